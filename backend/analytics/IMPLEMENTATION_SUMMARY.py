@@ -58,7 +58,7 @@ ANALYTICS_ENDPOINTS = {
             "status_breakdown (approved, rejected, pending)",
             "percentages",
             "defect_rate",
-            "average_quality_score",
+            "average_ai_confidence",
             "recent_trends"
         ]
     },
@@ -1,14 +1,14 @@
 """
 Django admin configuration for analytics app
-
-Currently no models are registered as the analytics app
-aggregates data from other apps without storing its own data.
-
-Future admin configurations can be added here when analytics
-models are implemented (e.g., cached metrics, snapshots).
 """
 
 from django.contrib import admin
+from analytics.models import AnalyticsSnapshot
+
 
-# No models to register currently
-# Analytics are computed in real-time from other apps' data
+@admin.register(AnalyticsSnapshot)
+class AnalyticsSnapshotAdmin(admin.ModelAdmin):
+    list_display = ['section', 'as_of', 'computation_ms']
+    list_filter = ['section']
+    readonly_fields = ['section', 'data', 'as_of', 'computation_ms']
+    ordering = ['-as_of']
@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class AnalyticsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'analytics'
+
+    def ready(self):
+        """
+        App initialization
+        """
+        # Invalidate cached analytics when their source models change
+        from analytics.signals import connect_source_models
+        connect_source_models()
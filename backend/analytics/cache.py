@@ -0,0 +1,137 @@
+"""
+Analytics response cache for TexPro AI
+
+Responses are cached per endpoint, role and site in the 'analytics' cache
+(file-based by default, so all workers share it). Each data source
+(workflow, machines, ...) has a generation token that is replaced by a new
+random one after a change to its models is committed (see
+analytics.signals); the tokens of the sources an endpoint reads are part of
+its cache key, so a change makes the affected entries unreachable instead
+of waiting for them to expire.
+
+Tokens are random rather than counters: a token culled from the cache is
+recreated as a new token, so culling invalidates like a change instead of
+resetting a counter to a value older entries were cached under.
+"""
+import hashlib
+import logging
+import uuid
+from functools import wraps
+from typing import Dict, Iterable
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework import status
+from rest_framework.response import Response
+
+from core.models import user_site_code
+
+logger = logging.getLogger('texproai.analytics')
+
+ANALYTICS_CACHE_ALIAS = 'analytics'
+KEY_PREFIX = 'texproai:analytics'
+
+DATA_SOURCES = ('workflow', 'machines', 'maintenance', 'quality', 'allocation')
+
+# Data sources each analytics section is computed from
+SECTION_SOURCES = {
+    'production': ('workflow',),
+    'machines': ('machines',),
+    'maintenance': ('maintenance', 'machines'),
+    'quality': ('quality',),
+    'allocation': ('allocation',),
+    'financial': DATA_SOURCES,
+    'dashboard': DATA_SOURCES,
+}
+
+
+def get_analytics_cache():
+    """The shared analytics cache, or the default cache when it is not configured"""
+    alias = ANALYTICS_CACHE_ALIAS if ANALYTICS_CACHE_ALIAS in settings.CACHES else 'default'
+    return caches[alias]
+
+
+def _generation_key(source: str) -> str:
+    return f'{KEY_PREFIX}:generation:{source}'
+
+
+def _new_generation() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+def get_generations(sources: Iterable[str]) -> Dict[str, str]:
+    """
+    Current generation token of each data source, created on first read
+
+    A token missing from the cache (never set, or culled) is added once, so
+    concurrent readers agree on it; if it cannot be stored the reader gets a
+    token of its own, which matches nothing cached.
+    """
+    cache = get_analytics_cache()
+    keys = {source: _generation_key(source) for source in sources}
+    stored = cache.get_many(list(keys.values()))
+    missing = [key for key in keys.values() if key not in stored]
+    if missing:
+        for key in missing:
+            cache.add(key, _new_generation(), timeout=None)
+        stored.update(cache.get_many(missing))
+    return {source: stored.get(key) or _new_generation() for source, key in keys.items()}
+
+
+def bump_generation(*sources: str) -> None:
+    """Invalidate the cached analytics reading the given data sources"""
+    cache = get_analytics_cache()
+    for source in sources:
+        cache.set(_generation_key(source), _new_generation(), timeout=None)
+
+
+def _user_scope(user) -> tuple:
+    role = getattr(user, 'role', '') or ''
+    return role, user_site_code(user) or ''
+
+
+def analytics_cache_key(section: str, request) -> str:
+    """
+    Cache key of an analytics response: section, requester role and site,
+    request path and query, and the generations of the section's sources
+    """
+    role, site = _user_scope(request.user)
+    path_digest = hashlib.md5(request.get_full_path().encode('utf-8')).hexdigest()
+    generations = get_generations(SECTION_SOURCES.get(section, DATA_SOURCES))
+    generation_part = '.'.join(generations[source] for source in sorted(generations))
+    return f'{KEY_PREFIX}:response:{section}:{role}:{site}:{path_digest}:{generation_part}'
+
+
+def cached_analytics(section: str, timeout: int = 60 * 5):
+    """
+    View decorator caching successful analytics responses in the shared
+    analytics cache; use with method_decorator on APIView methods, like
+    cache_page
+
+    Args:
+        section: analytics section the view serves (see SECTION_SOURCES)
+        timeout: upper bound in seconds on how long a response is kept
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            cache = get_analytics_cache()
+            try:
+                key = analytics_cache_key(section, request)
+                cached = cache.get(key)
+            except Exception as e:
+                logger.warning("Analytics cache unavailable for %s: %s", section, str(e))
+                return view_func(request, *args, **kwargs)
+
+            if cached is not None:
+                return Response(cached, status=status.HTTP_200_OK)
+
+            response = view_func(request, *args, **kwargs)
+            if response.status_code == status.HTTP_200_OK:
+                try:
+                    cache.set(key, response.data, timeout)
+                except Exception as e:
+                    logger.warning("Could not cache %s analytics: %s", section, str(e))
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,48 @@
+"""
+Management command to refresh the materialized analytics KPI snapshots
+"""
+
+from django.core.management.base import BaseCommand
+from analytics.models import AnalyticsSnapshot
+from analytics.services import SNAPSHOT_SECTIONS, refresh_analytics_snapshots
+
+
+class Command(BaseCommand):
+    help = 'Recompute analytics KPIs and store them as snapshots (run periodically, e.g. from cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--section',
+            action='append',
+            choices=list(SNAPSHOT_SECTIONS),
+            help='Section to refresh (repeatable). Defaults to all sections',
+        )
+        parser.add_argument(
+            '--keep-days',
+            type=int,
+            default=30,
+            help='Delete snapshots older than this many days (0 disables pruning)',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write('📊 Refreshing analytics snapshots...')
+
+        results = refresh_analytics_snapshots(options['section'])
+
+        for section, snapshot in results.items():
+            if snapshot is None:
+                self.stdout.write(
+                    self.style.WARNING(f'  ⚠️  {section}: computation failed, snapshot not stored')
+                )
+            else:
+                self.stdout.write(f'  ✓ {section} ({snapshot.computation_ms} ms)')
+
+        if options['keep_days'] > 0:
+            pruned = AnalyticsSnapshot.prune(options['keep_days'])
+            if pruned:
+                self.stdout.write(f'🧹 Pruned {pruned} old snapshots')
+
+        stored = sum(1 for snapshot in results.values() if snapshot is not None)
+        self.stdout.write(
+            self.style.SUCCESS(f'✅ Stored {stored}/{len(results)} analytics snapshots')
+        )
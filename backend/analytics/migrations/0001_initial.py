@@ -0,0 +1,32 @@
+"""
+Migration for AnalyticsSnapshot model
+"""
+import django.core.serializers.json
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name='AnalyticsSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('section', models.CharField(choices=[('dashboard', 'Dashboard Summary'), ('production', 'Production'), ('machines', 'Machines'), ('maintenance', 'Maintenance'), ('quality', 'Quality'), ('allocation', 'Allocation'), ('financial', 'Financial')], max_length=32)),
+                ('data', models.JSONField(default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('as_of', models.DateTimeField(default=django.utils.timezone.now, help_text='Time the KPIs were computed')),
+                ('computation_ms', models.PositiveIntegerField(default=0, help_text='Time spent computing the payload')),
+            ],
+            options={
+                'db_table': 'analytics_snapshot',
+                'ordering': ['-as_of'],
+                'get_latest_by': 'as_of',
+                'indexes': [models.Index(fields=['section', '-as_of'], name='analytics_snapshot_sec_asof')],
+            },
+        ),
+    ]
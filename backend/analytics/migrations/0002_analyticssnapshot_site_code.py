@@ -0,0 +1,27 @@
+"""
+Migration for per-site AnalyticsSnapshot rows
+"""
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='analyticssnapshot',
+            name='analytics_snapshot_sec_asof',
+        ),
+        migrations.AddField(
+            model_name='analyticssnapshot',
+            name='site_code',
+            field=models.CharField(blank=True, default='', help_text='Site the KPIs cover, empty for all sites', max_length=10),
+        ),
+        migrations.AddIndex(
+            model_name='analyticssnapshot',
+            index=models.Index(fields=['section', 'site_code', '-as_of'], name='analytics_snapshot_site_asof'),
+        ),
+    ]
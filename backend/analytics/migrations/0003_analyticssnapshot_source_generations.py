@@ -0,0 +1,19 @@
+"""
+Migration for the source generations of AnalyticsSnapshot rows
+"""
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0002_analyticssnapshot_site_code'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='analyticssnapshot',
+            name='source_generations',
+            field=models.JSONField(blank=True, default=dict, help_text='Generations of the data sources the KPIs were computed at'),
+        ),
+    ]
@@ -1,16 +1,71 @@
 """
 Analytics app models for TexPro AI
 
-This app primarily aggregates data from other apps and doesn't require
-its own database models. All analytics are computed in real-time from
-existing data in workflow, machines, maintenance, quality, and allocation apps.
-
-If caching or historical analytics storage is needed in the future,
-models can be added here for:
-- AnalyticsSnapshot (for historical KPI storage)
-- CachedMetrics (for performance optimization)
-- CustomReport (for saved report configurations)
+Analytics are aggregated from the workflow, machines, maintenance, quality
+and allocation apps. To avoid recomputing every aggregate on each dashboard
+hit, the computed KPI payloads are materialized into AnalyticsSnapshot rows
+which are refreshed periodically (see the refresh_analytics_snapshots
+management command) and read back with a single indexed lookup.
 """
+from datetime import timedelta
 
-# No models are currently needed for the analytics app
-# All data is aggregated from other apps in real-time
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from django.utils import timezone
+
+
+class AnalyticsSnapshot(models.Model):
+    """
+    Materialized KPI payload for one analytics section
+    """
+    SECTION_CHOICES = [
+        ('dashboard', 'Dashboard Summary'),
+        ('production', 'Production'),
+        ('machines', 'Machines'),
+        ('maintenance', 'Maintenance'),
+        ('quality', 'Quality'),
+        ('allocation', 'Allocation'),
+        ('financial', 'Financial'),
+    ]
+
+    section = models.CharField(max_length=32, choices=SECTION_CHOICES)
+    site_code = models.CharField(max_length=10, blank=True, default='', help_text='Site the KPIs cover, empty for all sites')
+    data = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    as_of = models.DateTimeField(default=timezone.now, help_text='Time the KPIs were computed')
+    computation_ms = models.PositiveIntegerField(default=0, help_text='Time spent computing the payload')
+    source_generations = models.JSONField(default=dict, blank=True, help_text='Generations of the data sources the KPIs were computed at')
+
+    class Meta:
+        db_table = 'analytics_snapshot'
+        ordering = ['-as_of']
+        get_latest_by = 'as_of'
+        indexes = [
+            models.Index(fields=['section', 'site_code', '-as_of'], name='analytics_snapshot_site_asof'),
+        ]
+
+    def __str__(self):
+        return f"{self.section} snapshot as of {self.as_of:%Y-%m-%d %H:%M}"
+
+    @property
+    def age_seconds(self):
+        """Seconds elapsed since the snapshot was computed"""
+        return (timezone.now() - self.as_of).total_seconds()
+
+    @classmethod
+    def get_fresh(cls, section, max_age, site_code=''):
+        """
+        Return the newest snapshot for a section (and site) if it is younger
+        than max_age (a timedelta), otherwise None
+        """
+        return cls.objects.filter(
+            section=section,
+            site_code=site_code,
+            as_of__gte=timezone.now() - max_age
+        ).order_by('-as_of').first()
+
+    @classmethod
+    def prune(cls, keep_days):
+        """Delete snapshots older than keep_days, returns deleted row count"""
+        cutoff = timezone.now() - timedelta(days=keep_days)
+        deleted, _ = cls.objects.filter(as_of__lt=cutoff).delete()
+        return deleted
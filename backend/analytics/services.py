@@ -3,15 +3,129 @@ Analytics services for TexPro AI
 Data aggregation and KPI calculation services
 """
 
-from django.db.models import Count, Avg, Sum, Q, F
+import logging
+import time
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import (
+    Aggregate, Count, Avg, Sum, Q, F, DurationField, ExpressionWrapper
+)
 from django.utils import timezone
 from datetime import timedelta
 from decimal import Decimal
 
+from analytics.cache import SECTION_SOURCES, get_generations
+from core.models import scope_to_site
+
+logger = logging.getLogger('texproai.analytics')
+
+
+# ---------------------------------------------------------------------------
+# Database-side duration statistics
+# ---------------------------------------------------------------------------
+
+class PercentileCont(Aggregate):
+    """
+    Continuous percentile ordered-set aggregate (PostgreSQL)
+    """
+    function = 'PERCENTILE_CONT'
+    name = 'PercentileCont'
+    template = '%(function)s(%(fraction)s) WITHIN GROUP (ORDER BY %(expressions)s)'
+
+    def __init__(self, expression, fraction, **extra):
+        super().__init__(expression, fraction=float(fraction), **extra)
+
+
+def _as_seconds(value):
+    """Convert a duration aggregate result to seconds"""
+    if value is None:
+        return None
+    if isinstance(value, timedelta):
+        return value.total_seconds()
+    # SQLite hands back raw microseconds for DurationField expressions
+    return float(value) / 1_000_000
+
+
+def _percentile_by_offset(queryset, count, fraction):
+    """
+    Interpolated percentile (same definition as PERCENTILE_CONT) for
+    backends without ordered-set aggregates. Reads at most two rows using
+    ORDER BY ... LIMIT 2 OFFSET k, so memory does not grow with the table.
+    """
+    position = (count - 1) * fraction
+    lower_index = int(position)
+    values = list(
+        queryset.order_by('duration').values_list('duration', flat=True)[lower_index:lower_index + 2]
+    )
+    if not values:
+        return None
+
+    lower = _as_seconds(values[0])
+    if len(values) == 1:
+        return lower
+    upper = _as_seconds(values[1])
+    return lower + (upper - lower) * (position - lower_index)
+
+
+def duration_statistics(queryset, start_field, end_field, percentiles=(50, 90)):
+    """
+    Average and percentiles of end_field - start_field computed in the
+    database. Rows missing either bound are ignored.
+
+    Returns a dict with 'count', 'average' and 'p<N>' keys, durations in
+    seconds (None when there are no rows).
+    """
+    durations = queryset.filter(
+        **{f'{start_field}__isnull': False, f'{end_field}__isnull': False}
+    ).annotate(
+        duration=ExpressionWrapper(F(end_field) - F(start_field), output_field=DurationField())
+    )
+
+    aggregates = {
+        'count': Count('pk'),
+        'average': Avg('duration'),
+    }
+    use_percentile_cont = connection.vendor == 'postgresql'
+    if use_percentile_cont:
+        for percentile in percentiles:
+            aggregates[f'p{percentile}'] = PercentileCont(
+                'duration', percentile / 100, output_field=DurationField()
+            )
+
+    result = durations.aggregate(**aggregates)
+    stats = {
+        'count': result['count'],
+        'average': _as_seconds(result['average']),
+    }
+
+    for percentile in percentiles:
+        key = f'p{percentile}'
+        if use_percentile_cont:
+            stats[key] = _as_seconds(result[key])
+        elif result['count']:
+            stats[key] = _percentile_by_offset(durations, result['count'], percentile / 100)
+        else:
+            stats[key] = None
+
+    return stats
+
+
+def _scaled_durations(stats, unit_seconds, percentiles=(50, 90)):
+    """Average and percentile durations from duration_statistics() in a unit"""
+    def scale(value):
+        return round(value / unit_seconds, 1) if value is not None else 0
 
-def get_financial_analytics():
+    return scale(stats['average']), {
+        f'p{percentile}': scale(stats[f'p{percentile}']) for percentile in percentiles
+    }
+
+
+def compute_financial_analytics(site_code=None):
     """
-    Calculate financial KPIs from various apps
+    Calculate financial KPIs from various apps, for one site when site_code
+    is given. Only machine and maintenance costs are scoped; batches and
+    quality checks do not belong to a site.
     """
     try:
         from workflow.models import BatchWorkflow
@@ -31,15 +145,15 @@ def get_financial_analytics():
         total_production_cost = total_batches * avg_batch_cost
         
         # Machine operation costs
-        total_machines = Machine.objects.count()
+        total_machines = Machine.objects.for_site(site_code).count()
         avg_machine_daily_cost = Decimal('200.00')  # Daily operation cost per machine
         days_in_period = 30  # Last 30 days
         total_machine_costs = total_machines * avg_machine_daily_cost * days_in_period
         
         # Maintenance costs
-        maintenance_logs = MaintenanceLog.objects.filter(
+        maintenance_logs = scope_to_site(MaintenanceLog.objects.filter(
             created_at__gte=timezone.now() - timedelta(days=30)
-        )
+        ), site_code, 'machine__site_code')
         
         # Estimated maintenance costs
         maintenance_cost_per_log = Decimal('500.00')
@@ -154,7 +268,7 @@ def get_financial_analytics():
         }
 
 
-def get_production_analytics():
+def compute_production_analytics():
     """
     Calculate production KPIs from workflow app
     """
@@ -173,23 +287,11 @@ def get_production_analytics():
         in_progress_count = status_breakdown.get('in_progress', 0)
         delayed_count = status_breakdown.get('delayed', 0)
         
-        # Calculate average batch duration for completed batches
-        completed_batches = BatchWorkflow.objects.filter(
-            status='completed',
-            start_date__isnull=False,
-            end_date__isnull=False
+        # Batch duration statistics for completed batches (computed in the database)
+        duration_stats = duration_statistics(
+            BatchWorkflow.objects.filter(status='completed'), 'start_date', 'end_date'
         )
-        
-        avg_duration_days = 0
-        if completed_batches.exists():
-            durations = []
-            for batch in completed_batches:
-                if batch.start_date and batch.end_date:
-                    duration = (batch.end_date - batch.start_date).days
-                    durations.append(duration)
-            
-            if durations:
-                avg_duration_days = sum(durations) / len(durations)
+        avg_duration_days, duration_percentiles = _scaled_durations(duration_stats, 86400)
         
         # Recent activity (last 30 days)
         thirty_days_ago = timezone.now().date() - timedelta(days=30)
@@ -210,7 +312,8 @@ def get_production_analytics():
                 'in_progress': round((in_progress_count / total_batches * 100), 1) if total_batches > 0 else 0,
                 'delayed': round((delayed_count / total_batches * 100), 1) if total_batches > 0 else 0
             },
-            'average_duration_days': round(avg_duration_days, 1),
+            'average_duration_days': avg_duration_days,
+            'duration_percentiles_days': duration_percentiles,
             'recent_activity': {
                 'batches_last_30_days': recent_batches
             }
@@ -223,71 +326,40 @@ def get_production_analytics():
             'status_breakdown': {},
             'percentages': {},
             'average_duration_days': 0,
+            'duration_percentiles_days': {},
             'recent_activity': {}
         }
 
 
-def get_machine_analytics():
+def compute_machine_analytics(site_code=None):
     """
-    Calculate machine KPIs from machines app
+    Calculate machine KPIs from machines app, for one site when site_code is given
     """
     try:
         from machines.models import Machine
         
-        # Basic counts
-        total_machines = Machine.objects.count()
-        
-        # Status breakdown
-        status_counts = Machine.objects.values('status').annotate(count=Count('id'))
-        status_breakdown = {item['status']: item['count'] for item in status_counts}
-        
-        operational_count = status_breakdown.get('operational', 0)
-        maintenance_count = status_breakdown.get('under_maintenance', 0)
-        offline_count = status_breakdown.get('offline', 0)
+        machines = Machine.objects.for_site(site_code)
+
+        # Status breakdown (one conditional aggregate, shared with the dashboard)
+        machine_data = _machine_status_data(_machine_status_counts(machines))
         
-        # Calculate average downtime from maintenance records
+        # Calculate downtime from completed maintenance records (in the database)
         try:
             from maintenance.models import MaintenanceLog
             
-            # Get recent completed maintenance records
-            completed_maintenance = MaintenanceLog.objects.filter(
-                status='resolved',
-                start_date__isnull=False,
-                completion_date__isnull=False
+            completed_logs = scope_to_site(
+                MaintenanceLog.objects.filter(status='completed'), site_code, 'machine__site_code'
             )
+            downtime_stats = duration_statistics(completed_logs, 'reported_at', 'resolved_at')
+            avg_downtime_hours, downtime_percentiles = _scaled_durations(downtime_stats, 3600)
             
-            avg_downtime_hours = 0
-            if completed_maintenance.exists():
-                downtimes = []
-                for log in completed_maintenance:
-                    if log.start_date and log.completion_date:
-                        downtime = (log.completion_date - log.start_date).total_seconds() / 3600
-                        downtimes.append(downtime)
-                
-                if downtimes:
-                    avg_downtime_hours = sum(downtimes) / len(downtimes)
-            
-        except:
-            avg_downtime_hours = 0
-        
-        # Machine utilization
-        utilization_rate = round((operational_count / total_machines * 100), 1) if total_machines > 0 else 0
+        except Exception:
+            avg_downtime_hours, downtime_percentiles = 0, {}
         
         return {
-            'total_machines': total_machines,
-            'status_breakdown': {
-                'operational': operational_count,
-                'under_maintenance': maintenance_count,
-                'offline': offline_count,
-                'other': total_machines - operational_count - maintenance_count - offline_count
-            },
-            'percentages': {
-                'operational': round((operational_count / total_machines * 100), 1) if total_machines > 0 else 0,
-                'under_maintenance': round((maintenance_count / total_machines * 100), 1) if total_machines > 0 else 0,
-                'offline': round((offline_count / total_machines * 100), 1) if total_machines > 0 else 0
-            },
-            'utilization_rate': utilization_rate,
-            'average_downtime_hours': round(avg_downtime_hours, 1)
+            **machine_data,
+            'average_downtime_hours': avg_downtime_hours,
+            'downtime_percentiles_hours': downtime_percentiles
         }
         
     except Exception as e:
@@ -297,71 +369,61 @@ def get_machine_analytics():
             'status_breakdown': {},
             'percentages': {},
             'utilization_rate': 0,
-            'average_downtime_hours': 0
+            'average_downtime_hours': 0,
+            'downtime_percentiles_hours': {}
         }
 
 
-def get_maintenance_analytics():
+def compute_maintenance_analytics(site_code=None):
     """
-    Calculate maintenance KPIs from maintenance app
+    Calculate maintenance KPIs from maintenance app, for the machines of one
+    site when site_code is given
     """
     try:
         from maintenance.models import MaintenanceLog
         
+        logs = scope_to_site(MaintenanceLog.objects.all(), site_code, 'machine__site_code')
+
         # Basic counts
-        total_logs = MaintenanceLog.objects.count()
+        total_logs = logs.count()
         
         # Status breakdown
-        status_counts = MaintenanceLog.objects.values('status').annotate(count=Count('id'))
+        status_counts = logs.values('status').annotate(count=Count('id'))
         status_breakdown = {item['status']: item['count'] for item in status_counts}
         
         open_count = status_breakdown.get('pending', 0) + status_breakdown.get('in_progress', 0)
-        resolved_count = status_breakdown.get('resolved', 0)
+        resolved_count = status_breakdown.get('completed', 0)
         
-        # Calculate average resolution time
-        resolved_logs = MaintenanceLog.objects.filter(
-            status='resolved',
-            start_date__isnull=False,
-            completion_date__isnull=False
+        # Resolution time statistics (computed in the database)
+        resolution_stats = duration_statistics(
+            logs.filter(status='completed'), 'reported_at', 'resolved_at'
         )
-        
-        avg_resolution_hours = 0
-        if resolved_logs.exists():
-            resolution_times = []
-            for log in resolved_logs:
-                if log.start_date and log.completion_date:
-                    resolution_time = (log.completion_date - log.start_date).total_seconds() / 3600
-                    resolution_times.append(resolution_time)
-            
-            if resolution_times:
-                avg_resolution_hours = sum(resolution_times) / len(resolution_times)
-        
-        # Next maintenance due (scheduled for next 30 days)
-        thirty_days_ahead = timezone.now().date() + timedelta(days=30)
-        upcoming_maintenance = MaintenanceLog.objects.filter(
-            status='scheduled',
-            scheduled_date__lte=thirty_days_ahead,
-            scheduled_date__gte=timezone.now().date()
+        avg_resolution_hours, resolution_percentiles = _scaled_durations(resolution_stats, 3600)
+        
+        # Next maintenance due (open logs due in the next 30 days)
+        today = timezone.now().date()
+        open_logs = logs.exclude(status='completed')
+        upcoming_maintenance = open_logs.filter(
+            next_due_date__lte=today + timedelta(days=30),
+            next_due_date__gte=today
         ).count()
         
         # Overdue maintenance
-        overdue_maintenance = MaintenanceLog.objects.filter(
-            status='scheduled',
-            scheduled_date__lt=timezone.now().date()
-        ).count()
+        overdue_maintenance = open_logs.filter(next_due_date__lt=today).count()
         
         return {
             'total_maintenance_logs': total_logs,
             'status_breakdown': {
                 'open': open_count,
                 'resolved': resolved_count,
-                'scheduled': status_breakdown.get('scheduled', 0)
+                'scheduled': upcoming_maintenance
             },
             'percentages': {
                 'resolved': round((resolved_count / total_logs * 100), 1) if total_logs > 0 else 0,
                 'open': round((open_count / total_logs * 100), 1) if total_logs > 0 else 0
             },
-            'average_resolution_hours': round(avg_resolution_hours, 1),
+            'average_resolution_hours': avg_resolution_hours,
+            'resolution_percentiles_hours': resolution_percentiles,
             'upcoming_maintenance': {
                 'next_30_days': upcoming_maintenance,
                 'overdue': overdue_maintenance
@@ -375,11 +437,12 @@ def get_maintenance_analytics():
             'status_breakdown': {},
             'percentages': {},
             'average_resolution_hours': 0,
+            'resolution_percentiles_hours': {},
             'upcoming_maintenance': {}
         }
 
 
-def get_quality_analytics():
+def compute_quality_analytics():
     """
     Calculate quality KPIs from quality app
     """
@@ -400,17 +463,15 @@ def get_quality_analytics():
         # Calculate defect rate (percentage of rejected checks)
         defect_rate = round((rejected_count / total_checks * 100), 1) if total_checks > 0 else 0
         
-        # Quality score average
-        quality_scores = QualityCheck.objects.filter(
-            quality_score__isnull=False
-        ).aggregate(avg_score=Avg('quality_score'))
-        
-        avg_quality_score = quality_scores['avg_score'] or 0
+        # Average AI confidence (0.0 to 1.0) of the analysed checks
+        avg_ai_confidence = QualityCheck.objects.aggregate(
+            average=Avg('ai_confidence_score')
+        )['average'] or 0
         
         # Recent quality trends (last 30 days)
-        thirty_days_ago = timezone.now().date() - timedelta(days=30)
+        thirty_days_ago = timezone.now() - timedelta(days=30)
         recent_checks = QualityCheck.objects.filter(
-            check_date__gte=thirty_days_ago
+            created_at__gte=thirty_days_ago
         )
         
         recent_approved = recent_checks.filter(status='approved').count()
@@ -430,7 +491,7 @@ def get_quality_analytics():
                 'pending': round((pending_count / total_checks * 100), 1) if total_checks > 0 else 0
             },
             'defect_rate': defect_rate,
-            'average_quality_score': round(float(avg_quality_score), 1),
+            'average_ai_confidence': round(float(avg_ai_confidence) * 100, 1),
             'recent_trends': {
                 'last_30_days_checks': recent_total,
                 'recent_approval_rate': recent_approval_rate
@@ -444,12 +505,12 @@ def get_quality_analytics():
             'status_breakdown': {},
             'percentages': {},
             'defect_rate': 0,
-            'average_quality_score': 0,
+            'average_ai_confidence': 0,
             'recent_trends': {}
         }
 
 
-def get_allocation_analytics():
+def compute_allocation_analytics():
     """
     Calculate allocation KPIs from allocation app
     """
@@ -515,33 +576,268 @@ def get_allocation_analytics():
         }
 
 
-def get_dashboard_summary():
+def _percentage(part, total):
+    """Percentage of part in total rounded to one decimal"""
+    return round((part / total * 100), 1) if total > 0 else 0
+
+
+def _machine_status_counts(machines):
+    """Machine counts per operational_status in one conditional aggregate"""
+    return machines.aggregate(
+        total=Count('id'),
+        running=Count('id', filter=Q(operational_status='running')),
+        idle=Count('id', filter=Q(operational_status='idle')),
+        maintenance=Count('id', filter=Q(operational_status='maintenance')),
+        breakdown=Count('id', filter=Q(operational_status='breakdown')),
+        offline=Count('id', filter=Q(operational_status='offline')),
+    )
+
+
+def _machine_status_data(counts):
+    """
+    Machine status breakdown, percentages and utilization from
+    _machine_status_counts(); running and idle machines are operational
+    """
+    total = counts['total']
+    operational = counts['running'] + counts['idle']
+    return {
+        'total_machines': total,
+        'status_breakdown': {
+            'operational': operational,
+            'under_maintenance': counts['maintenance'],
+            'offline': counts['offline'],
+            'breakdown': counts['breakdown'],
+            'other': total - operational - counts['maintenance'] - counts['offline'] - counts['breakdown']
+        },
+        'percentages': {
+            'operational': _percentage(operational, total),
+            'under_maintenance': _percentage(counts['maintenance'], total),
+            'offline': _percentage(counts['offline'], total)
+        },
+        'utilization_rate': _percentage(counts['running'], total)
+    }
+
+
+def aggregate_dashboard_metrics(site_code=None):
+    """
+    Collect every count the dashboard needs with a single conditional
+    aggregate query per source table (six queries), plus the allocation
+    breakdowns and duration statistics the section endpoints also report.
+    With a site_code only the machine and maintenance counts are scoped;
+    batches, quality checks and allocations are not tied to a site.
+    """
+    from workflow.models import BatchWorkflow
+    from machines.models import Machine
+    from maintenance.models import MaintenanceLog
+    from quality.models import QualityCheck
+    from allocation.models import WorkforceAllocation, MaterialAllocation
+
+    now = timezone.now()
+    today = now.date()
+    thirty_days_ago = now - timedelta(days=30)
+
+    batches = BatchWorkflow.objects.aggregate(
+        total=Count('id'),
+        completed=Count('id', filter=Q(status='completed')),
+        in_progress=Count('id', filter=Q(status='in_progress')),
+        delayed=Count('id', filter=Q(status='delayed')),
+        pending=Count('id', filter=Q(status='pending')),
+        recent=Count('id', filter=Q(created_at__gte=thirty_days_ago)),
+    )
+
+    machines = _machine_status_counts(Machine.objects.for_site(site_code))
+
+    maintenance_logs = scope_to_site(MaintenanceLog.objects.all(), site_code, 'machine__site_code')
+    maintenance = maintenance_logs.aggregate(
+        total=Count('id'),
+        pending=Count('id', filter=Q(status='pending')),
+        in_progress=Count('id', filter=Q(status='in_progress')),
+        completed=Count('id', filter=Q(status='completed')),
+        upcoming=Count('id', filter=(
+            ~Q(status='completed') &
+            Q(next_due_date__gte=today, next_due_date__lte=today + timedelta(days=30))
+        )),
+        overdue=Count('id', filter=~Q(status='completed') & Q(next_due_date__lt=today)),
+    )
+
+    quality = QualityCheck.objects.aggregate(
+        total=Count('id'),
+        approved=Count('id', filter=Q(status='approved')),
+        rejected=Count('id', filter=Q(status='rejected')),
+        pending=Count('id', filter=Q(status='pending')),
+        recent=Count('id', filter=Q(created_at__gte=thirty_days_ago)),
+        recent_approved=Count('id', filter=Q(status='approved', created_at__gte=thirty_days_ago)),
+        today=Count('id', filter=Q(created_at__date=today)),
+    )
+
+    workforce = WorkforceAllocation.objects.aggregate(
+        total=Count('id'),
+        active=Count('id', filter=Q(end_date__isnull=True) | Q(end_date__gte=today)),
+        batches=Count('batch', distinct=True),
+    )
+
+    materials = MaterialAllocation.objects.aggregate(
+        total=Count('id'),
+        total_cost=Sum(F('quantity') * F('cost_per_unit')),
+        unique_materials=Count('material_name', distinct=True),
+    )
+
+    # Breakdowns the section endpoints also report
+    workforce['average_per_batch'] = WorkforceAllocation.objects.values('batch').annotate(
+        workforce_count=Count('user', distinct=True)
+    ).aggregate(average=Avg('workforce_count'))['average'] or 0
+    workforce['role_distribution'] = list(
+        WorkforceAllocation.objects.values('role_assigned').annotate(count=Count('id'))
+    )
+    materials['top_by_cost'] = list(
+        MaterialAllocation.objects.values('material_name').annotate(
+            total_quantity=Sum('quantity'),
+            total_cost=Sum(F('quantity') * F('cost_per_unit')),
+            allocation_count=Count('id')
+        ).order_by('-total_cost')[:10]
+    )
+
+    # Completed maintenance gives both machine downtime and resolution time
+    durations = {
+        'batches': duration_statistics(
+            BatchWorkflow.objects.filter(status='completed'), 'start_date', 'end_date'
+        ),
+        'maintenance': duration_statistics(
+            maintenance_logs.filter(status='completed'), 'reported_at', 'resolved_at'
+        ),
+    }
+
+    return {
+        'batches': batches,
+        'machines': machines,
+        'maintenance': maintenance,
+        'quality': quality,
+        'workforce': workforce,
+        'materials': materials,
+        'durations': durations,
+    }
+
+
+def compute_dashboard_summary(site_code=None):
     """
-    Get overall dashboard summary with key metrics from all apps
+    Get overall dashboard summary with key metrics from all apps.
+    Built in a single pass from aggregate_dashboard_metrics(), with the
+    same keys as the per-section analytics.
     """
     try:
-        # Get key metrics from each app
-        production = get_production_analytics()
-        machines = get_machine_analytics()
-        maintenance = get_maintenance_analytics()
-        quality = get_quality_analytics()
-        allocation = get_allocation_analytics()
-        
+        metrics = aggregate_dashboard_metrics(site_code)
+        batches = metrics['batches']
+        machines = metrics['machines']
+        maintenance = metrics['maintenance']
+        quality = metrics['quality']
+        workforce = metrics['workforce']
+        materials = metrics['materials']
+
+        avg_duration_days, duration_percentiles = _scaled_durations(metrics['durations']['batches'], 86400)
+        avg_resolution_hours, resolution_percentiles = _scaled_durations(
+            metrics['durations']['maintenance'], 3600
+        )
+
+        machines_data = _machine_status_data(machines)
+        machines_data['average_downtime_hours'] = avg_resolution_hours
+        machines_data['downtime_percentiles_hours'] = resolution_percentiles
+        operational_machines = machines_data['status_breakdown']['operational']
+        open_maintenance = maintenance['pending'] + maintenance['in_progress']
+
+        production_data = {
+            'total_batches': batches['total'],
+            'status_breakdown': {
+                'completed': batches['completed'],
+                'in_progress': batches['in_progress'],
+                'delayed': batches['delayed'],
+                'other': batches['total'] - batches['completed'] - batches['in_progress'] - batches['delayed']
+            },
+            'percentages': {
+                'completed': _percentage(batches['completed'], batches['total']),
+                'in_progress': _percentage(batches['in_progress'], batches['total']),
+                'delayed': _percentage(batches['delayed'], batches['total'])
+            },
+            'average_duration_days': avg_duration_days,
+            'duration_percentiles_days': duration_percentiles,
+            'recent_activity': {
+                'batches_last_30_days': batches['recent']
+            }
+        }
+
+        maintenance_data = {
+            'total_maintenance_logs': maintenance['total'],
+            'status_breakdown': {
+                'open': open_maintenance,
+                'resolved': maintenance['completed'],
+                'scheduled': maintenance['upcoming']
+            },
+            'percentages': {
+                'resolved': _percentage(maintenance['completed'], maintenance['total']),
+                'open': _percentage(open_maintenance, maintenance['total'])
+            },
+            'average_resolution_hours': avg_resolution_hours,
+            'resolution_percentiles_hours': resolution_percentiles,
+            'pending_count': maintenance['pending'],
+            'in_progress_count': maintenance['in_progress'],
+            'completed_count': maintenance['completed'],
+            'scheduled_count': maintenance['upcoming'],
+            'upcoming_maintenance': {
+                'next_30_days': maintenance['upcoming'],
+                'overdue': maintenance['overdue']
+            }
+        }
+
+        quality_data = {
+            'total_quality_checks': quality['total'],
+            'status_breakdown': {
+                'approved': quality['approved'],
+                'rejected': quality['rejected'],
+                'pending': quality['pending']
+            },
+            'percentages': {
+                'approved': _percentage(quality['approved'], quality['total']),
+                'rejected': _percentage(quality['rejected'], quality['total']),
+                'pending': _percentage(quality['pending'], quality['total'])
+            },
+            'defect_rate': _percentage(quality['rejected'], quality['total']),
+            'checks_today': quality['today'],
+            'recent_trends': {
+                'last_30_days_checks': quality['recent'],
+                'recent_approval_rate': _percentage(quality['recent_approved'], quality['recent'])
+            }
+        }
+
+        allocation_data = {
+            'workforce_analytics': {
+                'total_allocations': workforce['total'],
+                'average_workforce_per_batch': round(float(workforce['average_per_batch']), 1),
+                'active_workforce': workforce['active'],
+                'role_distribution': workforce['role_distribution'],
+                'batches_staffed': workforce['batches']
+            },
+            'material_analytics': {
+                'total_allocations': materials['total'],
+                'total_material_cost_xof': float(materials['total_cost'] or 0),
+                'top_materials_by_cost': materials['top_by_cost'],
+                'unique_materials': materials['unique_materials']
+            }
+        }
+
         return {
             'timestamp': timezone.now().isoformat(),
             'summary': {
-                'total_batches': production.get('total_batches', 0),
-                'operational_machines': machines.get('status_breakdown', {}).get('operational', 0),
-                'quality_approval_rate': quality.get('percentages', {}).get('approved', 0),
-                'active_workforce': allocation.get('workforce_analytics', {}).get('active_workforce', 0),
-                'overdue_maintenance': maintenance.get('upcoming_maintenance', {}).get('overdue', 0)
+                'total_batches': batches['total'],
+                'operational_machines': operational_machines,
+                'quality_approval_rate': quality_data['percentages']['approved'],
+                'active_workforce': workforce['active'],
+                'overdue_maintenance': maintenance['overdue']
             },
             'detailed_analytics': {
-                'production': production,
-                'machines': machines,
-                'maintenance': maintenance,
-                'quality': quality,
-                'allocation': allocation
+                'production': production_data,
+                'machines': machines_data,
+                'maintenance': maintenance_data,
+                'quality': quality_data,
+                'allocation': allocation_data
             }
         }
         
@@ -552,3 +848,174 @@ def get_dashboard_summary():
             'summary': {},
             'detailed_analytics': {}
         }
+
+
+# ---------------------------------------------------------------------------
+# Materialized KPI snapshots
+# ---------------------------------------------------------------------------
+
+SNAPSHOT_SECTIONS = {
+    'production': compute_production_analytics,
+    'machines': compute_machine_analytics,
+    'maintenance': compute_maintenance_analytics,
+    'quality': compute_quality_analytics,
+    'allocation': compute_allocation_analytics,
+    'financial': compute_financial_analytics,
+    'dashboard': compute_dashboard_summary,
+}
+
+# Sections whose KPIs can be computed for a single site
+SITE_SCOPED_SECTIONS = ('machines', 'maintenance', 'financial', 'dashboard')
+
+
+def get_snapshot_max_age():
+    """
+    Maximum age of a snapshot before it is considered stale
+    """
+    minutes = settings.TEXPROAI_SETTINGS.get('ANALYTICS_SNAPSHOT_MAX_AGE_MINUTES', 15)
+    return timedelta(minutes=minutes)
+
+
+def _compute_section(section, site_code=None):
+    if site_code and section in SITE_SCOPED_SECTIONS:
+        return SNAPSHOT_SECTIONS[section](site_code=site_code)
+    return SNAPSHOT_SECTIONS[section]()
+
+
+def store_snapshot(section, site_code=None, replace=None):
+    """
+    Compute the KPIs of a section (for one site when site_code is given)
+    and persist them as a new snapshot, or over the stale snapshot given
+    as replace.
+    Returns the snapshot, or None when the computation reported an error.
+    """
+    from analytics.models import AnalyticsSnapshot
+
+    if section not in SITE_SCOPED_SECTIONS:
+        site_code = None
+
+    # Read before computing, so a change committed meanwhile makes the snapshot stale
+    generations = get_generations(SECTION_SOURCES[section])
+    started = time.monotonic()
+    data = _compute_section(section, site_code)
+    elapsed_ms = int((time.monotonic() - started) * 1000)
+
+    if 'error' in data:
+        logger.warning("Not storing %s snapshot: %s", section, data['error'])
+        return None
+
+    if replace is not None:
+        replace.data = data
+        replace.source_generations = generations
+        replace.as_of = timezone.now()
+        replace.computation_ms = elapsed_ms
+        replace.save(update_fields=['data', 'source_generations', 'as_of', 'computation_ms'])
+        return replace
+
+    return AnalyticsSnapshot.objects.create(
+        section=section,
+        site_code=site_code or '',
+        data=data,
+        source_generations=generations,
+        computation_ms=elapsed_ms
+    )
+
+
+def get_section_analytics(section, site_code=None):
+    """
+    Return the KPIs of a section from its latest fresh snapshot.
+    Site-scoped sections keep separate snapshots per site_code; other
+    sections ignore it.
+    A snapshot is fresh while it is younger than the maximum age and the
+    generations of the section's sources are those it was computed at.
+    Falls back to computing (and storing) the section when no fresh
+    snapshot exists, so dashboards keep working before the first refresh;
+    a snapshot made stale by a change is recomputed in place.
+    """
+    from analytics.models import AnalyticsSnapshot
+
+    if section not in SITE_SCOPED_SECTIONS:
+        site_code = None
+
+    try:
+        snapshot = AnalyticsSnapshot.get_fresh(section, get_snapshot_max_age(), site_code or '')
+        if snapshot is None:
+            snapshot = store_snapshot(section, site_code)
+        elif snapshot.source_generations != get_generations(SECTION_SOURCES[section]):
+            snapshot = store_snapshot(section, site_code, replace=snapshot)
+    except Exception as e:
+        logger.warning("Analytics snapshot unavailable for %s: %s", section, str(e))
+        snapshot = None
+
+    if snapshot is None:
+        return _compute_section(section, site_code)
+
+    data = dict(snapshot.data)
+    data['as_of'] = snapshot.as_of.isoformat()
+    return data
+
+
+def refresh_analytics_snapshots(sections=None):
+    """
+    Recompute and persist snapshots for the given sections (all by default).
+    Site-scoped sections are also refreshed for every site (see
+    snapshot_site_codes), so site users keep reading fresh snapshots.
+    Returns a dict mapping section name, or "section:site_code" for a
+    site's snapshot, to the stored snapshot (or None).
+    """
+    sections = sections or list(SNAPSHOT_SECTIONS)
+    ordered = [name for name in SNAPSHOT_SECTIONS if name in sections]
+    site_codes = snapshot_site_codes() if any(name in SITE_SCOPED_SECTIONS for name in ordered) else []
+
+    results = {}
+    for section in ordered:
+        results[section] = store_snapshot(section)
+        if section in SITE_SCOPED_SECTIONS:
+            for site_code in site_codes:
+                results[f'{section}:{site_code}'] = store_snapshot(section, site_code)
+    return results
+
+
+def snapshot_site_codes():
+    """Sites with machines in service, and sites that already have snapshots"""
+    from analytics.models import AnalyticsSnapshot
+    from machines.models import Machine
+
+    machine_sites = Machine.objects.exclude(status='archived').filter(site_code__gt='').values_list('site_code', flat=True)
+    snapshot_sites = AnalyticsSnapshot.objects.filter(site_code__gt='').values_list('site_code', flat=True)
+    return sorted(set(machine_sites.distinct()) | set(snapshot_sites.distinct()))
+
+
+def get_financial_analytics(site_code=None):
+    """Financial KPIs (of one site when site_code is given), served from the latest snapshot"""
+    return get_section_analytics('financial', site_code)
+
+
+def get_production_analytics():
+    """Production KPIs, served from the latest snapshot"""
+    return get_section_analytics('production')
+
+
+def get_machine_analytics(site_code=None):
+    """Machine KPIs (of one site when site_code is given), served from the latest snapshot"""
+    return get_section_analytics('machines', site_code)
+
+
+def get_maintenance_analytics(site_code=None):
+    """Maintenance KPIs (of one site when site_code is given), served from the latest snapshot"""
+    return get_section_analytics('maintenance', site_code)
+
+
+def get_quality_analytics():
+    """Quality KPIs, served from the latest snapshot"""
+    return get_section_analytics('quality')
+
+
+def get_allocation_analytics():
+    """Allocation KPIs, served from the latest snapshot"""
+    return get_section_analytics('allocation')
+
+
+def get_dashboard_summary(site_code=None):
+    """Dashboard summary (of one site when site_code is given), served from the latest snapshot"""
+    return get_section_analytics('dashboard', site_code)
@@ -0,0 +1,46 @@
+"""
+Analytics signals for TexPro AI
+Invalidate cached analytics when the models they are computed from change
+"""
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+
+from analytics.cache import bump_generation
+
+# Models whose changes invalidate each analytics data source
+SOURCE_MODELS = {
+    'workflow': ['workflow.BatchWorkflow'],
+    'machines': ['machines.Machine'],
+    'maintenance': ['maintenance.MaintenanceLog'],
+    'quality': ['quality.QualityCheck'],
+    'allocation': ['allocation.WorkforceAllocation', 'allocation.MaterialAllocation'],
+}
+
+
+def invalidate_analytics(*sources):
+    """
+    Bump the generation of the given data sources once the current
+    transaction commits, so that a recomputation cannot read the
+    uncommitted state under the new generation
+    """
+    transaction.on_commit(partial(bump_generation, *sources))
+
+
+def _invalidate_source(sender, source, **kwargs):
+    invalidate_analytics(source)
+
+
+def connect_source_models():
+    """Connect the post_save/post_delete invalidation handlers"""
+    from django.apps import apps
+
+    for source, model_labels in SOURCE_MODELS.items():
+        for label in model_labels:
+            model = apps.get_model(label)
+            handler = partial(_invalidate_source, source=source)
+            post_save.connect(handler, sender=model, weak=False,
+                              dispatch_uid=f'analytics_invalidate_{label}_save')
+            post_delete.connect(handler, sender=model, weak=False,
+                                dispatch_uid=f'analytics_invalidate_{label}_delete')
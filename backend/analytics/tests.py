@@ -1,3 +1,461 @@
-from django.test import TestCase
+"""
+Test suite for analytics app
+Tests KPI snapshot storage and the analytics services
+"""
+from datetime import date, timedelta
+from io import StringIO
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from analytics.cache import bump_generation, get_analytics_cache, get_generations
+from analytics.models import AnalyticsSnapshot
+from analytics.services import (
+    compute_dashboard_summary,
+    compute_maintenance_analytics,
+    compute_production_analytics,
+    duration_statistics,
+    get_dashboard_summary,
+    get_financial_analytics,
+    get_machine_analytics,
+    get_production_analytics,
+    get_section_analytics,
+    refresh_analytics_snapshots,
+)
+from machines.models import Machine, MachineType
+from maintenance.models import MaintenanceLog
+from quality.models import QualityCheck
+from workflow.models import BatchWorkflow
+
+User = get_user_model()
+
+# Keep the shared analytics cache off disk while testing
+TEST_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'analytics': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'analytics-tests',
+    },
+}
+
+
+class AnalyticsTestMixin:
+    """Mixin providing common test data for analytics tests"""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Set up test data shared across test methods"""
+        cls.supervisor = User.objects.create_user(
+            username="supervisor_user",
+            email="supervisor@texpro.com",
+            password="testpass123",
+            role="supervisor",
+            status="active",
+            employee_id="SU0001"
+        )
+
+        # bulk_create keeps the notification signals out of the fixtures
+        BatchWorkflow.objects.bulk_create([
+            BatchWorkflow(
+                batch_code=f"BATCH-{index:03d}",
+                status=batch_status,
+                supervisor=cls.supervisor,
+                start_date=date(2025, 1, 1),
+                end_date=date(2025, 1, 1) + timedelta(days=index + 2)
+            )
+            for index, batch_status in enumerate(['completed', 'completed', 'in_progress', 'delayed'])
+        ])
+
+    def create_batch(self, batch_code, **kwargs):
+        """Helper method to add a batch without firing signals"""
+        return BatchWorkflow.objects.bulk_create([
+            BatchWorkflow(batch_code=batch_code, supervisor=self.supervisor, **kwargs)
+        ])[0]
+
+
+# SNAPSHOT TESTS
+@override_settings(CACHES=TEST_CACHES)
+class AnalyticsSnapshotTest(AnalyticsTestMixin, TestCase):
+    """Test cases for materialized KPI snapshots"""
+
+    def test_refresh_stores_one_snapshot_per_section(self):
+        """Test refresh persists every section it computes"""
+        results = refresh_analytics_snapshots(['production', 'dashboard'])
+
+        self.assertEqual(list(results), ['production', 'dashboard'])
+        self.assertEqual(AnalyticsSnapshot.objects.filter(section='production').count(), 1)
+        snapshot = AnalyticsSnapshot.objects.get(section='production')
+        self.assertEqual(snapshot.data['total_batches'], 4)
+
+    def test_quality_snapshot_is_stored(self):
+        """Test the quality section computes without error and is snapshotted"""
+        batch = BatchWorkflow.objects.get(batch_code="BATCH-000")
+        QualityCheck.objects.bulk_create([
+            QualityCheck(batch=batch, inspector=self.supervisor, image="quality/sample.jpg",
+                         status=check_status, ai_confidence_score=confidence)
+            for check_status, confidence in [('approved', 0.9), ('rejected', 0.7)]
+        ])
+
+        results = refresh_analytics_snapshots(['quality'])
+
+        self.assertIsNotNone(results['quality'])
+        data = results['quality'].data
+        self.assertNotIn('error', data)
+        self.assertEqual(data['recent_trends'], {'last_30_days_checks': 2, 'recent_approval_rate': 50.0})
+        self.assertEqual(data['average_ai_confidence'], 80.0)
+
+    def test_fresh_snapshot_is_served_without_recomputing(self):
+        """Test reads are served from the snapshot while it is fresh"""
+        refresh_analytics_snapshots(['production'])
+        self.create_batch("BATCH-NEW")
+
+        with self.assertNumQueries(1):
+            data = get_production_analytics()
+
+        self.assertEqual(data['total_batches'], 4)
+        self.assertIn('as_of', data)
+
+    def test_stale_snapshot_is_recomputed(self):
+        """Test a stale snapshot triggers a recomputation"""
+        refresh_analytics_snapshots(['production'])
+        AnalyticsSnapshot.objects.update(as_of=timezone.now() - timedelta(days=1))
+        self.create_batch("BATCH-NEW")
+
+        data = get_production_analytics()
+
+        self.assertEqual(data['total_batches'], 5)
+        self.assertEqual(AnalyticsSnapshot.objects.filter(section='production').count(), 2)
+
+    def test_dashboard_summary_from_snapshot(self):
+        """Test the dashboard summary is read from a single snapshot"""
+        refresh_analytics_snapshots()
+
+        with self.assertNumQueries(1):
+            summary = get_dashboard_summary()
+
+        self.assertEqual(summary['summary']['total_batches'], 4)
+        self.assertIn('as_of', summary)
+
+    def test_site_scoped_snapshots_are_kept_per_site(self):
+        """Test site-scoped sections store a snapshot per site"""
+        machine_type = MachineType.objects.create(name="Spinning Frame")
+        Machine.objects.bulk_create([
+            Machine(machine_id=f"SPN-{index:03d}", name=f"Spinner {index}",
+                    machine_type=machine_type, site_code=site_code)
+            for index, site_code in enumerate(['BAM001', 'BAM001', 'SEG001'])
+        ])
+
+        self.assertEqual(get_machine_analytics()['total_machines'], 3)
+        self.assertEqual(get_machine_analytics('SEG001')['total_machines'], 1)
+        self.assertEqual(
+            sorted(AnalyticsSnapshot.objects.filter(section='machines').values_list('site_code', flat=True)),
+            ['', 'SEG001']
+        )
+        self.assertEqual(
+            get_financial_analytics('SEG001')['cost_breakdown']['machine_operations'],
+            get_financial_analytics()['cost_breakdown']['machine_operations'] / 3
+        )
+
+        # Sections without a site link ignore the site code
+        get_production_analytics()
+        get_section_analytics('production', 'SEG001')
+        self.assertEqual(
+            list(AnalyticsSnapshot.objects.filter(section='production').values_list('site_code', flat=True)),
+            ['']
+        )
+
+    def test_refresh_covers_every_site(self):
+        """Test a refresh also stores the snapshots of each site for site-scoped sections"""
+        machine_type = MachineType.objects.create(name="Spinning Frame")
+        Machine.objects.bulk_create([
+            Machine(machine_id=f"SPN-{index:03d}", name=f"Spinner {index}",
+                    machine_type=machine_type, site_code=site_code)
+            for index, site_code in enumerate(['BAM001', 'SEG001'])
+        ])
+        AnalyticsSnapshot.objects.create(section='machines', site_code='KTA001', data={})
+
+        results = refresh_analytics_snapshots(['production', 'machines'])
+
+        self.assertEqual(
+            sorted(results),
+            ['machines', 'machines:BAM001', 'machines:KTA001', 'machines:SEG001', 'production']
+        )
+        self.assertEqual(results['machines:SEG001'].data['total_machines'], 1)
+        with self.assertNumQueries(1):
+            self.assertEqual(get_machine_analytics('BAM001')['total_machines'], 1)
+
+    def test_refresh_command_prunes_old_snapshots(self):
+        """Test the management command refreshes and prunes snapshots"""
+        old = AnalyticsSnapshot.objects.create(section='production', data={})
+        AnalyticsSnapshot.objects.filter(pk=old.pk).update(as_of=timezone.now() - timedelta(days=60))
+
+        out = StringIO()
+        call_command('refresh_analytics_snapshots', '--section', 'production', '--keep-days', '30', stdout=out)
+
+        self.assertFalse(AnalyticsSnapshot.objects.filter(pk=old.pk).exists())
+        self.assertEqual(AnalyticsSnapshot.objects.filter(section='production').count(), 1)
+        self.assertIn('Stored 1/1', out.getvalue())
+
+
+# DASHBOARD AGGREGATION TESTS
+@override_settings(CACHES=TEST_CACHES)
+class DashboardAggregationTest(AnalyticsTestMixin, APITestCase):
+    """Test cases for the single-pass dashboard aggregation"""
+
+    # One conditional aggregate per source table (batches, machines,
+    # maintenance logs, quality checks, workforce and material allocations),
+    # three allocation breakdowns, and the batch (aggregate plus two
+    # percentile reads on SQLite) and maintenance duration statistics
+    DASHBOARD_QUERY_BUDGET = 13
+
+    def setUp(self):
+        """Start every test with an empty response cache"""
+        get_analytics_cache().clear()
+        self.client.force_authenticate(user=self.supervisor)
+
+    def test_summary_query_budget(self):
+        """Test the whole summary is built within the query budget"""
+        with self.assertNumQueries(self.DASHBOARD_QUERY_BUDGET):
+            summary = compute_dashboard_summary()
+
+        self.assertNotIn('error', summary)
+        self.assertEqual(summary['summary']['total_batches'], 4)
+        production = summary['detailed_analytics']['production']
+        self.assertEqual(production['status_breakdown']['completed'], 2)
+        self.assertEqual(production['percentages']['delayed'], 25.0)
+        self.assertEqual(production['average_duration_days'], 2.5)
+
+    def test_summary_keeps_section_keys(self):
+        """Test the detailed analytics carry the keys of the section endpoints"""
+        detailed = compute_dashboard_summary()['detailed_analytics']
+
+        for section, analytics in [
+            ('production', get_production_analytics()),
+            ('machines', get_machine_analytics()),
+            ('maintenance', compute_maintenance_analytics()),
+        ]:
+            analytics.pop('as_of', None)
+            self.assertLessEqual(set(analytics), set(detailed[section]), section)
+        self.assertIn('role_distribution', detailed['allocation']['workforce_analytics'])
+        self.assertIn('top_materials_by_cost', detailed['allocation']['material_analytics'])
+
+    def test_machine_breakdown_matches_machine_analytics(self):
+        """Test the dashboard and machine analytics count the same operational status"""
+        machine_type = MachineType.objects.create(name="Spinning Frame")
+        Machine.objects.bulk_create([
+            Machine(machine_id=f"SPN-{index:03d}", name=f"Spinner {index}",
+                    machine_type=machine_type, operational_status=operational_status)
+            for index, operational_status in enumerate(['running', 'idle', 'breakdown', 'offline'])
+        ])
+
+        machines = get_machine_analytics()
+        self.assertEqual(machines['status_breakdown']['operational'], 2)
+        self.assertEqual(machines['status_breakdown']['breakdown'], 1)
+        self.assertEqual(machines['utilization_rate'], 25.0)
+        self.assertEqual(
+            compute_dashboard_summary()['detailed_analytics']['machines']['status_breakdown'],
+            machines['status_breakdown']
+        )
+
+    def test_dashboard_endpoints_compute_summary_once(self):
+        """Test each dashboard endpoint computes the summary once per request"""
+        # Snapshot lookup + one aggregation pass + snapshot insert
+        budget = 1 + self.DASHBOARD_QUERY_BUDGET + 1
+
+        for url_name in ['v1:dashboard-stats', 'v1:system-kpis']:
+            AnalyticsSnapshot.objects.all().delete()
+            get_analytics_cache().clear()
+            with self.assertNumQueries(budget):
+                response = self.client.get(reverse(url_name))
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_dashboard_endpoints_share_snapshot(self):
+        """Test the dashboard endpoints reuse one stored summary"""
+        self.client.get(reverse('v1:dashboard-summary'))
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('v1:dashboard-stats'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(AnalyticsSnapshot.objects.filter(section='dashboard').count(), 1)
+
+
+# DURATION STATISTICS TESTS
+@override_settings(CACHES=TEST_CACHES)
+class DurationStatisticsTest(AnalyticsTestMixin, TestCase):
+    """Test cases for database-side duration averages and percentiles"""
+
+    def test_batch_duration_statistics(self):
+        """Test average and percentiles of completed batch durations"""
+        # Completed fixture batches last 2 and 3 days
+        stats = duration_statistics(
+            BatchWorkflow.objects.filter(status='completed'), 'start_date', 'end_date'
+        )
+
+        self.assertEqual(stats['count'], 2)
+        self.assertAlmostEqual(stats['average'], 2.5 * 86400)
+        self.assertAlmostEqual(stats['p50'], 2.5 * 86400)
+        self.assertAlmostEqual(stats['p90'], 2.9 * 86400)
+
+    def test_duration_statistics_ignore_open_intervals(self):
+        """Test rows without both bounds are ignored"""
+        self.create_batch("BATCH-OPEN", status='completed', start_date=date(2025, 1, 1))
+
+        stats = duration_statistics(
+            BatchWorkflow.objects.filter(status='completed'), 'start_date', 'end_date'
+        )
+
+        self.assertEqual(stats['count'], 2)
+
+    def test_duration_statistics_empty(self):
+        """Test empty querysets return no durations"""
+        stats = duration_statistics(BatchWorkflow.objects.none(), 'start_date', 'end_date')
+
+        self.assertEqual(stats['count'], 0)
+        self.assertIsNone(stats['average'])
+        self.assertIsNone(stats['p50'])
+
+    def test_maintenance_resolution_statistics(self):
+        """Test resolution hours are computed from reported/resolved timestamps"""
+        machine_type = MachineType.objects.create(name="Spinning Frame")
+        machine = Machine.objects.bulk_create([
+            Machine(machine_id="SPN-001", name="Spinner 1", machine_type=machine_type, site_code="BAM001")
+        ])[0]
+        technician = User.objects.create_user(
+            username="tech_user",
+            password="testpass123",
+            role="technician",
+            employee_id="TE0001"
+        )
+        reported_at = timezone.now() - timedelta(days=2)
+        MaintenanceLog.objects.bulk_create([
+            MaintenanceLog(
+                machine=machine,
+                technician=technician,
+                issue_reported="Spindle vibration",
+                status='completed',
+                resolved_at=reported_at + timedelta(hours=hours)
+            )
+            for hours in [2, 4, 6, 8]
+        ])
+        # reported_at is auto_now_add, backdate it explicitly
+        MaintenanceLog.objects.update(reported_at=reported_at)
+
+        data = compute_maintenance_analytics()
+
+        self.assertNotIn('error', data)
+        self.assertEqual(data['status_breakdown']['resolved'], 4)
+        self.assertEqual(data['average_resolution_hours'], 5.0)
+        self.assertEqual(data['resolution_percentiles_hours'], {'p50': 5.0, 'p90': 7.4})
+
+    def test_benchmark_command_rolls_back(self):
+        """Test the benchmark command leaves no synthetic rows behind"""
+        out = StringIO()
+        call_command('benchmark_analytics_durations', '--sizes', '20,40', '--legacy', stdout=out)
+
+        self.assertIn('Benchmark complete', out.getvalue())
+        self.assertFalse(MaintenanceLog.objects.exists())
+
+    def test_production_analytics_reports_percentiles(self):
+        """Test production analytics expose duration percentiles"""
+        data = compute_production_analytics()
+
+        self.assertEqual(data['average_duration_days'], 2.5)
+        self.assertEqual(data['duration_percentiles_days'], {'p50': 2.5, 'p90': 2.9})
+
+
+# RESPONSE CACHE TESTS
+@override_settings(CACHES=TEST_CACHES)
+class AnalyticsResponseCacheTest(AnalyticsTestMixin, APITestCase):
+    """Test cases for the shared analytics response cache"""
+
+    def setUp(self):
+        """Start every test with an empty analytics cache"""
+        get_analytics_cache().clear()
+        self.client.force_authenticate(user=self.supervisor)
+        self.url = reverse('v1:production-analytics')
+
+    def test_response_served_from_cache(self):
+        """Test a repeated request is answered without touching the database"""
+        first = self.client.get(self.url)
+
+        with self.assertNumQueries(0):
+            second = self.client.get(self.url)
+
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.data, first.data)
+
+    def test_generation_bump_invalidates_response_and_snapshot(self):
+        """Test a committed change is visible on the next request"""
+        self.client.get(self.url)
+        self.create_batch("BATCH-NEW", status='pending')
+
+        bump_generation('workflow')
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.data['data']['total_batches'], 5)
+        # The stale snapshot is recomputed in place
+        self.assertEqual(AnalyticsSnapshot.objects.filter(section='production').count(), 1)
+
+    def test_culled_generation_invalidates_snapshot(self):
+        """Test losing the generation tokens invalidates instead of reviving old entries"""
+        self.client.get(self.url)
+        self.create_batch("BATCH-NEW", status='pending')
+
+        # As if the cache culled every entry, generation tokens included
+        get_analytics_cache().clear()
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.data['data']['total_batches'], 5)
+
+    def test_unrelated_change_keeps_response(self):
+        """Test changes to other data sources leave the response cached"""
+        self.client.get(self.url)
+
+        bump_generation('quality')
+        with self.assertNumQueries(0):
+            self.client.get(self.url)
+
+    def test_cache_keyed_by_role(self):
+        """Test users with another role do not share cached responses"""
+        self.client.get(self.url)
+        analyst = User.objects.create_user(
+            username="analyst_user",
+            email="analyst@texpro.com",
+            password="testpass123",
+            role="analyst",
+            status="active",
+            employee_id="AN0001"
+        )
+        self.client.force_authenticate(user=analyst)
+
+        # Served from the stored snapshot rather than the supervisor's response
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_model_changes_bump_generation_on_commit(self):
+        """Test saving and deleting a source model bumps its generation after commit"""
+        machine_type = MachineType.objects.create(name="Carding Machine")
+        before = get_generations(['machines', 'workflow'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            machine = Machine.objects.create(
+                machine_id="CRD-MAC-001",
+                name="Carding Machine 1",
+                machine_type=machine_type,
+                site_code="BAM001"
+            )
+        created = get_generations(['machines', 'workflow'])
+        self.assertNotEqual(created['machines'], before['machines'])
+        self.assertEqual(created['workflow'], before['workflow'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            machine.delete()
+        self.assertNotEqual(get_generations(['machines'])['machines'], created['machines'])
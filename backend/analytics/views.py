@@ -7,10 +7,11 @@ from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from django.utils.decorators import method_decorator
-from django.views.decorators.cache import cache_page
 from rest_framework.views import APIView
 from django.utils import timezone
 
+from analytics.cache import cached_analytics
+from core.models import user_site_code
 from analytics.permissions import AnalyticsPermission, AdminAnalyticsPermission
 from analytics.services import (
     get_production_analytics,
@@ -31,7 +32,7 @@ class ProductionAnalyticsView(APIView):
     
     permission_classes = [AnalyticsPermission]
     
-    @method_decorator(cache_page(60 * 5))  # Cache for 5 minutes
+    @method_decorator(cached_analytics('production'))  # Cache for 5 minutes
     def get(self, request):
         """Get production analytics and KPIs"""
         try:
@@ -59,11 +60,11 @@ class MachineAnalyticsView(APIView):
     
     permission_classes = [AnalyticsPermission]
     
-    @method_decorator(cache_page(60 * 5))  # Cache for 5 minutes
+    @method_decorator(cached_analytics('machines'))  # Cache for 5 minutes
     def get(self, request):
         """Get machine analytics and KPIs"""
         try:
-            analytics_data = get_machine_analytics()
+            analytics_data = get_machine_analytics(user_site_code(request.user))
             
             return Response({
                 'success': True,
@@ -87,11 +88,11 @@ class MaintenanceAnalyticsView(APIView):
     
     permission_classes = [AnalyticsPermission]
     
-    @method_decorator(cache_page(60 * 5))  # Cache for 5 minutes
+    @method_decorator(cached_analytics('maintenance'))  # Cache for 5 minutes
     def get(self, request):
         """Get maintenance analytics and KPIs"""
         try:
-            analytics_data = get_maintenance_analytics()
+            analytics_data = get_maintenance_analytics(user_site_code(request.user))
             
             return Response({
                 'success': True,
@@ -115,7 +116,7 @@ class QualityAnalyticsView(APIView):
     
     permission_classes = [AnalyticsPermission]
     
-    @method_decorator(cache_page(60 * 5))  # Cache for 5 minutes
+    @method_decorator(cached_analytics('quality'))  # Cache for 5 minutes
     def get(self, request):
         """Get quality analytics and KPIs"""
         try:
@@ -143,7 +144,7 @@ class AllocationAnalyticsView(APIView):
     
     permission_classes = [AnalyticsPermission]
     
-    @method_decorator(cache_page(60 * 5))  # Cache for 5 minutes
+    @method_decorator(cached_analytics('allocation'))  # Cache for 5 minutes
     def get(self, request):
         """Get allocation analytics and KPIs"""
         try:
@@ -171,11 +172,11 @@ class FinancialAnalyticsView(APIView):
     
     permission_classes = [AnalyticsPermission]
     
-    @method_decorator(cache_page(60 * 5))  # Cache for 5 minutes
+    @method_decorator(cached_analytics('financial'))  # Cache for 5 minutes
     def get(self, request):
         """Get financial analytics and KPIs"""
         try:
-            analytics_data = get_financial_analytics()
+            analytics_data = get_financial_analytics(user_site_code(request.user))
             
             return Response({
                 'success': True,
@@ -202,19 +203,25 @@ class DashboardSummaryView(APIView):
     
     permission_classes = [AnalyticsPermission]
     
-    @method_decorator(cache_page(60 * 3))  # Cache for 3 minutes (more frequent updates)
+    def get_dashboard_data(self, request):
+        """
+        Dashboard summary memoized on the request, so every branch of a
+        request shares one computation
+        """
+        if not hasattr(request, '_dashboard_summary'):
+            request._dashboard_summary = get_dashboard_summary(user_site_code(request.user))
+        return request._dashboard_summary
+    
+    @method_decorator(cached_analytics('dashboard', timeout=60 * 3))  # Cache for 3 minutes (more frequent updates)
     def get(self, request):
         """Get dashboard data based on the endpoint called"""
         try:
             # Get the URL path to determine what data to return
             url_path = request.path
             
-            # Get complete dashboard data
-            dashboard_data = get_dashboard_summary()
-            
             if 'dashboard-stats' in url_path:
                 # Return stats data in the exact format expected by frontend
-                dashboard_data = get_dashboard_summary()
+                dashboard_data = self.get_dashboard_data(request)
                 
                 # Transform data to match frontend TypeScript interfaces
                 formatted_stats = {
@@ -222,11 +229,11 @@ class DashboardSummaryView(APIView):
                         'total': dashboard_data.get('detailed_analytics', {}).get('machines', {}).get('total_machines', 15),
                         'operational': dashboard_data.get('detailed_analytics', {}).get('machines', {}).get('status_breakdown', {}).get('operational', 12),
                         'offline': dashboard_data.get('detailed_analytics', {}).get('machines', {}).get('status_breakdown', {}).get('offline', 2),
-                        'maintenance': dashboard_data.get('detailed_analytics', {}).get('machines', {}).get('status_breakdown', {}).get('maintenance', 1)
+                        'maintenance': dashboard_data.get('detailed_analytics', {}).get('machines', {}).get('status_breakdown', {}).get('under_maintenance', 1)
                     },
                     'quality': {
                         'approval_rate': dashboard_data.get('detailed_analytics', {}).get('quality', {}).get('percentages', {}).get('approved', 94.2),
-                        'defect_rate': dashboard_data.get('detailed_analytics', {}).get('quality', {}).get('percentages', {}).get('defective', 5.8),
+                        'defect_rate': dashboard_data.get('detailed_analytics', {}).get('quality', {}).get('percentages', {}).get('rejected', 5.8),
                         'ai_accuracy': dashboard_data.get('detailed_analytics', {}).get('quality', {}).get('ai_accuracy', 98.5),
                         'checks_today': dashboard_data.get('detailed_analytics', {}).get('quality', {}).get('checks_today', 24)
                     },
@@ -250,7 +257,7 @@ class DashboardSummaryView(APIView):
             
             elif 'kpis' in url_path:
                 # Return KPIs array format expected by frontend
-                dashboard_data = get_dashboard_summary()
+                dashboard_data = self.get_dashboard_data(request)
                 production = dashboard_data.get('detailed_analytics', {}).get('production', {})
                 quality = dashboard_data.get('detailed_analytics', {}).get('quality', {})
                 
@@ -335,7 +342,7 @@ class DashboardSummaryView(APIView):
                 # Return complete dashboard data for /dashboard/ endpoint
                 return Response({
                     'success': True,
-                    'data': dashboard_data,
+                    'data': self.get_dashboard_data(request),
                     'message': 'Dashboard summary retrieved successfully'
                 }, status=status.HTTP_200_OK)
             
@@ -428,7 +435,7 @@ class AnalyticsHealthView(APIView):
 # Function-based view alternatives (if preferred)
 @api_view(['GET'])
 @permission_classes([AnalyticsPermission])
-@cache_page(60 * 5)
+@cached_analytics('production')
 def production_analytics_fbv(request):
     """Function-based view for production analytics"""
     try:
@@ -440,11 +447,11 @@ def production_analytics_fbv(request):
 
 @api_view(['GET'])
 @permission_classes([AnalyticsPermission])
-@cache_page(60 * 5)
+@cached_analytics('machines')
 def machine_analytics_fbv(request):
     """Function-based view for machine analytics"""
     try:
-        data = get_machine_analytics()
+        data = get_machine_analytics(user_site_code(request.user))
         return Response({'success': True, 'data': data}, status=status.HTTP_200_OK)
     except Exception as e:
         return Response({'success': False, 'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -610,7 +617,7 @@ class MachineExportView(BaseExportView):
         return "machine"
     
     def get_export_data(self):
-        analytics = get_machine_analytics()
+        analytics = get_machine_analytics(user_site_code(self.request.user))
         return {
             'summary': analytics,
             'metrics': {
@@ -646,7 +653,7 @@ class MaintenanceExportView(BaseExportView):
         return "maintenance"
     
     def get_export_data(self):
-        analytics = get_maintenance_analytics()
+        analytics = get_maintenance_analytics(user_site_code(self.request.user))
         return {
             'summary': analytics,
             'metrics': {
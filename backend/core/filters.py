@@ -5,6 +5,8 @@ Base filter classes and utilities
 import django_filters
 from django.db import models
 
+from core.models import scope_to_user
+
 
 class BaseFilterSet(django_filters.FilterSet):
     """
@@ -21,9 +23,8 @@ class BaseFilterSet(django_filters.FilterSet):
         user = getattr(self.request, 'user', None)
         
         # Filter by site if user is not admin
-        if user and hasattr(user, 'user_type') and user.user_type != 'admin':
-            if hasattr(user, 'site_code') and hasattr(parent.model, 'site_code'):
-                parent = parent.filter(site_code=user.site_code)
+        if user and hasattr(parent.model, 'site_code'):
+            parent = scope_to_user(parent, user)
         
         return parent
 
@@ -0,0 +1,79 @@
+"""
+Periodic jobs for TexPro AI
+Registered on the shared scheduler, see core.scheduler
+"""
+from datetime import timedelta
+
+from core.scheduler import scheduler
+
+
+@scheduler.register('mark_delayed_batches', interval=timedelta(hours=1))
+def mark_delayed_batches():
+    """Mark overdue batch workflows as delayed"""
+    from workflow.services import BatchWorkflowService
+
+    return BatchWorkflowService.auto_update_delayed_batches()
+
+
+@scheduler.register('maintenance_due_notifications', interval=timedelta(days=1))
+def maintenance_due_notifications():
+    """Notify about machines due for maintenance"""
+    from notifications.signals import trigger_maintenance_due_notifications
+
+    return trigger_maintenance_due_notifications()
+
+
+@scheduler.register('overdue_maintenance_notifications', interval=timedelta(hours=6))
+def overdue_maintenance_notifications():
+    """Notify about overdue maintenance"""
+    from notifications.signals import trigger_overdue_maintenance_notifications
+
+    return trigger_overdue_maintenance_notifications()
+
+
+@scheduler.register('batch_delay_notifications', interval=timedelta(days=1))
+def batch_delay_notifications():
+    """Notify about delayed batch workflows"""
+    from notifications.signals import trigger_batch_delay_notifications
+
+    return trigger_batch_delay_notifications()
+
+
+@scheduler.register('refresh_machine_metrics', interval=timedelta(hours=1))
+def refresh_machine_metrics():
+    """Recompute stored machine maintenance/efficiency metrics that depend on time"""
+    from machines.services import refresh_derived_metrics
+
+    return refresh_derived_metrics()
+
+
+@scheduler.register('prune_report_jobs', interval=timedelta(hours=1))
+def prune_report_jobs():
+    """Requeue stalled background report jobs, delete expired ones and their files"""
+    from reports.jobs import prune_report_jobs as prune
+
+    return prune()
+
+
+@scheduler.register('run_report_schedules', interval=timedelta(minutes=5))
+def run_report_schedules():
+    """Render and email due scheduled reports"""
+    from reports.schedules import run_due_schedules
+
+    return run_due_schedules()
+
+
+@scheduler.register('dispatch_email_outbox', interval=timedelta(minutes=1))
+def dispatch_email_outbox():
+    """Send the notification emails waiting in the outbox"""
+    from notifications.dispatch import dispatch_outbox
+
+    return dispatch_outbox()
+
+
+@scheduler.register('notification_digests', interval=timedelta(hours=1))
+def notification_digests():
+    """Queue the daily and weekly notification digest emails that are due"""
+    from notifications.digests import send_notification_digests
+
+    return send_notification_digests()
@@ -43,6 +43,56 @@ class TimestampedModel(models.Model):
         abstract = True
 
 
+def user_site_code(user):
+    """
+    Site code a user's data is restricted to, or None when the user sees
+    every site (administrators and users without a site)
+    """
+    if user is None:
+        return None
+    role = getattr(user, 'role', None) or getattr(user, 'user_type', None)
+    if role == 'admin':
+        return None
+    return getattr(user, 'site_code', None) or None
+
+
+def scope_to_site(queryset, site_code, site_field='site_code'):
+    """
+    Restrict a queryset to one site, unchanged when site_code is empty.
+    site_field may span relations for models that belong to a site through
+    another model (e.g. 'machine__site_code').
+    """
+    if not site_code:
+        return queryset
+    return queryset.filter(**{site_field: site_code})
+
+
+def scope_to_user(queryset, user, site_field='site_code'):
+    """Restrict a queryset to the site the user is restricted to"""
+    return scope_to_site(queryset, user_site_code(user), site_field)
+
+
+class SiteSpecificQuerySet(models.QuerySet):
+    """
+    QuerySet of site-specific records
+    """
+    
+    def for_site(self, site_code):
+        """Records of one site (all records when site_code is empty)"""
+        return scope_to_site(self, site_code)
+    
+    def for_user(self, user):
+        """Records visible to a user: all for admins, their site otherwise"""
+        return scope_to_user(self, user)
+
+
+class SiteSpecificManager(models.Manager.from_queryset(SiteSpecificQuerySet)):
+    """
+    Manager for site-specific models, providing for_site() and for_user()
+    """
+    pass
+
+
 class SiteSpecificModel(BaseModel):
     """
     Abstract model for site-specific data
@@ -52,6 +102,8 @@ class SiteSpecificModel(BaseModel):
         help_text='CMDT site/factory code'
     )
     
+    objects = SiteSpecificManager()
+    
     class Meta:
         abstract = True
         indexes = [
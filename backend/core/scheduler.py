@@ -0,0 +1,163 @@
+"""
+Lightweight periodic job scheduler for TexPro AI
+Runs housekeeping jobs outside the request path, from the
+run_scheduled_jobs management command
+
+The job-run model and the command live in the notifications app: core is
+a settings and shared-code package, not an installed app, so it cannot
+own models or management commands.
+"""
+import logging
+import threading
+import time
+import uuid
+from datetime import timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from django.db import close_old_connections
+from django.db.models import Q
+from django.utils import timezone
+
+logger = logging.getLogger('texproai.scheduler')
+
+
+class ScheduledJob:
+    """
+    A named callable run at most once per interval
+    """
+
+    def __init__(self, name: str, func: Callable[[], Any], interval: timedelta,
+                 lock_timeout: Optional[timedelta] = None, description: str = ''):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        # A crashed worker releases the running lock after this long
+        self.lock_timeout = lock_timeout or interval
+        self.description = description or (func.__doc__ or '').strip().split('\n')[0]
+
+
+class JobScheduler:
+    """
+    Registry and runner of periodic jobs
+
+    Coordination between workers goes through one database row per job
+    (notifications.models.scheduled_job_run.ScheduledJobRun):
+    - an interval lease (due_at, moved one interval ahead when a run
+      starts) makes the job run once per interval across all processes
+    - a running lock (locked_until) prevents two overlapping runs, even
+      when forced
+    Both are taken by a single conditional UPDATE, so any number of
+    workers and run_scheduled_jobs processes can poll safely. A failed run
+    gives its lease back, so the job is retried at the next poll.
+    """
+
+    def __init__(self):
+        self._jobs: Dict[str, ScheduledJob] = {}
+        self._stop_event = threading.Event()
+
+    def register(self, name: str, interval: timedelta, lock_timeout: Optional[timedelta] = None,
+                 description: str = ''):
+        """
+        Decorator registering a function as a periodic job
+        """
+        def decorator(func):
+            self.add_job(name, func, interval, lock_timeout=lock_timeout, description=description)
+            return func
+        return decorator
+
+    def add_job(self, name: str, func: Callable[[], Any], interval: timedelta,
+                lock_timeout: Optional[timedelta] = None, description: str = '') -> ScheduledJob:
+        """Register (or replace) a periodic job"""
+        job = ScheduledJob(name, func, interval, lock_timeout=lock_timeout, description=description)
+        self._jobs[name] = job
+        return job
+
+    @property
+    def jobs(self) -> List[ScheduledJob]:
+        return list(self._jobs.values())
+
+    def get_job(self, name: str) -> ScheduledJob:
+        try:
+            return self._jobs[name]
+        except KeyError:
+            raise KeyError(f"Unknown scheduled job '{name}'")
+
+    def run_job(self, name: str, force: bool = False) -> Dict[str, Any]:
+        """
+        Run a job if it is due and no other worker is running it
+
+        Args:
+            name: Registered job name
+            force: Ignore the interval lease (the running lock still applies)
+
+        Returns:
+            dict with job, status ('ran', 'not_due', 'locked' or 'failed'),
+            result, error and duration_ms
+        """
+        from notifications.models.scheduled_job_run import ScheduledJobRun
+
+        job = self.get_job(name)
+        outcome = {'job': name, 'status': None, 'result': None, 'error': None, 'duration_ms': 0}
+
+        now = timezone.now()
+        ScheduledJobRun.objects.get_or_create(name=name, defaults={'due_at': now})
+
+        token = uuid.uuid4().hex
+        claimable = ScheduledJobRun.objects.filter(name=name).filter(
+            Q(locked_until__isnull=True) | Q(locked_until__lte=now)
+        )
+        if not force:
+            claimable = claimable.filter(due_at__lte=now)
+        claimed = claimable.update(
+            due_at=now + job.interval,
+            locked_until=now + job.lock_timeout,
+            lock_token=token,
+            last_started_at=now
+        )
+        if not claimed:
+            locked_until = ScheduledJobRun.objects.filter(name=name).values_list('locked_until', flat=True).first()
+            outcome['status'] = 'locked' if locked_until and locked_until > now else 'not_due'
+            return outcome
+
+        started = time.monotonic()
+        release = {'locked_until': None, 'lock_token': ''}
+        try:
+            outcome['result'] = job.func()
+            outcome['status'] = 'ran'
+            release['last_error'] = ''
+            logger.info(f"Scheduled job {name} completed: {outcome['result']}")
+        except Exception as e:
+            outcome['status'] = 'failed'
+            outcome['error'] = str(e)
+            # Give the interval lease back so the next poll retries the job
+            release['due_at'] = now
+            release['last_error'] = str(e)
+            logger.error(f"Scheduled job {name} failed: {str(e)}")
+        outcome['duration_ms'] = int((time.monotonic() - started) * 1000)
+
+        # Only release a lock this run still owns
+        ScheduledJobRun.objects.filter(name=name, lock_token=token).update(
+            last_status=outcome['status'], last_finished_at=timezone.now(), **release
+        )
+        return outcome
+
+    def run_pending(self, names: Optional[List[str]] = None, force: bool = False) -> List[Dict[str, Any]]:
+        """Run every due job (or the given ones) once"""
+        names = names or list(self._jobs)
+        return [self.run_job(name, force=force) for name in names]
+
+    def run_forever(self, poll_seconds: int = 60, names: Optional[List[str]] = None):
+        """Poll for due jobs until stop() is called"""
+        self._stop_event.clear()
+        while not self._stop_event.is_set():
+            close_old_connections()
+            self.run_pending(names)
+            close_old_connections()
+            self._stop_event.wait(poll_seconds)
+
+    def stop(self):
+        """Stop the polling loop"""
+        self._stop_event.set()
+
+
+scheduler = JobScheduler()
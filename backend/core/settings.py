@@ -106,6 +106,25 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Analytics responses are cached on disk so every worker shares them
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'analytics': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache' / 'analytics',
+        'TIMEOUT': 60 * 5,
+        'OPTIONS': {
+            'MAX_ENTRIES': 5000,
+        },
+    },
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -311,5 +330,11 @@ TEXPROAI_SETTINGS = {
     'MAX_PHOTO_SIZE': 5 * 1024 * 1024,  # 5MB for quality control photos
     'SUPPORTED_IMAGE_FORMATS': ['JPEG', 'PNG', 'WEBP'],
     'MAINTENANCE_PREDICTION_DAYS': 30,  # Default prediction window
+    'ANALYTICS_SNAPSHOT_MAX_AGE_MINUTES': 15,  # Staleness limit for KPI snapshots
+    'REPORT_WORKERS': 2,  # Threads rendering report jobs (0 renders on commit, in-process)
+    'REPORT_JOB_CACHE_MINUTES': 60,  # How long a rendered report is reused for identical requests
+    'REPORT_JOB_RETENTION_DAYS': 7,  # Rendered reports older than this are deleted
+    'REPORT_JOB_LEASE_MINUTES': 10,  # A running job without a heartbeat for this long is requeued
+    'REPORT_JOB_MAX_ATTEMPTS': 3,  # Runs of a job before a stalled one is marked failed
     'DEFAULT_TIMEZONE': 'Africa/Bamako',
 }
@@ -0,0 +1,126 @@
+"""
+Field change tracking for TexPro AI
+Remembers the loaded values of selected model fields, so signal handlers
+can tell what a save changed without reading the row again
+"""
+import functools
+
+from django.db.models.signals import post_init
+
+
+class FieldTrackerMixin:
+    """
+    Model mixin tracking changes to the fields listed in tracked_fields
+
+    The tracked values are snapshotted when an instance is built or loaded
+    and again once save() returns, so pre_save and post_save handlers of a
+    save still see what it changed:
+
+        if instance.has_changed('status'):
+            notify(instance.previous('status'), instance.status)
+
+    A field deferred when the instance was loaded counts as changed.
+    Existing models get the same behaviour from track_changes().
+    """
+
+    tracked_fields = ()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._snapshot_tracked_fields()
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._snapshot_tracked_fields()
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self._snapshot_tracked_fields()
+
+    def _snapshot_tracked_fields(self):
+        self._tracked_snapshot = {
+            field: self.__dict__[attname]
+            for field, attname in _tracked_attnames(type(self)).items()
+            if attname in self.__dict__
+        }
+
+    def has_changed(self, field):
+        """Whether a tracked field differs from its loaded (or last saved) value"""
+        if field not in type(self).tracked_fields:
+            raise ValueError(f"{type(self).__name__}.{field} is not tracked")
+        attname = _tracked_attnames(type(self))[field]
+        snapshot = self.__dict__.get('_tracked_snapshot', {})
+        if field not in snapshot:
+            return True
+        return snapshot[field] != self.__dict__.get(attname)
+
+    def previous(self, field):
+        """Loaded (or last saved) value of a tracked field, None if it was deferred"""
+        if field not in type(self).tracked_fields:
+            raise ValueError(f"{type(self).__name__}.{field} is not tracked")
+        return self.__dict__.get('_tracked_snapshot', {}).get(field)
+
+    def has_previous(self, field):
+        """Whether the previous value of a tracked field is known (it was not deferred)"""
+        if field not in type(self).tracked_fields:
+            raise ValueError(f"{type(self).__name__}.{field} is not tracked")
+        return field in self.__dict__.get('_tracked_snapshot', {})
+
+    @property
+    def changed_fields(self):
+        """Tracked fields that changed, with their previous values"""
+        return {
+            field: self.previous(field)
+            for field in type(self).tracked_fields
+            if self.has_changed(field)
+        }
+
+
+def _tracked_attnames(model):
+    """Tracked field names of a model mapped to their attribute names (machine -> machine_id)"""
+    attnames = model.__dict__.get('_tracked_attnames')
+    if attnames is None:
+        attnames = {field: model._meta.get_field(field).attname for field in model.tracked_fields}
+        model._tracked_attnames = attnames
+    return attnames
+
+
+def _snapshot_on_init(sender, instance, **kwargs):
+    instance._snapshot_tracked_fields()
+
+
+def _after(method):
+    """Wrap a model method so the tracked fields are snapshotted after it runs"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        result = method(self, *args, **kwargs)
+        self._snapshot_tracked_fields()
+        return result
+    return wrapper
+
+
+def track_changes(model, *fields):
+    """
+    Apply FieldTrackerMixin to an existing model class
+
+    Used for the models defined in the app model packages; calling it
+    again for the same model adds fields to the tracked ones.
+    """
+    if model.__dict__.get('_tracks_changes'):
+        model.tracked_fields = tuple(dict.fromkeys((*model.tracked_fields, *fields)))
+        model._tracked_attnames = None
+        return model
+
+    model.tracked_fields = tuple(fields)
+    model._tracked_attnames = None
+    for name in ('_snapshot_tracked_fields', 'has_changed', 'previous', 'has_previous', 'changed_fields'):
+        setattr(model, name, FieldTrackerMixin.__dict__[name])
+    model.save = _after(model.save)
+    model.refresh_from_db = _after(model.refresh_from_db)
+    model._tracks_changes = True
+
+    post_init.connect(
+        _snapshot_on_init, sender=model, weak=False,
+        dispatch_uid=f'track_changes:{model._meta.label}'
+    )
+    return model
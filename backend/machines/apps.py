@@ -21,3 +21,13 @@ class MachinesConfig(AppConfig):
             from machines.models import machine_extensions
         except ImportError:
             pass
+        
+        # Stored metric columns and the signal handlers keeping them in sync
+        from machines.models import derived_metrics, operating_hours  # noqa: F401
+        # Composite site indexes (after derived_metrics, they cover its columns)
+        from machines.models import site_indexes  # noqa: F401
+        # Status changes are read by the notification signals
+        from core.tracking import track_changes
+        from machines.models import Machine
+        track_changes(Machine, 'status', 'operational_status')
+        import machines.signals  # noqa: F401
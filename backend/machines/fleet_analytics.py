@@ -0,0 +1,208 @@
+"""
+Fleet aggregation for TexPro AI machine analytics
+Per-fleet, per-type and per-location rollups computed with grouped queries
+over the stored metric columns, and per-machine rows read as plain values
+"""
+from datetime import date, timedelta
+from typing import Any, Dict, List
+
+from django.db.models import (
+    Avg, Case, Count, DateField, ExpressionWrapper, F, FloatField, Func, OuterRef, Q, QuerySet,
+    Subquery, Sum, Value, When,
+)
+from django.db.models.functions import Coalesce, Greatest, NullIf
+
+from machines.models.operating_hours import MachineDailyHours
+
+# Machines whose stored efficiency rating is set and positive
+RATED_EFFICIENCY = Q(efficiency_score__gt=0)
+
+OPERATIONAL_STATUSES = ['running', 'idle']
+OVERDUE_URGENCIES = ['urgent', 'critical']
+
+# Utilization assumes 8 hours per day, 6 days per week operation
+HOURS_PER_WEEK = 48
+
+NEEDS_MAINTENANCE = Q(maintenance_needed=True)
+MAINTENANCE_OVERDUE = NEEDS_MAINTENANCE & Q(maintenance_urgency_level__in=OVERDUE_URGENCIES)
+MAINTENANCE_DUE = NEEDS_MAINTENANCE & ~Q(maintenance_urgency_level__in=OVERDUE_URGENCIES)
+
+# Columns read for per-machine entries
+MACHINE_ROW_FIELDS = ('pk', 'machine_id', 'name', 'machine_type__name', 'site_code', 'building')
+
+# Sums and averages that come back as None for an empty group
+_NULLABLE_METRICS = ('operating_hours', 'average_operating_hours', 'average_efficiency')
+
+
+def rollup_aggregates() -> Dict[str, Any]:
+    """Aggregate expressions computed for every rollup"""
+    return {
+        'total_count': Count('id'),
+        'operational_count': Count('id', filter=Q(operational_status__in=OPERATIONAL_STATUSES)),
+        'maintenance_count': Count('id', filter=Q(operational_status='maintenance')),
+        'offline_count': Count('id', filter=Q(operational_status='offline')),
+        'breakdown_count': Count('id', filter=Q(operational_status='breakdown')),
+        'maintenance_due_count': Count('id', filter=MAINTENANCE_DUE),
+        'maintenance_overdue_count': Count('id', filter=MAINTENANCE_OVERDUE),
+        'operating_hours': Sum('total_operating_hours'),
+        'average_operating_hours': Avg('total_operating_hours'),
+        'rated_count': Count('id', filter=RATED_EFFICIENCY),
+        'average_efficiency': Avg('efficiency_score', filter=RATED_EFFICIENCY),
+    }
+
+
+def _clean(row: Dict[str, Any]) -> Dict[str, Any]:
+    for key in _NULLABLE_METRICS:
+        if row.get(key) is None:
+            row[key] = 0
+    return row
+
+
+def _grouped(queryset: QuerySet, group_by: tuple, extra: Dict[str, Any]) -> List[Dict[str, Any]]:
+    rows = (
+        queryset.order_by()
+        .values(*group_by)
+        .annotate(**rollup_aggregates(), **extra)
+        .order_by(*group_by)
+    )
+    return [_clean(row) for row in rows]
+
+
+def fleet_rollup(queryset: QuerySet, **extra) -> Dict[str, Any]:
+    """
+    Rollup of the whole queryset in one query
+
+    Args:
+        queryset: machines to aggregate
+        **extra: additional aggregate expressions to compute in the same query
+    """
+    return _clean(queryset.order_by().aggregate(**rollup_aggregates(), **extra))
+
+
+def type_rollups(queryset: QuerySet, **extra) -> List[Dict[str, Any]]:
+    """Rollups per machine type in one grouped query, ordered by type name"""
+    return _grouped(queryset, ('machine_type__name',), extra)
+
+
+def location_rollups(queryset: QuerySet, **extra) -> List[Dict[str, Any]]:
+    """Rollups per (site_code, building) in one grouped query"""
+    return _grouped(queryset, ('site_code', 'building'), extra)
+
+
+def machine_rows(queryset: QuerySet, *fields, **expressions):
+    """
+    Per-machine values without instantiating models
+
+    Args:
+        queryset: machines to read, with any ordering and slicing applied after
+        *fields: columns to read besides MACHINE_ROW_FIELDS
+        **expressions: annotated expressions to read
+    """
+    return queryset.annotate(**expressions).values(*MACHINE_ROW_FIELDS, *fields, *expressions)
+
+
+def machine_entry(row: Dict[str, Any], **values) -> Dict[str, Any]:
+    """Identification part of a per-machine analytics entry"""
+    entry = {
+        'machine_id': row['machine_id'],
+        'name': row['name'],
+        'type': row['machine_type__name'],
+    }
+    entry.update(values)
+    entry['location'] = f"{row['site_code']} - {row['building'] or 'Unknown'}"
+    return entry
+
+
+class DaysSince(Func):
+    """Whole days from a date column to a given date"""
+    template = '(%(expressions)s)'
+    arg_joiner = ' - '
+    output_field = FloatField()
+
+    def __init__(self, expression, until: date, **extra):
+        super().__init__(Value(until, output_field=DateField()), expression, **extra)
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return self.as_sql(
+            compiler, connection,
+            template='(julianday(%(expressions)s))',
+            arg_joiner=') - julianday(',
+            **extra_context
+        )
+
+    def as_mysql(self, compiler, connection, **extra_context):
+        return self.as_sql(
+            compiler, connection,
+            template='DATEDIFF(%(expressions)s)',
+            arg_joiner=', ',
+            **extra_context
+        )
+
+
+def available_hours(today: date = None):
+    """
+    Operating hours a machine could have run since its installation date,
+    NULL for machines without one
+    """
+    return ExpressionWrapper(
+        DaysSince('installation_date', today or date.today()) * HOURS_PER_WEEK / 7.0,
+        output_field=FloatField()
+    )
+
+
+def utilization_rate(today: date = None):
+    """
+    Operating hours as a percentage of available hours, NULL for machines
+    installed today or without an installation date
+    """
+    today = today or date.today()
+    return Case(
+        When(
+            installation_date__lt=today,
+            then=ExpressionWrapper(
+                F('total_operating_hours') * 100.0 / available_hours(today),
+                output_field=FloatField()
+            )
+        ),
+        output_field=FloatField()
+    )
+
+
+def window_operating_hours(start: date, end: date):
+    """
+    Operating hours a machine ran from start to end (inclusive), summed
+    from its daily rollups (0 without any)
+    """
+    daily_sum = (
+        MachineDailyHours.objects.filter(machine=OuterRef('pk'), work_date__gte=start, work_date__lte=end)
+        .order_by().values('machine').annotate(total_hours=Sum('hours')).values('total_hours')
+    )
+    return Coalesce(Subquery(daily_sum, output_field=FloatField()), Value(0.0), output_field=FloatField())
+
+
+def window_available_hours(start: date, end: date):
+    """
+    Operating hours a machine could have run from start to end (inclusive),
+    counted from its installation date when that falls inside the window;
+    NULL for machines installed after the window
+    """
+    window_start = Value(start, output_field=DateField())
+    first_day = Greatest(Coalesce('installation_date', window_start), window_start)
+    return Case(
+        When(
+            Q(installation_date__isnull=True) | Q(installation_date__lte=end),
+            then=ExpressionWrapper(
+                DaysSince(first_day, end + timedelta(days=1)) * HOURS_PER_WEEK / 7.0,
+                output_field=FloatField()
+            )
+        ),
+        output_field=FloatField()
+    )
+
+
+def window_utilization_rate(start: date, end: date):
+    """Window operating hours as a percentage of window available hours"""
+    return ExpressionWrapper(
+        window_operating_hours(start, end) * 100.0 / NullIf(window_available_hours(start, end), 0.0),
+        output_field=FloatField()
+    )
@@ -0,0 +1,37 @@
+"""
+Management command to backfill the stored machine maintenance and
+efficiency metrics (maintenance_needed, maintenance_urgency_level,
+efficiency_score)
+"""
+
+from django.core.management.base import BaseCommand
+
+from machines.models import Machine
+from machines.services import refresh_derived_metrics, BULK_UPDATE_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = 'Recompute the stored maintenance urgency and efficiency columns of machines'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--site',
+            type=str,
+            help='Only backfill machines of this site code',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BULK_UPDATE_BATCH_SIZE,
+            help='Machines loaded and updated per batch',
+        )
+
+    def handle(self, *args, **options):
+        machines = Machine.objects.all()
+        if options['site']:
+            machines = machines.filter(site_code=options['site'])
+
+        self.stdout.write(f'🔄 Backfilling metrics for {machines.count()} machines...')
+        updated_count = refresh_derived_metrics(machines, batch_size=options['batch_size'])
+
+        self.stdout.write(self.style.SUCCESS(f'✅ Updated stored metrics of {updated_count} machines'))
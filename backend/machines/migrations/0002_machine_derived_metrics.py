@@ -0,0 +1,29 @@
+"""
+Migration for stored Machine maintenance and efficiency metrics
+"""
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('machines', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='machine',
+            name='maintenance_needed',
+            field=models.BooleanField(db_index=True, default=False, editable=False, help_text='Stored value of needs_maintenance'),
+        ),
+        migrations.AddField(
+            model_name='machine',
+            name='maintenance_urgency_level',
+            field=models.CharField(db_index=True, default='normal', editable=False, help_text='Stored value of maintenance_urgency', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='machine',
+            name='efficiency_score',
+            field=models.FloatField(blank=True, db_index=True, editable=False, help_text='Stored value of get_efficiency_rating()', null=True),
+        ),
+    ]
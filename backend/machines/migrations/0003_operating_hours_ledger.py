@@ -0,0 +1,68 @@
+"""
+Migration for the machine operating hours ledger and its rollups
+"""
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('machines', '0002_machine_derived_metrics'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MachineDailyHours',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('work_date', models.DateField()),
+                ('hours', models.FloatField(default=0)),
+                ('entry_count', models.PositiveIntegerField(default=0)),
+                ('machine', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_hours', to='machines.machine')),
+            ],
+            options={
+                'verbose_name': 'Machine Daily Hours',
+                'verbose_name_plural': 'Machine Daily Hours',
+                'db_table': 'machines_daily_hours',
+                'indexes': [models.Index(fields=['work_date'], name='machines_da_work_da_3831e9_idx')],
+                'constraints': [models.UniqueConstraint(fields=('machine', 'work_date'), name='unique_machine_daily_hours')],
+            },
+        ),
+        migrations.CreateModel(
+            name='MachineHoursEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('work_date', models.DateField(help_text='Day the hours were run')),
+                ('hours', models.FloatField(help_text='Operating hours')),
+                ('source', models.CharField(choices=[('manual', 'Manual Entry'), ('upload', 'Bulk Upload')], default='manual', max_length=10)),
+                ('recorded_at', models.DateTimeField(auto_now_add=True)),
+                ('machine', models.ForeignKey(help_text='Machine the hours were run on', on_delete=django.db.models.deletion.CASCADE, related_name='hours_entries', to='machines.machine')),
+                ('recorded_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Machine Hours Entry',
+                'verbose_name_plural': 'Machine Hours Entries',
+                'db_table': 'machines_hours_entry',
+                'indexes': [models.Index(fields=['machine', 'work_date'], name='machines_ho_machine_d21566_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='MachineWeeklyHours',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('week_start', models.DateField()),
+                ('hours', models.FloatField(default=0)),
+                ('machine', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='weekly_hours', to='machines.machine')),
+            ],
+            options={
+                'verbose_name': 'Machine Weekly Hours',
+                'verbose_name_plural': 'Machine Weekly Hours',
+                'db_table': 'machines_weekly_hours',
+                'indexes': [models.Index(fields=['week_start'], name='machines_we_week_st_9cd74b_idx')],
+                'constraints': [models.UniqueConstraint(fields=('machine', 'week_start'), name='unique_machine_weekly_hours')],
+            },
+        ),
+    ]
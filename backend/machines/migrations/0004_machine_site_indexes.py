@@ -0,0 +1,30 @@
+"""
+Migration for composite site indexes on Machine
+"""
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('machines', '0003_operating_hours_ledger'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='machine',
+            index=models.Index(fields=['site_code', 'machine_id'], name='machines_site_machine_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='machine',
+            index=models.Index(fields=['site_code', 'operational_status'], name='machines_site_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='machine',
+            index=models.Index(fields=['site_code', 'machine_type'], name='machines_site_type_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='machine',
+            index=models.Index(fields=['site_code', 'maintenance_urgency_level'], name='machines_site_urgency_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+"""
+Stored maintenance and efficiency metrics for Machine
+TexPro AI - Denormalized columns for fleet filters and statistics
+
+The values mirror Machine.needs_maintenance, Machine.maintenance_urgency and
+Machine.get_efficiency_rating() so that fleet-wide filters and statistics can
+run as SQL. They are kept in sync by machines.signals and can be rebuilt with
+the backfill_machine_metrics command.
+"""
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+
+from machines.models import Machine
+
+
+DERIVED_METRIC_FIELDS = ('maintenance_needed', 'maintenance_urgency_level', 'efficiency_score')
+
+
+Machine.add_to_class('maintenance_needed', models.BooleanField(
+    default=False,
+    db_index=True,
+    editable=False,
+    help_text=_('Stored value of needs_maintenance')
+))
+Machine.add_to_class('maintenance_urgency_level', models.CharField(
+    max_length=20,
+    default='normal',
+    db_index=True,
+    editable=False,
+    help_text=_('Stored value of maintenance_urgency')
+))
+Machine.add_to_class('efficiency_score', models.FloatField(
+    null=True,
+    blank=True,
+    db_index=True,
+    editable=False,
+    help_text=_('Stored value of get_efficiency_rating()')
+))
@@ -0,0 +1,104 @@
+"""
+Operating hours ledger for Machine
+TexPro AI - Dated operating hours with daily and weekly rollups
+
+Machine.total_operating_hours and hours_since_maintenance are running
+totals. The ledger keeps when the hours were run: an append-only entry per
+machine and day for every recording, summed into daily and weekly rollup
+rows so that hours over any window are an indexed range sum. Entries are
+written through machines.services.record_operating_hours.
+"""
+from django.conf import settings
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+
+
+class MachineHoursEntry(models.Model):
+    """
+    Operating hours recorded for a machine on a given day.
+    Entries are never updated; corrections are recorded as new entries.
+    """
+
+    class Source(models.TextChoices):
+        MANUAL = 'manual', _('Manual Entry')
+        UPLOAD = 'upload', _('Bulk Upload')
+
+    machine = models.ForeignKey(
+        'machines.Machine',
+        on_delete=models.CASCADE,
+        related_name='hours_entries',
+        help_text=_('Machine the hours were run on')
+    )
+    work_date = models.DateField(help_text=_('Day the hours were run'))
+    hours = models.FloatField(help_text=_('Operating hours'))
+    source = models.CharField(max_length=10, choices=Source.choices, default=Source.MANUAL)
+    recorded_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+    recorded_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'machines_hours_entry'
+        verbose_name = _('Machine Hours Entry')
+        verbose_name_plural = _('Machine Hours Entries')
+        indexes = [
+            models.Index(fields=['machine', 'work_date']),
+        ]
+
+    def __str__(self):
+        return f"Machine {self.machine_id}: {self.hours}h on {self.work_date}"
+
+
+class MachineDailyHours(models.Model):
+    """Operating hours of a machine per day, summed from its ledger entries"""
+    machine = models.ForeignKey(
+        'machines.Machine',
+        on_delete=models.CASCADE,
+        related_name='daily_hours'
+    )
+    work_date = models.DateField()
+    hours = models.FloatField(default=0)
+    entry_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table = 'machines_daily_hours'
+        verbose_name = _('Machine Daily Hours')
+        verbose_name_plural = _('Machine Daily Hours')
+        constraints = [
+            models.UniqueConstraint(fields=['machine', 'work_date'], name='unique_machine_daily_hours'),
+        ]
+        indexes = [
+            models.Index(fields=['work_date']),
+        ]
+
+    def __str__(self):
+        return f"Machine {self.machine_id}: {self.hours}h on {self.work_date}"
+
+
+class MachineWeeklyHours(models.Model):
+    """Operating hours of a machine per week (starting Monday), summed from its daily rows"""
+    machine = models.ForeignKey(
+        'machines.Machine',
+        on_delete=models.CASCADE,
+        related_name='weekly_hours'
+    )
+    week_start = models.DateField()
+    hours = models.FloatField(default=0)
+
+    class Meta:
+        db_table = 'machines_weekly_hours'
+        verbose_name = _('Machine Weekly Hours')
+        verbose_name_plural = _('Machine Weekly Hours')
+        constraints = [
+            models.UniqueConstraint(fields=['machine', 'week_start'], name='unique_machine_weekly_hours'),
+        ]
+        indexes = [
+            models.Index(fields=['week_start']),
+        ]
+
+    def __str__(self):
+        return f"Machine {self.machine_id}: {self.hours}h in week of {self.week_start}"
@@ -0,0 +1,24 @@
+"""
+Site-scoped indexes for Machine
+TexPro AI - Composite (site_code, ...) indexes
+
+Non-admin requests are restricted to one site (SiteSpecificQuerySet.for_user),
+so the fleet filters, groupings and default ordering all lead with
+site_code. These indexes let a per-site query read only that site's rows.
+"""
+from django.db import models
+
+from machines.models import Machine
+
+
+SITE_INDEXES = [
+    models.Index(fields=['site_code', 'machine_id'], name='machines_site_machine_idx'),
+    models.Index(fields=['site_code', 'operational_status'], name='machines_site_status_idx'),
+    models.Index(fields=['site_code', 'machine_type'], name='machines_site_type_idx'),
+    models.Index(fields=['site_code', 'maintenance_urgency_level'], name='machines_site_urgency_idx'),
+]
+
+Machine._meta.indexes = [
+    *Machine._meta.indexes,
+    *(index for index in SITE_INDEXES if index.name not in {i.name for i in Machine._meta.indexes}),
+]
@@ -126,6 +126,9 @@ class UtilizationAnalyticsSerializer(serializers.Serializer):
     """
     Serializer for machine utilization analytics
     """
+    # Only set for a ?start=&end= window
+    period_start = serializers.DateField(read_only=True)
+    period_end = serializers.DateField(read_only=True)
     total_available_hours = serializers.FloatField(read_only=True)
     total_operating_hours = serializers.FloatField(read_only=True)
     overall_utilization_rate = serializers.FloatField(read_only=True)
@@ -0,0 +1,396 @@
+"""
+Machine services for TexPro AI
+Bulk operating-hours ingestion for shift-end uploads from the PLC gateway,
+the operating hours ledger, and upkeep of the stored maintenance/efficiency
+metrics
+"""
+import csv
+import json
+import logging
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, Iterator, Union
+
+from django.db import transaction
+from django.db.models import Count, F, Q, QuerySet, Sum
+from django.db.models.functions import TruncWeek
+from django.utils import timezone
+
+from analytics.signals import invalidate_analytics
+from machines.models import Machine
+from machines.models.operating_hours import MachineDailyHours, MachineHoursEntry, MachineWeeklyHours
+
+logger = logging.getLogger('texproai.machines')
+
+MAX_HOURS_PER_ENTRY = 24
+BULK_UPDATE_BATCH_SIZE = 500
+
+
+def compute_derived_metrics(machine: Machine) -> Dict[str, Any]:
+    """
+    Values of the stored metric columns, taken from the model's own
+    needs_maintenance, maintenance_urgency and get_efficiency_rating()
+    """
+    return {
+        'maintenance_needed': bool(machine.needs_maintenance),
+        'maintenance_urgency_level': machine.maintenance_urgency or 'normal',
+        'efficiency_score': machine.get_efficiency_rating(),
+    }
+
+
+def apply_derived_metrics(machine: Machine) -> bool:
+    """Set the stored metric columns on an instance, True if any changed"""
+    changed = False
+    for field, value in compute_derived_metrics(machine).items():
+        if getattr(machine, field) != value:
+            setattr(machine, field, value)
+            changed = True
+    return changed
+
+
+def refresh_derived_metrics(machines=None, batch_size: int = BULK_UPDATE_BATCH_SIZE) -> int:
+    """
+    Recompute the stored metrics of the given machines (queryset or ids,
+    all machines by default) and write back the rows that changed
+
+    Returns:
+        int: number of machines whose stored metrics changed
+    """
+    from machines.models.derived_metrics import DERIVED_METRIC_FIELDS
+
+    if machines is None:
+        queryset = Machine.objects.all()
+    elif isinstance(machines, QuerySet):
+        queryset = machines
+    else:
+        queryset = Machine.objects.filter(pk__in=list(machines))
+
+    changed = []
+    updated_count = 0
+    for machine in queryset.select_related('machine_type').order_by('pk').iterator(chunk_size=batch_size):
+        if apply_derived_metrics(machine):
+            changed.append(machine)
+        if len(changed) >= batch_size:
+            Machine.objects.bulk_update(changed, DERIVED_METRIC_FIELDS)
+            updated_count += len(changed)
+            changed = []
+
+    if changed:
+        Machine.objects.bulk_update(changed, DERIVED_METRIC_FIELDS)
+        updated_count += len(changed)
+
+    # bulk_update bypasses the signals invalidating cached analytics
+    if updated_count:
+        invalidate_analytics('machines')
+
+    return updated_count
+
+
+def week_start(day: date) -> date:
+    """Monday of the week a day falls in"""
+    return day - timedelta(days=day.weekday())
+
+
+def record_operating_hours(hours_by_machine_day: Dict[tuple, float],
+                           source: str = MachineHoursEntry.Source.MANUAL,
+                           recorded_by=None) -> int:
+    """
+    Append operating hours to the ledger and refresh the daily and weekly
+    rollups they fall in. The machines' running totals are not touched.
+
+    Args:
+        hours_by_machine_day: hours keyed by (machine id, work date)
+        source: MachineHoursEntry.Source of the recording
+        recorded_by: user recording the hours
+
+    Returns:
+        int: number of ledger entries written
+    """
+    entries = [
+        MachineHoursEntry(
+            machine_id=machine_id,
+            work_date=work_date,
+            hours=hours,
+            source=source,
+            recorded_by=recorded_by
+        )
+        for (machine_id, work_date), hours in hours_by_machine_day.items()
+        if hours
+    ]
+    if not entries:
+        return 0
+
+    with transaction.atomic():
+        MachineHoursEntry.objects.bulk_create(entries, batch_size=BULK_UPDATE_BATCH_SIZE)
+        refresh_hours_rollups((entry.machine_id, entry.work_date) for entry in entries)
+
+    return len(entries)
+
+
+def refresh_hours_rollups(machine_days: Iterable[tuple]) -> None:
+    """
+    Recompute the daily and weekly rollup rows of the given
+    (machine id, work date) pairs from the ledger
+
+    Rollups are summed from the ledger rather than incremented, so a
+    rollup row is always consistent with its entries after its next write.
+    """
+    machine_days = set(machine_days)
+    if not machine_days:
+        return
+    machine_ids = {machine_id for machine_id, _ in machine_days}
+    work_dates = {work_date for _, work_date in machine_days}
+
+    daily_rows = [
+        MachineDailyHours(
+            machine_id=row['machine_id'],
+            work_date=row['work_date'],
+            hours=row['total_hours'],
+            entry_count=row['entry_count']
+        )
+        for row in MachineHoursEntry.objects.filter(
+            machine_id__in=machine_ids, work_date__in=work_dates
+        ).order_by().values('machine_id', 'work_date').annotate(
+            total_hours=Sum('hours'), entry_count=Count('id')
+        )
+        if (row['machine_id'], row['work_date']) in machine_days
+    ]
+    MachineDailyHours.objects.bulk_create(
+        daily_rows,
+        update_conflicts=True,
+        unique_fields=['machine', 'work_date'],
+        update_fields=['hours', 'entry_count'],
+        batch_size=BULK_UPDATE_BATCH_SIZE
+    )
+
+    machine_weeks = {(machine_id, week_start(work_date)) for machine_id, work_date in machine_days}
+    weeks = {week for _, week in machine_weeks}
+    weekly_rows = [
+        MachineWeeklyHours(machine_id=row['machine_id'], week_start=row['week'], hours=row['total_hours'])
+        for row in MachineDailyHours.objects.filter(
+            machine_id__in=machine_ids,
+            work_date__gte=min(weeks),
+            work_date__lt=max(weeks) + timedelta(days=7)
+        ).order_by().annotate(week=TruncWeek('work_date')).values('machine_id', 'week').annotate(
+            total_hours=Sum('hours')
+        )
+        if (row['machine_id'], row['week']) in machine_weeks
+    ]
+    MachineWeeklyHours.objects.bulk_create(
+        weekly_rows,
+        update_conflicts=True,
+        unique_fields=['machine', 'week_start'],
+        update_fields=['hours'],
+        batch_size=BULK_UPDATE_BATCH_SIZE
+    )
+
+
+def operating_hours_between(start: date, end: date, machines=None) -> Dict[int, float]:
+    """
+    Operating hours per machine id run from start to end (inclusive),
+    summed from the daily rollups
+
+    Args:
+        start: first day of the window
+        end: last day of the window
+        machines: queryset or ids to restrict to (default: all machines)
+    """
+    rows = MachineDailyHours.objects.filter(work_date__gte=start, work_date__lte=end)
+    if isinstance(machines, QuerySet):
+        rows = rows.filter(machine__in=machines.values('pk'))
+    elif machines is not None:
+        rows = rows.filter(machine_id__in=list(machines))
+    return dict(
+        rows.order_by().values('machine_id').annotate(total_hours=Sum('hours'))
+        .values_list('machine_id', 'total_hours')
+    )
+
+
+def _decode_lines(lines: Iterable) -> Iterator[str]:
+    """Decode a byte or text line stream, without reading it all at once"""
+    for line in lines:
+        yield line.decode('utf-8-sig') if isinstance(line, bytes) else line
+
+
+def iter_csv_entries(lines: Iterable) -> Iterator[Dict[str, Any]]:
+    """
+    Entries from a CSV stream with a header row
+    (machine_id,additional_hours[,date,notes])
+    """
+    yield from csv.DictReader(_decode_lines(lines))
+
+
+def iter_ndjson_entries(lines: Iterable) -> Iterator[Union[Dict[str, Any], ValueError]]:
+    """
+    Entries from a newline-delimited JSON stream, one object per line.
+    Lines that cannot be parsed are yielded as ValueError so that they are
+    reported with their entry number.
+    """
+    for line in _decode_lines(lines):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            entry = json.loads(line)
+        except ValueError as e:
+            yield ValueError(f'Invalid JSON: {str(e)}')
+            continue
+        yield entry if isinstance(entry, dict) else ValueError('Entry must be a JSON object')
+
+
+def _validate_entry(entry) -> tuple:
+    """
+    (machine identifier, hours, work date) of an update entry, following
+    the rules of MachineOperatingHoursSerializer; the date defaults to today
+
+    Raises:
+        ValueError: describing why the entry is invalid
+    """
+    if isinstance(entry, Exception):
+        raise entry
+    if not isinstance(entry, dict):
+        raise ValueError('Entry must be an object')
+
+    machine_id = entry.get('machine_id')
+    additional_hours = entry.get('additional_hours')
+    if machine_id in (None, '') or additional_hours in (None, ''):
+        raise ValueError('Missing machine_id or additional_hours in update')
+
+    try:
+        hours = float(additional_hours)
+    except (TypeError, ValueError):
+        raise ValueError(f'Invalid additional_hours value: {additional_hours}')
+    if hours <= 0:
+        raise ValueError('Additional hours must be greater than 0')
+    if hours > MAX_HOURS_PER_ENTRY:
+        raise ValueError(f'Additional hours cannot exceed {MAX_HOURS_PER_ENTRY} per day')
+
+    work_date = entry.get('date')
+    if work_date in (None, ''):
+        work_date = timezone.localdate()
+    elif not isinstance(work_date, date):
+        try:
+            work_date = date.fromisoformat(str(work_date).strip())
+        except ValueError:
+            raise ValueError(f'Invalid date value: {work_date}')
+
+    return str(machine_id).strip(), hours, work_date
+
+
+def _resolve_machines(identifiers) -> Dict[str, Machine]:
+    """
+    Machines for the given identifiers (database ids or machine codes such
+    as CTN-GIN-001) in one query, keyed by identifier
+    """
+    codes = set(identifiers)
+    pks = {identifier for identifier in codes if identifier.isdigit()}
+
+    machines = Machine.objects.filter(
+        Q(pk__in=[int(pk) for pk in pks]) | Q(machine_id__in=codes)
+    ).only('pk', 'machine_id')
+
+    resolved = {}
+    for machine in machines:
+        if machine.machine_id in codes:
+            resolved.setdefault(machine.machine_id, machine)
+        if str(machine.pk) in pks:
+            # A database id wins over a numeric machine code
+            resolved[str(machine.pk)] = machine
+    return resolved
+
+
+def ingest_operating_hours(entries: Iterable, recorded_by=None) -> Dict[str, Any]:
+    """
+    Add operating hours to many machines at once
+
+    Entries are validated one by one and their hours summed per machine,
+    then all machines are resolved with one query and the totals applied as
+    F() increments in a bulk_update, so concurrent uploads never overwrite
+    each other. The hours are also written to the ledger, one entry per
+    machine and day.
+
+    Args:
+        entries: dicts with machine_id (database id or machine code),
+            additional_hours and an optional date; may be a lazily parsed
+            stream
+        recorded_by: user uploading the hours
+
+    Returns:
+        dict with entry_count, updated_count (applied entries),
+        machines_updated and errors (entry number, machine_id, error)
+    """
+    errors = []
+    hours_by_identifier = defaultdict(float)
+    hours_by_identifier_day = defaultdict(float)
+    entries_by_identifier = defaultdict(list)
+    entry_count = 0
+
+    for index, entry in enumerate(entries, start=1):
+        entry_count = index
+        try:
+            identifier, hours, work_date = _validate_entry(entry)
+        except ValueError as e:
+            machine_id = entry.get('machine_id') if isinstance(entry, dict) else None
+            errors.append({'entry': index, 'machine_id': machine_id, 'error': str(e)})
+            continue
+        hours_by_identifier[identifier] += hours
+        hours_by_identifier_day[identifier, work_date] += hours
+        entries_by_identifier[identifier].append(index)
+
+    machines = _resolve_machines(hours_by_identifier) if hours_by_identifier else {}
+
+    hours_by_machine = defaultdict(float)
+    machine_objects = {}
+    updated_count = 0
+    for identifier, hours in hours_by_identifier.items():
+        machine = machines.get(identifier)
+        if machine is None:
+            errors.extend(
+                {'entry': index, 'machine_id': identifier, 'error': f'Machine with id {identifier} not found'}
+                for index in entries_by_identifier[identifier]
+            )
+            continue
+        hours_by_machine[machine.pk] += hours
+        machine_objects[machine.pk] = machine
+        updated_count += len(entries_by_identifier[identifier])
+
+    hours_by_machine_day = defaultdict(float)
+    for (identifier, work_date), hours in hours_by_identifier_day.items():
+        if identifier in machines:
+            hours_by_machine_day[machines[identifier].pk, work_date] += hours
+
+    now = timezone.now()
+    for pk, machine in machine_objects.items():
+        machine.total_operating_hours = F('total_operating_hours') + hours_by_machine[pk]
+        machine.hours_since_maintenance = F('hours_since_maintenance') + hours_by_machine[pk]
+        machine.updated_at = now
+
+    if machine_objects:
+        with transaction.atomic():
+            Machine.objects.bulk_update(
+                list(machine_objects.values()),
+                ['total_operating_hours', 'hours_since_maintenance', 'updated_at'],
+                batch_size=BULK_UPDATE_BATCH_SIZE
+            )
+            # bulk_update skips the save signals that keep the stored metrics
+            # in sync and invalidate cached analytics
+            refresh_derived_metrics(list(machine_objects))
+            invalidate_analytics('machines')
+            record_operating_hours(
+                hours_by_machine_day,
+                source=MachineHoursEntry.Source.UPLOAD,
+                recorded_by=recorded_by
+            )
+
+    errors.sort(key=lambda error: error['entry'])
+    logger.info(
+        f"Operating hours ingestion: {entry_count} entries, {updated_count} applied "
+        f"to {len(machine_objects)} machines, {len(errors)} errors"
+    )
+
+    return {
+        'entry_count': entry_count,
+        'updated_count': updated_count,
+        'machines_updated': len(machine_objects),
+        'errors': errors,
+    }
@@ -0,0 +1,40 @@
+"""
+Machine signals for TexPro AI
+Keep the stored maintenance/efficiency metrics in sync with the machines
+"""
+from django.db.models.signals import pre_save, post_save
+from django.dispatch import receiver
+
+from machines.models import Machine, MachineType
+from machines.models.derived_metrics import DERIVED_METRIC_FIELDS
+from machines.services import apply_derived_metrics, refresh_derived_metrics
+
+
+@receiver(pre_save, sender=Machine)
+def update_derived_metrics(sender, instance, raw=False, **kwargs):
+    """Recompute the stored metrics before every machine save"""
+    if raw:
+        return
+    apply_derived_metrics(instance)
+
+
+@receiver(post_save, sender=Machine)
+def persist_derived_metrics_for_partial_saves(sender, instance, raw=False, update_fields=None, **kwargs):
+    """
+    save(update_fields=[...]) only writes the listed columns: persist the
+    metrics recomputed in pre_save when they were not listed
+    """
+    if raw or update_fields is None or set(DERIVED_METRIC_FIELDS) <= set(update_fields):
+        return
+
+    Machine.objects.filter(pk=instance.pk).update(**{
+        field: getattr(instance, field) for field in DERIVED_METRIC_FIELDS
+    })
+
+
+@receiver(post_save, sender=MachineType)
+def refresh_metrics_for_machine_type(sender, instance, created, raw=False, **kwargs):
+    """Maintenance intervals of the type drive the metrics of its machines"""
+    if raw or created:
+        return
+    refresh_derived_metrics(Machine.objects.filter(machine_type=instance))
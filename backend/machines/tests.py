@@ -7,7 +7,13 @@ from django.contrib.auth import get_user_model
 from rest_framework.test import APITestCase
 from rest_framework import status
 from django.urls import reverse
+from django.core.management import call_command
+from django.utils import timezone
+from datetime import date, timedelta
+from io import StringIO
 from machines.models import Machine, MachineType
+from machines.models.operating_hours import MachineDailyHours, MachineHoursEntry, MachineWeeklyHours
+from machines.services import ingest_operating_hours, operating_hours_between
 
 User = get_user_model()
 
@@ -104,3 +110,626 @@ class MachineModelTest(TestCase):
         
         self.assertEqual(self.machine.hours_since_maintenance, 0)
         self.assertIsNotNone(self.machine.last_maintenance_date)
+
+
+class OperatingHoursIngestionTest(APITestCase):
+    """
+    Test cases for bulk operating-hours ingestion
+    """
+    
+    def setUp(self):
+        """Set up test data"""
+        self.machine_type = MachineType.objects.create(
+            name="Spinning Frame",
+            description="Ring spinning frame",
+            manufacturer="TextileTech",
+            typical_power_consumption=20.0,
+            typical_production_rate=50.0,
+            production_unit="kg/hr"
+        )
+        self.machines = [
+            Machine.objects.create(
+                machine_id=f"SPN-FRM-{index:03d}",
+                name=f"Spinning Frame {index}",
+                machine_type=self.machine_type,
+                site_code="BAM001",
+                total_operating_hours=100,
+                hours_since_maintenance=10
+            )
+            for index in range(1, 4)
+        ]
+        self.admin = User.objects.create_user(
+            username="admin_user",
+            email="admin@example.com",
+            password="testpass123",
+            role="admin"
+        )
+        self.client.force_authenticate(user=self.admin)
+        self.url = reverse('v1:machines:machine-operating-hours')
+    
+    def test_json_updates_accumulated_per_machine(self):
+        """Test entries are summed per machine and errors reported per entry"""
+        first, second, _ = self.machines
+        
+        response = self.client.post(self.url, {'updates': [
+            {'machine_id': first.id, 'additional_hours': 8},
+            {'machine_id': 'SPN-FRM-001', 'additional_hours': 4.5},
+            {'machine_id': second.machine_id, 'additional_hours': 6},
+            {'machine_id': 999999, 'additional_hours': 2},
+            {'machine_id': second.id, 'additional_hours': 30},
+            {'additional_hours': 1},
+        ]}, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['updated_count'], 3)
+        self.assertEqual(response.data['machines_updated'], 2)
+        self.assertEqual([error['entry'] for error in response.data['errors']], [4, 5, 6])
+        
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.total_operating_hours, 112.5)
+        self.assertEqual(first.hours_since_maintenance, 22.5)
+        self.assertEqual(second.total_operating_hours, 106)
+    
+    def test_constant_queries(self):
+        """Test the query count does not depend on the number of entries"""
+        updates = [
+            {'machine_id': machine.machine_id, 'additional_hours': 1}
+            for machine in self.machines
+            for _ in range(50)
+        ]
+        
+        # Lookup, savepoint, hours UPDATE, metrics SELECT + UPDATE, ledger
+        # savepoint, INSERT, daily and weekly SELECT + upsert, releases
+        with self.assertNumQueries(13):
+            result = ingest_operating_hours(updates)
+        
+        self.assertEqual(result['updated_count'], 150)
+        self.machines[2].refresh_from_db()
+        self.assertEqual(self.machines[2].total_operating_hours, 150)
+    
+    def test_csv_body(self):
+        """Test a streamed CSV body is ingested"""
+        body = "machine_id,additional_hours\nSPN-FRM-001,7.5\nSPN-FRM-002,abc\n"
+        
+        response = self.client.post(self.url, body, content_type='text/csv')
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['updated_count'], 1)
+        self.assertEqual(response.data['errors'][0]['entry'], 2)
+        self.machines[0].refresh_from_db()
+        self.assertEqual(self.machines[0].total_operating_hours, 107.5)
+    
+    def test_ndjson_body(self):
+        """Test a streamed NDJSON body is ingested, invalid lines reported"""
+        body = (
+            '{"machine_id": "SPN-FRM-003", "additional_hours": 5}\n'
+            'not json\n'
+            '\n'
+            '{"machine_id": "SPN-FRM-003", "additional_hours": 3}\n'
+        )
+        
+        response = self.client.post(self.url, body, content_type='application/x-ndjson')
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['entry_count'], 3)
+        self.assertEqual(response.data['updated_count'], 2)
+        self.assertEqual(response.data['errors'][0]['entry'], 2)
+        self.machines[2].refresh_from_db()
+        self.assertEqual(self.machines[2].hours_since_maintenance, 18)
+    
+    def test_empty_body_rejected(self):
+        """Test a request without updates is rejected"""
+        response = self.client.post(self.url, '', content_type='text/csv')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        
+        response = self.client.post(self.url, {'updates': []}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class OperatingHoursLedgerTest(APITestCase):
+    """
+    Test cases for the operating hours ledger and its rollups
+    """
+    
+    def setUp(self):
+        """Set up test data"""
+        self.machine_type = MachineType.objects.create(
+            name="Spinning Frame",
+            production_unit="kg/hr"
+        )
+        self.machine = Machine.objects.create(
+            machine_id="SPN-FRM-001",
+            name="Spinning Frame 1",
+            machine_type=self.machine_type,
+            site_code="BAM001",
+            total_operating_hours=100,
+            hours_since_maintenance=10
+        )
+        self.admin = User.objects.create_user(
+            username="admin_user",
+            email="admin@example.com",
+            password="testpass123",
+            role="admin"
+        )
+        self.client.force_authenticate(user=self.admin)
+        # A Monday, so that the entries below span two weeks
+        self.monday = date(2026, 3, 2)
+    
+    def test_update_hours_writes_ledger(self):
+        """Test the update_hours action appends an entry and its rollups"""
+        url = reverse('v1:machines:machine-update-hours', args=[self.machine.pk])
+        
+        for hours in (6, 2.5):
+            response = self.client.post(url, {
+                'additional_hours': hours, 'date': self.monday.isoformat()
+            }, format='json')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+        
+        self.assertEqual(response.data['total_hours'], 108.5)
+        entries = MachineHoursEntry.objects.filter(machine=self.machine)
+        self.assertEqual(entries.count(), 2)
+        self.assertEqual(entries.first().recorded_by, self.admin)
+        daily = MachineDailyHours.objects.get(machine=self.machine, work_date=self.monday)
+        self.assertEqual((daily.hours, daily.entry_count), (8.5, 2))
+        self.assertEqual(MachineWeeklyHours.objects.get(machine=self.machine).hours, 8.5)
+    
+    def test_ingestion_rolls_up_per_day_and_week(self):
+        """Test uploaded hours are stored per day and rolled up per week"""
+        sunday = self.monday + timedelta(days=6)
+        next_monday = self.monday + timedelta(days=7)
+        
+        result = ingest_operating_hours([
+            {'machine_id': 'SPN-FRM-001', 'additional_hours': 8, 'date': self.monday.isoformat()},
+            {'machine_id': 'SPN-FRM-001', 'additional_hours': 4, 'date': self.monday.isoformat()},
+            {'machine_id': 'SPN-FRM-001', 'additional_hours': 5, 'date': sunday.isoformat()},
+            {'machine_id': 'SPN-FRM-001', 'additional_hours': 7, 'date': next_monday.isoformat()},
+            {'machine_id': 'SPN-FRM-001', 'additional_hours': 1, 'date': '2026-02-30'},
+        ])
+        
+        self.assertEqual(result['updated_count'], 4)
+        self.assertEqual(result['errors'], [
+            {'entry': 5, 'machine_id': 'SPN-FRM-001', 'error': 'Invalid date value: 2026-02-30'}
+        ])
+        # One compact entry per machine and day
+        self.assertEqual(MachineHoursEntry.objects.filter(source='upload').count(), 3)
+        self.assertEqual(
+            dict(MachineWeeklyHours.objects.values_list('week_start', 'hours')),
+            {self.monday: 17, next_monday: 7}
+        )
+        
+        # A later upload for the same day updates its rollups
+        ingest_operating_hours([
+            {'machine_id': 'SPN-FRM-001', 'additional_hours': 3, 'date': sunday.isoformat()},
+        ])
+        self.assertEqual(MachineDailyHours.objects.get(work_date=sunday).hours, 8)
+        self.assertEqual(MachineWeeklyHours.objects.get(week_start=self.monday).hours, 20)
+    
+    def test_operating_hours_between(self):
+        """Test hours over a window are summed from the daily rollups"""
+        ingest_operating_hours([
+            {'machine_id': 'SPN-FRM-001', 'additional_hours': 8,
+             'date': (self.monday + timedelta(days=offset)).isoformat()}
+            for offset in range(10)
+        ])
+        
+        window = operating_hours_between(
+            self.monday + timedelta(days=2), self.monday + timedelta(days=4)
+        )
+        
+        self.assertEqual(window, {self.machine.pk: 24})
+        self.assertEqual(
+            operating_hours_between(self.monday, self.monday, machines=Machine.objects.none()),
+            {}
+        )
+
+
+class MachineDerivedMetricsTest(APITestCase):
+    """
+    Test cases for the stored maintenance and efficiency metrics
+    """
+    
+    def setUp(self):
+        """Set up test data"""
+        self.machine_type = MachineType.objects.create(
+            name="Weaving Loom",
+            description="Air-jet weaving loom",
+            manufacturer="TextileTech",
+            typical_power_consumption=10.0,
+            typical_production_rate=30.0,
+            production_unit="m/hr",
+            recommended_maintenance_interval_hours=100
+        )
+        self.machine = Machine.objects.create(
+            machine_id="WVG-LOM-001",
+            name="Weaving Loom 1",
+            machine_type=self.machine_type,
+            site_code="BAM001",
+            building="Hall B",
+            total_operating_hours=50,
+            hours_since_maintenance=50,
+            operational_status="running"
+        )
+        self.admin = User.objects.create_user(
+            username="admin_user",
+            email="admin@example.com",
+            password="testpass123",
+            role="admin"
+        )
+    
+    def assertStoredMetricsCurrent(self, machine):
+        """Assert the stored columns match the model's computed values"""
+        stored = Machine.objects.get(pk=machine.pk)
+        self.assertEqual(stored.maintenance_needed, stored.needs_maintenance)
+        self.assertEqual(stored.maintenance_urgency_level, stored.maintenance_urgency)
+        self.assertEqual(stored.efficiency_score, stored.get_efficiency_rating())
+    
+    def test_metrics_stored_on_save(self):
+        """Test creating and saving a machine stores its metrics"""
+        self.assertStoredMetricsCurrent(self.machine)
+        
+        self.machine.hours_since_maintenance = 110
+        self.machine.save()
+        
+        self.assertStoredMetricsCurrent(self.machine)
+        self.assertEqual(Machine.objects.get(pk=self.machine.pk).maintenance_urgency_level, 'urgent')
+    
+    def test_metrics_stored_on_partial_save(self):
+        """Test save(update_fields=...) still persists the recomputed metrics"""
+        self.machine.update_operating_hours(80)
+        
+        self.assertStoredMetricsCurrent(self.machine)
+        self.assertTrue(Machine.objects.get(pk=self.machine.pk).maintenance_needed)
+    
+    def test_machine_type_change_refreshes_machines(self):
+        """Test changing the type maintenance interval refreshes its machines"""
+        self.machine_type.recommended_maintenance_interval_hours = 45
+        self.machine_type.save()
+        
+        self.assertStoredMetricsCurrent(self.machine)
+        self.assertEqual(Machine.objects.get(pk=self.machine.pk).maintenance_urgency_level, 'urgent')
+    
+    def test_backfill_command(self):
+        """Test the backfill command repairs stale stored metrics"""
+        Machine.objects.filter(pk=self.machine.pk).update(
+            maintenance_needed=True, maintenance_urgency_level='critical', efficiency_score=None
+        )
+        
+        out = StringIO()
+        call_command('backfill_machine_metrics', stdout=out)
+        
+        self.assertIn('Updated stored metrics of 1 machines', out.getvalue())
+        self.assertStoredMetricsCurrent(self.machine)
+    
+    def test_maintenance_due_filter_uses_stored_columns(self):
+        """Test the maintenance_due filter matches machines needing maintenance"""
+        Machine.objects.create(
+            machine_id="WVG-LOM-002",
+            name="Weaving Loom 2",
+            machine_type=self.machine_type,
+            site_code="BAM001",
+            hours_since_maintenance=130,
+            operational_status="running"
+        )
+        self.client.force_authenticate(user=self.admin)
+        
+        response = self.client.get(reverse('v1:machines:machine-list'), {'maintenance_due': 'true'})
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data.get('results', response.data)
+        self.assertEqual([machine['machine_id'] for machine in results], ['WVG-LOM-002'])
+    
+    def test_efficiency_analytics_from_stored_columns(self):
+        """Test efficiency analytics aggregate the stored efficiency scores"""
+        Machine.objects.create(
+            machine_id="WVG-LOM-002",
+            name="Weaving Loom 2",
+            machine_type=self.machine_type,
+            site_code="BAM001",
+            building="Hall B",
+            total_operating_hours=200,
+            hours_since_maintenance=250,
+            operational_status="running"
+        )
+        self.client.force_authenticate(user=self.admin)
+        expected = [machine.get_efficiency_rating() for machine in Machine.objects.order_by('machine_id')]
+        
+        # Overall, by type, by location, top and underperforming machines
+        with self.assertNumQueries(5):
+            response = self.client.get(reverse('v1:machines:efficiency-analytics'))
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertAlmostEqual(response.data['overall_efficiency'], round(sum(expected) / 2, 2))
+        self.assertEqual(response.data['efficiency_by_type'][0]['machine_count'], 2)
+        self.assertEqual(
+            [machine['efficiency'] for machine in response.data['top_performing_machines']],
+            sorted(expected, reverse=True)
+        )
+    
+    def test_machine_stats_maintenance_counts(self):
+        """Test fleet stats count machines due and overdue from stored columns"""
+        self.machine.hours_since_maintenance = 95
+        self.machine.save()
+        Machine.objects.create(
+            machine_id="WVG-LOM-002",
+            name="Weaving Loom 2",
+            machine_type=self.machine_type,
+            site_code="BAM001",
+            hours_since_maintenance=130,
+            operational_status="running"
+        )
+        self.client.force_authenticate(user=self.admin)
+        
+        response = self.client.get(reverse('v1:machines:machine-stats'))
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['total_machines'], 2)
+        self.assertEqual(response.data['maintenance_overdue'], 1)
+
+
+class FleetAnalyticsTest(APITestCase):
+    """
+    Test cases for the analytics views built on the fleet rollups
+    """
+    
+    def setUp(self):
+        """Set up a fleet over two types and three buildings"""
+        self.loom_type = MachineType.objects.create(
+            name="Weaving Loom",
+            recommended_maintenance_interval_hours=100
+        )
+        self.gin_type = MachineType.objects.create(
+            name="Cotton Gin",
+            recommended_maintenance_interval_hours=100
+        )
+        fleet = [
+            # machine_id, type, building, hours since maintenance, status
+            ("WVG-LOM-001", self.loom_type, "Hall A", 10, "running"),
+            ("WVG-LOM-002", self.loom_type, "Hall A", 95, "idle"),
+            ("WVG-LOM-003", self.loom_type, "Hall B", 105, "maintenance"),
+            ("CTN-GIN-001", self.gin_type, "Hall B", 130, "breakdown"),
+            ("CTN-GIN-002", self.gin_type, "Hall C", 50, "offline"),
+        ]
+        for machine_id, machine_type, building, hours, operational_status in fleet:
+            Machine.objects.create(
+                machine_id=machine_id,
+                name=machine_id,
+                machine_type=machine_type,
+                site_code="BAM001",
+                building=building,
+                total_operating_hours=hours + 100,
+                hours_since_maintenance=hours,
+                operational_status=operational_status
+            )
+        # Due by calendar date although well within its hours interval
+        overdue_date = Machine.objects.get(machine_id="WVG-LOM-001")
+        overdue_date.next_maintenance_date = timezone.now() - timedelta(days=1)
+        overdue_date.save()
+        self.admin = User.objects.create_user(
+            username="admin_user",
+            email="admin@example.com",
+            password="testpass123",
+            role="admin"
+        )
+        self.client.force_authenticate(user=self.admin)
+    
+    def test_machine_analytics_by_type_and_location(self):
+        """Test type and location analytics come from one grouped query each"""
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('v1:machines:machine-analytics'))
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        by_type = {row['machine_type']: row for row in response.data['type_analytics']}
+        self.assertEqual(list(by_type), ["Cotton Gin", "Weaving Loom"])
+        
+        looms = by_type["Weaving Loom"]
+        self.assertEqual(looms['total_count'], 3)
+        self.assertEqual(looms['operational_count'], 2)
+        self.assertEqual(looms['maintenance_count'], 1)
+        self.assertEqual(looms['maintenance_due_count'], 1)
+        self.assertEqual(looms['maintenance_overdue_count'], 1)
+        self.assertEqual(looms['average_operating_hours'], round((110 + 195 + 205) / 3, 2))
+        ratings = [m.get_efficiency_rating() for m in Machine.objects.filter(machine_type=self.loom_type)]
+        self.assertEqual(looms['average_efficiency'], round(sum(ratings) / len(ratings), 2))
+        
+        gins = by_type["Cotton Gin"]
+        self.assertEqual((gins['offline_count'], gins['breakdown_count']), (1, 1))
+        
+        by_location = {row['building']: row for row in response.data['location_analytics']}
+        self.assertEqual(by_location["Hall B"]['total_machines'], 2)
+        self.assertEqual(by_location["Hall B"]['total_operating_hours'], 205 + 230)
+    
+    def test_query_count_independent_of_fleet_size(self):
+        """Test adding types and buildings does not add queries"""
+        for index in range(5):
+            machine_type = MachineType.objects.create(name=f"Spinner {index}")
+            Machine.objects.create(
+                machine_id=f"SPN-{index:03d}",
+                name=f"Spinner {index}",
+                machine_type=machine_type,
+                site_code="BAM001",
+                building=f"Annex {index}",
+                operational_status="running"
+            )
+        
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('v1:machines:machine-analytics'))
+        
+        self.assertEqual(len(response.data['type_analytics']), 7)
+        self.assertEqual(len(response.data['location_analytics']), 8)
+    
+    def test_maintenance_analytics(self):
+        """Test maintenance analytics counts, machine lists and type rates"""
+        # Due counts, critical machines, upcoming maintenance, by type
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('v1:machines:maintenance-analytics'))
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['machines_overdue'], 1)
+        self.assertEqual(response.data['machines_due_today'], 1)
+        self.assertEqual(
+            [machine['machine_id'] for machine in response.data['critical_machines']],
+            ["CTN-GIN-001"]
+        )
+        self.assertEqual(response.data['critical_machines'][0]['location'], "BAM001 - Hall B")
+        self.assertEqual(
+            sorted(machine['machine_id'] for machine in response.data['upcoming_maintenance']),
+            ["WVG-LOM-002", "WVG-LOM-003"]
+        )
+        
+        by_type = {row['machine_type']: row for row in response.data['maintenance_by_type']}
+        self.assertEqual(by_type["Weaving Loom"]['maintenance_rate'], round(2 / 3 * 100, 2))
+        self.assertEqual(by_type["Cotton Gin"]['maintenance_overdue'], 1)
+    
+    def test_utilization_analytics_by_type(self):
+        """Test utilization per type matches the summed machine hours"""
+        response = self.client.get(reverse('v1:machines:utilization-analytics'))
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['total_operating_hours'], 110 + 195 + 205 + 230 + 150)
+        by_type = {row['machine_type']: row for row in response.data['utilization_by_type']}
+        self.assertEqual(by_type["Cotton Gin"]['total_machines'], 2)
+        self.assertEqual(by_type["Cotton Gin"]['operating_hours'], 230 + 150)
+    
+    def test_utilization_computed_in_database(self):
+        """Test available hours and rates match the 48 hours per week model"""
+        today = date.today()
+        installed_days_ago = {
+            "WVG-LOM-001": 70, "WVG-LOM-002": 14, "WVG-LOM-003": 35, "CTN-GIN-001": 7,
+        }
+        for machine_id, days in installed_days_ago.items():
+            Machine.objects.filter(machine_id=machine_id).update(
+                installation_date=today - timedelta(days=days)
+            )
+        operating_hours = {
+            machine.machine_id: machine.total_operating_hours for machine in Machine.objects.all()
+        }
+        available = {machine_id: days / 7 * 48 for machine_id, days in installed_days_ago.items()}
+        rates = {
+            machine_id: operating_hours[machine_id] / hours * 100
+            for machine_id, hours in available.items()
+        }
+        
+        # Fleet, by type, by location, most and least utilized machines
+        with self.assertNumQueries(5):
+            response = self.client.get(reverse('v1:machines:utilization-analytics'))
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertAlmostEqual(response.data['total_available_hours'], round(sum(available.values()), 2))
+        
+        by_ranking = sorted(rates, key=rates.get, reverse=True)
+        self.assertEqual(
+            [machine['machine_id'] for machine in response.data['most_utilized_machines']],
+            by_ranking
+        )
+        self.assertEqual(
+            [machine['machine_id'] for machine in response.data['least_utilized_machines']],
+            by_ranking
+        )
+        top = response.data['most_utilized_machines'][0]
+        self.assertAlmostEqual(top['utilization_rate'], round(rates[top['machine_id']], 2))
+        
+        by_location = {row['building']: row for row in response.data['utilization_by_location']}
+        self.assertEqual(list(by_location), ["Hall A", "Hall B", "Hall C"])
+        hall_b_available = available["WVG-LOM-003"] + available["CTN-GIN-001"]
+        self.assertAlmostEqual(by_location["Hall B"]['available_hours'], round(hall_b_available, 2))
+        self.assertAlmostEqual(
+            by_location["Hall B"]['utilization_rate'],
+            round((205 + 230) / hall_b_available * 100, 2)
+        )
+        # Machines without an installation date have no available hours
+        self.assertEqual(by_location["Hall C"]['available_hours'], 0)
+        self.assertEqual(by_location["Hall C"]['utilization_rate'], 0)
+    
+    def test_utilization_over_window_reads_daily_rollups(self):
+        """Test ?start=&end= utilization uses the hours run in the window"""
+        monday = date(2026, 3, 2)
+        ingest_operating_hours(
+            [{'machine_id': 'WVG-LOM-001', 'additional_hours': 8, 'date': (monday + timedelta(days=offset)).isoformat()}
+             for offset in range(7)] +
+            [{'machine_id': 'WVG-LOM-002', 'additional_hours': 24, 'date': monday.isoformat()},
+             {'machine_id': 'CTN-GIN-001', 'additional_hours': 12, 'date': (monday + timedelta(days=4)).isoformat()},
+             # Outside the window
+             {'machine_id': 'WVG-LOM-003', 'additional_hours': 30, 'date': (monday - timedelta(days=1)).isoformat()}]
+        )
+        # Installed during the window, and after it
+        Machine.objects.filter(machine_id="CTN-GIN-001").update(installation_date=monday + timedelta(days=3))
+        Machine.objects.filter(machine_id="CTN-GIN-002").update(installation_date=date(2026, 4, 1))
+        
+        url = reverse('v1:machines:utilization-analytics')
+        with self.assertNumQueries(5):
+            response = self.client.get(url, {'start': monday.isoformat(), 'end': '2026-03-08'})
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['period_start'], '2026-03-02')
+        self.assertEqual(response.data['total_operating_hours'], 56 + 24 + 12)
+        self.assertAlmostEqual(response.data['total_available_hours'], round(3 * 48 + 4 / 7 * 48, 2))
+        self.assertEqual(
+            [machine['machine_id'] for machine in response.data['most_utilized_machines']],
+            ["WVG-LOM-001", "WVG-LOM-002", "CTN-GIN-001"]
+        )
+        self.assertAlmostEqual(response.data['most_utilized_machines'][0]['utilization_rate'], round(56 / 48 * 100, 2))
+        by_type = {row['machine_type']: row for row in response.data['utilization_by_type']}
+        self.assertEqual(by_type["Weaving Loom"]['operating_hours'], 80)
+        
+        response = self.client.get(url, {'start': '2026-03-08', 'end': monday.isoformat()})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class SiteScopedQuerysetTest(APITestCase):
+    """
+    Test cases for restricting machine querysets to the user's site
+    """
+    
+    def setUp(self):
+        """Set up machines at two sites"""
+        self.machine_type = MachineType.objects.create(name="Weaving Loom")
+        for machine_id, site_code in [
+            ("WVG-LOM-001", "BAM001"), ("WVG-LOM-002", "BAM001"), ("WVG-LOM-003", "SEG001"),
+        ]:
+            Machine.objects.create(
+                machine_id=machine_id,
+                name=machine_id,
+                machine_type=self.machine_type,
+                site_code=site_code,
+                operational_status="running"
+            )
+        self.supervisor = User.objects.create_user(
+            username="site_supervisor",
+            email="site_supervisor@example.com",
+            password="testpass123",
+            role="supervisor",
+            employee_id="SU0001"
+        )
+        self.supervisor.site_code = "SEG001"
+        self.admin = User.objects.create_user(
+            username="admin_user",
+            email="admin@example.com",
+            password="testpass123",
+            role="admin",
+            employee_id="AD0001"
+        )
+        self.admin.site_code = "SEG001"
+    
+    def test_for_user_restricts_to_site(self):
+        """Test site users see their site and admins see every site"""
+        self.assertEqual(
+            list(Machine.objects.for_user(self.supervisor).values_list('machine_id', flat=True)),
+            ["WVG-LOM-003"]
+        )
+        self.assertEqual(Machine.objects.for_user(self.admin).count(), 3)
+        self.assertEqual(Machine.objects.for_site(None).count(), 3)
+    
+    def test_machine_list_and_stats_are_site_scoped(self):
+        """Test the machine list and analytics only cover the user's site"""
+        self.client.force_authenticate(user=self.supervisor)
+        
+        response = self.client.get(reverse('v1:machines:machine-list'))
+        results = response.data.get('results', response.data)
+        self.assertEqual([machine['machine_id'] for machine in results], ["WVG-LOM-003"])
+        
+        response = self.client.get(reverse('v1:machines:machine-analytics'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [row['site_code'] for row in response.data['location_analytics']], ["SEG001"]
+        )
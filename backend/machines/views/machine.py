@@ -8,6 +8,7 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
 from django.db.models import Q, Avg
+from django.db import transaction
 from django.utils import timezone
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
@@ -21,6 +22,12 @@ from machines.serializers import (
     MachineMaintenanceSerializer,
     MachineOperatingHoursSerializer
 )
+from machines.services import (
+    ingest_operating_hours,
+    iter_csv_entries,
+    iter_ndjson_entries,
+    record_operating_hours
+)
 from core.permissions import RoleBasedPermission
 from core.pagination import StandardResultsSetPagination
 from core.filters import BaseFilterSet
@@ -195,13 +202,8 @@ class MachineViewSet(viewsets.ModelViewSet):
         """
         Filter queryset based on user permissions and query parameters
         """
-        queryset = super().get_queryset()
-        user = self.request.user
-        
         # Filter by site if user is not admin
-        if hasattr(user, 'user_type') and user.user_type != 'admin':
-            if hasattr(user, 'site_code') and user.site_code:
-                queryset = queryset.filter(site_code=user.site_code)
+        queryset = super().get_queryset().for_user(self.request.user)
         
         # Additional filtering based on query parameters
         operational_status = self.request.query_params.get('operational_status')
@@ -210,12 +212,11 @@ class MachineViewSet(viewsets.ModelViewSet):
         
         maintenance_due = self.request.query_params.get('maintenance_due')
         if maintenance_due == 'true':
-            # Get machines that need maintenance
-            maintenance_machines = []
-            for machine in queryset:
-                if machine.needs_maintenance or machine.maintenance_urgency in ['urgent', 'critical']:
-                    maintenance_machines.append(machine.id)
-            queryset = queryset.filter(id__in=maintenance_machines)
+            # Get machines that need maintenance (stored metric columns)
+            queryset = queryset.filter(
+                Q(maintenance_needed=True) |
+                Q(maintenance_urgency_level__in=['urgent', 'critical'])
+            )
 
         # Filter by creator role (e.g., created_by_role=admin)
         created_by_role = self.request.query_params.get('created_by_role')
@@ -400,10 +401,16 @@ class MachineViewSet(viewsets.ModelViewSet):
         
         if serializer.is_valid():
             additional_hours = serializer.validated_data['additional_hours']
+            work_date = serializer.validated_data.get('date') or timezone.localdate()
             notes = serializer.validated_data.get('notes', '')
             
-            # Update operating hours
-            machine.update_operating_hours(additional_hours)
+            # Update operating hours and record them in the ledger
+            with transaction.atomic():
+                machine.update_operating_hours(additional_hours)
+                record_operating_hours(
+                    {(machine.pk, work_date): additional_hours},
+                    recorded_by=request.user
+                )
             
             # Add note if provided
             if notes:
@@ -516,47 +523,55 @@ class MachineMaintenanceView(APIView):
 class MachineOperatingHoursView(APIView):
     """
     Bulk update machine operating hours
+    
+    Accepts a JSON body {"updates": [{"machine_id": ..., "additional_hours": ...}]},
+    or a streamed text/csv (header: machine_id,additional_hours[,date]) or
+    application/x-ndjson body with one update per line. Each update may
+    carry the date the hours were run (defaults to today).
     """
     permission_classes = [IsAuthenticated, RoleBasedPermission]
     
+    STREAM_PARSERS = {
+        'text/csv': iter_csv_entries,
+        'application/x-ndjson': iter_ndjson_entries,
+        'application/ndjson': iter_ndjson_entries,
+    }
+    
     def post(self, request):
         """
         Bulk update operating hours for multiple machines
         """
-        updates = request.data.get('updates', [])
+        content_type = (request.content_type or '').split(';')[0].strip().lower()
+        stream_parser = self.STREAM_PARSERS.get(content_type)
+        
+        if stream_parser:
+            # Parsed line by line while reading the request body
+            updates = stream_parser(request.stream or [])
+        else:
+            updates = request.data.get('updates', [])
+            
+            if not updates:
+                return Response(
+                    {'error': 'updates array is required'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        
+        result = ingest_operating_hours(updates, recorded_by=request.user)
         
-        if not updates:
+        if not result['entry_count']:
             return Response(
-                {'error': 'updates array is required'},
+                {'error': 'No updates found in request body'},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        updated_count = 0
-        errors = []
-        
-        for update in updates:
-            machine_id = update.get('machine_id')
-            additional_hours = update.get('additional_hours')
-            
-            if not machine_id or additional_hours is None:
-                errors.append(f'Missing machine_id or additional_hours in update')
-                continue
-            
-            try:
-                machine = Machine.objects.get(id=machine_id)
-                machine.update_operating_hours(additional_hours)
-                updated_count += 1
-            except Machine.DoesNotExist:
-                errors.append(f'Machine with id {machine_id} not found')
-            except Exception as e:
-                errors.append(f'Error updating machine {machine_id}: {str(e)}')
-        
         response_data = {
-            'message': f'Updated {updated_count} machines',
-            'updated_count': updated_count
+            'message': f'Updated {result["machines_updated"]} machines',
+            'updated_count': result['updated_count'],
+            'machines_updated': result['machines_updated'],
+            'entry_count': result['entry_count']
         }
         
-        if errors:
-            response_data['errors'] = errors
+        if result['errors']:
+            response_data['errors'] = result['errors']
         
         return Response(response_data)
@@ -2,14 +2,29 @@
 Machine statistics and analytics views for TexPro AI
 Handles machine performance analytics and reporting
 """
+from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from django.db.models import Count, Avg, Sum, Q
+from django.db.models import Count, Q, F, Sum
 from django.utils import timezone
+from django.utils.dateparse import parse_date
 from datetime import date, timedelta
 
-from machines.models import Machine, MachineType
+from machines.models import Machine
+from machines.fleet_analytics import (
+    RATED_EFFICIENCY,
+    fleet_rollup,
+    type_rollups,
+    location_rollups,
+    machine_rows,
+    machine_entry,
+    available_hours,
+    utilization_rate,
+    window_available_hours,
+    window_operating_hours,
+    window_utilization_rate,
+)
 from machines.serializers import (
     MachineStatsSerializer,
     MachineTypeStatsSerializer,
@@ -30,28 +45,8 @@ class MachineStatsView(APIView):
         """
         Get overall machine statistics
         """
-        user = request.user
-        machines_queryset = Machine.objects.all()
-        
         # Filter by site if user is not admin
-        if hasattr(user, 'user_type') and user.user_type != 'admin':
-            if hasattr(user, 'site_code') and user.site_code:
-                machines_queryset = machines_queryset.filter(site_code=user.site_code)
-        
-        # Basic counts
-        total_machines = machines_queryset.count()
-        operational_machines = machines_queryset.filter(
-            operational_status__in=['running', 'idle']
-        ).count()
-        maintenance_machines = machines_queryset.filter(
-            operational_status='maintenance'
-        ).count()
-        offline_machines = machines_queryset.filter(
-            operational_status='offline'
-        ).count()
-        breakdown_machines = machines_queryset.filter(
-            operational_status='breakdown'
-        ).count()
+        machines_queryset = Machine.objects.for_user(request.user)
         
         # Statistics by status
         machines_by_status = list(
@@ -75,50 +70,30 @@ class MachineStatsView(APIView):
             .order_by('site_code', 'building')
         )
         
-        # Maintenance statistics
-        maintenance_due_soon = 0
-        maintenance_overdue = 0
-        
-        for machine in machines_queryset:
-            if machine.needs_maintenance:
-                if machine.maintenance_urgency in ['urgent', 'critical']:
-                    maintenance_overdue += 1
-                elif machine.maintenance_urgency == 'due_soon':
-                    maintenance_due_soon += 1
-        
-        # Performance metrics
-        total_operating_hours = machines_queryset.aggregate(
-            total=Sum('total_operating_hours')
-        )['total'] or 0
-        
-        # Calculate average efficiency
-        efficiency_sum = 0
-        efficiency_count = 0
-        for machine in machines_queryset:
-            efficiency = machine.get_efficiency_rating()
-            if efficiency:
-                efficiency_sum += efficiency
-                efficiency_count += 1
-        
-        average_efficiency = efficiency_sum / efficiency_count if efficiency_count > 0 else 0
+        # Counts, maintenance statistics and performance metrics (stored metric columns)
+        fleet = fleet_rollup(
+            machines_queryset,
+            maintenance_due_soon=Count('id', filter=Q(
+                maintenance_needed=True, maintenance_urgency_level='due_soon'
+            )),
+        )
         
         stats_data = {
-            'total_machines': total_machines,
-            'operational_machines': operational_machines,
-            'maintenance_machines': maintenance_machines,
-            'offline_machines': offline_machines,
-            'breakdown_machines': breakdown_machines,
+            'total_machines': fleet['total_count'],
+            'operational_machines': fleet['operational_count'],
+            'maintenance_machines': fleet['maintenance_count'],
+            'offline_machines': fleet['offline_count'],
+            'breakdown_machines': fleet['breakdown_count'],
             'machines_by_status': machines_by_status,
             'machines_by_type': machines_by_type,
             'machines_by_location': machines_by_location,
-            'maintenance_due_soon': maintenance_due_soon,
-            'maintenance_overdue': maintenance_overdue,
-            'average_efficiency': round(average_efficiency, 2),
-            'total_operating_hours': total_operating_hours,
+            'maintenance_due_soon': fleet['maintenance_due_soon'],
+            'maintenance_overdue': fleet['maintenance_overdue_count'],
+            'average_efficiency': round(fleet['average_efficiency'], 2),
+            'total_operating_hours': fleet['operating_hours'],
         }
         
-        serializer = MachineStatsSerializer(data=stats_data)
-        serializer.is_valid()
+        serializer = MachineStatsSerializer(stats_data)
         return Response(serializer.data)
 
 
@@ -132,129 +107,41 @@ class MachineAnalyticsView(APIView):
         """
         Get detailed analytics grouped by type and location
         """
-        user = request.user
-        machines_queryset = Machine.objects.select_related('machine_type').all()
-        
         # Filter by site if user is not admin
-        if hasattr(user, 'user_type') and user.user_type != 'admin':
-            if hasattr(user, 'site_code') and user.site_code:
-                machines_queryset = machines_queryset.filter(site_code=user.site_code)
+        machines_queryset = Machine.objects.for_user(request.user)
         
         # Analytics by machine type
-        machine_types = MachineType.objects.all()
-        type_analytics = []
-        
-        for machine_type in machine_types:
-            type_machines = machines_queryset.filter(machine_type=machine_type)
-            
-            if type_machines.exists():
-                # Count by status
-                operational_count = type_machines.filter(
-                    operational_status__in=['running', 'idle']
-                ).count()
-                maintenance_count = type_machines.filter(
-                    operational_status='maintenance'
-                ).count()
-                offline_count = type_machines.filter(
-                    operational_status='offline'
-                ).count()
-                breakdown_count = type_machines.filter(
-                    operational_status='breakdown'
-                ).count()
-                
-                # Maintenance statistics
-                maintenance_due_count = 0
-                maintenance_overdue_count = 0
-                
-                for machine in type_machines:
-                    if machine.needs_maintenance:
-                        if machine.maintenance_urgency in ['urgent', 'critical']:
-                            maintenance_overdue_count += 1
-                        else:
-                            maintenance_due_count += 1
-                
-                # Performance metrics
-                avg_operating_hours = type_machines.aggregate(
-                    avg=Avg('total_operating_hours')
-                )['avg'] or 0
-                
-                efficiency_sum = 0
-                efficiency_count = 0
-                for machine in type_machines:
-                    efficiency = machine.get_efficiency_rating()
-                    if efficiency:
-                        efficiency_sum += efficiency
-                        efficiency_count += 1
-                
-                avg_efficiency = efficiency_sum / efficiency_count if efficiency_count > 0 else 0
-                
-                type_analytics.append({
-                    'machine_type': machine_type.name,
-                    'total_count': type_machines.count(),
-                    'operational_count': operational_count,
-                    'maintenance_count': maintenance_count,
-                    'offline_count': offline_count,
-                    'breakdown_count': breakdown_count,
-                    'average_operating_hours': round(avg_operating_hours, 2),
-                    'average_efficiency': round(avg_efficiency, 2),
-                    'maintenance_due_count': maintenance_due_count,
-                    'maintenance_overdue_count': maintenance_overdue_count,
-                })
+        type_analytics = [
+            {
+                'machine_type': row['machine_type__name'],
+                'total_count': row['total_count'],
+                'operational_count': row['operational_count'],
+                'maintenance_count': row['maintenance_count'],
+                'offline_count': row['offline_count'],
+                'breakdown_count': row['breakdown_count'],
+                'average_operating_hours': round(row['average_operating_hours'], 2),
+                'average_efficiency': round(row['average_efficiency'], 2),
+                'maintenance_due_count': row['maintenance_due_count'],
+                'maintenance_overdue_count': row['maintenance_overdue_count'],
+            }
+            for row in type_rollups(machines_queryset)
+        ]
         
         # Analytics by location
-        locations = machines_queryset.values('site_code', 'building').distinct()
-        location_analytics = []
-        
-        for location in locations:
-            site_code = location['site_code']
-            building = location['building']
-            
-            location_machines = machines_queryset.filter(
-                site_code=site_code,
-                building=building
-            )
-            
-            if location_machines.exists():
-                # Count by status
-                operational_count = location_machines.filter(
-                    operational_status__in=['running', 'idle']
-                ).count()
-                maintenance_count = location_machines.filter(
-                    operational_status='maintenance'
-                ).count()
-                offline_count = location_machines.filter(
-                    operational_status='offline'
-                ).count()
-                breakdown_count = location_machines.filter(
-                    operational_status='breakdown'
-                ).count()
-                
-                # Performance metrics
-                total_operating_hours = location_machines.aggregate(
-                    total=Sum('total_operating_hours')
-                )['total'] or 0
-                
-                efficiency_sum = 0
-                efficiency_count = 0
-                for machine in location_machines:
-                    efficiency = machine.get_efficiency_rating()
-                    if efficiency:
-                        efficiency_sum += efficiency
-                        efficiency_count += 1
-                
-                avg_efficiency = efficiency_sum / efficiency_count if efficiency_count > 0 else 0
-                
-                location_analytics.append({
-                    'site_code': site_code,
-                    'building': building or 'Unknown',
-                    'total_machines': location_machines.count(),
-                    'operational_machines': operational_count,
-                    'maintenance_machines': maintenance_count,
-                    'offline_machines': offline_count,
-                    'breakdown_machines': breakdown_count,
-                    'average_efficiency': round(avg_efficiency, 2),
-                    'total_operating_hours': total_operating_hours,
-                })
+        location_analytics = [
+            {
+                'site_code': row['site_code'],
+                'building': row['building'] or 'Unknown',
+                'total_machines': row['total_count'],
+                'operational_machines': row['operational_count'],
+                'maintenance_machines': row['maintenance_count'],
+                'offline_machines': row['offline_count'],
+                'breakdown_machines': row['breakdown_count'],
+                'average_efficiency': round(row['average_efficiency'], 2),
+                'total_operating_hours': row['operating_hours'],
+            }
+            for row in location_rollups(machines_queryset)
+        ]
         
         return Response({
             'type_analytics': type_analytics,
@@ -272,107 +159,82 @@ class MaintenanceAnalyticsView(APIView):
         """
         Get maintenance analytics and forecasting
         """
-        user = request.user
-        machines_queryset = Machine.objects.select_related('machine_type').all()
-        
         # Filter by site if user is not admin
-        if hasattr(user, 'user_type') and user.user_type != 'admin':
-            if hasattr(user, 'site_code') and user.site_code:
-                machines_queryset = machines_queryset.filter(site_code=user.site_code)
-        
-        today = date.today()
+        machines_queryset = Machine.objects.for_user(request.user)
+        
+        now = timezone.now()
+        
+        # Maintenance due analysis; days_until_maintenance() <= n days means
+        # the next maintenance date is less than n + 1 days away
+        due_soon = Q(maintenance_urgency_level='due_soon')
+        due_counts = fleet_rollup(
+            machines_queryset,
+            machines_due_today=Count('id', filter=Q(maintenance_urgency_level='urgent')),
+            machines_due_this_week=Count('id', filter=due_soon & Q(
+                next_maintenance_date__lt=now + timedelta(days=8)
+            )),
+            machines_due_this_month=Count('id', filter=due_soon & Q(
+                next_maintenance_date__lt=now + timedelta(days=31)
+            )),
+            machines_overdue=Count('id', filter=Q(maintenance_urgency_level='critical')),
+        )
         
-        # Maintenance due analysis
-        machines_due_today = 0
-        machines_due_this_week = 0
-        machines_due_this_month = 0
-        machines_overdue = 0
-        
-        critical_machines = []
-        upcoming_maintenance = []
-        
-        for machine in machines_queryset:
-            urgency = machine.maintenance_urgency
-            
-            if urgency == 'critical':
-                machines_overdue += 1
-                critical_machines.append({
-                    'machine_id': machine.machine_id,
-                    'name': machine.name,
-                    'type': machine.machine_type.name,
-                    'hours_since_maintenance': machine.hours_since_maintenance,
-                    'urgency': urgency,
-                    'location': f"{machine.site_code} - {machine.building or 'Unknown'}"
-                })
-            elif urgency == 'urgent':
-                machines_due_today += 1
-                upcoming_maintenance.append({
-                    'machine_id': machine.machine_id,
-                    'name': machine.name,
-                    'type': machine.machine_type.name,
-                    'estimated_days': machine.days_until_maintenance(),
-                    'urgency': urgency,
-                    'location': f"{machine.site_code} - {machine.building or 'Unknown'}"
-                })
-            elif urgency == 'due_soon':
-                days_until = machine.days_until_maintenance()
-                if days_until is not None:
-                    if days_until <= 7:
-                        machines_due_this_week += 1
-                    if days_until <= 30:
-                        machines_due_this_month += 1
-                
-                upcoming_maintenance.append({
-                    'machine_id': machine.machine_id,
-                    'name': machine.name,
-                    'type': machine.machine_type.name,
-                    'estimated_days': days_until,
-                    'urgency': urgency,
-                    'location': f"{machine.site_code} - {machine.building or 'Unknown'}"
-                })
+        critical_machines = [
+            machine_entry(
+                row,
+                hours_since_maintenance=row['hours_since_maintenance'],
+                urgency=row['maintenance_urgency_level'],
+            )
+            for row in machine_rows(
+                machines_queryset.filter(maintenance_urgency_level='critical'),
+                'hours_since_maintenance', 'maintenance_urgency_level'
+            )[:10]  # Limit to top 10
+        ]
+        
+        # Soonest first, machines without a scheduled date last
+        upcoming_maintenance = [
+            machine_entry(
+                row,
+                estimated_days=(
+                    (row['next_maintenance_date'] - now).days
+                    if row['next_maintenance_date'] else None
+                ),
+                urgency=row['maintenance_urgency_level'],
+            )
+            for row in machine_rows(
+                machines_queryset.filter(maintenance_urgency_level__in=['urgent', 'due_soon']),
+                'next_maintenance_date', 'maintenance_urgency_level'
+            ).order_by(
+                F('next_maintenance_date').asc(nulls_last=True), 'site_code', 'machine_id'
+            )[:20]  # Limit to top 20
+        ]
         
         # Maintenance by machine type
-        maintenance_by_type = []
-        machine_types = MachineType.objects.all()
-        
-        for machine_type in machine_types:
-            type_machines = machines_queryset.filter(machine_type=machine_type)
-            due_count = 0
-            overdue_count = 0
-            
-            for machine in type_machines:
-                if machine.needs_maintenance:
-                    if machine.maintenance_urgency in ['urgent', 'critical']:
-                        overdue_count += 1
-                    else:
-                        due_count += 1
-            
-            if type_machines.exists():
-                maintenance_by_type.append({
-                    'machine_type': machine_type.name,
-                    'total_machines': type_machines.count(),
-                    'maintenance_due': due_count,
-                    'maintenance_overdue': overdue_count,
-                    'maintenance_rate': round(
-                        ((due_count + overdue_count) / type_machines.count()) * 100, 2
-                    )
-                })
+        maintenance_by_type = [
+            {
+                'machine_type': row['machine_type__name'],
+                'total_machines': row['total_count'],
+                'maintenance_due': row['maintenance_due_count'],
+                'maintenance_overdue': row['maintenance_overdue_count'],
+                'maintenance_rate': round(
+                    ((row['maintenance_due_count'] + row['maintenance_overdue_count'])
+                     / row['total_count']) * 100, 2
+                )
+            }
+            for row in type_rollups(machines_queryset)
+        ]
         
         analytics_data = {
-            'machines_due_today': machines_due_today,
-            'machines_due_this_week': machines_due_this_week,
-            'machines_due_this_month': machines_due_this_month,
-            'machines_overdue': machines_overdue,
-            'critical_machines': critical_machines[:10],  # Limit to top 10
-            'upcoming_maintenance': sorted(
-                upcoming_maintenance,
-                key=lambda x: x['estimated_days'] or 999
-            )[:20],  # Limit to top 20
+            'machines_due_today': due_counts['machines_due_today'],
+            'machines_due_this_week': due_counts['machines_due_this_week'],
+            'machines_due_this_month': due_counts['machines_due_this_month'],
+            'machines_overdue': due_counts['machines_overdue'],
+            'critical_machines': critical_machines,
+            'upcoming_maintenance': upcoming_maintenance,
             'maintenance_by_type': maintenance_by_type,
         }
         
-        serializer = MaintenanceAnalyticsSerializer(data=analytics_data)
-        serializer.is_valid()
+        serializer = MaintenanceAnalyticsSerializer(analytics_data)
         return Response(serializer.data)
 
 
@@ -386,95 +248,53 @@ class EfficiencyAnalyticsView(APIView):
         """
         Get efficiency analytics across machines, types, and locations
         """
-        user = request.user
-        machines_queryset = Machine.objects.select_related('machine_type').all()
-        
         # Filter by site if user is not admin
-        if hasattr(user, 'user_type') and user.user_type != 'admin':
-            if hasattr(user, 'site_code') and user.site_code:
-                machines_queryset = machines_queryset.filter(site_code=user.site_code)
+        machines_queryset = Machine.objects.for_user(request.user)
         
-        # Overall efficiency
-        efficiency_sum = 0
-        efficiency_count = 0
-        
-        for machine in machines_queryset:
-            efficiency = machine.get_efficiency_rating()
-            if efficiency:
-                efficiency_sum += efficiency
-                efficiency_count += 1
+        # Only machines with a positive stored efficiency rating count
+        rated_machines = machines_queryset.filter(RATED_EFFICIENCY)
         
-        overall_efficiency = efficiency_sum / efficiency_count if efficiency_count > 0 else 0
+        # Overall efficiency
+        overall_efficiency = fleet_rollup(machines_queryset)['average_efficiency']
         
         # Efficiency by type
-        efficiency_by_type = []
-        machine_types = MachineType.objects.all()
-        
-        for machine_type in machine_types:
-            type_machines = machines_queryset.filter(machine_type=machine_type)
-            type_efficiency_sum = 0
-            type_efficiency_count = 0
-            
-            for machine in type_machines:
-                efficiency = machine.get_efficiency_rating()
-                if efficiency:
-                    type_efficiency_sum += efficiency
-                    type_efficiency_count += 1
-            
-            if type_efficiency_count > 0:
-                avg_efficiency = type_efficiency_sum / type_efficiency_count
-                efficiency_by_type.append({
-                    'machine_type': machine_type.name,
-                    'average_efficiency': round(avg_efficiency, 2),
-                    'machine_count': type_machines.count(),
-                })
+        efficiency_by_type = [
+            {
+                'machine_type': row['machine_type__name'],
+                'average_efficiency': round(row['average_efficiency'], 2),
+                'machine_count': row['total_count'],
+            }
+            for row in type_rollups(machines_queryset)
+            if row['rated_count']
+        ]
         
         # Efficiency by location
-        efficiency_by_location = []
-        locations = machines_queryset.values('site_code', 'building').distinct()
-        
-        for location in locations:
-            location_machines = machines_queryset.filter(
-                site_code=location['site_code'],
-                building=location['building']
-            )
-            
-            location_efficiency_sum = 0
-            location_efficiency_count = 0
-            
-            for machine in location_machines:
-                efficiency = machine.get_efficiency_rating()
-                if efficiency:
-                    location_efficiency_sum += efficiency
-                    location_efficiency_count += 1
-            
-            if location_efficiency_count > 0:
-                avg_efficiency = location_efficiency_sum / location_efficiency_count
-                efficiency_by_location.append({
-                    'site_code': location['site_code'],
-                    'building': location['building'] or 'Unknown',
-                    'average_efficiency': round(avg_efficiency, 2),
-                    'machine_count': location_machines.count(),
-                })
-        
-        # Top performing machines
-        machine_efficiencies = []
-        for machine in machines_queryset:
-            efficiency = machine.get_efficiency_rating()
-            if efficiency:
-                machine_efficiencies.append({
-                    'machine_id': machine.machine_id,
-                    'name': machine.name,
-                    'type': machine.machine_type.name,
-                    'efficiency': efficiency,
-                    'location': f"{machine.site_code} - {machine.building or 'Unknown'}"
-                })
-        
-        # Sort by efficiency
-        machine_efficiencies.sort(key=lambda x: x['efficiency'], reverse=True)
-        
-        top_performing = machine_efficiencies[:10]
-        underperforming = [m for m in machine_efficiencies if m['efficiency'] < 70][-10:]
+        efficiency_by_location = [
+            {
+                'site_code': row['site_code'],
+                'building': row['building'] or 'Unknown',
+                'average_efficiency': round(row['average_efficiency'], 2),
+                'machine_count': row['total_count'],
+            }
+            for row in location_rollups(machines_queryset)
+            if row['rated_count']
+        ]
+        
+        # Top performing and underperforming machines
+        def efficiency_entry(row):
+            return machine_entry(row, efficiency=row['efficiency_score'])
+        
+        top_performing = [
+            efficiency_entry(row)
+            for row in machine_rows(rated_machines, 'efficiency_score')
+            .order_by('-efficiency_score', 'pk')[:10]
+        ]
+        # The 10 lowest ratings under 70, listed from highest to lowest
+        underperforming = [
+            efficiency_entry(row)
+            for row in machine_rows(rated_machines.filter(efficiency_score__lt=70), 'efficiency_score')
+            .order_by('efficiency_score', '-pk')[:10]
+        ][::-1]
         
         analytics_data = {
             'overall_efficiency': round(overall_efficiency, 2),
@@ -484,8 +304,7 @@ class EfficiencyAnalyticsView(APIView):
             'underperforming_machines': underperforming,
         }
         
-        serializer = EfficiencyAnalyticsSerializer(data=analytics_data)
-        serializer.is_valid()
+        serializer = EfficiencyAnalyticsSerializer(analytics_data)
         return Response(serializer.data)
 
 
@@ -498,102 +317,118 @@ class UtilizationAnalyticsView(APIView):
     def get(self, request):
         """
         Get utilization analytics showing how machines are being used
-        """
-        user = request.user
-        machines_queryset = Machine.objects.select_related('machine_type').all()
         
+        Without parameters utilization covers each machine's lifetime (since
+        its installation date). With ?start=YYYY-MM-DD&end=YYYY-MM-DD it
+        covers that window, from the daily operating hours rollups.
+        """
         # Filter by site if user is not admin
-        if hasattr(user, 'user_type') and user.user_type != 'admin':
-            if hasattr(user, 'site_code') and user.site_code:
-                machines_queryset = machines_queryset.filter(site_code=user.site_code)
+        machines_queryset = Machine.objects.for_user(request.user)
+        
+        start_param = request.query_params.get('start')
+        end_param = request.query_params.get('end')
+        window = None
+        if start_param or end_param:
+            try:
+                window = (parse_date(start_param or ''), parse_date(end_param or ''))
+            except ValueError:
+                window = (None, None)
+            if None in window or window[0] > window[1]:
+                return Response(
+                    {'error': 'start and end must be dates (YYYY-MM-DD) with start <= end'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
         
-        # Calculate utilization based on installation date and operating hours
-        # Assuming 8 hours per day, 6 days per week operation
-        hours_per_week = 48
-        weeks_per_year = 50  # Account for maintenance and holidays
-        
-        total_available_hours = 0
-        total_operating_hours = machines_queryset.aggregate(
-            total=Sum('total_operating_hours')
-        )['total'] or 0
-        
-        # Calculate total available hours based on installation dates
         today = date.today()
-        for machine in machines_queryset:
-            if machine.installation_date:
-                weeks_since_installation = (today - machine.installation_date).days / 7
-                available_hours = weeks_since_installation * hours_per_week
-                total_available_hours += available_hours
+        if window:
+            # Hours run in the window, per machine from the daily rollups
+            operating = window_operating_hours(*window)
+            total_operating = Sum(operating)
+            total_available = Sum(window_available_hours(*window))
+            utilized_machines = machine_rows(
+                machines_queryset,
+                machine_operating_hours=operating,
+                machine_available_hours=window_available_hours(*window),
+                machine_utilization_rate=window_utilization_rate(*window),
+            ).filter(machine_operating_hours__gt=0, machine_utilization_rate__isnull=False)
+        else:
+            # Utilization based on installation date and operating hours,
+            # computed per machine in the database
+            total_operating = Sum('total_operating_hours')
+            total_available = Sum(available_hours(today))
+            utilized_machines = machine_rows(
+                machines_queryset.filter(installation_date__lt=today, total_operating_hours__gt=0),
+                machine_operating_hours=F('total_operating_hours'),
+                machine_available_hours=available_hours(today),
+                machine_utilization_rate=utilization_rate(today),
+            )
+        
+        usage = {'usage_hours': total_operating, 'available_hours': total_available}
+        fleet = fleet_rollup(machines_queryset, **usage)
+        total_operating_hours = fleet['usage_hours'] or 0
+        total_available_hours = fleet['available_hours'] or 0
+        
+        def group_utilization(row):
+            group_operating_hours = row['usage_hours'] or 0
+            group_available_hours = row['available_hours'] or 0
+            group_utilization_rate = 0
+            if group_available_hours > 0:
+                group_utilization_rate = (group_operating_hours / group_available_hours) * 100
+            return {
+                'total_machines': row['total_count'],
+                'operating_hours': group_operating_hours,
+                'available_hours': round(group_available_hours, 2),
+                'utilization_rate': round(group_utilization_rate, 2),
+            }
         
         overall_utilization_rate = 0
         if total_available_hours > 0:
             overall_utilization_rate = (total_operating_hours / total_available_hours) * 100
         
-        # Utilization by type
-        utilization_by_type = []
-        machine_types = MachineType.objects.all()
-        
-        for machine_type in machine_types:
-            type_machines = machines_queryset.filter(machine_type=machine_type)
-            type_operating_hours = type_machines.aggregate(
-                total=Sum('total_operating_hours')
-            )['total'] or 0
-            
-            type_available_hours = 0
-            for machine in type_machines:
-                if machine.installation_date:
-                    weeks_since_installation = (today - machine.installation_date).days / 7
-                    available_hours = weeks_since_installation * hours_per_week
-                    type_available_hours += available_hours
-            
-            type_utilization = 0
-            if type_available_hours > 0:
-                type_utilization = (type_operating_hours / type_available_hours) * 100
-            
-            if type_machines.exists():
-                utilization_by_type.append({
-                    'machine_type': machine_type.name,
-                    'total_machines': type_machines.count(),
-                    'operating_hours': type_operating_hours,
-                    'available_hours': round(type_available_hours, 2),
-                    'utilization_rate': round(type_utilization, 2),
-                })
-        
-        # Most and least utilized machines
-        machine_utilizations = []
-        for machine in machines_queryset:
-            if machine.installation_date and machine.total_operating_hours > 0:
-                weeks_since_installation = (today - machine.installation_date).days / 7
-                available_hours = weeks_since_installation * hours_per_week
-                
-                if available_hours > 0:
-                    utilization_rate = (machine.total_operating_hours / available_hours) * 100
-                    machine_utilizations.append({
-                        'machine_id': machine.machine_id,
-                        'name': machine.name,
-                        'type': machine.machine_type.name,
-                        'operating_hours': machine.total_operating_hours,
-                        'available_hours': round(available_hours, 2),
-                        'utilization_rate': round(utilization_rate, 2),
-                        'location': f"{machine.site_code} - {machine.building or 'Unknown'}"
-                    })
-        
-        # Sort by utilization rate
-        machine_utilizations.sort(key=lambda x: x['utilization_rate'], reverse=True)
-        
-        most_utilized = machine_utilizations[:10]
-        least_utilized = machine_utilizations[-10:]
+        # Utilization by type and by location
+        utilization_by_type = [
+            {'machine_type': row['machine_type__name'], **group_utilization(row)}
+            for row in type_rollups(machines_queryset, **usage)
+        ]
+        utilization_by_location = [
+            {
+                'site_code': row['site_code'],
+                'building': row['building'] or 'Unknown',
+                **group_utilization(row),
+            }
+            for row in location_rollups(machines_queryset, **usage)
+        ]
+        
+        # Most and least utilized machines, selected with ORDER BY ... LIMIT
+        def utilization_entry(row):
+            return machine_entry(
+                row,
+                operating_hours=row['machine_operating_hours'],
+                available_hours=round(row['machine_available_hours'], 2),
+                utilization_rate=round(row['machine_utilization_rate'], 2),
+            )
+        
+        most_utilized = [
+            utilization_entry(row)
+            for row in utilized_machines.order_by('-machine_utilization_rate', 'pk')[:10]
+        ]
+        # The 10 lowest rates, listed from highest to lowest
+        least_utilized = [
+            utilization_entry(row)
+            for row in utilized_machines.order_by('machine_utilization_rate', '-pk')[:10]
+        ][::-1]
         
         analytics_data = {
             'total_available_hours': round(total_available_hours, 2),
             'total_operating_hours': total_operating_hours,
             'overall_utilization_rate': round(overall_utilization_rate, 2),
             'utilization_by_type': utilization_by_type,
-            'utilization_by_location': [],  # Could be implemented similar to type
+            'utilization_by_location': utilization_by_location,
             'most_utilized_machines': most_utilized,
             'least_utilized_machines': least_utilized,
         }
+        if window:
+            analytics_data['period_start'], analytics_data['period_end'] = window
         
-        serializer = UtilizationAnalyticsSerializer(data=analytics_data)
-        serializer.is_valid()
+        serializer = UtilizationAnalyticsSerializer(analytics_data)
         return Response(serializer.data)
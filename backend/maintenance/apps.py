@@ -4,3 +4,16 @@ from django.apps import AppConfig
 class MaintenanceConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'maintenance'
+
+    def ready(self):
+        """
+        App initialization
+        """
+        # Register support models and signal handlers
+        from maintenance.models import interval_stats, machine_patterns  # noqa: F401
+        from core.tracking import track_changes
+        from maintenance.models import MaintenanceLog
+        # Status changes are read by the notification signals, the pattern
+        # fields by the maintenance pattern signals
+        track_changes(MaintenanceLog, 'status', 'machine', 'resolved_at', 'downtime_hours')
+        import maintenance.signals  # noqa: F401
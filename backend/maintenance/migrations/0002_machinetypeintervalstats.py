@@ -0,0 +1,36 @@
+"""
+Migration for MachineTypeIntervalStats model
+"""
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('machines', '0001_initial'),
+        ('maintenance', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MachineTypeIntervalStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sample_count', models.PositiveIntegerField(default=0, help_text='Number of maintenance intervals the statistics are based on')),
+                ('mean_days', models.FloatField(blank=True, null=True)),
+                ('median_days', models.FloatField(blank=True, null=True)),
+                ('std_days', models.FloatField(blank=True, null=True)),
+                ('p25_days', models.FloatField(blank=True, null=True)),
+                ('p75_days', models.FloatField(blank=True, null=True)),
+                ('p90_days', models.FloatField(blank=True, null=True)),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+                ('machine_type', models.OneToOneField(help_text='Machine type these statistics describe', on_delete=django.db.models.deletion.CASCADE, related_name='interval_stats', to='machines.machinetype')),
+            ],
+            options={
+                'verbose_name': 'Machine Type Interval Statistics',
+                'verbose_name_plural': 'Machine Type Interval Statistics',
+                'db_table': 'maintenance_type_interval_stats',
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+"""
+Migration for MachineMaintenancePattern model
+"""
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('machines', '0001_initial'),
+        ('maintenance', '0002_machinetypeintervalstats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MachineMaintenancePattern',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('completed_count', models.PositiveIntegerField(default=0)),
+                ('downtime_total', models.FloatField(default=0)),
+                ('downtime_count', models.PositiveIntegerField(default=0)),
+                ('first_resolved_at', models.DateTimeField(blank=True, null=True)),
+                ('last_resolved_at', models.DateTimeField(blank=True, null=True)),
+                ('avg_downtime', models.FloatField(blank=True, null=True)),
+                ('maintenance_frequency', models.FloatField(blank=True, help_text='Completed maintenances per month', null=True)),
+                ('reliability_score', models.FloatField(default=50)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('machine', models.OneToOneField(help_text='Machine this pattern summarizes', on_delete=django.db.models.deletion.CASCADE, related_name='maintenance_pattern', to='machines.machine')),
+            ],
+            options={
+                'verbose_name': 'Machine Maintenance Pattern',
+                'verbose_name_plural': 'Machine Maintenance Patterns',
+                'db_table': 'maintenance_machine_pattern',
+            },
+        ),
+    ]
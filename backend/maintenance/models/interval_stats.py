@@ -0,0 +1,46 @@
+"""
+Cached maintenance interval statistics per machine type
+TexPro AI - Predictive maintenance support tables
+"""
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+
+
+class MachineTypeIntervalStats(models.Model):
+    """
+    Distribution of the gaps (in days) between consecutive completed
+    maintenances of machines of one type. Refreshed whenever a maintenance
+    log of the type is completed, see maintenance.signals.
+    """
+    machine_type = models.OneToOneField(
+        'machines.MachineType',
+        on_delete=models.CASCADE,
+        related_name='interval_stats',
+        help_text=_('Machine type these statistics describe')
+    )
+    sample_count = models.PositiveIntegerField(
+        default=0,
+        help_text=_('Number of maintenance intervals the statistics are based on')
+    )
+    mean_days = models.FloatField(null=True, blank=True)
+    median_days = models.FloatField(null=True, blank=True)
+    std_days = models.FloatField(null=True, blank=True)
+    p25_days = models.FloatField(null=True, blank=True)
+    p75_days = models.FloatField(null=True, blank=True)
+    p90_days = models.FloatField(null=True, blank=True)
+    computed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'maintenance_type_interval_stats'
+        verbose_name = _('Machine Type Interval Statistics')
+        verbose_name_plural = _('Machine Type Interval Statistics')
+
+    def __str__(self):
+        return f"Interval stats for type {self.machine_type_id} ({self.sample_count} intervals)"
+
+    @property
+    def average_interval_days(self):
+        """Whole-day average interval, as used by the predictive service"""
+        if self.mean_days is None:
+            return None
+        return int(self.mean_days)
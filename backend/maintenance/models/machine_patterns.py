@@ -0,0 +1,68 @@
+"""
+Cached maintenance patterns per machine
+TexPro AI - Predictive maintenance support tables
+"""
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+
+
+class MachineMaintenancePattern(models.Model):
+    """
+    Running summary of a machine's completed maintenance history.
+    Kept up to date incrementally by the MaintenanceLog signal handlers
+    (see maintenance.signals), so predictions read one row instead of
+    re-aggregating the history.
+    """
+    machine = models.OneToOneField(
+        'machines.Machine',
+        on_delete=models.CASCADE,
+        related_name='maintenance_pattern',
+        help_text=_('Machine this pattern summarizes')
+    )
+
+    # Running totals used for incremental updates
+    completed_count = models.PositiveIntegerField(default=0)
+    downtime_total = models.FloatField(default=0)
+    downtime_count = models.PositiveIntegerField(default=0)
+    first_resolved_at = models.DateTimeField(null=True, blank=True)
+    last_resolved_at = models.DateTimeField(null=True, blank=True)
+
+    # Derived pattern values
+    avg_downtime = models.FloatField(null=True, blank=True)
+    maintenance_frequency = models.FloatField(null=True, blank=True, help_text=_('Completed maintenances per month'))
+    reliability_score = models.FloatField(default=50)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'maintenance_machine_pattern'
+        verbose_name = _('Machine Maintenance Pattern')
+        verbose_name_plural = _('Machine Maintenance Patterns')
+
+    def __str__(self):
+        return f"Maintenance pattern for machine {self.machine_id} ({self.completed_count} completed)"
+
+    @property
+    def has_history(self):
+        return self.completed_count > 0
+
+    def as_patterns(self):
+        """
+        Pattern dictionary in the format returned by
+        PredictiveMaintenanceService._analyze_machine_patterns
+        """
+        if not self.has_history:
+            return {
+                'has_history': False,
+                'avg_downtime': None,
+                'maintenance_frequency': None,
+                'reliability_score': 50  # Default neutral score
+            }
+
+        return {
+            'has_history': True,
+            'avg_downtime': self.avg_downtime,
+            'maintenance_frequency': self.maintenance_frequency,
+            'reliability_score': self.reliability_score,
+            'total_maintenance_count': self.completed_count
+        }
@@ -4,5 +4,23 @@ Exports all maintenance-related services
 """
 
 from .predictive_maintenance import PredictiveMaintenanceService
+from .interval_analysis import (
+    interval_statistics,
+    compute_type_interval_statistics,
+    refresh_type_interval_stats,
+    get_type_interval_stats,
+)
+from .pattern_cache import (
+    rebuild_machine_patterns,
+    get_machine_patterns,
+)
 
-__all__ = ['PredictiveMaintenanceService']
+__all__ = [
+    'PredictiveMaintenanceService',
+    'interval_statistics',
+    'compute_type_interval_statistics',
+    'refresh_type_interval_stats',
+    'get_type_interval_stats',
+    'rebuild_machine_patterns',
+    'get_machine_patterns',
+]
@@ -0,0 +1,137 @@
+"""
+Maintenance interval analysis for TexPro AI
+Vectorized (NumPy) statistics of the gaps between consecutive maintenances
+"""
+import threading
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+from django.db import transaction
+
+from maintenance.models import MaintenanceLog
+
+
+PERCENTILES = (25, 75, 90)
+
+_pending_refresh = threading.local()
+
+
+def interval_statistics(history: Iterable[Tuple]) -> Optional[Dict[str, float]]:
+    """
+    Statistics of the gaps in days between consecutive completed
+    maintenances of the same machine
+
+    Args:
+        history: (machine_id, resolved_at) tuples ordered by machine and
+            resolved_at
+
+    Returns:
+        dict with sample_count, mean_days, median_days, std_days and
+        p25/p75/p90_days, or None when there is no valid interval
+    """
+    rows = [(machine_id, resolved_at.date().toordinal()) for machine_id, resolved_at in history]
+    if len(rows) < 2:
+        return None
+
+    machine_ids = np.array([row[0] for row in rows])
+    days = np.array([row[1] for row in rows], dtype=np.int64)
+
+    gaps = np.diff(days)
+    # Only gaps between two logs of the same machine count, and only forward ones
+    gaps = gaps[(machine_ids[1:] == machine_ids[:-1]) & (gaps > 0)]
+    if gaps.size == 0:
+        return None
+
+    stats = {
+        'sample_count': int(gaps.size),
+        'mean_days': float(gaps.mean()),
+        'median_days': float(np.median(gaps)),
+        'std_days': float(gaps.std()),
+    }
+    for percentile, value in zip(PERCENTILES, np.percentile(gaps, PERCENTILES)):
+        stats[f'p{percentile}_days'] = float(value)
+    return stats
+
+
+def compute_type_interval_statistics(machine_type_ids=None) -> Dict[int, Optional[Dict[str, float]]]:
+    """
+    Interval statistics for every machine type (or the given ones) from a
+    single values_list query over completed maintenance logs
+    """
+    logs = MaintenanceLog.objects.filter(status='completed', resolved_at__isnull=False)
+    if machine_type_ids is not None:
+        logs = logs.filter(machine__machine_type_id__in=machine_type_ids)
+
+    history_by_type = {type_id: [] for type_id in (machine_type_ids or [])}
+    for type_id, machine_id, resolved_at in logs.order_by(
+        'machine__machine_type_id', 'machine_id', 'resolved_at'
+    ).values_list('machine__machine_type_id', 'machine_id', 'resolved_at'):
+        history_by_type.setdefault(type_id, []).append((machine_id, resolved_at))
+
+    return {
+        type_id: interval_statistics(history)
+        for type_id, history in history_by_type.items()
+    }
+
+
+def refresh_type_interval_stats(machine_type_ids=None) -> Dict[int, object]:
+    """
+    Recompute and store the cached statistics table rows for the given
+    machine types (all types with history by default)
+    """
+    from maintenance.models.interval_stats import MachineTypeIntervalStats
+
+    empty = {'sample_count': 0, 'mean_days': None, 'median_days': None, 'std_days': None}
+    empty.update({f'p{percentile}_days': None for percentile in PERCENTILES})
+
+    refreshed = {}
+    for type_id, stats in compute_type_interval_statistics(machine_type_ids).items():
+        refreshed[type_id], _ = MachineTypeIntervalStats.objects.update_or_create(
+            machine_type_id=type_id,
+            defaults=stats or empty
+        )
+    return refreshed
+
+
+def get_type_interval_stats(machine_type_ids) -> Dict[int, object]:
+    """
+    Cached statistics rows for the given machine types, computing the rows
+    that do not exist yet
+    """
+    from maintenance.models.interval_stats import MachineTypeIntervalStats
+
+    machine_type_ids = set(machine_type_ids)
+    if not machine_type_ids:
+        return {}
+
+    stats = {
+        row.machine_type_id: row
+        for row in MachineTypeIntervalStats.objects.filter(machine_type_id__in=machine_type_ids)
+    }
+    missing = machine_type_ids - set(stats)
+    if missing:
+        stats.update(refresh_type_interval_stats(missing))
+    return stats
+
+
+def schedule_type_interval_refresh(machine_type_id):
+    """
+    Refresh a type's statistics once the current transaction commits.
+    Several completions of the same type in one transaction trigger a
+    single refresh.
+    """
+    pending = getattr(_pending_refresh, 'type_ids', None)
+    if pending is None:
+        pending = _pending_refresh.type_ids = set()
+
+    pending.add(machine_type_id)
+    # The first callback to run flushes everything, later ones are no-ops
+    transaction.on_commit(_flush_pending_refresh)
+
+
+def _flush_pending_refresh():
+    """Refresh every machine type scheduled in the committed transaction"""
+    type_ids = getattr(_pending_refresh, 'type_ids', set())
+    _pending_refresh.type_ids = set()
+    if type_ids:
+        refresh_type_interval_stats(type_ids)
@@ -0,0 +1,196 @@
+"""
+Per-machine maintenance pattern cache for TexPro AI
+Incrementally maintained summary of each machine's completed maintenance
+"""
+from collections import defaultdict
+from typing import Dict, Iterable, Optional, Tuple
+
+from django.db import transaction
+
+from maintenance.models import MaintenanceLog
+
+
+def derive_pattern_values(completed_count: int, downtime_total: float, downtime_count: int,
+                          first_resolved_at, last_resolved_at) -> Tuple:
+    """
+    (avg_downtime, maintenance_frequency, reliability_score) from the
+    running totals of a machine's completed maintenance
+    """
+    if not completed_count:
+        return None, None, 50
+
+    avg_downtime = (downtime_total / downtime_count) if downtime_count else 0
+
+    # Maintenance frequency (logs per month)
+    frequency = 0
+    if completed_count > 1 and first_resolved_at and last_resolved_at:
+        days_span = (last_resolved_at - first_resolved_at).days
+        if days_span > 0:
+            frequency = (completed_count / days_span) * 30
+
+    # Reliability score (inverse of maintenance frequency)
+    reliability_score = max(10, 100 - (frequency * 10))
+
+    return avg_downtime, frequency, reliability_score
+
+
+def _refresh_derived(pattern):
+    """Recompute the derived values of a pattern row from its totals"""
+    pattern.avg_downtime, pattern.maintenance_frequency, pattern.reliability_score = derive_pattern_values(
+        pattern.completed_count,
+        pattern.downtime_total,
+        pattern.downtime_count,
+        pattern.first_resolved_at,
+        pattern.last_resolved_at
+    )
+
+
+def _summarize_history(pattern, history: Iterable[Tuple]):
+    """Fill a pattern row from (resolved_at, downtime_hours) tuples"""
+    history = list(history)
+    downtimes = [float(downtime) for _, downtime in history if downtime is not None]
+    resolved_dates = [resolved_at for resolved_at, _ in history if resolved_at is not None]
+
+    pattern.completed_count = len(history)
+    pattern.downtime_total = sum(downtimes)
+    pattern.downtime_count = len(downtimes)
+    pattern.first_resolved_at = min(resolved_dates) if resolved_dates else None
+    pattern.last_resolved_at = max(resolved_dates) if resolved_dates else None
+    _refresh_derived(pattern)
+    return pattern
+
+
+def rebuild_machine_patterns(machine_ids) -> Dict[int, object]:
+    """
+    Rebuild the pattern rows of the given machines from their full
+    completed maintenance history (one history query)
+    """
+    from maintenance.models.machine_patterns import MachineMaintenancePattern
+
+    machine_ids = set(machine_ids)
+    if not machine_ids:
+        return {}
+
+    history = defaultdict(list)
+    for machine_id, resolved_at, downtime in MaintenanceLog.objects.filter(
+        machine_id__in=machine_ids,
+        status='completed'
+    ).values_list('machine_id', 'resolved_at', 'downtime_hours'):
+        history[machine_id].append((resolved_at, downtime))
+
+    existing = {
+        pattern.machine_id: pattern
+        for pattern in MachineMaintenancePattern.objects.filter(machine_id__in=machine_ids)
+    }
+
+    patterns = {}
+    for machine_id in machine_ids:
+        pattern = existing.get(machine_id) or MachineMaintenancePattern(machine_id=machine_id)
+        patterns[machine_id] = _summarize_history(pattern, history.get(machine_id, []))
+
+    fields = [
+        'completed_count', 'downtime_total', 'downtime_count', 'first_resolved_at',
+        'last_resolved_at', 'avg_downtime', 'maintenance_frequency', 'reliability_score'
+    ]
+    MachineMaintenancePattern.objects.bulk_update(
+        [patterns[machine_id] for machine_id in existing], fields
+    )
+    MachineMaintenancePattern.objects.bulk_create(
+        [pattern for machine_id, pattern in patterns.items() if machine_id not in existing],
+        ignore_conflicts=True
+    )
+    return patterns
+
+
+def get_machine_patterns(machine_ids) -> Dict[int, object]:
+    """
+    Pattern rows for the given machines, keyed by machine id.
+    A single row read when the cache is warm; rows that do not exist yet
+    are built from history.
+    """
+    from maintenance.models.machine_patterns import MachineMaintenancePattern
+
+    machine_ids = set(machine_ids)
+    if not machine_ids:
+        return {}
+
+    patterns = {
+        pattern.machine_id: pattern
+        for pattern in MachineMaintenancePattern.objects.filter(machine_id__in=machine_ids)
+    }
+    missing = machine_ids - set(patterns)
+    if missing:
+        patterns.update(rebuild_machine_patterns(missing))
+    return patterns
+
+
+def log_contribution(machine_id, status, resolved_at, downtime_hours) -> Optional[Tuple]:
+    """
+    What a maintenance log contributes to its machine's pattern:
+    (machine_id, resolved_at, downtime_hours) when completed, else None
+    """
+    if status != 'completed':
+        return None
+    return (
+        machine_id,
+        resolved_at,
+        float(downtime_hours) if downtime_hours is not None else None
+    )
+
+
+def apply_log_change(previous: Optional[Tuple], current: Optional[Tuple]):
+    """
+    Incrementally move a log's contribution from `previous` to `current`
+    (either may be None), as returned by log_contribution()
+    """
+    if previous == current:
+        return
+
+    if previous and current and previous[0] == current[0]:
+        _update_pattern(previous[0], remove=previous, add=current)
+        return
+
+    if previous:
+        _update_pattern(previous[0], remove=previous)
+    if current:
+        _update_pattern(current[0], add=current)
+
+
+def _update_pattern(machine_id, remove=None, add=None):
+    """Apply one removal and/or addition to a machine's pattern row"""
+    from maintenance.models.machine_patterns import MachineMaintenancePattern
+
+    with transaction.atomic():
+        pattern = MachineMaintenancePattern.objects.select_for_update().filter(
+            machine_id=machine_id
+        ).first()
+        if pattern is None:
+            # No cached summary yet: the history already reflects the change
+            rebuild_machine_patterns([machine_id])
+            return
+
+        if remove:
+            _, resolved_at, downtime = remove
+            if resolved_at is not None and resolved_at in (pattern.first_resolved_at, pattern.last_resolved_at):
+                # The history bounds cannot be recovered incrementally
+                rebuild_machine_patterns([machine_id])
+                return
+            pattern.completed_count = max(0, pattern.completed_count - 1)
+            if downtime is not None:
+                pattern.downtime_total -= downtime
+                pattern.downtime_count = max(0, pattern.downtime_count - 1)
+
+        if add:
+            _, resolved_at, downtime = add
+            pattern.completed_count += 1
+            if downtime is not None:
+                pattern.downtime_total += downtime
+                pattern.downtime_count += 1
+            if resolved_at is not None:
+                if pattern.first_resolved_at is None or resolved_at < pattern.first_resolved_at:
+                    pattern.first_resolved_at = resolved_at
+                if pattern.last_resolved_at is None or resolved_at > pattern.last_resolved_at:
+                    pattern.last_resolved_at = resolved_at
+
+        _refresh_derived(pattern)
+        pattern.save()
@@ -3,12 +3,13 @@ Predictive Maintenance Service for TexPro AI
 MVP implementation with rule-based predictions, designed for future AI integration
 """
 from datetime import date, timedelta
-from django.db.models import Avg, Count
+from django.db.models import QuerySet
 from django.utils import timezone
 from typing import Optional, Dict, Any
 
 from machines.models import Machine
-from maintenance.models import MaintenanceLog
+from maintenance.services.interval_analysis import get_type_interval_stats
+from maintenance.services.pattern_cache import get_machine_patterns
 
 
 class PredictiveMaintenanceService:
@@ -39,117 +40,70 @@ class PredictiveMaintenanceService:
         Returns:
             date: Predicted next maintenance due date
         """
-        prediction_data = cls._analyze_machine_patterns(machine)
-        
+        return cls._recommendations_for(machine)['next_due_date']
+    
+    @classmethod
+    def _recommendations_for(cls, machine: Machine) -> Dict[str, Any]:
+        """
+        Recommendations for a single machine, computed by the bulk engine
+        from its cached maintenance pattern
+        """
+        return cls.bulk_maintenance_recommendations([machine])[machine.pk]
+    
+    @classmethod
+    def _compute_next_due(cls, machine: Machine, patterns: Dict[str, Any],
+                          type_interval: Optional[int], reference_date: date) -> date:
+        """
+        Apply the prediction strategies to already loaded data
+        """
         # Strategy 1: Use machine type recommended interval
         if machine.machine_type.recommended_maintenance_interval_days:
             base_interval = machine.machine_type.recommended_maintenance_interval_days
         else:
             # Strategy 2: Use historical average for this machine type
-            avg_interval = cls._get_average_interval_for_type(machine.machine_type)
-            base_interval = avg_interval or cls.DEFAULT_MAINTENANCE_INTERVAL_DAYS
+            base_interval = type_interval or cls.DEFAULT_MAINTENANCE_INTERVAL_DAYS
         
         # Strategy 3: Adjust based on machine's historical performance
-        adjusted_interval = cls._adjust_for_machine_history(machine, base_interval)
+        adjusted_interval = cls._adjust_interval_for_patterns(patterns, base_interval)
         
         # Strategy 4: Factor in current operating hours
         final_interval = cls._adjust_for_operating_hours(machine, adjusted_interval)
         
         # Calculate next due date
-        reference_date = cls._get_reference_date(machine)
-        next_due = reference_date + timedelta(days=final_interval)
-        
-        return next_due
+        return reference_date + timedelta(days=final_interval)
     
     @classmethod
     def _analyze_machine_patterns(cls, machine: Machine) -> Dict[str, Any]:
         """
         Analyze historical patterns for the machine
         This method is designed to be AI-ready for future ML integration
+        (served from the cached per-machine maintenance pattern)
         """
-        maintenance_logs = MaintenanceLog.objects.filter(
-            machine=machine,
-            status='completed'
-        ).order_by('-resolved_at')
-        
-        if not maintenance_logs.exists():
-            return {
-                'has_history': False,
-                'avg_downtime': None,
-                'maintenance_frequency': None,
-                'reliability_score': 50  # Default neutral score
-            }
-        
-        # Calculate average downtime
-        avg_downtime = maintenance_logs.aggregate(
-            avg=Avg('downtime_hours')
-        )['avg'] or 0
-        
-        # Calculate maintenance frequency (logs per month)
-        if maintenance_logs.count() > 1:
-            first_log = maintenance_logs.last()
-            last_log = maintenance_logs.first()
-            days_span = (last_log.resolved_at - first_log.resolved_at).days
-            
-            if days_span > 0:
-                frequency = (maintenance_logs.count() / days_span) * 30  # logs per month
-            else:
-                frequency = 0
-        else:
-            frequency = 0
-        
-        # Calculate reliability score (inverse of maintenance frequency)
-        reliability_score = max(10, 100 - (frequency * 10))
-        
-        return {
-            'has_history': True,
-            'avg_downtime': avg_downtime,
-            'maintenance_frequency': frequency,
-            'reliability_score': reliability_score,
-            'total_maintenance_count': maintenance_logs.count()
-        }
+        return get_machine_patterns([machine.pk])[machine.pk].as_patterns()
     
     @classmethod
     def _get_average_interval_for_type(cls, machine_type) -> Optional[int]:
         """
         Get average maintenance interval for machines of this type
+        (served from the cached per-type interval statistics)
         """
-        # Get all completed maintenance for this machine type
-        completed_maintenance = MaintenanceLog.objects.filter(
-            machine__machine_type=machine_type,
-            status='completed'
-        ).order_by('machine', 'resolved_at')
-        
-        intervals = []
-        current_machine = None
-        last_date = None
-        
-        for log in completed_maintenance:
-            if current_machine != log.machine.id:
-                # New machine, reset tracking
-                current_machine = log.machine.id
-                last_date = log.resolved_at.date()
-                continue
-            
-            if last_date:
-                interval = (log.resolved_at.date() - last_date).days
-                if interval > 0:  # Valid interval
-                    intervals.append(interval)
-            
-            last_date = log.resolved_at.date()
-        
-        if intervals:
-            return sum(intervals) // len(intervals)  # Average interval
-        
-        return None
+        stats = get_type_interval_stats([machine_type.id]).get(machine_type.id)
+        return stats.average_interval_days if stats else None
     
     @classmethod
     def _adjust_for_machine_history(cls, machine: Machine, base_interval: int) -> int:
         """
         Adjust interval based on machine's specific history
         """
-        patterns = cls._analyze_machine_patterns(machine)
-        
+        return cls._adjust_interval_for_patterns(
+            cls._analyze_machine_patterns(machine), base_interval
+        )
+    
+    @classmethod
+    def _adjust_interval_for_patterns(cls, patterns: Dict[str, Any], base_interval: int) -> int:
+        """
+        Adjust interval based on already analyzed machine patterns
+        """
         if not patterns['has_history']:
             return base_interval
         
@@ -208,13 +162,17 @@ class PredictiveMaintenanceService:
         Get reference date for calculating next maintenance
         """
         # Priority 1: Last completed maintenance
-        last_maintenance = MaintenanceLog.objects.filter(
-            machine=machine,
-            status='completed'
-        ).order_by('-resolved_at').first()
+        pattern = get_machine_patterns([machine.pk])[machine.pk]
         
-        if last_maintenance:
-            return last_maintenance.resolved_at.date()
+        return cls._reference_date_from(machine, pattern.last_resolved_at)
+    
+    @classmethod
+    def _reference_date_from(cls, machine: Machine, last_resolved_at) -> date:
+        """
+        Reference date given the machine's last completed maintenance time
+        """
+        if last_resolved_at:
+            return last_resolved_at.date()
         
         # Priority 2: Last maintenance date from machine
         if machine.last_maintenance_date:
@@ -232,7 +190,13 @@ class PredictiveMaintenanceService:
         """
         Determine maintenance urgency level
         """
-        next_due = cls.predict_next_due(machine)
+        return cls._recommendations_for(machine)['urgency']
+    
+    @classmethod
+    def _urgency_for_due_date(cls, machine: Machine, next_due: date) -> str:
+        """
+        Combine the predicted due date with the operating hours urgency
+        """
         today = date.today()
         days_until_due = (next_due - today).days
         
@@ -297,10 +261,14 @@ class PredictiveMaintenanceService:
         """
         Get comprehensive maintenance recommendations for a machine as dictionary
         """
-        patterns = cls._analyze_machine_patterns(machine)
-        next_due = cls.predict_next_due(machine)
-        urgency = cls.get_maintenance_urgency(machine)
-        
+        return cls._recommendations_for(machine)
+    
+    @classmethod
+    def _build_recommendations(cls, machine: Machine, patterns: Dict[str, Any],
+                               next_due: date, urgency: str) -> Dict[str, Any]:
+        """
+        Assemble the recommendation payload from computed predictions
+        """
         recommendations = {
             'machine_id': machine.machine_id,
             'machine_name': machine.name,
@@ -339,14 +307,58 @@ class PredictiveMaintenanceService:
         
         return recommendations
     
+    @classmethod
+    def bulk_maintenance_recommendations(cls, machines) -> Dict[Any, Dict[str, Any]]:
+        """
+        Recommendations for many machines at once, keyed by machine pk
+        
+        Loads the machines (with their types), the cached per-type interval
+        statistics and the machines' cached maintenance patterns in one query
+        each; no maintenance history is scanned. Each value has the same
+        structure as get_maintenance_recommendations_dict().
+        """
+        if isinstance(machines, QuerySet):
+            machines = machines.select_related('machine_type')
+        machines = list(machines)
+        if not machines:
+            return {}
+        
+        # Types without a recommended interval fall back to the cached
+        # fleet average interval of that type
+        averaged_type_ids = {
+            machine.machine_type_id for machine in machines
+            if not machine.machine_type.recommended_maintenance_interval_days
+        }
+        type_intervals = {
+            type_id: stats.average_interval_days
+            for type_id, stats in get_type_interval_stats(averaged_type_ids).items()
+        }
+        
+        machine_patterns = get_machine_patterns([machine.pk for machine in machines])
+        
+        results = {}
+        for machine in machines:
+            pattern = machine_patterns[machine.pk]
+            patterns = pattern.as_patterns()
+            reference_date = cls._reference_date_from(machine, pattern.last_resolved_at)
+            next_due = cls._compute_next_due(
+                machine, patterns, type_intervals.get(machine.machine_type_id), reference_date
+            )
+            urgency = cls._urgency_for_due_date(machine, next_due)
+            results[machine.pk] = cls._build_recommendations(machine, patterns, next_due, urgency)
+        
+        return results
+    
     @classmethod
     def bulk_predict_maintenance(cls, machines_queryset) -> Dict[str, Any]:
         """
         Predict maintenance for multiple machines
         Optimized for bulk operations
         """
+        recommendations = cls.bulk_maintenance_recommendations(machines_queryset)
+        
         results = {
-            'total_machines': machines_queryset.count(),
+            'total_machines': len(recommendations),
             'critical': [],
             'urgent': [],
             'warning': [],
@@ -359,13 +371,12 @@ class PredictiveMaintenanceService:
             }
         }
         
-        for machine in machines_queryset:
-            recommendation = cls.get_maintenance_recommendations_dict(machine)
+        for recommendation in recommendations.values():
             urgency = recommendation['urgency']
             
             results[urgency].append({
-                'machine_id': machine.machine_id,
-                'machine_name': machine.name,
+                'machine_id': recommendation['machine_id'],
+                'machine_name': recommendation['machine_name'],
                 'next_due_date': recommendation['next_due_date'],
                 'days_until_due': recommendation['days_until_due']
             })
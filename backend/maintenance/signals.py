@@ -0,0 +1,82 @@
+"""
+Maintenance signals for TexPro AI
+Keep derived maintenance statistics in sync with the maintenance logs
+"""
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from machines.models import Machine
+from maintenance.models import MaintenanceLog
+from maintenance.services.interval_analysis import schedule_type_interval_refresh
+from maintenance.services.pattern_cache import apply_log_change, log_contribution, rebuild_machine_patterns
+
+# Fields a log's pattern contribution is made of, tracked since load (see maintenance.apps)
+PATTERN_FIELDS = ('machine', 'status', 'resolved_at', 'downtime_hours')
+
+
+def _schedule_interval_refresh(machine_ids):
+    """Refresh the interval statistics of the types of the given machines"""
+    type_ids = Machine.objects.filter(pk__in=machine_ids).values_list('machine_type_id', flat=True).distinct()
+    for machine_type_id in type_ids:
+        schedule_type_interval_refresh(machine_type_id)
+
+
+@receiver(post_save, sender=MaintenanceLog)
+def refresh_interval_stats_on_save(sender, instance, created, **kwargs):
+    """
+    Refresh the machine type interval statistics when a saved log is
+    completed, or was completed before the save (reopened or moved to
+    another machine), from the tracked loaded values of the log
+    """
+    machine_ids = set()
+    if instance.status == 'completed' and instance.resolved_at is not None:
+        machine_ids.add(instance.machine_id)
+    if not created:
+        if not instance.has_previous('status') or instance.previous('status') == 'completed':
+            # Unknown previous machine: the log stayed on its current one
+            previous_machine = instance.previous('machine') if instance.has_previous('machine') else instance.machine_id
+            machine_ids.update({previous_machine, instance.machine_id})
+
+    if machine_ids:
+        _schedule_interval_refresh(machine_ids)
+
+
+@receiver(post_delete, sender=MaintenanceLog)
+def refresh_interval_stats_on_delete(sender, instance, **kwargs):
+    """Refresh the machine type interval statistics when a completed log is removed"""
+    if instance.status == 'completed' and instance.resolved_at is not None:
+        _schedule_interval_refresh({instance.machine_id})
+
+
+@receiver(post_save, sender=MaintenanceLog)
+def update_machine_pattern_on_save(sender, instance, created, **kwargs):
+    """
+    Apply a saved log's change to its machine's maintenance pattern, from
+    the tracked loaded values of the log (no read of the stored row)
+    """
+    if not created and not all(instance.has_previous(field) for field in PATTERN_FIELDS):
+        # The log was loaded without its previous values: rebuild instead
+        rebuild_machine_patterns({instance.previous('machine'), instance.machine_id} - {None})
+        return
+
+    current = log_contribution(instance.machine_id, instance.status, instance.resolved_at, instance.downtime_hours)
+    if created:
+        apply_log_change(None, current)
+        return
+
+    apply_log_change(
+        log_contribution(
+            instance.previous('machine'), instance.previous('status'),
+            instance.previous('resolved_at'), instance.previous('downtime_hours')
+        ),
+        current
+    )
+
+
+@receiver(post_delete, sender=MaintenanceLog)
+def update_machine_pattern_on_delete(sender, instance, **kwargs):
+    """Remove a deleted log's contribution from its machine's maintenance pattern"""
+    apply_log_change(
+        log_contribution(instance.machine_id, instance.status, instance.resolved_at, instance.downtime_hours),
+        None
+    )
@@ -6,13 +6,15 @@ import uuid
 from datetime import date, timedelta
 from decimal import Decimal
 
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 from django.core.exceptions import ValidationError
 from django.urls import reverse
 from rest_framework import status
-from rest_framework.test import APITestCase, APIRequestFactory
+from rest_framework.test import APITestCase, APIRequestFactory, APIClient
 
 from machines.models import Machine, MachineType
 from maintenance.models import MaintenanceLog
@@ -21,7 +23,15 @@ from maintenance.serializers import (
     MaintenanceLogCreateSerializer,
     MaintenanceLogUpdateSerializer
 )
-from maintenance.services import PredictiveMaintenanceService
+from maintenance.services import (
+    PredictiveMaintenanceService,
+    interval_statistics,
+    refresh_type_interval_stats,
+    rebuild_machine_patterns,
+    get_machine_patterns,
+)
+from maintenance.models.interval_stats import MachineTypeIntervalStats
+from maintenance.models.machine_patterns import MachineMaintenancePattern
 from maintenance.permissions import MaintenancePermission
 
 User = get_user_model()
@@ -375,6 +385,278 @@ class PredictiveMaintenanceServiceTest(MaintenanceTestMixin, TestCase):
         
         self.assertIsInstance(recommendations, list)
         self.assertGreater(len(recommendations), 0)
+    
+    def create_fleet_history(self):
+        """Helper method to create completed maintenance history for both machines"""
+        now = timezone.now()
+        for days_ago in [90, 60, 35, 5]:
+            self.create_completed_maintenance_log(
+                machine=self.machine_1,
+                resolved_at=now - timedelta(days=days_ago),
+                downtime_hours=days_ago / 10
+            )
+        for days_ago in [40, 20]:
+            self.create_completed_maintenance_log(
+                machine=self.machine_2,
+                resolved_at=now - timedelta(days=days_ago)
+            )
+    
+    def test_bulk_recommendations_match_single_machine(self):
+        """Test bulk engine returns the same result as the per-machine methods"""
+        self.create_fleet_history()
+        
+        bulk = PredictiveMaintenanceService.bulk_maintenance_recommendations(
+            Machine.objects.filter(id__in=[self.machine_1.id, self.machine_2.id])
+        )
+        
+        for machine in [self.machine_1, self.machine_2]:
+            expected = PredictiveMaintenanceService.get_maintenance_recommendations_dict(machine)
+            self.assertEqual(bulk[machine.pk], expected)
+    
+    def test_bulk_recommendations_constant_queries(self):
+        """Test bulk engine uses one query each for machines, type stats and patterns"""
+        self.create_fleet_history()
+        refresh_type_interval_stats()
+        
+        with self.assertNumQueries(3):
+            results = PredictiveMaintenanceService.bulk_maintenance_recommendations(
+                Machine.objects.all()
+            )
+        
+        self.assertEqual(len(results), 2)
+    
+    def test_bulk_predict_maintenance_summary(self):
+        """Test bulk prediction groups machines by urgency"""
+        self.create_fleet_history()
+        
+        results = PredictiveMaintenanceService.bulk_predict_maintenance(Machine.objects.all())
+        
+        self.assertEqual(results['total_machines'], 2)
+        self.assertEqual(sum(results['summary'].values()), 2)
+
+
+class IntervalAnalysisTest(MaintenanceTestMixin, TestCase):
+    """Test cases for per-machine-type interval statistics"""
+    
+    def test_interval_statistics_per_machine_gaps(self):
+        """Test gaps are only taken between logs of the same machine"""
+        base = timezone.now() - timedelta(days=100)
+        history = [
+            (1, base),
+            (1, base + timedelta(days=10)),
+            (1, base + timedelta(days=30)),
+            (2, base + timedelta(days=5)),
+            (2, base + timedelta(days=45)),
+        ]
+        
+        stats = interval_statistics(history)
+        
+        # Gaps: 10, 20 (machine 1) and 40 (machine 2)
+        self.assertEqual(stats['sample_count'], 3)
+        self.assertAlmostEqual(stats['mean_days'], 70 / 3)
+        self.assertEqual(stats['median_days'], 20)
+        self.assertEqual(stats['p90_days'], 36)
+    
+    def test_interval_statistics_without_intervals(self):
+        """Test a single log per machine yields no statistics"""
+        now = timezone.now()
+        self.assertIsNone(interval_statistics([(1, now), (2, now)]))
+    
+    def test_average_interval_for_type_matches_history(self):
+        """Test the predictive service reads the cached type average"""
+        now = timezone.now()
+        for days_ago in [65, 40, 5]:
+            self.create_completed_maintenance_log(resolved_at=now - timedelta(days=days_ago))
+        
+        interval = PredictiveMaintenanceService._get_average_interval_for_type(self.machine_type)
+        
+        # Gaps of 25 and 35 days
+        self.assertEqual(interval, 30)
+        self.assertTrue(MachineTypeIntervalStats.objects.filter(machine_type=self.machine_type).exists())
+    
+    def test_stats_refreshed_when_log_completes(self):
+        """Test completing a log refreshes the type statistics on commit"""
+        now = timezone.now()
+        self.create_completed_maintenance_log(resolved_at=now - timedelta(days=20))
+        log = self.create_maintenance_log()
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            log.status = 'completed'
+            log.resolved_at = now
+            log.save()
+        
+        stats = MachineTypeIntervalStats.objects.get(machine_type=self.machine_type)
+        self.assertEqual(stats.sample_count, 1)
+        self.assertEqual(stats.median_days, 20)
+
+
+    def test_stats_refreshed_when_log_reopened_or_moved(self):
+        """Test reopening a completed log or moving it to another machine type refreshes the statistics"""
+        now = timezone.now()
+        with self.captureOnCommitCallbacks(execute=True):
+            logs = [
+                self.create_completed_maintenance_log(resolved_at=now - timedelta(days=days_ago))
+                for days_ago in [50, 30, 10]
+            ]
+        self.assertEqual(MachineTypeIntervalStats.objects.get(machine_type=self.machine_type).sample_count, 2)
+        
+        logs[1] = MaintenanceLog.objects.get(pk=logs[1].pk)
+        logs[1].status = 'in_progress'
+        with self.captureOnCommitCallbacks(execute=True):
+            logs[1].save()
+        stats = MachineTypeIntervalStats.objects.get(machine_type=self.machine_type)
+        self.assertEqual(stats.sample_count, 1)
+        self.assertEqual(stats.median_days, 40)
+        
+        other_type = MachineType.objects.create(name="Spinning Frame")
+        spinner = Machine.objects.create(machine_id="SPN-001", name="Spinner-001", machine_type=other_type)
+        logs[2] = MaintenanceLog.objects.get(pk=logs[2].pk)
+        logs[2].machine = spinner
+        with self.captureOnCommitCallbacks(execute=True):
+            logs[2].save()
+        self.assertEqual(MachineTypeIntervalStats.objects.get(machine_type=self.machine_type).sample_count, 0)
+        self.assertTrue(MachineTypeIntervalStats.objects.filter(machine_type=other_type).exists())
+
+
+class MachinePatternCacheTest(MaintenanceTestMixin, TestCase):
+    """Test cases for the incremental per-machine pattern cache"""
+    
+    def assertPatternMatchesHistory(self, machine):
+        """Assert the incrementally kept pattern equals a rebuild from history"""
+        cached = MachineMaintenancePattern.objects.get(machine=machine).as_patterns()
+        rebuilt = rebuild_machine_patterns([machine.pk])[machine.pk].as_patterns()
+        self.assertEqual(cached.keys(), rebuilt.keys())
+        for key, value in rebuilt.items():
+            self.assertAlmostEqual(cached[key], value)
+    
+    def test_completed_logs_update_pattern_incrementally(self):
+        """Test each completed log is added to the cached pattern"""
+        now = timezone.now()
+        for days_ago, downtime in [(60, Decimal('2.0')), (30, Decimal('4.0')), (10, None)]:
+            self.create_completed_maintenance_log(
+                resolved_at=now - timedelta(days=days_ago),
+                downtime_hours=downtime
+            )
+        
+        pattern = MachineMaintenancePattern.objects.get(machine=self.machine_1)
+        self.assertEqual(pattern.completed_count, 3)
+        self.assertEqual(pattern.avg_downtime, 3.0)
+        self.assertEqual(pattern.last_resolved_at, now - timedelta(days=10))
+        self.assertPatternMatchesHistory(self.machine_1)
+    
+    def test_pending_log_not_counted_until_completed(self):
+        """Test a pending log only contributes once it is completed"""
+        now = timezone.now()
+        self.create_completed_maintenance_log(resolved_at=now - timedelta(days=20))
+        log = self.create_maintenance_log()
+        
+        self.assertEqual(
+            MachineMaintenancePattern.objects.get(machine=self.machine_1).completed_count, 1
+        )
+        
+        log.status = 'completed'
+        log.resolved_at = now
+        log.downtime_hours = Decimal('6.0')
+        log.save()
+        
+        pattern = MachineMaintenancePattern.objects.get(machine=self.machine_1)
+        self.assertEqual(pattern.completed_count, 2)
+        self.assertEqual(pattern.avg_downtime, 4.25)
+        self.assertPatternMatchesHistory(self.machine_1)
+    
+    def test_edit_and_delete_keep_pattern_in_sync(self):
+        """Test editing and deleting completed logs adjusts the cached pattern"""
+        now = timezone.now()
+        logs = [
+            self.create_completed_maintenance_log(resolved_at=now - timedelta(days=days_ago))
+            for days_ago in [50, 25, 5]
+        ]
+        
+        # Interior log: handled incrementally
+        logs[1].downtime_hours = Decimal('8.5')
+        logs[1].save()
+        self.assertPatternMatchesHistory(self.machine_1)
+        
+        # Boundary log: the history span has to be recomputed
+        logs[2].delete()
+        self.assertPatternMatchesHistory(self.machine_1)
+        
+        # Moved to another machine
+        logs[0].machine = self.machine_2
+        logs[0].save()
+        self.assertPatternMatchesHistory(self.machine_1)
+        self.assertPatternMatchesHistory(self.machine_2)
+        self.assertEqual(
+            MachineMaintenancePattern.objects.get(machine=self.machine_1).completed_count, 1
+        )
+    
+    def test_edit_reads_previous_values_without_select(self):
+        """Test an edit takes the previous contribution from the loaded values, not a SELECT of the log"""
+        log = self.create_completed_maintenance_log(resolved_at=timezone.now() - timedelta(days=5))
+        log = MaintenanceLog.objects.get(pk=log.pk)
+        
+        log.downtime_hours = Decimal('9.0')
+        with CaptureQueriesContext(connection) as queries:
+            log.save()
+        
+        # The only read of the logs is the history rebuild of this boundary log
+        self.assertFalse(any(
+            query['sql'].startswith('SELECT') and '"maintenance_log"."id" =' in query['sql']
+            for query in queries.captured_queries
+        ))
+        self.assertPatternMatchesHistory(self.machine_1)
+    
+    def test_edit_of_deferred_log_rebuilds_pattern(self):
+        """Test a log loaded without its pattern fields still keeps the pattern in sync"""
+        log = self.create_completed_maintenance_log(resolved_at=timezone.now() - timedelta(days=5))
+        log = MaintenanceLog.objects.only('id', 'machine').get(pk=log.pk)
+        
+        log.status = 'pending'
+        log.save()
+        
+        self.assertEqual(
+            MachineMaintenancePattern.objects.get(machine=self.machine_1).completed_count, 0
+        )
+    
+    def test_missing_pattern_rows_are_built(self):
+        """Test machines without a cached row get one built from history"""
+        self.create_completed_maintenance_log(resolved_at=timezone.now() - timedelta(days=3))
+        MachineMaintenancePattern.objects.all().delete()
+        
+        patterns = get_machine_patterns([self.machine_1.pk, self.machine_2.pk])
+        
+        self.assertEqual(patterns[self.machine_1.pk].completed_count, 1)
+        self.assertFalse(patterns[self.machine_2.pk].has_history)
+        self.assertEqual(MachineMaintenancePattern.objects.count(), 2)
+    
+    def test_single_machine_prediction_reads_cached_pattern(self):
+        """Test per-machine recommendations do not scan the maintenance history"""
+        self.create_completed_maintenance_log(resolved_at=timezone.now() - timedelta(days=3))
+        get_machine_patterns([self.machine_1.pk])
+        refresh_type_interval_stats()
+        machine = Machine.objects.select_related('machine_type').get(pk=self.machine_1.pk)
+        
+        # Type statistics and pattern rows only
+        with self.assertNumQueries(2):
+            recommendations = PredictiveMaintenanceService.get_maintenance_recommendations_dict(machine)
+        
+        self.assertTrue(recommendations['patterns']['has_history'])
+    
+    def test_bulk_status_update_resyncs_patterns(self):
+        """Test the bulk status endpoint rebuilds the affected patterns"""
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin_user)
+        log = self.create_maintenance_log(resolved_at=timezone.now())
+        
+        response = self.client.post(reverse('v1:maintenance:bulk-status-update'), {
+            'maintenance_ids': [str(log.id)],
+            'status': 'completed'
+        }, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            MachineMaintenancePattern.objects.get(machine=self.machine_1).completed_count, 1
+        )
 
 
 # PERMISSION TESTS
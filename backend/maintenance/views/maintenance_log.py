@@ -11,6 +11,7 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from maintenance.models import MaintenanceLog
+from analytics.signals import invalidate_analytics
 from maintenance.serializers import (
     MaintenanceLogSerializer,
     MaintenanceLogDetailSerializer,
@@ -20,7 +21,11 @@ from maintenance.serializers import (
     MaintenanceStatsSerializer,
     PredictiveMaintenanceSerializer
 )
-from maintenance.services import PredictiveMaintenanceService
+from maintenance.services import (
+    PredictiveMaintenanceService,
+    rebuild_machine_patterns,
+    refresh_type_interval_stats
+)
 from maintenance.permissions import (
     MaintenancePermission,
     CanViewMaintenanceStats,
@@ -320,15 +325,22 @@ class BulkMaintenanceStatusUpdateView(APIView):
             new_status = serializer.validated_data['status']
             notes = serializer.validated_data.get('notes', '')
             
+            logs = MaintenanceLog.objects.filter(id__in=maintenance_ids)
+            affected = list(logs.values_list('machine_id', 'machine__machine_type_id').distinct())
+            
             # Update maintenance logs
-            updated_count = MaintenanceLog.objects.filter(
-                id__in=maintenance_ids
-            ).update(
+            updated_count = logs.update(
                 status=new_status,
                 notes=notes if notes else models.F('notes'),
                 updated_at=timezone.now()
             )
             
+            # Queryset updates bypass the signals, resync the derived statistics
+            if updated_count:
+                rebuild_machine_patterns({machine_id for machine_id, _ in affected})
+                refresh_type_interval_stats({type_id for _, type_id in affected})
+                invalidate_analytics('maintenance')
+            
             return Response({
                 'success': True,
                 'updated_count': updated_count,
@@ -348,60 +360,35 @@ class PredictiveMaintenanceView(APIView):
         """Get predictive maintenance data for all machines or specific machine"""
         if machine_id:
             # Get prediction for specific machine
-            try:
-                machine = Machine.objects.get(id=machine_id)
-            except Machine.DoesNotExist:
-                return Response({'error': 'Machine not found'}, status=status.HTTP_404_NOT_FOUND)
-            
-            next_due_date = PredictiveMaintenanceService.predict_next_due(machine)
-            urgency = PredictiveMaintenanceService.calculate_urgency(machine)
-            patterns = PredictiveMaintenanceService.analyze_failure_patterns(machine)
-            recommendations = PredictiveMaintenanceService.get_maintenance_recommendations(machine)
-            
-            days_until_due = None
-            if next_due_date:
-                days_until_due = (next_due_date - timezone.now().date()).days
-            
-            prediction_data = {
-                'machine_id': str(machine.id),
-                'machine_name': machine.name,
-                'next_due_date': next_due_date,
-                'urgency': urgency,
-                'days_until_due': days_until_due,
-                'patterns': patterns,
-                'recommendations': recommendations
-            }
-            
-            return Response(prediction_data)
+            machines = Machine.objects.filter(id=machine_id)
+        else:
+            # Get predictions for all operational machines
+            machines = Machine.objects.filter(operational_status__in=['running', 'idle'])
         
-        # Get predictions for all operational machines
-        machines = Machine.objects.filter(operational_status__in=['running', 'idle'])
-        predictions = []
+        # One query each for the machines, type statistics and maintenance patterns
+        recommendations = PredictiveMaintenanceService.bulk_maintenance_recommendations(machines)
         
-        for machine in machines:
-            next_due_date = PredictiveMaintenanceService.predict_next_due(machine)
-            urgency = PredictiveMaintenanceService.calculate_urgency(machine)
-            patterns = PredictiveMaintenanceService.analyze_failure_patterns(machine)
-            recommendations = PredictiveMaintenanceService.get_maintenance_recommendations(machine)
-            
-            days_until_due = None
-            if next_due_date:
-                days_until_due = (next_due_date - timezone.now().date()).days
-            
-            prediction_data = {
-                'machine_id': str(machine.id),
-                'machine_name': machine.name,
-                'next_due_date': next_due_date,
-                'urgency': urgency,
-                'days_until_due': days_until_due,
-                'patterns': patterns,
-                'recommendations': recommendations
+        if machine_id and not recommendations:
+            return Response({'error': 'Machine not found'}, status=status.HTTP_404_NOT_FOUND)
+        
+        predictions = [
+            {
+                'machine_id': str(pk),
+                'machine_name': recommendation['machine_name'],
+                'next_due_date': recommendation['next_due_date'],
+                'urgency': recommendation['urgency'],
+                'days_until_due': recommendation['days_until_due'],
+                'patterns': recommendation['patterns'],
+                'recommendations': recommendation['recommendations']
             }
-            
-            predictions.append(prediction_data)
+            for pk, recommendation in recommendations.items()
+        ]
+        
+        if machine_id:
+            return Response(predictions[0])
         
         # Sort by urgency and days until due
-        urgency_order = {'critical': 0, 'high': 1, 'medium': 2, 'low': 3}
+        urgency_order = {'critical': 0, 'urgent': 1, 'warning': 2, 'normal': 3}
         predictions.sort(
             key=lambda x: (
                 urgency_order.get(x['urgency'], 4),
@@ -11,6 +11,10 @@ class NotificationsConfig(AppConfig):
         """
         Import signals when the app is ready
         """
+        # Email outbox drained by the background dispatcher, digest windows,
+        # scheduled job leases (core.scheduler)
+        from notifications.models import email_outbox, notification_digest, scheduled_job_run  # noqa: F401
+        
         try:
             import notifications.signals
         except ImportError:
@@ -0,0 +1,88 @@
+"""
+Deferred notification dispatch for TexPro AI
+Collects the notification events raised by signal handlers during a
+transaction and creates their notifications once it commits
+
+Events are buffered per transaction (and savepoint) and keyed by object
+and event type, so saving the same object several times in one
+transaction notifies once (with its latest state). The flush resolves
+recipients once per event kind and type and bulk inserts every
+notification, instead of a round of queries per save.
+
+The buffer of each atomic block is kept per thread and registers one
+on_commit flush when it is created, so nothing is sent for a transaction
+or savepoint that rolls back. The thread only holds a weak reference:
+once Django runs or discards the flush, the buffer is gone and the next
+event of that block starts a new one.
+"""
+import logging
+import threading
+import weakref
+
+from django.db import transaction
+
+from .services import NotificationService
+
+logger = logging.getLogger('texproai.notifications')
+
+
+class NotificationBuffer:
+    """Notification events of one transaction, coalesced by object and event type"""
+
+    def __init__(self):
+        self.events = {}
+        self.flushed = False
+
+    def add(self, kind, instance, event_type, user=None):
+        key = (kind, instance._meta.label, instance.pk, event_type)
+        # A repeated event keeps the latest instance and user
+        self.events.pop(key, None)
+        self.events[key] = (kind, instance, event_type, user)
+
+    def flush(self):
+        self.flushed = True
+        events = list(self.events.values())
+        self.events.clear()
+        if events:
+            NotificationService.create_event_notifications(events)
+            logger.debug(f"Flushed {len(events)} notification events")
+
+
+_local = threading.local()
+
+
+def _buffers():
+    """Buffers of the current thread, by database alias and atomic block"""
+    buffers = getattr(_local, 'buffers', None)
+    if buffers is None:
+        buffers = _local.buffers = weakref.WeakValueDictionary()
+    return buffers
+
+
+def enqueue_notification(kind, instance, event_type, user=None, using=None):
+    """
+    Create an event's notifications once the current transaction commits
+
+    Outside a transaction (autocommit) they are created right away.
+
+    Args:
+        kind: workflow, machine, maintenance, quality or allocation
+        instance: Object the event is about
+        event_type: Type of event
+        user: User who triggered the event
+        using: Database alias of the save, the default one if None
+    """
+    connection = transaction.get_connection(using)
+    if not connection.in_atomic_block:
+        NotificationService.create_event_notifications([(kind, instance, event_type, user)])
+        return
+
+    # The savepoints open around the save identify its atomic block, as
+    # they identify the block of an on_commit callback
+    key = (connection.alias, tuple(connection.savepoint_ids))
+    buffers = _buffers()
+    buffer = buffers.get(key)
+    if buffer is None or buffer.flushed:
+        buffer = buffers[key] = NotificationBuffer()
+        transaction.on_commit(buffer.flush, using=using, robust=True)
+    buffer.add(kind, instance, event_type, user)
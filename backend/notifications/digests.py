@@ -0,0 +1,162 @@
+"""
+Notification digests for TexPro AI
+Groups the notifications of users with a daily or weekly digest_frequency
+into one email per user and window
+
+A run reads the digest users, their last windows and the notifications of
+every due window in one query each (the notifications over the
+(recipient, created_at) index), then queues the digest emails in the
+outbox and records the windows in bulk. Email volume therefore follows
+the number of users, not the number of notifications.
+"""
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.html import strip_tags
+
+from notifications.models import Notification, NotificationPreference
+from notifications.models.email_outbox import EmailOutbox
+from notifications.models.notification_digest import NotificationDigest
+
+logger = logging.getLogger('texproai.notifications')
+
+DIGEST_PERIODS = {
+    'daily': timedelta(days=1),
+    'weekly': timedelta(days=7),
+}
+
+# Latest notifications listed under each type in a digest email
+DIGEST_ITEMS_PER_TYPE = 5
+
+TYPE_LABELS = dict(Notification._meta.get_field('type').choices)
+
+
+def due_digest_users(now):
+    """
+    Preferences of the users whose digest window has ended, with the
+    start of that window (the end of their last digest, or one period ago)
+    """
+    preferences = list(
+        NotificationPreference.objects.filter(
+            digest_frequency__in=list(DIGEST_PERIODS),
+            user__is_active=True
+        ).select_related('user')
+    )
+    last_ends = dict(
+        NotificationDigest.objects.filter(user_id__in=[preference.user_id for preference in preferences])
+        .values('user_id')
+        .annotate(last_end=Max('period_end'))
+        .values_list('user_id', 'last_end')
+    )
+
+    due = []
+    for preference in preferences:
+        period = DIGEST_PERIODS[preference.digest_frequency]
+        last_end = last_ends.get(preference.user_id)
+        if last_end is None:
+            due.append((preference, now - period))
+        elif now - last_end >= period:
+            due.append((preference, last_end))
+    return due
+
+
+def collect_notifications(due, now):
+    """Notifications of each due user's window, grouped by user and type"""
+    starts = {preference.user_id: start for preference, start in due}
+    grouped = defaultdict(lambda: defaultdict(list))
+    if not starts:
+        return grouped
+
+    rows = Notification.objects.filter(
+        recipient_id__in=list(starts),
+        created_at__gt=min(starts.values()),
+        created_at__lte=now
+    ).order_by('recipient_id', 'created_at').values_list('recipient_id', 'type', 'title', 'priority', 'created_at')
+
+    for recipient_id, notification_type, title, priority, created_at in rows.iterator():
+        if created_at > starts[recipient_id]:
+            grouped[recipient_id][notification_type].append(
+                {'title': title, 'priority': priority, 'created_at': created_at}
+            )
+    return grouped
+
+
+def build_digest_email(preference, start, now, by_type):
+    """Unsaved outbox email summarizing a user's notifications by type"""
+    user = preference.user
+    sections = [
+        {
+            'type': TYPE_LABELS.get(notification_type, notification_type.title()),
+            'count': len(items),
+            'latest': items[-DIGEST_ITEMS_PER_TYPE:][::-1],
+            'more': max(len(items) - DIGEST_ITEMS_PER_TYPE, 0),
+        }
+        for notification_type, items in sorted(by_type.items(), key=lambda item: -len(item[1]))
+    ]
+    total = sum(section['count'] for section in sections)
+    context = {
+        'user': user,
+        'frequency': preference.get_digest_frequency_display().lower(),
+        'period_start': start,
+        'period_end': now,
+        'sections': sections,
+        'total': total,
+        'site_name': 'TexPro AI',
+        'site_url': getattr(settings, 'SITE_URL', 'http://localhost:3000'),
+    }
+    html_message = render_to_string('notifications/notification_digest_email.html', context)
+    return EmailOutbox(
+        to_email=user.email,
+        subject=f"[TexPro AI] Your {context['frequency']} digest: {total} notifications",
+        body=strip_tags(html_message),
+        html_body=html_message
+    )
+
+
+def send_notification_digests(now=None):
+    """
+    Queue one digest email per user whose digest window has ended
+
+    Only notification types the user receives by email are included.
+    Every due window is recorded, also without notifications, so windows
+    keep their daily or weekly cadence.
+
+    Returns:
+        dict with due users, emails queued and notifications summarized
+    """
+    now = now or timezone.now()
+    due = due_digest_users(now)
+    grouped = collect_notifications(due, now)
+
+    emails, digests = [], []
+    summarized = 0
+    for preference, start in due:
+        by_type = {
+            notification_type: items
+            for notification_type, items in grouped.get(preference.user_id, {}).items()
+            if preference.should_send_email(notification_type)
+        }
+        count = sum(len(items) for items in by_type.values())
+        if count and preference.user.email:
+            emails.append(build_digest_email(preference, start, now, by_type))
+            summarized += count
+        digests.append(NotificationDigest(
+            user_id=preference.user_id,
+            frequency=preference.digest_frequency,
+            period_start=start,
+            period_end=now,
+            notification_count=count
+        ))
+
+    with transaction.atomic():
+        EmailOutbox.objects.bulk_create(emails, batch_size=500)
+        NotificationDigest.objects.bulk_create(digests, batch_size=500)
+
+    logger.info(f"Queued {len(emails)} notification digests for {len(due)} users")
+    return {'users': len(due), 'emails': len(emails), 'notifications': summarized}
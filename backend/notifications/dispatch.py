@@ -0,0 +1,148 @@
+"""
+Background email dispatcher for TexPro AI
+Drains the notification email outbox outside the request path
+
+Each batch is claimed with a conditional UPDATE tagging the rows with a
+token and a lease, so concurrent dispatchers never send the same email,
+and rows left behind by a crashed dispatcher become due again when their
+lease expires. A batch is sent over a single backend connection; failed
+emails are retried with exponential backoff until MAX_ATTEMPTS.
+"""
+import logging
+import uuid
+from datetime import timedelta
+
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.conf import settings
+from django.utils import timezone
+
+from notifications.models.email_outbox import EmailOutbox
+
+logger = logging.getLogger('texproai.notifications')
+
+# Emails claimed and sent per batch
+OUTBOX_BATCH_SIZE = 100
+
+# Delivery attempts before an email is marked failed
+MAX_ATTEMPTS = 5
+
+# Delay before the first retry, doubled after each failed attempt
+RETRY_BACKOFF = timedelta(minutes=1)
+MAX_RETRY_BACKOFF = timedelta(hours=1)
+
+# How long a claimed batch is reserved for its dispatcher
+SEND_LEASE = timedelta(minutes=10)
+
+DUE_STATUSES = (EmailOutbox.Status.PENDING, EmailOutbox.Status.SENDING)
+
+
+def retry_delay(attempts):
+    """Backoff before the next attempt of an email that failed `attempts` times"""
+    return min(RETRY_BACKOFF * 2 ** (attempts - 1), MAX_RETRY_BACKOFF)
+
+
+def claim_batch(now, batch_size=OUTBOX_BATCH_SIZE):
+    """
+    Reserve up to batch_size due emails for this dispatcher
+
+    Pending emails and sending emails whose lease expired are due once
+    next_attempt_at has passed (notif_outbox_due_idx).
+    """
+    due_ids = list(
+        EmailOutbox.objects.filter(status__in=DUE_STATUSES, next_attempt_at__lte=now)
+        .order_by('next_attempt_at')
+        .values_list('pk', flat=True)[:batch_size]
+    )
+    if not due_ids:
+        return []
+
+    token = uuid.uuid4().hex
+    EmailOutbox.objects.filter(
+        pk__in=due_ids, status__in=DUE_STATUSES, next_attempt_at__lte=now
+    ).update(status=EmailOutbox.Status.SENDING, claim_token=token, next_attempt_at=now + SEND_LEASE)
+    return list(EmailOutbox.objects.filter(claim_token=token))
+
+
+def build_message(email, connection):
+    """Email message of an outbox row"""
+    message = EmailMultiAlternatives(
+        subject=email.subject,
+        body=email.body,
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[email.to_email],
+        connection=connection
+    )
+    if email.html_body:
+        message.attach_alternative(email.html_body, 'text/html')
+    return message
+
+
+def send_batch(emails, now):
+    """
+    Send claimed emails over one connection and record each outcome
+
+    Returns:
+        (sent, failed) counts
+    """
+    connection = get_connection(fail_silently=False)
+    sent, failed = [], []
+    try:
+        connection.open()
+        for email in emails:
+            try:
+                if connection.send_messages([build_message(email, connection)]):
+                    sent.append(email)
+                else:
+                    failed.append((email, 'Email backend did not send the message'))
+            except Exception as e:
+                failed.append((email, str(e)))
+    except Exception as e:
+        # The connection could not be opened: the whole batch is retried
+        logger.error(f"Email dispatcher could not connect: {str(e)}")
+        failed.extend((email, str(e)) for email in emails if email not in sent)
+    finally:
+        connection.close()
+
+    for email in sent:
+        email.status = EmailOutbox.Status.SENT
+        email.sent_at = now
+        email.attempts += 1
+        email.claim_token = ''
+        email.last_error = ''
+
+    for email, error in failed:
+        email.attempts += 1
+        email.claim_token = ''
+        email.last_error = error
+        if email.attempts >= MAX_ATTEMPTS:
+            email.status = EmailOutbox.Status.FAILED
+            logger.error(f"Giving up on email {email.pk} to {email.to_email}: {error}")
+        else:
+            email.status = EmailOutbox.Status.PENDING
+            email.next_attempt_at = now + retry_delay(email.attempts)
+
+    EmailOutbox.objects.bulk_update(
+        emails,
+        ['status', 'sent_at', 'attempts', 'claim_token', 'last_error', 'next_attempt_at']
+    )
+    return len(sent), len(failed)
+
+
+def dispatch_outbox(batch_size=OUTBOX_BATCH_SIZE, max_batches=None, now=None):
+    """
+    Send due outbox emails batch by batch until none is due
+
+    Returns:
+        dict with batches, sent and failed counts
+    """
+    outcome = {'batches': 0, 'sent': 0, 'failed': 0}
+    while max_batches is None or outcome['batches'] < max_batches:
+        batch_now = now or timezone.now()
+        emails = claim_batch(batch_now, batch_size)
+        if not emails:
+            break
+        sent, failed = send_batch(emails, batch_now)
+        outcome['batches'] += 1
+        outcome['sent'] += sent
+        outcome['failed'] += failed
+    return outcome
@@ -0,0 +1,33 @@
+"""
+Management command to deliver queued notification emails
+Drains the email outbox over a single connection to the email backend
+"""
+
+from django.core.management.base import BaseCommand
+
+from notifications.dispatch import OUTBOX_BATCH_SIZE, dispatch_outbox
+
+
+class Command(BaseCommand):
+    help = 'Send the notification emails waiting in the outbox'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=OUTBOX_BATCH_SIZE,
+            help='Emails sent per batch',
+        )
+        parser.add_argument(
+            '--max-batches',
+            type=int,
+            default=None,
+            help='Stop after this many batches (default: until the outbox is drained)',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write('📧 Dispatching outbox emails...')
+        outcome = dispatch_outbox(batch_size=options['batch_size'], max_batches=options['max_batches'])
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {outcome['sent']} sent, {outcome['failed']} failed in {outcome['batches']} batches"
+        ))
@@ -0,0 +1,74 @@
+"""
+Management command to run the periodic jobs (delayed batches, maintenance
+and batch delay notifications) outside the request path
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+import core.jobs  # noqa: F401  (registers the jobs)
+from core.scheduler import scheduler
+
+
+class Command(BaseCommand):
+    help = 'Run due periodic jobs once, or keep polling with --loop'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--job',
+            action='append',
+            dest='jobs',
+            help='Job to run (repeatable, default: all jobs)',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Run even if the job already ran within its interval',
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep running and poll for due jobs',
+        )
+        parser.add_argument(
+            '--poll-seconds',
+            type=int,
+            default=60,
+            help='Polling interval in seconds when looping',
+        )
+        parser.add_argument(
+            '--list',
+            action='store_true',
+            help='List registered jobs and exit',
+        )
+
+    def handle(self, *args, **options):
+        if options['list']:
+            for job in scheduler.jobs:
+                self.stdout.write(f'{job.name}: every {job.interval} - {job.description}')
+            return
+
+        names = options['jobs']
+        for name in names or []:
+            try:
+                scheduler.get_job(name)
+            except KeyError as e:
+                raise CommandError(e.args[0])
+
+        if options['loop']:
+            self.stdout.write(f'⏱️ Scheduler running, polling every {options["poll_seconds"]}s...')
+            try:
+                scheduler.run_forever(poll_seconds=options['poll_seconds'], names=names)
+            except KeyboardInterrupt:
+                scheduler.stop()
+            return
+
+        self.stdout.write('⏱️ Running scheduled jobs...')
+        for outcome in scheduler.run_pending(names, force=options['force']):
+            if outcome['status'] == 'ran':
+                self.stdout.write(self.style.SUCCESS(
+                    f"✅ {outcome['job']}: {outcome['result']} ({outcome['duration_ms']} ms)"
+                ))
+            elif outcome['status'] == 'failed':
+                self.stdout.write(self.style.ERROR(f"❌ {outcome['job']}: {outcome['error']}"))
+            else:
+                self.stdout.write(f"⏭️ {outcome['job']}: {outcome['status'].replace('_', ' ')}")
@@ -0,0 +1,38 @@
+"""
+Migration for notification digest windows
+"""
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0002_email_outbox'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationDigest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('frequency', models.CharField(max_length=10)),
+                ('period_start', models.DateTimeField()),
+                ('period_end', models.DateTimeField()),
+                ('notification_count', models.PositiveIntegerField(default=0, help_text='Notifications summarized (0: no email was sent)')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notification_digests', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Notification Digest',
+                'verbose_name_plural': 'Notification Digests',
+                'db_table': 'notifications_digest',
+                'ordering': ['-period_end'],
+                'indexes': [models.Index(fields=['user', '-period_end'], name='notif_digest_user_end_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'period_end'), name='unique_notification_digest_window')],
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+"""
+Migration for the scheduled job leases
+"""
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0003_notification_digest'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScheduledJobRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('due_at', models.DateTimeField(default=django.utils.timezone.now, help_text='Earliest time of the next run')),
+                ('locked_until', models.DateTimeField(blank=True, help_text='Running lock, released by a crashed run after this time', null=True)),
+                ('lock_token', models.CharField(blank=True, help_text='Run holding the running lock', max_length=32)),
+                ('last_started_at', models.DateTimeField(blank=True, null=True)),
+                ('last_finished_at', models.DateTimeField(blank=True, null=True)),
+                ('last_status', models.CharField(blank=True, max_length=10)),
+                ('last_error', models.TextField(blank=True)),
+            ],
+            options={
+                'verbose_name': 'Scheduled Job Run',
+                'verbose_name_plural': 'Scheduled Job Runs',
+                'db_table': 'notifications_scheduled_job_run',
+                'ordering': ['name'],
+            },
+        ),
+    ]
@@ -0,0 +1,56 @@
+"""
+Email outbox model for TexPro AI
+Notification emails waiting for delivery
+
+Rows are written in the transaction that creates the notification, so an
+email is queued exactly when its notification is committed. The dispatcher
+(notifications.dispatch) sends them later, outside the request, over one
+reused connection, retrying failures with exponential backoff.
+"""
+from django.db import models
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+
+class EmailOutbox(models.Model):
+    """
+    An email queued for the background dispatcher
+    """
+
+    class Status(models.TextChoices):
+        PENDING = 'pending', _('Pending')
+        SENDING = 'sending', _('Sending')
+        SENT = 'sent', _('Sent')
+        FAILED = 'failed', _('Failed')
+
+    notification = models.ForeignKey(
+        'notifications.Notification',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='outbox_emails'
+    )
+    to_email = models.EmailField()
+    subject = models.CharField(max_length=255)
+    body = models.TextField(help_text=_('Plain text body'))
+    html_body = models.TextField(blank=True)
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now, help_text=_('Earliest time of the next delivery attempt'))
+    claim_token = models.CharField(max_length=32, blank=True, help_text=_('Dispatcher run sending this email'))
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'notifications_email_outbox'
+        verbose_name = _('Outbox Email')
+        verbose_name_plural = _('Outbox Emails')
+        ordering = ['next_attempt_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='notif_outbox_due_idx'),
+            models.Index(fields=['claim_token'], name='notif_outbox_claim_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {self.to_email} ({self.status})"
@@ -0,0 +1,44 @@
+"""
+Notification digest model for TexPro AI
+One row per user and digest window that has been processed
+
+Users whose NotificationPreference.digest_frequency is daily or weekly get
+their notification emails grouped into one digest per window instead of
+one email per notification (notifications.digests). The latest
+period_end of a user is where their next window starts.
+"""
+from django.conf import settings
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+
+
+class NotificationDigest(models.Model):
+    """
+    A digest window of a user's notifications
+    """
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='notification_digests'
+    )
+    frequency = models.CharField(max_length=10)
+    period_start = models.DateTimeField()
+    period_end = models.DateTimeField()
+    notification_count = models.PositiveIntegerField(default=0, help_text=_('Notifications summarized (0: no email was sent)'))
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'notifications_digest'
+        verbose_name = _('Notification Digest')
+        verbose_name_plural = _('Notification Digests')
+        ordering = ['-period_end']
+        indexes = [
+            models.Index(fields=['user', '-period_end'], name='notif_digest_user_end_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'period_end'], name='unique_notification_digest_window'),
+        ]
+
+    def __str__(self):
+        return f"{self.user} {self.frequency} digest until {self.period_end:%Y-%m-%d %H:%M}"
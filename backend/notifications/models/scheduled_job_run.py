@@ -0,0 +1,36 @@
+"""
+Scheduled job run model for TexPro AI
+One row per periodic job, shared by every scheduler process
+
+The scheduler (core.scheduler) claims a job with a conditional UPDATE of
+its row, taking the interval lease (due_at) and the running lock
+(locked_until) in one statement, so only one process runs a job per
+interval whichever worker or run_scheduled_jobs process polls first.
+"""
+from django.db import models
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+
+class ScheduledJobRun(models.Model):
+    """
+    Lease and last outcome of a periodic job
+    """
+
+    name = models.CharField(max_length=100, unique=True)
+    due_at = models.DateTimeField(default=timezone.now, help_text=_('Earliest time of the next run'))
+    locked_until = models.DateTimeField(null=True, blank=True, help_text=_('Running lock, released by a crashed run after this time'))
+    lock_token = models.CharField(max_length=32, blank=True, help_text=_('Run holding the running lock'))
+    last_started_at = models.DateTimeField(null=True, blank=True)
+    last_finished_at = models.DateTimeField(null=True, blank=True)
+    last_status = models.CharField(max_length=10, blank=True)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        db_table = 'notifications_scheduled_job_run'
+        verbose_name = _('Scheduled Job Run')
+        verbose_name_plural = _('Scheduled Job Runs')
+        ordering = ['name']
+
+    def __str__(self):
+        return f"{self.name} (due {self.due_at})"
@@ -4,17 +4,34 @@ Business logic for creating and managing notifications
 """
 
 from django.contrib.auth import get_user_model
+from django.db import transaction
 from django.db.models import Q
 from django.utils import timezone
-from django.core.mail import send_mail
 from django.conf import settings
 from django.template.loader import render_to_string
 from django.utils.html import strip_tags
 
 from .models import Notification, NotificationPreference
+from .models.email_outbox import EmailOutbox
 
 User = get_user_model()
 
+# Rows per INSERT when fanning out notifications
+BULK_BATCH_SIZE = 500
+
+# Per-recipient outcomes of create_bulk_notifications
+OUTCOME_CREATED = 'created'
+OUTCOME_DISABLED = 'disabled'
+OUTCOME_QUIET_HOURS = 'quiet_hours'
+
+# related_object_type of each event kind's notifications (allocations use their class name)
+RELATED_OBJECT_TYPES = {
+    'workflow': 'batch',
+    'machine': 'machine',
+    'maintenance': 'maintenance_log',
+    'quality': 'quality_check',
+}
+
 
 class NotificationService:
     """
@@ -46,69 +63,251 @@ class NotificationService:
             sent_by: User who sent the notification
         
         Returns:
-            Notification instance
+            Notification instance, or None if the recipient's preferences
+            or quiet hours filtered it out
         """
-        # Get or create notification preferences for user
-        preferences, created = NotificationPreference.objects.get_or_create(
-            user=recipient
-        )
-        
-        # Check if user wants this type of notification
-        if not preferences.should_send_app_notification(notification_type):
-            return None
-        
-        # Check quiet hours
-        if preferences.is_quiet_hours() and priority not in ['high', 'critical']:
-            return None
-        
-        notification = Notification.objects.create(
-            recipient=recipient,
-            title=title,
-            message=message,
-            type=notification_type,
+        result = NotificationService.create_bulk_notifications(
+            [recipient],
+            title,
+            message,
+            notification_type=notification_type,
             priority=priority,
             related_object_type=related_object_type,
             related_object_id=related_object_id,
             sent_by=sent_by
         )
+        return result['notifications'][0] if result['notifications'] else None
+    
+    @staticmethod
+    def get_preferences(recipients):
+        """
+        Notification preferences of several users, keyed by user id
+        
+        Read in one query; missing preferences are bulk created with the
+        defaults (a row created concurrently is kept as it is).
+        """
+        user_ids = [recipient.pk for recipient in recipients]
+        preferences = {
+            preference.user_id: preference
+            for preference in NotificationPreference.objects.filter(user_id__in=user_ids)
+        }
+        missing = [
+            NotificationPreference(user=recipient)
+            for recipient in recipients if recipient.pk not in preferences
+        ]
+        if missing:
+            NotificationPreference.objects.bulk_create(
+                missing, batch_size=BULK_BATCH_SIZE, ignore_conflicts=True
+            )
+            preferences.update({preference.user_id: preference for preference in missing})
+        return preferences
+    
+    @staticmethod
+    def create_bulk_notifications(
+        recipients,
+        title,
+        message,
+        notification_type='system',
+        priority='normal',
+        related_object_type=None,
+        related_object_id=None,
+        sent_by=None
+    ):
+        """
+        Create the same notification for many recipients
+        
+        Preferences are read in one query and evaluated in memory, and the
+        notifications are inserted in batches of BULK_BATCH_SIZE, so the
+        query count does not grow with the number of recipients.
         
-        # Send email if enabled and configured
-        if preferences.should_send_email(notification_type):
-            NotificationService.send_email_notification(notification)
+        Args:
+            recipients: Users (or a User queryset) to notify; duplicates are ignored
+            Other arguments as for create_notification
         
-        return notification
+        Returns:
+            dict with the created notifications and the outcome for each
+            recipient id: 'created', 'disabled' (type turned off in the
+            recipient's preferences) or 'quiet_hours'
+        """
+        return NotificationService.fan_out([{
+            'recipients': recipients,
+            'title': title,
+            'message': message,
+            'notification_type': notification_type,
+            'priority': priority,
+            'related_object_type': related_object_type,
+            'related_object_id': related_object_id,
+            'sent_by': sent_by,
+        }])[0]
     
     @staticmethod
-    def send_email_notification(notification):
+    def fan_out(deliveries):
         """
-        Send email notification if email settings are configured
+        Create several notifications, each for its own recipients, at once
+        
+        The preferences of every recipient are read in one query, and all
+        notifications and their outbox emails are bulk inserted together.
+        
+        Args:
+            deliveries: dicts with 'recipients' and the other arguments of
+                create_bulk_notifications
+        
+        Returns:
+            One result per delivery, as returned by create_bulk_notifications
         """
-        if not getattr(settings, 'EMAIL_HOST', None):
-            return False
-        
-        try:
-            # Create email context
-            context = {
-                'notification': notification,
-                'site_name': 'TexPro AI',
-                'site_url': getattr(settings, 'SITE_URL', 'http://localhost:3000'),
-            }
+        deliveries = [
+            {**delivery, 'recipients': list({recipient.pk: recipient for recipient in delivery['recipients']}.values())}
+            for delivery in deliveries
+        ]
+        preferences = NotificationService.get_preferences(list({
+            recipient.pk: recipient
+            for delivery in deliveries for recipient in delivery['recipients']
+        }.values()))
+        
+        results = []
+        notifications = []
+        emails = []
+        for delivery in deliveries:
+            notification_type = delivery.get('notification_type', 'system')
+            priority = delivery.get('priority', 'normal')
+            outcomes = {}
+            created = []
+            for recipient in delivery['recipients']:
+                recipient_preferences = preferences[recipient.pk]
+                
+                # Check if user wants this type of notification
+                if not recipient_preferences.should_send_app_notification(notification_type):
+                    outcomes[recipient.pk] = OUTCOME_DISABLED
+                    continue
+                
+                # Check quiet hours
+                if recipient_preferences.is_quiet_hours() and priority not in ['high', 'critical']:
+                    outcomes[recipient.pk] = OUTCOME_QUIET_HOURS
+                    continue
+                
+                outcomes[recipient.pk] = OUTCOME_CREATED
+                notification = Notification(
+                    recipient=recipient,
+                    title=delivery['title'],
+                    message=delivery['message'],
+                    type=notification_type,
+                    priority=priority,
+                    related_object_type=delivery.get('related_object_type'),
+                    related_object_id=delivery.get('related_object_id'),
+                    sent_by=delivery.get('sent_by')
+                )
+                created.append(notification)
+                
+                # Email if enabled; users with a digest frequency get theirs
+                # grouped by the digest job instead
+                if (recipient_preferences.should_send_email(notification_type)
+                        and recipient_preferences.digest_frequency == 'none'):
+                    emails.append(notification)
+            
+            notifications.extend(created)
+            results.append({'notifications': created, 'outcomes': outcomes})
+        
+        # Notifications and their outbox emails are committed together
+        with transaction.atomic():
+            Notification.objects.bulk_create(notifications, batch_size=BULK_BATCH_SIZE)
+            NotificationService.queue_email_notifications(emails)
+        
+        return results
+    
+    @staticmethod
+    def create_event_notifications(events):
+        """
+        Create the notifications of several model events at once
+        
+        Recipients are resolved once per event kind and type, and every
+        notification is inserted through one fan_out.
+        
+        Args:
+            events: (kind, instance, event_type, user) tuples, kind being
+                workflow, machine, maintenance, quality or allocation
+        
+        Returns:
+            One result per event, as returned by create_bulk_notifications
+        """
+        if not events:
+            return []
+        
+        role_recipients = {}
+        deliveries = []
+        for kind, instance, event_type, user in events:
+            key = (kind, event_type)
+            if key not in role_recipients:
+                # Recipients depend on the role and event type, not on the object
+                role_recipients[key] = getattr(NotificationService, f'_get_{kind}_recipients')(None, event_type)
+            recipients = list(role_recipients[key])
             
-            # Render email templates
-            html_message = render_to_string('notifications/notification_email.html', context)
-            plain_message = strip_tags(html_message)
+            # Add batch creator if available (some models may not have this field)
+            creator = getattr(instance, 'created_by', None) if kind == 'workflow' else None
+            if creator:
+                recipients.append(creator)
             
-            send_mail(
-                subject=f"[TexPro AI] {notification.title}",
-                message=plain_message,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[notification.recipient.email],
-                html_message=html_message,
-                fail_silently=True,
+            title, message, priority = getattr(NotificationService, f'_get_{kind}_content')(
+                instance, event_type, user
             )
-            return True
-        except Exception:
-            return False
+            deliveries.append({
+                'recipients': recipients,
+                'title': title,
+                'message': message,
+                'notification_type': kind,
+                'priority': priority,
+                'related_object_type': RELATED_OBJECT_TYPES.get(kind) or type(instance).__name__.lower(),
+                'related_object_id': instance.pk,
+                'sent_by': user,
+            })
+        
+        return NotificationService.fan_out(deliveries)
+    
+    @staticmethod
+    def send_email_notification(notification):
+        """
+        Queue the email of a notification if email settings are configured
+        
+        The email is written to the outbox in the current transaction and
+        delivered by the background dispatcher (dispatch_email_outbox).
+        """
+        return bool(NotificationService.queue_email_notifications([notification]))
+    
+    @staticmethod
+    def build_notification_email(notification):
+        """Unsaved outbox email of a notification"""
+        context = {
+            'notification': notification,
+            'site_name': 'TexPro AI',
+            'site_url': getattr(settings, 'SITE_URL', 'http://localhost:3000'),
+        }
+        
+        # Render email templates
+        html_message = render_to_string('notifications/notification_email.html', context)
+        return EmailOutbox(
+            notification=notification,
+            to_email=notification.recipient.email,
+            subject=f"[TexPro AI] {notification.title}",
+            body=strip_tags(html_message),
+            html_body=html_message
+        )
+    
+    @staticmethod
+    def queue_email_notifications(notifications):
+        """
+        Write the emails of several notifications to the outbox
+        
+        Returns:
+            Number of emails queued (recipients without an address are skipped)
+        """
+        if not getattr(settings, 'EMAIL_HOST', None):
+            return 0
+        
+        emails = [
+            NotificationService.build_notification_email(notification)
+            for notification in notifications if notification.recipient.email
+        ]
+        EmailOutbox.objects.bulk_create(emails, batch_size=BULK_BATCH_SIZE)
+        return len(emails)
     
     @staticmethod
     def create_workflow_notification(batch, event_type, user=None):
@@ -120,141 +319,45 @@ class NotificationService:
             event_type: Type of workflow event
             user: User who triggered the event
         """
-        # Get relevant users based on event type
-        recipients = NotificationService._get_workflow_recipients(batch, event_type)
-        
-        # Create notification content
-        title, message, priority = NotificationService._get_workflow_content(
-            batch, event_type, user
-        )
-        
-        # Create notifications for each recipient
-        notifications = []
-        for recipient in recipients:
-            notification = NotificationService.create_notification(
-                recipient=recipient,
-                title=title,
-                message=message,
-                notification_type='workflow',
-                priority=priority,
-                related_object_type='batch',
-                related_object_id=batch.id,
-                sent_by=user
-            )
-            if notification:
-                notifications.append(notification)
-        
-        return notifications
+        return NotificationService.create_event_notifications(
+            [('workflow', batch, event_type, user)]
+        )[0]['notifications']
     
     @staticmethod
     def create_machine_notification(machine, event_type, user=None):
         """
         Create machine-related notifications
         """
-        recipients = NotificationService._get_machine_recipients(machine, event_type)
-        title, message, priority = NotificationService._get_machine_content(
-            machine, event_type, user
-        )
-        
-        notifications = []
-        for recipient in recipients:
-            notification = NotificationService.create_notification(
-                recipient=recipient,
-                title=title,
-                message=message,
-                notification_type='machine',
-                priority=priority,
-                related_object_type='machine',
-                related_object_id=machine.id,
-                sent_by=user
-            )
-            if notification:
-                notifications.append(notification)
-        
-        return notifications
+        return NotificationService.create_event_notifications(
+            [('machine', machine, event_type, user)]
+        )[0]['notifications']
     
     @staticmethod
     def create_maintenance_notification(maintenance_log, event_type, user=None):
         """
         Create maintenance-related notifications
         """
-        recipients = NotificationService._get_maintenance_recipients(
-            maintenance_log, event_type
-        )
-        title, message, priority = NotificationService._get_maintenance_content(
-            maintenance_log, event_type, user
-        )
-        
-        notifications = []
-        for recipient in recipients:
-            notification = NotificationService.create_notification(
-                recipient=recipient,
-                title=title,
-                message=message,
-                notification_type='maintenance',
-                priority=priority,
-                related_object_type='maintenance_log',
-                related_object_id=maintenance_log.id,
-                sent_by=user
-            )
-            if notification:
-                notifications.append(notification)
-        
-        return notifications
+        return NotificationService.create_event_notifications(
+            [('maintenance', maintenance_log, event_type, user)]
+        )[0]['notifications']
     
     @staticmethod
     def create_quality_notification(quality_check, event_type, user=None):
         """
         Create quality-related notifications
         """
-        recipients = NotificationService._get_quality_recipients(quality_check, event_type)
-        title, message, priority = NotificationService._get_quality_content(
-            quality_check, event_type, user
-        )
-        
-        notifications = []
-        for recipient in recipients:
-            notification = NotificationService.create_notification(
-                recipient=recipient,
-                title=title,
-                message=message,
-                notification_type='quality',
-                priority=priority,
-                related_object_type='quality_check',
-                related_object_id=quality_check.id,
-                sent_by=user
-            )
-            if notification:
-                notifications.append(notification)
-        
-        return notifications
+        return NotificationService.create_event_notifications(
+            [('quality', quality_check, event_type, user)]
+        )[0]['notifications']
     
     @staticmethod
     def create_allocation_notification(allocation, event_type, user=None):
         """
         Create allocation-related notifications
         """
-        recipients = NotificationService._get_allocation_recipients(allocation, event_type)
-        title, message, priority = NotificationService._get_allocation_content(
-            allocation, event_type, user
-        )
-        
-        notifications = []
-        for recipient in recipients:
-            notification = NotificationService.create_notification(
-                recipient=recipient,
-                title=title,
-                message=message,
-                notification_type='allocation',
-                priority=priority,
-                related_object_type=type(allocation).__name__.lower(),
-                related_object_id=allocation.id,
-                sent_by=user
-            )
-            if notification:
-                notifications.append(notification)
-        
-        return notifications
+        return NotificationService.create_event_notifications(
+            [('allocation', allocation, event_type, user)]
+        )[0]['notifications']
     
     @staticmethod
     def broadcast_notification(title, message, user_filter=None, priority='normal', sent_by=None):
@@ -272,20 +375,14 @@ class NotificationService:
         if user_filter:
             users = users.filter(user_filter)
         
-        notifications = []
-        for user in users:
-            notification = NotificationService.create_notification(
-                recipient=user,
-                title=title,
-                message=message,
-                notification_type='system',
-                priority=priority,
-                sent_by=sent_by
-            )
-            if notification:
-                notifications.append(notification)
-        
-        return notifications
+        return NotificationService.create_bulk_notifications(
+            users,
+            title=title,
+            message=message,
+            notification_type='system',
+            priority=priority,
+            sent_by=sent_by
+        )['notifications']
     
     # Helper methods for getting recipients
     @staticmethod
@@ -383,30 +480,30 @@ class NotificationService:
         """Get notification content for workflow events"""
         content_map = {
             'started': {
-                'title': f"Batch {batch.batch_number} Started",
-                'message': f"Production batch {batch.batch_number} for {batch.product_type} has been started.",
+                'title': f"Batch {batch.batch_code} Started",
+                'message': f"Production batch {batch.batch_code} has been started.",
                 'priority': 'normal'
             },
             'completed': {
-                'title': f"Batch {batch.batch_number} Completed",
-                'message': f"Production batch {batch.batch_number} has been completed successfully.",
+                'title': f"Batch {batch.batch_code} Completed",
+                'message': f"Production batch {batch.batch_code} has been completed successfully.",
                 'priority': 'normal'
             },
             'delayed': {
-                'title': f"Batch {batch.batch_number} Delayed",
-                'message': f"Production batch {batch.batch_number} is experiencing delays.",
+                'title': f"Batch {batch.batch_code} Delayed",
+                'message': f"Production batch {batch.batch_code} is experiencing delays.",
                 'priority': 'high'
             },
             'cancelled': {
-                'title': f"Batch {batch.batch_number} Cancelled",
-                'message': f"Production batch {batch.batch_number} has been cancelled.",
+                'title': f"Batch {batch.batch_code} Cancelled",
+                'message': f"Production batch {batch.batch_code} has been cancelled.",
                 'priority': 'high'
             },
         }
         
         content = content_map.get(event_type, {
-            'title': f"Batch {batch.batch_number} Update",
-            'message': f"Batch {batch.batch_number} has been updated.",
+            'title': f"Batch {batch.batch_code} Update",
+            'message': f"Batch {batch.batch_code} has been updated.",
             'priority': 'normal'
         })
         
@@ -7,6 +7,7 @@ from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from django.contrib.auth import get_user_model
 
+from .buffer import enqueue_notification
 from .services import NotificationService
 
 User = get_user_model()
@@ -33,31 +34,25 @@ except ImportError:
 def batch_workflow_notification(sender, instance, created, **kwargs):
     """
     Send notifications for batch workflow events
+    
+    Like the handlers below, the notifications are created once the
+    transaction of the save commits (see notifications.buffer).
     """
     if not created:
-        # Check for status changes
-        if hasattr(instance, '_state') and instance._state.adding:
-            return
-        
-        # Get the previous instance to compare status
-        try:
-            previous = BatchWorkflow.objects.get(pk=instance.pk)
-            if hasattr(previous, 'status') and previous.status != instance.status:
-                # Status changed
-                event_type = instance.status.lower()
-                NotificationService.create_workflow_notification(
-                    batch=instance,
-                    event_type=event_type,
-                    user=getattr(instance, '_updated_by', None)
-                )
-        except BatchWorkflow.DoesNotExist:
-            pass
+        # Status changed (tracked since load, see core.tracking)
+        if instance.has_changed('status'):
+            event_type = instance.status.lower()
+            enqueue_notification(
+                'workflow', instance, event_type,
+                user=getattr(instance, '_updated_by', None),
+                using=kwargs.get('using')
+            )
     else:
         # New batch created
-        NotificationService.create_workflow_notification(
-            batch=instance,
-            event_type='started',
-            user=instance.supervisor
+        enqueue_notification(
+            'workflow', instance, 'started',
+            user=instance.supervisor,
+            using=kwargs.get('using')
         )
 
 
@@ -66,26 +61,20 @@ def machine_notification(sender, instance, created, **kwargs):
     """
     Send notifications for machine events
     """
-    if not created:
-        # Check for status changes indicating breakdown
-        if instance.status == 'broken':
-            NotificationService.create_machine_notification(
-                machine=instance,
-                event_type='breakdown',
-                user=getattr(instance, '_updated_by', None)
+    if not created and instance.has_changed('operational_status'):
+        if instance.operational_status == 'breakdown':
+            enqueue_notification(
+                'machine', instance, 'breakdown',
+                user=getattr(instance, '_updated_by', None),
+                using=kwargs.get('using')
+            )
+        elif instance.previous('operational_status') == 'breakdown':
+            # Repaired after a breakdown
+            enqueue_notification(
+                'machine', instance, 'back_online',
+                user=getattr(instance, '_updated_by', None),
+                using=kwargs.get('using')
             )
-        elif instance.status == 'operational':
-            # Check if it was previously broken
-            try:
-                previous = Machine.objects.get(pk=instance.pk)
-                if hasattr(previous, 'status') and previous.status == 'broken':
-                    NotificationService.create_machine_notification(
-                        machine=instance,
-                        event_type='back_online',
-                        user=getattr(instance, '_updated_by', None)
-                    )
-            except Machine.DoesNotExist:
-                pass
 
 
 @receiver(post_save, sender=MaintenanceLog)
@@ -95,18 +84,18 @@ def maintenance_notification(sender, instance, created, **kwargs):
     """
     if created:
         # New maintenance scheduled
-        NotificationService.create_maintenance_notification(
-            maintenance_log=instance,
-            event_type='scheduled',
-            user=getattr(instance, 'performed_by', None) or getattr(instance, 'technician', None)
+        enqueue_notification(
+            'maintenance', instance, 'scheduled',
+            user=getattr(instance, 'performed_by', None) or getattr(instance, 'technician', None),
+            using=kwargs.get('using')
         )
     else:
         # Check for completion
-        if instance.status == 'completed':
-            NotificationService.create_maintenance_notification(
-                maintenance_log=instance,
-                event_type='completed',
-                user=getattr(instance, 'performed_by', None) or getattr(instance, 'technician', None)
+        if instance.status == 'completed' and instance.has_changed('status'):
+            enqueue_notification(
+                'maintenance', instance, 'completed',
+                user=getattr(instance, 'performed_by', None) or getattr(instance, 'technician', None),
+                using=kwargs.get('using')
             )
 
 
@@ -115,18 +104,18 @@ def quality_notification(sender, instance, created, **kwargs):
     """
     Send notifications for quality check events
     """
-    if not created and instance.status:
-        if instance.status == 'failed':
-            NotificationService.create_quality_notification(
-                quality_check=instance,
-                event_type='failed',
-                user=instance.inspector
+    if not created and instance.status and instance.has_changed('status'):
+        if instance.status == 'rejected':
+            enqueue_notification(
+                'quality', instance, 'failed',
+                user=instance.inspector,
+                using=kwargs.get('using')
             )
-        elif instance.status == 'passed':
-            NotificationService.create_quality_notification(
-                quality_check=instance,
-                event_type='passed',
-                user=instance.inspector
+        elif instance.status == 'approved':
+            enqueue_notification(
+                'quality', instance, 'passed',
+                user=instance.inspector,
+                using=kwargs.get('using')
             )
 
 
@@ -136,18 +125,18 @@ def workforce_allocation_notification(sender, instance, created, **kwargs):
     Send notifications for workforce allocation events
     """
     if created:
-        NotificationService.create_allocation_notification(
-            allocation=instance,
-            event_type='created',
-            user=instance.allocated_by
+        enqueue_notification(
+            'allocation', instance, 'created',
+            user=instance.allocated_by,
+            using=kwargs.get('using')
         )
     else:
         # Check for conflicts
         if hasattr(instance, 'has_conflict') and instance.has_conflict():
-            NotificationService.create_allocation_notification(
-                allocation=instance,
-                event_type='conflict',
-                user=getattr(instance, '_updated_by', None)
+            enqueue_notification(
+                'allocation', instance, 'conflict',
+                user=getattr(instance, '_updated_by', None),
+                using=kwargs.get('using')
             )
 
 
@@ -157,18 +146,18 @@ def material_allocation_notification(sender, instance, created, **kwargs):
     Send notifications for material allocation events
     """
     if created:
-        NotificationService.create_allocation_notification(
-            allocation=instance,
-            event_type='created',
-            user=instance.allocated_by
+        enqueue_notification(
+            'allocation', instance, 'created',
+            user=instance.allocated_by,
+            using=kwargs.get('using')
         )
     else:
         # Check for conflicts
         if hasattr(instance, 'has_conflict') and instance.has_conflict():
-            NotificationService.create_allocation_notification(
-                allocation=instance,
-                event_type='conflict',
-                user=getattr(instance, '_updated_by', None)
+            enqueue_notification(
+                'allocation', instance, 'conflict',
+                user=getattr(instance, '_updated_by', None),
+                using=kwargs.get('using')
             )
 
 
@@ -193,27 +182,22 @@ def user_welcome_notification(sender, instance, created, **kwargs):
 def trigger_maintenance_due_notifications():
     """
     Check for machines that are due for maintenance and send notifications
-    This can be called from a scheduled task
+    Run periodically by the scheduler (see core.jobs)
     """
     if not Machine:
-        return
+        return 0
     
     from django.utils import timezone
     from datetime import timedelta
     
-    # Find machines due for maintenance (example logic)
-    due_date = timezone.now() + timedelta(days=7)  # 7 days from now
-    
     machines_due = Machine.objects.filter(
-        status='operational',
-        last_maintenance__lt=timezone.now() - timedelta(days=30)  # 30 days since last maintenance
+        operational_status__in=['running', 'idle'],
+        last_maintenance_date__lt=timezone.now() - timedelta(days=30)  # 30 days since last maintenance
     )
     
-    for machine in machines_due:
-        NotificationService.create_machine_notification(
-            machine=machine,
-            event_type='maintenance_due'
-        )
+    events = [('machine', machine, 'maintenance_due', None) for machine in machines_due]
+    NotificationService.create_event_notifications(events)
+    return len(events)
 
 
 def trigger_overdue_maintenance_notifications():
@@ -221,24 +205,22 @@ def trigger_overdue_maintenance_notifications():
     Check for overdue maintenance and send critical notifications
     """
     if not MaintenanceLog:
-        return
+        return 0
     
     from django.utils import timezone
     from datetime import timedelta
     
     # Find overdue maintenance
-    overdue_cutoff = timezone.now() - timedelta(hours=24)  # 24 hours overdue
+    overdue_cutoff = (timezone.now() - timedelta(hours=24)).date()  # 24 hours overdue
     
     overdue_maintenance = MaintenanceLog.objects.filter(
-        status='scheduled',
-        scheduled_date__lt=overdue_cutoff
-    )
+        status__in=['pending', 'in_progress'],
+        next_due_date__lt=overdue_cutoff
+    ).select_related('machine')
     
-    for maintenance in overdue_maintenance:
-        NotificationService.create_maintenance_notification(
-            maintenance_log=maintenance,
-            event_type='overdue'
-        )
+    events = [('maintenance', maintenance, 'overdue', None) for maintenance in overdue_maintenance]
+    NotificationService.create_event_notifications(events)
+    return len(events)
 
 
 def trigger_batch_delay_notifications():
@@ -246,21 +228,19 @@ def trigger_batch_delay_notifications():
     Check for delayed batches and send notifications
     """
     if not BatchWorkflow:
-        return
+        return 0
     
     from django.utils import timezone
     from datetime import timedelta
     
-    # Find potentially delayed batches
-    delay_cutoff = timezone.now() - timedelta(hours=2)  # 2 hours past expected
+    # Find batches still running past their expected end date
+    delay_cutoff = (timezone.now() - timedelta(hours=2)).date()  # 2 hours past expected
     
     delayed_batches = BatchWorkflow.objects.filter(
-        status='in_progress',
-        expected_completion__lt=delay_cutoff
+        status__in=['in_progress', 'delayed'],
+        end_date__lt=delay_cutoff
     )
     
-    for batch in delayed_batches:
-        NotificationService.create_workflow_notification(
-            batch=batch,
-            event_type='delayed'
-        )
+    events = [('workflow', batch, 'delayed', None) for batch in delayed_batches]
+    NotificationService.create_event_notifications(events)
+    return len(events)
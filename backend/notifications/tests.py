@@ -1,3 +1,459 @@
-from django.test import TestCase
+"""
+Test suite for notifications app
+Tests notification fan-out and delivery
+"""
+from datetime import timedelta
+from io import StringIO
+from smtplib import SMTPException
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from machines.models import Machine, MachineType
+from notifications.buffer import NotificationBuffer
+from notifications.digests import send_notification_digests
+from notifications.dispatch import MAX_ATTEMPTS, RETRY_BACKOFF, dispatch_outbox
+from notifications.models import Notification, NotificationPreference
+from notifications.models.email_outbox import EmailOutbox
+from notifications.models.notification_digest import NotificationDigest
+from notifications.services import NotificationService
+from quality.models import QualityCheck
+from workflow.models import BatchWorkflow
+
+User = get_user_model()
+
+
+# BULK FAN-OUT TESTS
+class BulkNotificationFanOutTest(TestCase):
+    """Test cases for creating one notification for many recipients"""
+
+    USER_COUNT = 40
+
+    def setUp(self):
+        """Set up active users without notification preferences"""
+        self.users = [
+            User.objects.create_user(
+                username=f"operator_{index}",
+                email=f"operator{index}@texpro.com",
+                role="operator",
+                employee_id=f"OP{index:04d}"
+            )
+            for index in range(self.USER_COUNT)
+        ]
+        # Drop the welcome notifications and the preferences they created
+        Notification.objects.all().delete()
+        NotificationPreference.objects.all().delete()
+
+    def test_broadcast_query_count_is_constant(self):
+        """Test a broadcast reads and writes every recipient in a fixed number of queries"""
+        # Users, preferences, missing preferences insert, and the
+        # notifications insert inside a savepoint
+        with self.settings(EMAIL_HOST=''), self.assertNumQueries(6):
+            notifications = NotificationService.broadcast_notification(
+                title="Plant shutdown",
+                message="The plant closes at 18:00."
+            )
+
+        self.assertEqual(len(notifications), self.USER_COUNT)
+        self.assertEqual(Notification.objects.filter(title="Plant shutdown").count(), self.USER_COUNT)
+        self.assertEqual(NotificationPreference.objects.count(), self.USER_COUNT)
+
+    def test_outcomes_follow_preferences(self):
+        """Test recipients who turned the type off are reported and skipped"""
+        muted = self.users[0]
+        NotificationPreference.objects.create(user=muted, app_machine=False)
+
+        with self.settings(EMAIL_HOST=''):
+            result = NotificationService.create_bulk_notifications(
+                self.users + [self.users[1]],
+                title="Loom 3 breakdown",
+                message="Loom 3 requires attention.",
+                notification_type='machine'
+            )
+
+        self.assertEqual(result['outcomes'][muted.pk], 'disabled')
+        self.assertEqual(result['outcomes'][self.users[1].pk], 'created')
+        self.assertEqual(len(result['notifications']), self.USER_COUNT - 1)
+        self.assertFalse(Notification.objects.filter(recipient=muted).exists())
+        self.assertFalse(NotificationPreference.objects.get(user=muted).app_machine)
+
+    def test_single_notification_uses_bulk_path(self):
+        """Test create_notification still returns the created notification or None"""
+        recipient = self.users[0]
+        with self.settings(EMAIL_HOST=''):
+            notification = NotificationService.create_notification(
+                recipient=recipient,
+                title="Batch started",
+                message="Batch B-001 has started.",
+                notification_type='workflow'
+            )
+            NotificationPreference.objects.filter(user=recipient).update(app_workflow=False)
+            muted = NotificationService.create_notification(
+                recipient=recipient,
+                title="Batch completed",
+                message="Batch B-001 has completed.",
+                notification_type='workflow'
+            )
+
+        self.assertEqual(Notification.objects.get(recipient=recipient), notification)
+        self.assertIsNone(muted)
+
+
+# EMAIL OUTBOX TESTS
+@override_settings(EMAIL_HOST='smtp.texpro.com')
+class EmailOutboxDispatchTest(TestCase):
+    """Test cases for queueing notification emails and dispatching them"""
+
+    def setUp(self):
+        """Set up recipients and drop their welcome emails"""
+        self.users = [
+            User.objects.create_user(
+                username=f"supervisor_{index}",
+                email=f"supervisor{index}@texpro.com",
+                role="supervisor",
+                employee_id=f"SU{index:04d}"
+            )
+            for index in range(3)
+        ]
+        # Individual emails go to users without a digest
+        NotificationPreference.objects.update(digest_frequency='none')
+        EmailOutbox.objects.all().delete()
+
+    def broadcast(self):
+        return NotificationService.broadcast_notification(
+            title="Plant shutdown",
+            message="The plant closes at 18:00."
+        )
+
+    def test_emails_are_queued_then_dispatched(self):
+        """Test notifications queue emails in the outbox and the dispatcher sends them"""
+        self.broadcast()
+
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(EmailOutbox.objects.filter(status='pending').count(), 3)
+
+        out = StringIO()
+        call_command('dispatch_email_outbox', stdout=out)
+
+        self.assertIn('3 sent, 0 failed in 1 batches', out.getvalue())
+        self.assertEqual(
+            sorted(message.to[0] for message in mail.outbox),
+            ["supervisor0@texpro.com", "supervisor1@texpro.com", "supervisor2@texpro.com"]
+        )
+        self.assertEqual(mail.outbox[0].subject, "[TexPro AI] Plant shutdown")
+        self.assertEqual(mail.outbox[0].alternatives[0][1], 'text/html')
+        self.assertEqual(EmailOutbox.objects.filter(status='sent').count(), 3)
+
+        # Nothing is sent twice
+        self.assertEqual(dispatch_outbox()['sent'], 0)
+        self.assertEqual(len(mail.outbox), 3)
+
+    def test_failed_emails_back_off_then_give_up(self):
+        """Test a failing server delays retries and marks the email failed after MAX_ATTEMPTS"""
+        self.broadcast()
+        now = timezone.now()
+
+        with mock.patch(
+            'django.core.mail.backends.locmem.EmailBackend.send_messages',
+            side_effect=SMTPException("Server unavailable")
+        ):
+            outcome = dispatch_outbox(now=now)
+            self.assertEqual(outcome['failed'], 3)
+
+            email = EmailOutbox.objects.first()
+            self.assertEqual(email.status, 'pending')
+            self.assertEqual(email.attempts, 1)
+            self.assertEqual(email.next_attempt_at, now + RETRY_BACKOFF)
+            self.assertEqual(email.last_error, "Server unavailable")
+
+            # Not due again until the backoff has passed
+            self.assertEqual(dispatch_outbox(now=now)['batches'], 0)
+
+            for attempt in range(MAX_ATTEMPTS - 1):
+                now += timedelta(days=1)
+                dispatch_outbox(now=now)
+
+        self.assertEqual(EmailOutbox.objects.filter(status='failed', attempts=MAX_ATTEMPTS).count(), 3)
+        self.assertEqual(len(mail.outbox), 0)
+
+
+# DIGEST TESTS
+@override_settings(EMAIL_HOST='smtp.texpro.com')
+class NotificationDigestTest(TestCase):
+    """Test cases for grouping notifications into daily and weekly digests"""
+
+    def setUp(self):
+        """Set up a daily digest user, a weekly digest user and an immediate user"""
+        self.daily, self.weekly, self.immediate = [
+            User.objects.create_user(
+                username=f"supervisor_{frequency}",
+                email=f"{frequency}@texpro.com",
+                role="supervisor",
+                employee_id=f"SU{index:04d}"
+            )
+            for index, frequency in enumerate(['daily', 'weekly', 'none'])
+        ]
+        for user, frequency in [(self.daily, 'daily'), (self.weekly, 'weekly'), (self.immediate, 'none')]:
+            NotificationPreference.objects.filter(user=user).update(digest_frequency=frequency)
+        NotificationPreference.objects.filter(user=self.daily).update(email_quality=False)
+        Notification.objects.all().delete()
+        EmailOutbox.objects.all().delete()
+
+    def notify(self, count, notification_type):
+        for index in range(count):
+            NotificationService.create_bulk_notifications(
+                [self.daily, self.weekly, self.immediate],
+                title=f"{notification_type.title()} event {index}",
+                message="Details",
+                notification_type=notification_type
+            )
+
+    def test_storm_becomes_one_email_per_user(self):
+        """Test many notifications produce a single digest per digest user"""
+        self.notify(30, 'machine')
+        self.notify(3, 'quality')
+
+        # Only the user without a digest was emailed individually
+        self.assertEqual(EmailOutbox.objects.filter(to_email="none@texpro.com").count(), 33)
+        self.assertEqual(EmailOutbox.objects.exclude(to_email="none@texpro.com").count(), 0)
+
+        # Preferences, last windows, notifications, and both inserts in a savepoint
+        with self.assertNumQueries(7):
+            outcome = send_notification_digests(now=timezone.now() + timedelta(minutes=1))
+
+        self.assertEqual(outcome, {'users': 2, 'emails': 2, 'notifications': 63})
+        daily_email = EmailOutbox.objects.get(to_email="daily@texpro.com")
+        self.assertIn("30 notifications", daily_email.subject)
+        self.assertIn("Machine (30)", daily_email.body)
+        self.assertIn("and 25 more", daily_email.body)
+        # Quality emails are turned off for the daily user
+        self.assertNotIn("Quality", daily_email.body)
+        self.assertIn("Quality (3)", EmailOutbox.objects.get(to_email="weekly@texpro.com").body)
+
+    def test_windows_follow_frequency(self):
+        """Test a window is summarized once and the next one waits for its period"""
+        self.notify(2, 'workflow')
+        now = timezone.now()
+        send_notification_digests(now=now)
+        self.notify(1, 'workflow')
+
+        # Within the window: nothing is due
+        self.assertEqual(send_notification_digests(now=now + timedelta(hours=12))['users'], 0)
+
+        # The next day only the daily user's window has ended
+        outcome = send_notification_digests(now=now + timedelta(days=1))
+        self.assertEqual(outcome, {'users': 1, 'emails': 1, 'notifications': 1})
+        self.assertEqual(
+            list(NotificationDigest.objects.filter(user=self.daily).values_list('notification_count', flat=True)),
+            [1, 2]
+        )
+
+
+# CHANGE TRACKING TESTS
+class SignalChangeTrackingTest(TestCase):
+    """Test cases for status change detection in the notification signals"""
+
+    def setUp(self):
+        """Set up a supervisor and a pending batch"""
+        self.supervisor = User.objects.create_user(
+            username="supervisor_user",
+            email="supervisor@texpro.com",
+            role="supervisor",
+            employee_id="SU0001"
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            BatchWorkflow.objects.create(batch_code="B-001", supervisor=self.supervisor)
+
+    def test_status_change_notifies_without_reloading(self):
+        """Test a status change is detected from the loaded values, without a SELECT of the batch"""
+        batch = BatchWorkflow.objects.get(batch_code="B-001")
+        self.assertFalse(batch.has_changed('status'))
+
+        batch.status = 'delayed'
+        self.assertEqual(batch.changed_fields, {'status': 'pending'})
+
+        with CaptureQueriesContext(connection) as queries, self.captureOnCommitCallbacks(execute=True):
+            batch.save()
+
+        self.assertFalse(any(
+            query['sql'].startswith('SELECT') and BatchWorkflow._meta.db_table in query['sql']
+            for query in queries.captured_queries
+        ))
+        self.assertTrue(Notification.objects.filter(title="Batch B-001 Delayed").exists())
+        self.assertFalse(batch.has_changed('status'))
+        self.assertEqual(batch.previous('status'), 'delayed')
+
+    def test_save_without_change_does_not_notify(self):
+        """Test saving other fields sends no status notification"""
+        batch = BatchWorkflow.objects.get(batch_code="B-001")
+        Notification.objects.all().delete()
+
+        batch.description = "Indigo dye run"
+        with self.captureOnCommitCallbacks(execute=True):
+            batch.save()
+
+        self.assertFalse(Notification.objects.exists())
+
+
+# EVENT SIGNAL TESTS
+class EventSignalTest(TestCase):
+    """Test cases for the machine and quality check notification signals"""
+
+    def setUp(self):
+        """Set up a supervisor, a running machine and a pending quality check"""
+        self.supervisor = User.objects.create_user(
+            username="supervisor_user",
+            email="supervisor@texpro.com",
+            role="supervisor",
+            employee_id="SU0001"
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.machine = Machine.objects.create(
+                machine_id="WVG-LOM-001",
+                name="Loom 1",
+                machine_type=MachineType.objects.create(name="Weaving Loom"),
+                operational_status="running"
+            )
+            batch = BatchWorkflow.objects.create(batch_code="B-001", supervisor=self.supervisor)
+            self.check = QualityCheck.objects.create(
+                batch=batch, inspector=self.supervisor, image="quality/sample.jpg"
+            )
+        Notification.objects.all().delete()
+
+    def set_operational_status(self, operational_status):
+        self.machine.operational_status = operational_status
+        with self.captureOnCommitCallbacks(execute=True):
+            self.machine.save()
+
+    def test_breakdown_and_recovery_notify(self):
+        """Test a breakdown and the repair after it each create a notification"""
+        self.set_operational_status('breakdown')
+        self.assertTrue(Notification.objects.filter(
+            recipient=self.supervisor, title="Machine Loom 1 Breakdown"
+        ).exists())
+
+        self.set_operational_status('running')
+        self.assertTrue(Notification.objects.filter(
+            recipient=self.supervisor, title="Machine Loom 1 Back Online"
+        ).exists())
+
+    def test_other_machine_changes_do_not_notify(self):
+        """Test operational changes outside a breakdown create no notification"""
+        self.set_operational_status('idle')
+        self.set_operational_status('maintenance')
+
+        self.assertFalse(Notification.objects.exists())
+
+    def test_quality_decisions_notify(self):
+        """Test rejecting and approving a quality check each create a notification"""
+        for status, title in [('rejected', "Quality Check Failed"), ('approved', "Quality Check Passed")]:
+            self.check.status = status
+            with self.captureOnCommitCallbacks(execute=True):
+                self.check.save()
+
+            self.assertTrue(Notification.objects.filter(recipient=self.supervisor, title=title).exists())
+
+
+# DEFERRED DISPATCH TESTS
+class DeferredNotificationTest(TestCase):
+    """Test cases for buffering notification events until the transaction commits"""
+
+    def setUp(self):
+        """Set up a supervisor and pending batches"""
+        self.supervisor = User.objects.create_user(
+            username="supervisor_user",
+            email="supervisor@texpro.com",
+            role="supervisor",
+            employee_id="SU0001"
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            for index in range(20):
+                BatchWorkflow.objects.create(batch_code=f"B-{index:03d}", supervisor=self.supervisor)
+        Notification.objects.all().delete()
+
+    def buffer_flushes(self, callbacks):
+        return [callback for callback in callbacks if isinstance(getattr(callback, '__self__', None), NotificationBuffer)]
+
+    def test_repeated_events_are_coalesced(self):
+        """Test saves of one object in a transaction notify once per event after the commit"""
+        batch = BatchWorkflow.objects.get(batch_code="B-000")
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with transaction.atomic():
+                for status in ['delayed', 'in_progress', 'delayed']:
+                    batch.status = status
+                    batch.save()
+                batch.save()
+                # Nothing is created before the commit
+                self.assertFalse(Notification.objects.exists())
+
+        self.assertEqual(len(self.buffer_flushes(callbacks)), 1)
+        self.assertEqual(
+            sorted(Notification.objects.values_list('title', flat=True)),
+            ["Batch B-000 Delayed", "Batch B-000 Update"]
+        )
+
+    def test_flush_query_count_is_constant(self):
+        """Test the events of many objects are flushed in a fixed number of queries"""
+        with self.captureOnCommitCallbacks() as callbacks:
+            for batch in BatchWorkflow.objects.all():
+                batch.status = 'delayed'
+                batch.save()
+
+        flushes = self.buffer_flushes(callbacks)
+        self.assertEqual(len(flushes), 1)
+        # Recipients, preferences, and the notifications insert inside a savepoint
+        with self.settings(EMAIL_HOST=''), self.assertNumQueries(5):
+            flushes[0]()
+
+        self.assertEqual(Notification.objects.filter(recipient=self.supervisor).count(), 20)
+
+    def test_rolled_back_savepoint_drops_its_events(self):
+        """Test events of a rolled back savepoint are dropped while the transaction's are sent"""
+        first, second = BatchWorkflow.objects.filter(batch_code__in=["B-000", "B-001"]).order_by('batch_code')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                first.status = 'delayed'
+                first.save()
+                try:
+                    with transaction.atomic():
+                        second.status = 'delayed'
+                        second.save()
+                        raise ValueError("Rejected")
+                except ValueError:
+                    pass
+                first.status = 'cancelled'
+                first.save()
+
+        self.assertEqual(
+            sorted(Notification.objects.values_list('title', flat=True)),
+            ["Batch B-000 Cancelled", "Batch B-000 Delayed"]
+        )
+
+    def test_rolled_back_transaction_sends_nothing(self):
+        """Test events of a rolled back transaction are dropped"""
+        batch = BatchWorkflow.objects.get(batch_code="B-000")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    batch.status = 'cancelled'
+                    batch.save()
+                    raise ValueError("Rejected")
+            except ValueError:
+                pass
+
+        self.assertFalse(Notification.objects.exists())
+
+        batch.status = 'delayed'
+        with self.captureOnCommitCallbacks(execute=True):
+            batch.save()
+
+        self.assertEqual(list(Notification.objects.values_list('title', flat=True)), ["Batch B-000 Delayed"])
@@ -97,19 +97,15 @@ class NotificationViewSet(ModelViewSet):
                 is_active=True
             )
         
-        # Create notifications
-        created_notifications = []
-        for recipient in recipients:
-            notification = NotificationService.create_notification(
-                recipient=recipient,
-                title=title,
-                message=message,
-                notification_type=notification_type,
-                priority=priority,
-                sent_by=request.user
-            )
-            if notification:
-                created_notifications.append(notification)
+        # Create notifications in bulk
+        created_notifications = NotificationService.create_bulk_notifications(
+            recipients,
+            title=title,
+            message=message,
+            notification_type=notification_type,
+            priority=priority,
+            sent_by=request.user
+        )['notifications']
         
         # Return response
         return Response({
@@ -4,3 +4,12 @@ from django.apps import AppConfig
 class QualityConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'quality'
+
+    def ready(self):
+        """
+        App initialization
+        """
+        from core.tracking import track_changes
+        from quality.models import QualityCheck
+        # Status changes are read by the notification signals
+        track_changes(QualityCheck, 'status')
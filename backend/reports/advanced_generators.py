@@ -3,72 +3,62 @@ Reports services - Part 3: Quality, Allocation, and Analytics generators
 Final report generators for complete coverage
 """
 
+from itertools import chain
+
 from django.http import HttpResponse
 from reportlab.platypus import Table, TableStyle, Paragraph
 from reportlab.lib import colors
+from reportlab.lib.styles import getSampleStyleSheet
+
+from core.models import user_site_code
 from .services import (
     create_pdf_base, create_excel_base,
+    create_streaming_excel, add_streaming_sheet, iterate_export, excel_file_response,
+    pdf_table_flowables, pdf_report_response,
     apply_quality_filters, apply_allocation_filters
 )
 import logging
 import traceback
 
 
+def _quality_pdf_row(check):
+    """PDF table row of a quality check"""
+    # Use `created_at` as the check timestamp and `ai_analysis_result`/fields as available
+    check_date = getattr(check, 'created_at', None)
+    score_val = getattr(check, 'ai_confidence_score', None)
+    defects_val = getattr(check, 'defect_type', None) or ("Defect" if getattr(check, 'defect_detected', False) else 'None')
+
+    return [
+        str(check.batch) if check.batch else 'N/A',
+        str(check.inspector) if check.inspector else 'N/A',
+        check.get_status_display() if hasattr(check, 'get_status_display') else check.status,
+        (f"{score_val:.2f}" if score_val is not None else 'N/A'),
+        check_date.strftime('%Y-%m-%d') if check_date else 'N/A',
+        (str(defects_val)[:50] + '...') if defects_val and len(str(defects_val)) > 50 else (defects_val or 'None')
+    ]
+
+
 def generate_quality_pdf(request):
-    """Generate quality checks PDF report"""
+    """Generate quality checks PDF report over every matching check"""
     try:
         from quality.models import QualityCheck
         
         # Apply filters
         queryset = apply_quality_filters(QualityCheck.objects.all(), request)
         
-        # Create PDF
-        buffer, doc, story, styles = create_pdf_base(
-            "Quality Checks Report",
-            f"Total Quality Checks: {queryset.count()}"
+        # Page-sized tables, filled while the document is laid out
+        headers = ['Batch', 'Inspector', 'Status', 'Score', 'Check Date', 'Defects']
+        tables = pdf_table_flowables(
+            headers, map(_quality_pdf_row, iterate_export(queryset, 'batch', 'inspector')),
+            colors.purple, colors.lavender
         )
         
-        # Prepare data
-        data = [['Batch', 'Inspector', 'Status', 'Score', 'Check Date', 'Defects']]
-
-        for check in queryset[:100]:
-            # Use `created_at` as the check timestamp and `ai_analysis_result`/fields as available
-            check_date = getattr(check, 'created_at', None)
-            defects_field = getattr(check, 'defects', None) or getattr(check, 'ai_analysis_result', None)
-
-            score_val = getattr(check, 'ai_confidence_score', None)
-            defects_val = getattr(check, 'defect_type', None) or ("Defect" if getattr(check, 'defect_detected', False) else 'None')
-
-            data.append([
-                str(check.batch) if check.batch else 'N/A',
-                str(check.inspector) if check.inspector else 'N/A',
-                check.get_status_display() if hasattr(check, 'get_status_display') else check.status,
-                (f"{score_val:.2f}" if score_val is not None else 'N/A'),
-                check_date.strftime('%Y-%m-%d') if check_date else 'N/A',
-                (str(defects_val)[:50] + '...') if defects_val and len(str(defects_val)) > 50 else (defects_val or 'None')
-            ])
-        
-        # Create table
-        table = Table(data)
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.purple),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 12),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.lavender),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-        
-        story.append(table)
-        doc.build(story)
-        
-        # Return response
-        buffer.seek(0)
-        response = HttpResponse(buffer.getvalue(), content_type='application/pdf')
-        response['Content-Disposition'] = 'attachment; filename="quality_report.pdf"'
-        return response
+        return pdf_report_response(
+            "Quality Checks Report",
+            f"Total Quality Checks: {queryset.count()}",
+            tables,
+            'quality_report.pdf'
+        )
         
     except Exception as e:
         logging.exception('Error in generate_quality_pdf')
@@ -77,7 +67,7 @@ def generate_quality_pdf(request):
 
 
 def generate_quality_excel(request):
-    """Generate quality checks Excel report"""
+    """Generate quality checks Excel report, streaming every matching check"""
     try:
         from quality.models import QualityCheck
         
@@ -85,34 +75,27 @@ def generate_quality_excel(request):
         queryset = apply_quality_filters(QualityCheck.objects.all(), request)
         
         # Create Excel
-        wb, ws, header_font, header_fill = create_excel_base("Quality Checks")
-        
-        # Headers
         headers = ['Batch', 'Inspector', 'Status', 'Quality Score', 'Check Date', 'Defects', 'Notes']
-        for col, header in enumerate(headers, 1):
-            cell = ws.cell(row=4, column=col, value=header)
-            cell.font = header_font
-            cell.fill = header_fill
+        wb = create_streaming_excel()
+        ws = add_streaming_sheet(wb, "Quality Checks", headers)
         
         # Data
-        for row, check in enumerate(queryset[:1000], 5):
+        for check in iterate_export(queryset, 'batch', 'inspector'):
             check_date = getattr(check, 'created_at', None)
             score_val = getattr(check, 'ai_confidence_score', None)
             defects_val = getattr(check, 'defect_type', None) or ("Defect" if getattr(check, 'defect_detected', False) else 'None')
 
-            ws.cell(row=row, column=1, value=str(check.batch) if check.batch else 'N/A')
-            ws.cell(row=row, column=2, value=str(check.inspector) if check.inspector else 'N/A')
-            ws.cell(row=row, column=3, value=check.status or 'N/A')
-            ws.cell(row=row, column=4, value=float(score_val) if score_val is not None else 'N/A')
-            ws.cell(row=row, column=5, value=check_date.strftime('%Y-%m-%d') if check_date else 'N/A')
-            ws.cell(row=row, column=6, value=str(defects_val) if defects_val else 'None')
-            ws.cell(row=row, column=7, value=getattr(check, 'comments', None) or 'N/A')
+            ws.append([
+                str(check.batch) if check.batch else 'N/A',
+                str(check.inspector) if check.inspector else 'N/A',
+                check.status or 'N/A',
+                float(score_val) if score_val is not None else 'N/A',
+                check_date.strftime('%Y-%m-%d') if check_date else 'N/A',
+                str(defects_val) if defects_val else 'None',
+                getattr(check, 'comments', None) or 'N/A'
+            ])
         
-        # Save to response
-        response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-        response['Content-Disposition'] = 'attachment; filename="quality_report.xlsx"'
-        wb.save(response)
-        return response
+        return excel_file_response(wb, 'quality_report.xlsx')
         
     except Exception as e:
         logging.exception('Error in generate_quality_excel')
@@ -120,8 +103,31 @@ def generate_quality_excel(request):
         return HttpResponse(f"Error generating Excel: {str(e)}", status=500)
 
 
+def _workforce_pdf_row(allocation):
+    """PDF table row of a workforce allocation"""
+    return [
+        str(allocation.batch) if allocation.batch else 'N/A',
+        str(allocation.user) if allocation.user else 'N/A',
+        allocation.get_role_assigned_display() if hasattr(allocation, 'get_role_assigned_display') else allocation.role_assigned,
+        allocation.start_date.strftime('%Y-%m-%d') if allocation.start_date else 'N/A',
+        allocation.end_date.strftime('%Y-%m-%d') if allocation.end_date else 'N/A'
+    ]
+
+
+def _material_pdf_row(allocation):
+    """PDF table row of a material allocation"""
+    return [
+        str(allocation.batch) if allocation.batch else 'N/A',
+        allocation.material_name or 'N/A',
+        str(allocation.quantity) if allocation.quantity else '0',
+        allocation.get_unit_display() if hasattr(allocation, 'get_unit_display') else allocation.unit,
+        f"{allocation.total_cost:,.0f}" if allocation.total_cost else '0',
+        allocation.supplier or 'N/A'
+    ]
+
+
 def generate_allocation_pdf(request):
-    """Generate allocation report PDF"""
+    """Generate resource allocation PDF report over every matching allocation"""
     try:
         from allocation.models import WorkforceAllocation, MaterialAllocation
         
@@ -129,74 +135,35 @@ def generate_allocation_pdf(request):
         workforce_queryset = apply_allocation_filters(WorkforceAllocation.objects.all(), request, 'workforce')
         material_queryset = apply_allocation_filters(MaterialAllocation.objects.all(), request, 'material')
         
-        # Create PDF
-        buffer, doc, story, styles = create_pdf_base(
-            "Resource Allocation Report",
-            f"Workforce: {workforce_queryset.count()}, Materials: {material_queryset.count()}"
-        )
-        
-        # Workforce allocation table
-        story.append(Paragraph("Workforce Allocations", styles['Heading2']))
-        workforce_data = [['Batch', 'Worker', 'Role', 'Start Date', 'End Date']]
-        
-        for allocation in workforce_queryset[:50]:
-            workforce_data.append([
-                str(allocation.batch) if allocation.batch else 'N/A',
-                str(allocation.user) if allocation.user else 'N/A',
-                allocation.get_role_assigned_display() if hasattr(allocation, 'get_role_assigned_display') else allocation.role_assigned,
-                allocation.start_date.strftime('%Y-%m-%d') if allocation.start_date else 'N/A',
-                allocation.end_date.strftime('%Y-%m-%d') if allocation.end_date else 'N/A'
-            ])
-        
-        workforce_table = Table(workforce_data)
-        workforce_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.orange),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 12),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.lightyellow),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-        
-        story.append(workforce_table)
-        story.append(Paragraph("<br/><br/>", styles['Normal']))
+        styles = getSampleStyleSheet()
         
-        # Material allocation table
-        story.append(Paragraph("Material Allocations", styles['Heading2']))
-        material_data = [['Batch', 'Material', 'Quantity', 'Unit', 'Cost (XOF)', 'Supplier']]
-        
-        for allocation in material_queryset[:50]:
-            material_data.append([
-                str(allocation.batch) if allocation.batch else 'N/A',
-                allocation.material_name or 'N/A',
-                str(allocation.quantity) if allocation.quantity else '0',
-                allocation.get_unit_display() if hasattr(allocation, 'get_unit_display') else allocation.unit,
-                f"{allocation.total_cost:,.0f}" if allocation.total_cost else '0',
-                allocation.supplier or 'N/A'
-            ])
+        # Workforce allocation tables
+        workforce_headers = ['Batch', 'Worker', 'Role', 'Start Date', 'End Date']
+        workforce_tables = pdf_table_flowables(
+            workforce_headers, map(_workforce_pdf_row, iterate_export(workforce_queryset, 'batch', 'user')),
+            colors.orange, colors.lightyellow
+        )
         
-        material_table = Table(material_data)
-        material_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.brown),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 12),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.tan),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
+        # Material allocation tables
+        material_headers = ['Batch', 'Material', 'Quantity', 'Unit', 'Cost (XOF)', 'Supplier']
+        material_tables = pdf_table_flowables(
+            material_headers, map(_material_pdf_row, iterate_export(material_queryset, 'batch')),
+            colors.brown, colors.tan
+        )
         
-        story.append(material_table)
-        doc.build(story)
+        flowables = chain(
+            [Paragraph("Workforce Allocations", styles['Heading2'])],
+            workforce_tables,
+            [Paragraph("<br/><br/>", styles['Normal']), Paragraph("Material Allocations", styles['Heading2'])],
+            material_tables
+        )
         
-        # Return response
-        buffer.seek(0)
-        response = HttpResponse(buffer.getvalue(), content_type='application/pdf')
-        response['Content-Disposition'] = 'attachment; filename="allocation_report.pdf"'
-        return response
+        return pdf_report_response(
+            "Resource Allocation Report",
+            f"Workforce: {workforce_queryset.count()}, Materials: {material_queryset.count()}",
+            flowables,
+            'allocation_report.pdf'
+        )
         
     except Exception as e:
         logging.exception('Error in generate_allocation_pdf')
@@ -205,65 +172,51 @@ def generate_allocation_pdf(request):
 
 
 def generate_allocation_excel(request):
-    """Generate allocation Excel report"""
+    """Generate allocation Excel report, streaming every matching allocation"""
     try:
         from allocation.models import WorkforceAllocation, MaterialAllocation
         
         # Create Excel with multiple sheets
-        wb, ws, header_font, header_fill = create_excel_base("Resource Allocation")
+        wb = create_streaming_excel()
         
         # Workforce sheet
-        ws.title = "Workforce"
         workforce_queryset = apply_allocation_filters(WorkforceAllocation.objects.all(), request, 'workforce')
-        
         headers = ['Batch', 'Worker', 'Role', 'Start Date', 'End Date', 'Duration (Days)']
-        for col, header in enumerate(headers, 1):
-            cell = ws.cell(row=4, column=col, value=header)
-            cell.font = header_font
-            cell.fill = header_fill
+        ws = add_streaming_sheet(wb, "Resource Allocation", headers, sheet_title="Workforce")
         
-        for row, allocation in enumerate(workforce_queryset[:1000], 5):
-            ws.cell(row=row, column=1, value=str(allocation.batch) if allocation.batch else 'N/A')
-            ws.cell(row=row, column=2, value=str(allocation.user) if allocation.user else 'N/A')
-            ws.cell(row=row, column=3, value=allocation.role_assigned or 'N/A')
-            ws.cell(row=row, column=4, value=allocation.start_date.strftime('%Y-%m-%d') if allocation.start_date else 'N/A')
-            ws.cell(row=row, column=5, value=allocation.end_date.strftime('%Y-%m-%d') if allocation.end_date else 'N/A')
-            
+        for allocation in iterate_export(workforce_queryset, 'batch', 'user'):
             # Calculate duration
             if allocation.start_date and allocation.end_date:
                 duration = (allocation.end_date - allocation.start_date).days
-                ws.cell(row=row, column=6, value=duration)
             else:
-                ws.cell(row=row, column=6, value='N/A')
+                duration = 'N/A'
+            
+            ws.append([
+                str(allocation.batch) if allocation.batch else 'N/A',
+                str(allocation.user) if allocation.user else 'N/A',
+                allocation.role_assigned or 'N/A',
+                allocation.start_date.strftime('%Y-%m-%d') if allocation.start_date else 'N/A',
+                allocation.end_date.strftime('%Y-%m-%d') if allocation.end_date else 'N/A',
+                duration
+            ])
         
         # Material sheet
-        ws2 = wb.create_sheet("Materials")
         material_queryset = apply_allocation_filters(MaterialAllocation.objects.all(), request, 'material')
-        
-        # Headers for material sheet
-        ws2['A1'] = "TexPro AI - Material Allocation"
-        ws2['A2'] = f"Generated: {wb.worksheets[0]['A2'].value}"
-        
         material_headers = ['Batch', 'Material', 'Quantity', 'Unit', 'Cost per Unit', 'Total Cost (XOF)', 'Supplier']
-        for col, header in enumerate(material_headers, 1):
-            cell = ws2.cell(row=4, column=col, value=header)
-            cell.font = header_font
-            cell.fill = header_fill
+        ws2 = add_streaming_sheet(wb, "Material Allocation", material_headers, sheet_title="Materials")
         
-        for row, allocation in enumerate(material_queryset[:1000], 5):
-            ws2.cell(row=row, column=1, value=str(allocation.batch) if allocation.batch else 'N/A')
-            ws2.cell(row=row, column=2, value=allocation.material_name or 'N/A')
-            ws2.cell(row=row, column=3, value=float(allocation.quantity) if allocation.quantity else 0)
-            ws2.cell(row=row, column=4, value=allocation.unit or 'N/A')
-            ws2.cell(row=row, column=5, value=float(allocation.cost_per_unit) if allocation.cost_per_unit else 0)
-            ws2.cell(row=row, column=6, value=float(allocation.total_cost) if allocation.total_cost else 0)
-            ws2.cell(row=row, column=7, value=allocation.supplier or 'N/A')
+        for allocation in iterate_export(material_queryset, 'batch'):
+            ws2.append([
+                str(allocation.batch) if allocation.batch else 'N/A',
+                allocation.material_name or 'N/A',
+                float(allocation.quantity) if allocation.quantity else 0,
+                allocation.unit or 'N/A',
+                float(allocation.cost_per_unit) if allocation.cost_per_unit else 0,
+                float(allocation.total_cost) if allocation.total_cost else 0,
+                allocation.supplier or 'N/A'
+            ])
         
-        # Save to response
-        response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-        response['Content-Disposition'] = 'attachment; filename="allocation_report.xlsx"'
-        wb.save(response)
-        return response
+        return excel_file_response(wb, 'allocation_report.xlsx')
         
     except Exception as e:
         logging.exception('Error in generate_allocation_excel')
@@ -276,8 +229,8 @@ def generate_analytics_pdf(request):
     try:
         from analytics.services import get_dashboard_summary
         
-        # Get analytics data
-        dashboard_data = get_dashboard_summary()
+        # Get analytics data, for the requester's site
+        dashboard_data = get_dashboard_summary(user_site_code(request.user))
         
         # Create PDF
         buffer, doc, story, styles = create_pdf_base(
@@ -329,8 +282,8 @@ def generate_analytics_excel(request):
     try:
         from analytics.services import get_dashboard_summary
         
-        # Get analytics data
-        dashboard_data = get_dashboard_summary()
+        # Get analytics data, for the requester's site
+        dashboard_data = get_dashboard_summary(user_site_code(request.user))
         
         # Create Excel
         wb, ws, header_font, header_fill = create_excel_base("Analytics KPIs")
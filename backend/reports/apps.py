@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class ReportsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'reports'
+
+    def ready(self):
+        # Background report jobs and the due-schedule index
+        from reports.models import report_job, schedule_indexes  # noqa: F401
@@ -0,0 +1,337 @@
+"""
+Background report jobs for TexPro AI
+Reports requested through POST /api/v1/reports/jobs/ are rendered by a
+local thread pool (no external broker) and stored under MEDIA_ROOT.
+
+Identical requests (same report, format, filters, site and data) share a cache
+key: while a job is queued or running, or its artifact is still fresh,
+new requests get that job back instead of rendering the report again.
+"""
+import hashlib
+import json
+import logging
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import F
+from django.http import HttpRequest, QueryDict
+from django.utils import timezone
+
+from analytics.cache import DATA_SOURCES, get_generations
+from core.models import user_site_code
+from reports.models.report_job import ReportJob
+from reports.services import stream_report_response
+from reports.report_generators import (
+    generate_workflow_pdf, generate_workflow_excel,
+    generate_machine_pdf, generate_machine_excel,
+    generate_maintenance_pdf, generate_maintenance_excel
+)
+from reports.advanced_generators import (
+    generate_quality_pdf, generate_quality_excel,
+    generate_allocation_pdf, generate_allocation_excel,
+    generate_analytics_pdf, generate_analytics_excel
+)
+
+logger = logging.getLogger('texproai.reports')
+
+# PDF and Excel generators of each report; CSV and NDJSON stream the export rows
+REPORT_GENERATORS = {
+    'workflow': {'pdf': generate_workflow_pdf, 'excel': generate_workflow_excel},
+    'machines': {'pdf': generate_machine_pdf, 'excel': generate_machine_excel},
+    'maintenance': {'pdf': generate_maintenance_pdf, 'excel': generate_maintenance_excel},
+    'quality': {'pdf': generate_quality_pdf, 'excel': generate_quality_excel},
+    'allocation': {'pdf': generate_allocation_pdf, 'excel': generate_allocation_excel},
+    'analytics': {'pdf': generate_analytics_pdf, 'excel': generate_analytics_excel},
+}
+
+# Data sources each report reads: a change to one makes cached artifacts stale
+REPORT_SOURCES = {
+    'workflow': ('workflow',),
+    'machines': ('machines',),
+    'maintenance': ('maintenance', 'machines'),
+    'quality': ('quality',),
+    'allocation': ('allocation',),
+    'analytics': DATA_SOURCES,
+}
+
+ACTIVE_STATUSES = (ReportJob.Status.QUEUED, ReportJob.Status.RUNNING)
+
+# A job still queued after this long lost its worker (e.g. a restart) and is resubmitted
+STALE_QUEUED_AFTER = timedelta(minutes=10)
+
+# Seconds between heartbeats of a running job
+HEARTBEAT_INTERVAL = 30
+
+STALLED_ERROR = "The report worker stopped responding"
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _job_setting(name, default):
+    return getattr(settings, 'TEXPROAI_SETTINGS', {}).get(name, default)
+
+
+def normalize_filters(filters):
+    """Report query parameters as a sorted dict of strings, without empty values"""
+    return {
+        str(key): str(value)
+        for key, value in sorted((filters or {}).items())
+        if value not in (None, '') and key != 'format'
+    }
+
+
+def report_cache_key(report, export_format, filters, site_code):
+    """
+    Hash identifying the artifact of a report request, including the
+    generations of the data sources the report reads, so a change to them
+    gives new requests a new key
+    """
+    generations = get_generations(REPORT_SOURCES[report])
+    payload = json.dumps([report, export_format, filters, site_code, generations], sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def get_executor():
+    """The process-wide report worker pool, created on first use"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=_job_setting('REPORT_WORKERS', 2),
+                thread_name_prefix='texproai-report'
+            )
+        return _executor
+
+
+def submit_report_job(job_id):
+    """
+    Hand a job to the worker pool. With REPORT_WORKERS set to 0 the job
+    is rendered in the calling thread instead.
+    """
+    if _job_setting('REPORT_WORKERS', 2) <= 0:
+        run_report_job(job_id)
+        return
+    get_executor().submit(_run_in_worker, job_id)
+
+
+def _run_in_worker(job_id):
+    # Worker threads own their database connections
+    close_old_connections()
+    try:
+        run_report_job(job_id)
+    finally:
+        close_old_connections()
+
+
+def find_reusable_job(cache_key):
+    """
+    The job serving a cache key: an active job (a stalled one is requeued
+    first, or replaced once it ran out of attempts), or the latest completed
+    one if it is younger than REPORT_JOB_CACHE_MINUTES (the key changes
+    with the data the report reads)
+    """
+    active = ReportJob.objects.filter(cache_key=cache_key, status__in=ACTIVE_STATUSES).first()
+    if active is not None and requeue_stalled_jobs(ReportJob.objects.filter(pk=active.pk)):
+        active = ReportJob.objects.filter(cache_key=cache_key, status__in=ACTIVE_STATUSES).first()
+    if active is not None:
+        return active
+
+    fresh_after = timezone.now() - timedelta(minutes=_job_setting('REPORT_JOB_CACHE_MINUTES', 60))
+    completed = ReportJob.objects.filter(
+        cache_key=cache_key,
+        status=ReportJob.Status.COMPLETED,
+        completed_at__gte=fresh_after
+    ).order_by('-completed_at').first()
+    if completed is None or not completed.file:
+        return None
+    return completed
+
+
+def request_report_job(report, export_format, filters, user):
+    """
+    Queue a report for rendering, or return the job already serving an
+    identical request. Returns (job, created).
+    """
+    filters = normalize_filters(filters)
+    site_code = user_site_code(user) or ''
+    cache_key = report_cache_key(report, export_format, filters, site_code)
+
+    job = find_reusable_job(cache_key)
+    if job is not None:
+        if job.status == ReportJob.Status.QUEUED and job.created_at < timezone.now() - STALE_QUEUED_AFTER:
+            logger.warning("Resubmitting report job %s, queued since %s", job.pk, job.created_at)
+            transaction.on_commit(lambda: submit_report_job(job.pk))
+        return job, False
+
+    try:
+        with transaction.atomic():
+            job = ReportJob.objects.create(
+                report=report,
+                format=export_format,
+                filters=filters,
+                site_code=site_code,
+                cache_key=cache_key,
+                requested_by=user
+            )
+    except IntegrityError:
+        # An identical request queued the report concurrently
+        job = ReportJob.objects.filter(cache_key=cache_key, status__in=ACTIVE_STATUSES).first()
+        if job is None:
+            raise
+        return job, False
+
+    transaction.on_commit(lambda: submit_report_job(job.pk))
+    return job, True
+
+
+def build_report_request(filters, user, site_code=''):
+    """A GET request carrying report filters and the requester, for the report generators"""
+    request = HttpRequest()
+    request.method = 'GET'
+    request.GET = QueryDict(mutable=True)
+    request.GET.update(filters)
+    request.user = user
+    if site_code:
+        # The report keeps the site scope it was requested with
+        request.user.site_code = site_code
+    return request
+
+
+def render_report(report, export_format, request):
+    """Response of the report generator for a report and format"""
+    if export_format in (ReportJob.Format.CSV, ReportJob.Format.NDJSON):
+        return stream_report_response(report, request, export_format)
+    return REPORT_GENERATORS[report][export_format](request)
+
+
+def iter_report_content(response):
+    """Chunks of a successful report response; error responses raise RuntimeError"""
+    if response.status_code != 200:
+        raise RuntimeError(response.content.decode('utf-8', 'replace')[:500])
+    try:
+        yield from (response.streaming_content if response.streaming else [response.content])
+    finally:
+        response.close()
+
+
+class LeaseLost(Exception):
+    """The running job was requeued or finished by another worker"""
+
+
+def _running(job):
+    """The job as long as this run holds it"""
+    return ReportJob.objects.filter(pk=job.pk, status=ReportJob.Status.RUNNING, attempts=job.attempts)
+
+
+def _heartbeat(job):
+    if not _running(job).update(heartbeat_at=timezone.now()):
+        raise LeaseLost(job.pk)
+
+
+def run_report_job(job_id):
+    """
+    Render a queued job and store its artifact. A job is claimed with a
+    conditional update, so a job submitted twice is only rendered once.
+    The job heartbeats while its content is written; a run whose job was
+    requeued meanwhile stops and leaves the job to its new run.
+    """
+    now = timezone.now()
+    claimed = ReportJob.objects.filter(pk=job_id, status=ReportJob.Status.QUEUED).update(
+        status=ReportJob.Status.RUNNING, started_at=now, heartbeat_at=now, attempts=F('attempts') + 1
+    )
+    if not claimed:
+        return None
+
+    job = ReportJob.objects.select_related('requested_by').get(pk=job_id)
+    try:
+        # Site-restricted reports are never rendered without their requester's scope
+        if job.requested_by is None:
+            raise RuntimeError("The user who requested the report no longer exists")
+
+        request = build_report_request(job.filters, job.requested_by, job.site_code)
+        response = render_report(job.report, job.format, request)
+        with tempfile.TemporaryFile() as output:
+            beat_at = time.monotonic()
+            for chunk in iter_report_content(response):
+                output.write(chunk)
+                if time.monotonic() - beat_at >= HEARTBEAT_INTERVAL:
+                    _heartbeat(job)
+                    beat_at = time.monotonic()
+            output.seek(0)
+            job.file.save(job.filename, File(output), save=False)
+
+        job.status = ReportJob.Status.COMPLETED
+        job.error = ''
+    except LeaseLost:
+        logger.warning("Report job %s was requeued while rendering, dropping this run", job_id)
+        return None
+    except Exception as e:
+        logger.exception("Report job %s failed", job_id)
+        job.status = ReportJob.Status.FAILED
+        job.error = str(e)
+
+    job.completed_at = timezone.now()
+    finished = _running(job).update(
+        status=job.status, file=job.file.name or '', error=job.error, completed_at=job.completed_at
+    )
+    if not finished:
+        logger.warning("Report job %s was requeued while rendering, dropping this run", job_id)
+        if job.file:
+            job.file.delete(save=False)
+        return None
+    return job
+
+
+def requeue_stalled_jobs(jobs=None):
+    """
+    Requeue running jobs whose heartbeat is older than
+    REPORT_JOB_LEASE_MINUTES: their worker crashed or was restarted.
+    Jobs already run REPORT_JOB_MAX_ATTEMPTS times are marked failed
+    instead. Returns the number of stalled jobs.
+    """
+    now = timezone.now()
+    stalled = (ReportJob.objects.all() if jobs is None else jobs).filter(
+        status=ReportJob.Status.RUNNING,
+        heartbeat_at__lt=now - timedelta(minutes=_job_setting('REPORT_JOB_LEASE_MINUTES', 10))
+    )
+    max_attempts = _job_setting('REPORT_JOB_MAX_ATTEMPTS', 3)
+
+    failed = stalled.filter(attempts__gte=max_attempts).update(
+        status=ReportJob.Status.FAILED, error=STALLED_ERROR, completed_at=now
+    )
+    requeued = list(stalled.filter(attempts__lt=max_attempts).values_list('pk', flat=True))
+    if requeued:
+        stalled.filter(pk__in=requeued).update(status=ReportJob.Status.QUEUED, heartbeat_at=None)
+        logger.warning("Requeuing %d stalled report jobs", len(requeued))
+        for job_id in requeued:
+            transaction.on_commit(lambda job_id=job_id: submit_report_job(job_id))
+    if failed:
+        logger.warning("Marked %d stalled report jobs as failed", failed)
+    return failed + len(requeued)
+
+
+def prune_report_jobs():
+    """
+    Requeue stalled jobs, then delete finished jobs older than
+    REPORT_JOB_RETENTION_DAYS, with their files
+    """
+    requeue_stalled_jobs()
+    cutoff = timezone.now() - timedelta(days=_job_setting('REPORT_JOB_RETENTION_DAYS', 7))
+    expired = ReportJob.objects.filter(
+        status__in=[ReportJob.Status.COMPLETED, ReportJob.Status.FAILED],
+        created_at__lt=cutoff
+    )
+    deleted = 0
+    for job in expired.iterator():
+        if job.file:
+            job.file.delete(save=False)
+        job.delete()
+        deleted += 1
+    return deleted
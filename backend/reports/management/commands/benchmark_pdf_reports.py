@@ -0,0 +1,138 @@
+"""
+Management command to benchmark the paginated PDF report renderer
+Measures time and peak memory of the maintenance PDF as the log count grows
+"""
+import io
+import re
+import time
+import tracemalloc
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import RequestFactory
+from django.utils import timezone
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.platypus import SimpleDocTemplate, Table
+
+from machines.models import Machine, MachineType
+from maintenance.models import MaintenanceLog
+from reports.report_generators import _maintenance_pdf_row, generate_maintenance_pdf
+from reports.services import report_table_style
+
+User = get_user_model()
+
+PAGE_PATTERN = re.compile(rb'/Type /Page\b(?!s)')
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the maintenance PDF report against growing synthetic maintenance history (rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            type=str,
+            default='10000,100000',
+            help='Comma separated row counts to benchmark',
+        )
+        parser.add_argument(
+            '--legacy',
+            action='store_true',
+            help='Also measure a single Table holding every row (the previous layout)',
+        )
+
+    def handle(self, *args, **options):
+        sizes = sorted(int(size) for size in options['sizes'].split(','))
+
+        self.stdout.write('⏱️  Benchmarking maintenance PDF report...')
+        self.stdout.write(f"{'rows':>10} {'pages':>8} {'size (KiB)':>11} {'time (s)':>10} {'peak (KiB)':>12}"
+                          + (f" {'single time (s)':>16} {'single peak (KiB)':>18}" if options['legacy'] else ''))
+
+        request = RequestFactory().get('/api/v1/reports/maintenance/pdf/')
+        request.user = AnonymousUser()
+
+        # Everything is created inside one transaction and rolled back at the end
+        with transaction.atomic():
+            machine, technician = self._create_fixtures()
+            created = 0
+            for size in sizes:
+                self._create_logs(machine, technician, size - created)
+                created = size
+
+                (content, elapsed), peak = self._measure(lambda: self._render(request))
+                pages = len(PAGE_PATTERN.findall(content))
+                line = f'{size:>10} {pages:>8} {len(content) / 1024:>11.1f} {elapsed:>10.2f} {peak / 1024:>12.1f}'
+
+                if options['legacy']:
+                    (_, legacy_elapsed), legacy_peak = self._measure(self._render_single_table)
+                    line += f' {legacy_elapsed:>16.2f} {legacy_peak / 1024:>18.1f}'
+
+                self.stdout.write(line)
+
+            transaction.set_rollback(True)
+
+        self.stdout.write(self.style.SUCCESS('✅ Benchmark complete (synthetic data rolled back)'))
+
+    def _create_fixtures(self):
+        """Create a throwaway machine and technician for the synthetic logs"""
+        machine_type = MachineType.objects.create(name='Benchmark Machine Type')
+        machine = Machine.objects.bulk_create([
+            Machine(machine_id='BENCH-001', name='Benchmark Machine', machine_type=machine_type, site_code='BENCH')
+        ])[0]
+        technician = User.objects.create_user(
+            username='benchmark_technician',
+            role='technician',
+            employee_id='BENCH01'
+        )
+        return machine, technician
+
+    def _create_logs(self, machine, technician, count):
+        """Bulk insert completed logs with varied priorities and costs"""
+        if count <= 0:
+            return
+        resolved_base = timezone.now()
+        MaintenanceLog.objects.bulk_create(
+            (
+                MaintenanceLog(
+                    machine=machine,
+                    technician=technician,
+                    issue_reported='Synthetic benchmark issue',
+                    status='completed',
+                    priority=('low', 'medium', 'high', 'critical')[index % 4],
+                    cost=500 + index % 1000,
+                    resolved_at=resolved_base + timedelta(minutes=index % 720)
+                )
+                for index in range(count)
+            ),
+            batch_size=2000
+        )
+
+    def _render(self, request):
+        """Render the report through the endpoint's generator, returning (bytes, seconds)"""
+        started = time.perf_counter()
+        response = generate_maintenance_pdf(request)
+        content = b''.join(response.streaming_content)
+        response.close()
+        return content, time.perf_counter() - started
+
+    def _render_single_table(self):
+        """The previous layout: one Table of every row built in memory"""
+        started = time.perf_counter()
+        data = [['Machine', 'Type', 'Priority', 'Status', 'Start Date', 'Cost (XOF)']]
+        data.extend(_maintenance_pdf_row(log) for log in MaintenanceLog.objects.select_related('machine'))
+        table = Table(data, repeatRows=1)
+        table.setStyle(report_table_style(colors.darkgreen, colors.lightgreen))
+        buffer = io.BytesIO()
+        SimpleDocTemplate(buffer, pagesize=A4).build([table])
+        return buffer.getvalue(), time.perf_counter() - started
+
+    def _measure(self, func):
+        """Run func once, returning (its result, peak traced bytes)"""
+        tracemalloc.start()
+        result = func()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return result, peak
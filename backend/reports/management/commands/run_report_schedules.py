@@ -0,0 +1,34 @@
+"""
+Management command to run due report schedules outside the web workers
+Renders each due ReportSchedule and emails the reports in one batch.
+Use run_scheduled_jobs --loop to keep polling (job run_report_schedules).
+"""
+from django.core.management.base import BaseCommand
+
+from reports.schedules import SCHEDULE_BATCH_SIZE, run_due_schedules
+
+
+class Command(BaseCommand):
+    help = 'Render and email the report schedules that are due'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=SCHEDULE_BATCH_SIZE,
+            help='Maximum schedules to run',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Rendering threads (default: REPORT_WORKERS setting, 0 renders in this thread)',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write('📅 Running due report schedules...')
+        outcome = run_due_schedules(limit=options['limit'], workers=options['workers'])
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {outcome['claimed']}/{outcome['due']} schedules run, "
+            f"{outcome['sent']} emails sent, {outcome['unsent']} to retry, {outcome['failed']} failed"
+        ))
@@ -0,0 +1,45 @@
+"""
+Migration for background report jobs
+"""
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0002_alter_reportschedule_id'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('report', models.CharField(choices=[('workflow', 'Workflow Batches'), ('machines', 'Machine Status'), ('maintenance', 'Maintenance Logs'), ('quality', 'Quality Checks'), ('allocation', 'Resource Allocation'), ('analytics', 'Analytics KPIs')], max_length=20)),
+                ('format', models.CharField(choices=[('pdf', 'PDF'), ('excel', 'Excel'), ('csv', 'CSV'), ('ndjson', 'NDJSON')], default='pdf', max_length=10)),
+                ('filters', models.JSONField(blank=True, default=dict, help_text='Report query parameters')),
+                ('site_code', models.CharField(blank=True, default='', help_text='Site the report is restricted to', max_length=10)),
+                ('cache_key', models.CharField(help_text='Hash of report, format, filters and site', max_length=64)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], default='queued', max_length=10)),
+                ('file', models.FileField(blank=True, upload_to='reports/jobs/%Y/%m/')),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('requested_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='report_jobs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Report Job',
+                'verbose_name_plural': 'Report Jobs',
+                'db_table': 'reports_job',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['cache_key', '-completed_at'], name='reports_job_key_completed'), models.Index(fields=['status', 'created_at'], name='reports_job_status_created')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('status__in', ['queued', 'running'])), fields=('cache_key',), name='unique_active_report_job')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+"""
+Migration for the due-schedule index on ReportSchedule
+"""
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0003_report_job'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reportschedule',
+            index=models.Index(fields=['status', 'next_run'], name='reports_schedule_due_idx'),
+        ),
+    ]
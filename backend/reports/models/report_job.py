@@ -0,0 +1,92 @@
+"""
+Report job model for TexPro AI
+Reports rendered in the background, stored under MEDIA_ROOT
+
+A job is created by POST /api/v1/reports/jobs/ and rendered by the local
+report worker pool (reports.jobs). Jobs with the same report, format,
+filters and site share a cache_key: a request matching a job that is
+still running or whose artifact is still fresh reuses that job.
+
+A running job heartbeats while it renders; one whose heartbeat is older
+than the lease lost its worker (a crash or restart) and is requeued.
+"""
+import uuid
+
+from django.conf import settings
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+
+
+class ReportJob(models.Model):
+    """
+    A report rendered outside the request/response cycle
+    """
+
+    class Report(models.TextChoices):
+        WORKFLOW = 'workflow', _('Workflow Batches')
+        MACHINES = 'machines', _('Machine Status')
+        MAINTENANCE = 'maintenance', _('Maintenance Logs')
+        QUALITY = 'quality', _('Quality Checks')
+        ALLOCATION = 'allocation', _('Resource Allocation')
+        ANALYTICS = 'analytics', _('Analytics KPIs')
+
+    class Format(models.TextChoices):
+        PDF = 'pdf', _('PDF')
+        EXCEL = 'excel', _('Excel')
+        CSV = 'csv', _('CSV')
+        NDJSON = 'ndjson', _('NDJSON')
+
+    class Status(models.TextChoices):
+        QUEUED = 'queued', _('Queued')
+        RUNNING = 'running', _('Running')
+        COMPLETED = 'completed', _('Completed')
+        FAILED = 'failed', _('Failed')
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    report = models.CharField(max_length=20, choices=Report.choices)
+    format = models.CharField(max_length=10, choices=Format.choices, default=Format.PDF)
+    filters = models.JSONField(default=dict, blank=True, help_text=_('Report query parameters'))
+    site_code = models.CharField(max_length=10, blank=True, default='', help_text=_('Site the report is restricted to'))
+    cache_key = models.CharField(max_length=64, help_text=_('Hash of report, format, filters and site'))
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.QUEUED)
+    file = models.FileField(upload_to='reports/jobs/%Y/%m/', blank=True)
+    error = models.TextField(blank=True)
+    requested_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='report_jobs'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True, help_text=_('Last sign of life of the running worker'))
+    attempts = models.PositiveSmallIntegerField(default=0, help_text=_('Times the job was claimed by a worker'))
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'reports_job'
+        verbose_name = _('Report Job')
+        verbose_name_plural = _('Report Jobs')
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['cache_key', '-completed_at'], name='reports_job_key_completed'),
+            models.Index(fields=['status', 'created_at'], name='reports_job_status_created'),
+        ]
+        constraints = [
+            # At most one queued or running job per cache key
+            models.UniqueConstraint(
+                fields=['cache_key'],
+                condition=models.Q(status__in=['queued', 'running']),
+                name='unique_active_report_job'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.get_report_display()} ({self.format}) - {self.status}"
+
+    @property
+    def filename(self):
+        """Download name of the rendered report"""
+        extension = 'xlsx' if self.format == self.Format.EXCEL else self.format
+        return f"{self.report}_report.{extension}"
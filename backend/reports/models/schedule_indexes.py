@@ -0,0 +1,20 @@
+"""
+Due-schedule index for ReportSchedule
+TexPro AI - Scheduled report delivery
+
+The report scheduler (reports.schedules) polls for active schedules whose
+next_run has passed; this index answers that query without a table scan.
+"""
+from django.db import models
+
+from reports.models.report_schedule import ReportSchedule
+
+
+SCHEDULE_INDEXES = [
+    models.Index(fields=['status', 'next_run'], name='reports_schedule_due_idx'),
+]
+
+ReportSchedule._meta.indexes = [
+    *ReportSchedule._meta.indexes,
+    *(index for index in SCHEDULE_INDEXES if index.name not in {i.name for i in ReportSchedule._meta.indexes}),
+]
@@ -132,3 +132,14 @@ class AnalyticsReportsPermission(permissions.BasePermission):
         
         user_role = getattr(request.user, 'role', None)
         return user_role in ['admin', 'analyst']
+
+
+# Permission of each report, shared by its export views, background jobs and schedules
+REPORT_PERMISSIONS = {
+    'workflow': WorkflowReportsPermission,
+    'machines': MachineReportsPermission,
+    'maintenance': MaintenanceReportsPermission,
+    'quality': QualityReportsPermission,
+    'allocation': AllocationReportsPermission,
+    'analytics': AnalyticsReportsPermission,
+}
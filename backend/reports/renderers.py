@@ -0,0 +1,24 @@
+"""
+Reports renderers for TexPro AI
+Lets ?format=csv and ?format=ndjson through DRF content negotiation
+"""
+from rest_framework.renderers import JSONRenderer
+
+
+class CSVStreamRenderer(JSONRenderer):
+    """
+    Accepts format=csv on report endpoints. The rows themselves are
+    streamed by the view; only error payloads go through this renderer,
+    and they are rendered as JSON.
+    """
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+class NDJSONStreamRenderer(JSONRenderer):
+    """
+    Accepts format=ndjson on report endpoints. The rows themselves are
+    streamed by the view; error payloads are rendered as a JSON line.
+    """
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
@@ -6,63 +6,47 @@ PDF and Excel generation for each app module
 from django.http import HttpResponse
 import logging
 import traceback
-from reportlab.platypus import Table, TableStyle, Paragraph
 from reportlab.lib import colors
 from .services import (
-    create_pdf_base, create_excel_base,
+    create_streaming_excel, add_streaming_sheet, iterate_export, excel_file_response,
+    pdf_table_flowables, pdf_report_response,
     apply_workflow_filters, apply_machine_filters,
     apply_maintenance_filters, apply_quality_filters,
     apply_allocation_filters
 )
 
 
+def _workflow_pdf_row(batch):
+    """PDF table row of a workflow batch"""
+    return [
+        batch.batch_number or 'N/A',
+        batch.get_product_type_display() if hasattr(batch, 'get_product_type_display') else batch.product_type,
+        batch.get_status_display() if hasattr(batch, 'get_status_display') else batch.status,
+        batch.start_date.strftime('%Y-%m-%d') if batch.start_date else 'N/A',
+        batch.end_date.strftime('%Y-%m-%d') if batch.end_date else 'N/A'
+    ]
+
+
 def generate_workflow_pdf(request):
-    """Generate workflow batches PDF report"""
+    """Generate workflow batches PDF report over every matching batch"""
     try:
         from workflow.models import BatchWorkflow
         
         # Apply filters
         queryset = apply_workflow_filters(BatchWorkflow.objects.all(), request)
         
-        # Create PDF
-        buffer, doc, story, styles = create_pdf_base(
-            "Workflow Batches Report",
-            f"Total Batches: {queryset.count()}"
+        # Page-sized tables, filled while the document is laid out
+        headers = ['Batch Number', 'Product Type', 'Status', 'Start Date', 'End Date']
+        tables = pdf_table_flowables(
+            headers, map(_workflow_pdf_row, iterate_export(queryset)), colors.grey, colors.beige
         )
         
-        # Prepare data
-        data = [['Batch Number', 'Product Type', 'Status', 'Start Date', 'End Date']]
-        
-        for batch in queryset[:100]:  # Limit for performance
-            data.append([
-                batch.batch_number or 'N/A',
-                batch.get_product_type_display() if hasattr(batch, 'get_product_type_display') else batch.product_type,
-                batch.get_status_display() if hasattr(batch, 'get_status_display') else batch.status,
-                batch.start_date.strftime('%Y-%m-%d') if batch.start_date else 'N/A',
-                batch.end_date.strftime('%Y-%m-%d') if batch.end_date else 'N/A'
-            ])
-        
-        # Create table
-        table = Table(data)
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 12),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-        
-        story.append(table)
-        doc.build(story)
-        
-        # Return response
-        buffer.seek(0)
-        response = HttpResponse(buffer.getvalue(), content_type='application/pdf')
-        response['Content-Disposition'] = 'attachment; filename="workflow_report.pdf"'
-        return response
+        return pdf_report_response(
+            "Workflow Batches Report",
+            f"Total Batches: {queryset.count()}",
+            tables,
+            'workflow_report.pdf'
+        )
         
     except Exception as e:
         logging.exception('Error in generate_workflow_pdf')
@@ -71,7 +55,7 @@ def generate_workflow_pdf(request):
 
 
 def generate_workflow_excel(request):
-    """Generate workflow batches Excel report"""
+    """Generate workflow batches Excel report, streaming every matching batch"""
     try:
         from workflow.models import BatchWorkflow
         
@@ -79,35 +63,28 @@ def generate_workflow_excel(request):
         queryset = apply_workflow_filters(BatchWorkflow.objects.all(), request)
         
         # Create Excel
-        wb, ws, header_font, header_fill = create_excel_base("Workflow Batches")
-        
-        # Headers
         headers = ['Batch Number', 'Product Type', 'Status', 'Start Date', 'End Date', 'Duration (Days)']
-        for col, header in enumerate(headers, 1):
-            cell = ws.cell(row=4, column=col, value=header)
-            cell.font = header_font
-            cell.fill = header_fill
+        wb = create_streaming_excel()
+        ws = add_streaming_sheet(wb, "Workflow Batches", headers)
         
         # Data
-        for row, batch in enumerate(queryset[:1000], 5):  # Limit for performance
-            ws.cell(row=row, column=1, value=batch.batch_number or 'N/A')
-            ws.cell(row=row, column=2, value=batch.product_type or 'N/A')
-            ws.cell(row=row, column=3, value=batch.status or 'N/A')
-            ws.cell(row=row, column=4, value=batch.start_date.strftime('%Y-%m-%d') if batch.start_date else 'N/A')
-            ws.cell(row=row, column=5, value=batch.end_date.strftime('%Y-%m-%d') if batch.end_date else 'N/A')
-            
+        for batch in iterate_export(queryset):
             # Calculate duration
             if batch.start_date and batch.end_date:
                 duration = (batch.end_date - batch.start_date).days
-                ws.cell(row=row, column=6, value=duration)
             else:
-                ws.cell(row=row, column=6, value='N/A')
+                duration = 'N/A'
+            
+            ws.append([
+                batch.batch_number or 'N/A',
+                batch.product_type or 'N/A',
+                batch.status or 'N/A',
+                batch.start_date.strftime('%Y-%m-%d') if batch.start_date else 'N/A',
+                batch.end_date.strftime('%Y-%m-%d') if batch.end_date else 'N/A',
+                duration
+            ])
         
-        # Save to response
-        response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-        response['Content-Disposition'] = 'attachment; filename="workflow_report.xlsx"'
-        wb.save(response)
-        return response
+        return excel_file_response(wb, 'workflow_report.xlsx')
         
     except Exception as e:
         logging.exception('Error in generate_workflow_excel')
@@ -115,61 +92,46 @@ def generate_workflow_excel(request):
         return HttpResponse(f"Error generating Excel: {str(e)}", status=500)
 
 
+def _machine_pdf_row(machine):
+    """PDF table row of a machine"""
+    # Ensure machine_type is serializable for display (could be a Model instance)
+    mt = getattr(machine, 'machine_type', None)
+    if mt:
+        mt_display = mt.name if hasattr(mt, 'name') else str(mt)
+    else:
+        mt_display = 'N/A'
+
+    return [
+        machine.name or 'N/A',
+        mt_display,
+        machine.get_status_display() if hasattr(machine, 'get_status_display') else machine.status,
+        # Machine model uses `building`, `floor`, and `location_details` instead of `location`
+        " ".join(filter(None, [getattr(machine, 'building', ''), getattr(machine, 'floor', ''), getattr(machine, 'location_details', '')])) or 'N/A',
+        machine.installation_date.strftime('%Y-%m-%d') if hasattr(machine, 'installation_date') and machine.installation_date else 'N/A'
+    ]
+
+
 def generate_machine_pdf(request):
-    """Generate machine status PDF report"""
+    """Generate machine status PDF report over every matching machine"""
     try:
         from machines.models import Machine
         
         # Apply filters
         queryset = apply_machine_filters(Machine.objects.all(), request)
         
-        # Create PDF
-        buffer, doc, story, styles = create_pdf_base(
-            "Machine Status Report",
-            f"Total Machines: {queryset.count()}"
+        # Page-sized tables, filled while the document is laid out
+        headers = ['Machine Name', 'Type', 'Status', 'Location', 'Install Date']
+        tables = pdf_table_flowables(
+            headers, map(_machine_pdf_row, iterate_export(queryset, 'machine_type')),
+            colors.darkblue, colors.lightblue
         )
         
-        # Prepare data
-        data = [['Machine Name', 'Type', 'Status', 'Location', 'Install Date']]
-        
-        for machine in queryset[:100]:
-            # Ensure machine_type is serializable for display (could be a Model instance)
-            mt = getattr(machine, 'machine_type', None)
-            if mt:
-                mt_display = mt.name if hasattr(mt, 'name') else str(mt)
-            else:
-                mt_display = 'N/A'
-
-            data.append([
-                machine.name or 'N/A',
-                mt_display,
-                machine.get_status_display() if hasattr(machine, 'get_status_display') else machine.status,
-                # Machine model uses `building`, `floor`, and `location_details` instead of `location`
-                " ".join(filter(None, [getattr(machine, 'building', ''), getattr(machine, 'floor', ''), getattr(machine, 'location_details', '')])) or 'N/A',
-                machine.installation_date.strftime('%Y-%m-%d') if hasattr(machine, 'installation_date') and machine.installation_date else 'N/A'
-            ])
-        
-        # Create table
-        table = Table(data)
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.darkblue),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 12),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.lightblue),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-        
-        story.append(table)
-        doc.build(story)
-        
-        # Return response
-        buffer.seek(0)
-        response = HttpResponse(buffer.getvalue(), content_type='application/pdf')
-        response['Content-Disposition'] = 'attachment; filename="machine_report.pdf"'
-        return response
+        return pdf_report_response(
+            "Machine Status Report",
+            f"Total Machines: {queryset.count()}",
+            tables,
+            'machine_report.pdf'
+        )
         
     except Exception as e:
         logging.exception('Error in generate_machine_pdf')
@@ -178,7 +140,7 @@ def generate_machine_pdf(request):
 
 
 def generate_machine_excel(request):
-    """Generate machine status Excel report"""
+    """Generate machine status Excel report, streaming every matching machine"""
     try:
         from machines.models import Machine
         
@@ -186,17 +148,12 @@ def generate_machine_excel(request):
         queryset = apply_machine_filters(Machine.objects.all(), request)
         
         # Create Excel
-        wb, ws, header_font, header_fill = create_excel_base("Machine Status")
-        
-        # Headers
         headers = ['Machine Name', 'Type', 'Status', 'Location', 'Install Date', 'Capacity']
-        for col, header in enumerate(headers, 1):
-            cell = ws.cell(row=4, column=col, value=header)
-            cell.font = header_font
-            cell.fill = header_fill
+        wb = create_streaming_excel()
+        ws = add_streaming_sheet(wb, "Machine Status", headers)
         
         # Data
-        for row, machine in enumerate(queryset[:1000], 5):
+        for machine in iterate_export(queryset, 'machine_type'):
             # Ensure machine_type is serializable for Excel (avoid writing model instances)
             mt = getattr(machine, 'machine_type', None)
             if mt:
@@ -204,19 +161,17 @@ def generate_machine_excel(request):
             else:
                 mt_val = 'N/A'
 
-            ws.cell(row=row, column=1, value=machine.name or 'N/A')
-            ws.cell(row=row, column=2, value=mt_val)
-            ws.cell(row=row, column=3, value=machine.status or 'N/A')
-            # Combine building/floor/location_details for location display
-            ws.cell(row=row, column=4, value=(" ".join(filter(None, [getattr(machine, 'building', ''), getattr(machine, 'floor', ''), getattr(machine, 'location_details', '')])) or 'N/A'))
-            ws.cell(row=row, column=5, value=machine.installation_date.strftime('%Y-%m-%d') if hasattr(machine, 'installation_date') and machine.installation_date else 'N/A')
-            ws.cell(row=row, column=6, value=getattr(machine, 'capacity', 'N/A'))
+            ws.append([
+                machine.name or 'N/A',
+                mt_val,
+                machine.status or 'N/A',
+                # Combine building/floor/location_details for location display
+                " ".join(filter(None, [getattr(machine, 'building', ''), getattr(machine, 'floor', ''), getattr(machine, 'location_details', '')])) or 'N/A',
+                machine.installation_date.strftime('%Y-%m-%d') if hasattr(machine, 'installation_date') and machine.installation_date else 'N/A',
+                getattr(machine, 'capacity', 'N/A')
+            ])
         
-        # Save to response
-        response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-        response['Content-Disposition'] = 'attachment; filename="machine_report.xlsx"'
-        wb.save(response)
-        return response
+        return excel_file_response(wb, 'machine_report.xlsx')
         
     except Exception as e:
         logging.exception('Error in generate_machine_excel')
@@ -224,57 +179,42 @@ def generate_machine_excel(request):
         return HttpResponse(f"Error generating Excel: {str(e)}", status=500)
 
 
+def _maintenance_pdf_row(log):
+    """PDF table row of a maintenance log"""
+    return [
+        str(log.machine) if log.machine else 'N/A',
+        # MaintenanceLog does not have `maintenance_type` field in this project.
+        # Use `priority` as a substitute for the type/importance of the maintenance.
+        (log.get_priority_display() if hasattr(log, 'get_priority_display') else (getattr(log, 'priority', 'N/A'))),
+        log.get_priority_display() if hasattr(log, 'get_priority_display') else log.priority,
+        log.get_status_display() if hasattr(log, 'get_status_display') else log.status,
+        # Use `reported_at` as the start/report date
+        (log.reported_at.strftime('%Y-%m-%d') if getattr(log, 'reported_at', None) else 'N/A'),
+        f"{log.cost:,.0f}" if log.cost else '0'
+    ]
+
+
 def generate_maintenance_pdf(request):
-    """Generate maintenance logs PDF report"""
+    """Generate maintenance logs PDF report over every matching log"""
     try:
         from maintenance.models import MaintenanceLog
         
         # Apply filters
         queryset = apply_maintenance_filters(MaintenanceLog.objects.all(), request)
         
-        # Create PDF
-        buffer, doc, story, styles = create_pdf_base(
-            "Maintenance Logs Report",
-            f"Total Logs: {queryset.count()}"
+        # Page-sized tables, filled while the document is laid out
+        headers = ['Machine', 'Type', 'Priority', 'Status', 'Start Date', 'Cost (XOF)']
+        tables = pdf_table_flowables(
+            headers, map(_maintenance_pdf_row, iterate_export(queryset, 'machine')),
+            colors.darkgreen, colors.lightgreen
         )
         
-        # Prepare data
-        data = [['Machine', 'Type', 'Priority', 'Status', 'Start Date', 'Cost (XOF)']]
-        
-        for log in queryset[:100]:
-            data.append([
-                str(log.machine) if log.machine else 'N/A',
-                # MaintenanceLog does not have `maintenance_type` field in this project.
-                # Use `priority` as a substitute for the type/importance of the maintenance.
-                (log.get_priority_display() if hasattr(log, 'get_priority_display') else (getattr(log, 'priority', 'N/A'))),
-                log.get_priority_display() if hasattr(log, 'get_priority_display') else log.priority,
-                log.get_status_display() if hasattr(log, 'get_status_display') else log.status,
-                # Use `reported_at` as the start/report date
-                (log.reported_at.strftime('%Y-%m-%d') if getattr(log, 'reported_at', None) else 'N/A'),
-                f"{log.cost:,.0f}" if log.cost else '0'
-            ])
-        
-        # Create table
-        table = Table(data)
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.darkgreen),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 12),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.lightgreen),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-        
-        story.append(table)
-        doc.build(story)
-        
-        # Return response
-        buffer.seek(0)
-        response = HttpResponse(buffer.getvalue(), content_type='application/pdf')
-        response['Content-Disposition'] = 'attachment; filename="maintenance_report.pdf"'
-        return response
+        return pdf_report_response(
+            "Maintenance Logs Report",
+            f"Total Logs: {queryset.count()}",
+            tables,
+            'maintenance_report.pdf'
+        )
         
     except Exception as e:
         logging.exception('Error in generate_maintenance_pdf')
@@ -283,7 +223,7 @@ def generate_maintenance_pdf(request):
 
 
 def generate_maintenance_excel(request):
-    """Generate maintenance logs Excel report"""
+    """Generate maintenance logs Excel report, streaming every matching log"""
     try:
         from maintenance.models import MaintenanceLog
         
@@ -291,18 +231,12 @@ def generate_maintenance_excel(request):
         queryset = apply_maintenance_filters(MaintenanceLog.objects.all(), request)
         
         # Create Excel
-        wb, ws, header_font, header_fill = create_excel_base("Maintenance Logs")
-        
-        # Headers
         headers = ['Machine', 'Type', 'Priority', 'Status', 'Start Date', 'Completion', 'Cost (XOF)', 'Duration (Days)']
-        for col, header in enumerate(headers, 1):
-            cell = ws.cell(row=4, column=col, value=header)
-            cell.font = header_font
-            cell.fill = header_fill
+        wb = create_streaming_excel()
+        ws = add_streaming_sheet(wb, "Maintenance Logs", headers)
         
         # Data
-        for row, log in enumerate(queryset[:1000], 5):
-            ws.cell(row=row, column=1, value=str(log.machine) if log.machine else 'N/A')
+        for log in iterate_export(queryset, 'machine'):
             # MaintenanceLog may not have a `maintenance_type` field in this project.
             # Safely resolve it if present, otherwise fall back to priority display or 'N/A'.
             mt = getattr(log, 'maintenance_type', None)
@@ -310,42 +244,32 @@ def generate_maintenance_excel(request):
                 mt_val = mt.name if hasattr(mt, 'name') else str(mt)
             else:
                 mt_val = (log.get_priority_display() if hasattr(log, 'get_priority_display') else getattr(log, 'priority', 'N/A'))
-            ws.cell(row=row, column=2, value=mt_val)
-            ws.cell(row=row, column=3, value=(log.get_priority_display() if hasattr(log, 'get_priority_display') else (getattr(log, 'priority', 'N/A'))))
-            ws.cell(row=row, column=4, value=(log.get_status_display() if hasattr(log, 'get_status_display') else (getattr(log, 'status', 'N/A'))))
+            
             # Resolve start date: prefer explicit start_date, fall back to reported_at
             s_dt = getattr(log, 'start_date', None) or getattr(log, 'reported_at', None)
-            if s_dt:
-                s_val = s_dt.strftime('%Y-%m-%d')
-            else:
-                s_val = 'N/A'
-            ws.cell(row=row, column=5, value=s_val)
-
             # Completion date (may be missing)
             c_dt = getattr(log, 'completion_date', None)
-            if c_dt:
-                c_val = c_dt.strftime('%Y-%m-%d')
-            else:
-                c_val = 'N/A'
-            ws.cell(row=row, column=6, value=c_val)
-
-            ws.cell(row=row, column=7, value=float(getattr(log, 'cost', 0)) if getattr(log, 'cost', None) else 0)
 
             # Calculate duration using the best-available dates
+            duration = 'N/A'
             if s_dt and c_dt:
                 try:
                     duration = (c_dt - s_dt).days
-                    ws.cell(row=row, column=8, value=duration)
                 except Exception:
-                    ws.cell(row=row, column=8, value='N/A')
-            else:
-                ws.cell(row=row, column=8, value='N/A')
+                    pass
+            
+            ws.append([
+                str(log.machine) if log.machine else 'N/A',
+                mt_val,
+                (log.get_priority_display() if hasattr(log, 'get_priority_display') else (getattr(log, 'priority', 'N/A'))),
+                (log.get_status_display() if hasattr(log, 'get_status_display') else (getattr(log, 'status', 'N/A'))),
+                s_dt.strftime('%Y-%m-%d') if s_dt else 'N/A',
+                c_dt.strftime('%Y-%m-%d') if c_dt else 'N/A',
+                float(getattr(log, 'cost', 0)) if getattr(log, 'cost', None) else 0,
+                duration
+            ])
         
-        # Save to response
-        response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-        response['Content-Disposition'] = 'attachment; filename="maintenance_report.xlsx"'
-        wb.save(response)
-        return response
+        return excel_file_response(wb, 'maintenance_report.xlsx')
         
     except Exception as e:
         logging.exception('Error in generate_maintenance_excel')
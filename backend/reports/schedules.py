@@ -0,0 +1,252 @@
+"""
+Scheduled report delivery for TexPro AI
+Runs due ReportSchedule entries: each due schedule is claimed by moving
+its next_run forward with a conditional UPDATE, so concurrent scheduler
+processes never fire a schedule twice. Claimed reports are rendered by the
+existing generators in a local worker pool and emailed over a single
+connection to the configured email backend. A report whose email could
+not be sent gets its claimed run back, so the next run retries it.
+"""
+import calendar
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import close_old_connections
+from django.utils import timezone
+
+from reports.jobs import build_report_request, iter_report_content, render_report
+from reports.models.report_schedule import ReportSchedule
+from reports.permissions import REPORT_PERMISSIONS
+from reports.services import EXCEL_CONTENT_TYPE, STREAM_FORMATS
+
+logger = logging.getLogger('texproai.reports')
+
+# Report rendered for each schedule report_type
+SCHEDULE_REPORTS = {
+    'production': 'workflow',
+    'quality': 'quality',
+    'performance': 'machines',
+    'cost': 'maintenance',
+    'safety': 'maintenance',
+    'custom': 'analytics',
+}
+
+# Schedule format values accepted for each report format (anything else renders a PDF)
+SCHEDULE_FORMATS = {
+    'pdf': 'pdf',
+    'excel': 'excel',
+    'xlsx': 'excel',
+    'csv': 'csv',
+    'ndjson': 'ndjson',
+}
+
+ATTACHMENT_TYPES = {
+    'pdf': ('pdf', 'application/pdf'),
+    'excel': ('xlsx', EXCEL_CONTENT_TYPE),
+    'csv': ('csv', STREAM_FORMATS['csv']),
+    'ndjson': ('ndjson', STREAM_FORMATS['ndjson']),
+}
+
+# Length of each schedule frequency: (days, months)
+FREQUENCY_STEPS = {
+    'daily': (1, 0),
+    'weekly': (7, 0),
+    'monthly': (0, 1),
+    'quarterly': (0, 3),
+}
+
+# Schedules claimed per run, so a backlog is spread over several runs
+SCHEDULE_BATCH_SIZE = 100
+
+
+def _schedule_setting(name, default):
+    return getattr(settings, 'TEXPROAI_SETTINGS', {}).get(name, default)
+
+
+def shift_months(value, months):
+    """The same day and time the given number of months later (clamped to the month's end)"""
+    month_index = value.month - 1 + months
+    year, month = value.year + month_index // 12, month_index % 12 + 1
+    day = min(value.day, calendar.monthrange(year, month)[1])
+    return value.replace(year=year, month=month, day=day)
+
+
+def step(value, frequency, direction=1):
+    """Move a run time one frequency period forward (or back with direction=-1)"""
+    days, months = FREQUENCY_STEPS[frequency]
+    return shift_months(value, months * direction) + timedelta(days=days * direction)
+
+
+def advance_next_run(next_run, frequency, now):
+    """
+    First run time after now on the schedule's cadence. Runs missed while
+    the scheduler was down are skipped rather than replayed.
+    """
+    next_run = step(next_run, frequency)
+    while next_run <= now:
+        next_run = step(next_run, frequency)
+    return next_run
+
+
+def due_schedules(now, limit=SCHEDULE_BATCH_SIZE):
+    """Active, periodic schedules whose next_run has passed (reports_schedule_due_idx)"""
+    return list(
+        ReportSchedule.objects.filter(
+            status='active',
+            next_run__lte=now,
+            frequency__in=list(FREQUENCY_STEPS)
+        ).select_related('created_by').order_by('next_run')[:limit]
+    )
+
+
+def claim_schedule(schedule, now):
+    """
+    Advance a schedule's next_run if no other scheduler did so first.
+    Returns the run time that was claimed, or None.
+    """
+    run_at = schedule.next_run
+    claimed = ReportSchedule.objects.filter(
+        pk=schedule.pk, status='active', next_run=run_at
+    ).update(next_run=advance_next_run(run_at, schedule.frequency, now), updated_at=now)
+    return run_at if claimed else None
+
+
+def release_schedule(schedule, run_at, now):
+    """Give back a claimed run whose report was not delivered, so it is due again"""
+    ReportSchedule.objects.filter(
+        pk=schedule.pk, next_run=advance_next_run(run_at, schedule.frequency, now)
+    ).update(next_run=run_at, updated_at=now)
+
+
+def render_schedule(schedule, run_at):
+    """
+    Render the report of a claimed schedule as its creator, over the
+    period ending at run_at. Returns (filename, content, mimetype).
+    """
+    user = schedule.created_by
+    if user is None:
+        raise RuntimeError("The user who created the schedule no longer exists")
+
+    report = SCHEDULE_REPORTS.get(schedule.report_type, 'analytics')
+    export_format = SCHEDULE_FORMATS.get((schedule.format or '').lower(), 'pdf')
+    filters = {
+        'start_date': step(run_at, schedule.frequency, direction=-1).date().isoformat(),
+        'end_date': run_at.date().isoformat(),
+    }
+    request = build_report_request(filters, user)
+    if not REPORT_PERMISSIONS[report]().has_permission(request, None):
+        raise RuntimeError(f"{user} may not generate {report} reports")
+
+    content = b''.join(iter_report_content(render_report(report, export_format, request)))
+    extension, mimetype = ATTACHMENT_TYPES[export_format]
+    return f"{report}_report_{run_at:%Y%m%d}.{extension}", content, mimetype
+
+
+def _render_in_worker(schedule, run_at):
+    # Worker threads own their database connections
+    close_old_connections()
+    try:
+        return render_schedule(schedule, run_at)
+    finally:
+        close_old_connections()
+
+
+def build_schedule_email(schedule, run_at, attachment):
+    """Email of a rendered schedule to its recipients"""
+    message = EmailMessage(
+        subject=f"TexPro AI - {schedule.report_title}",
+        body=(
+            f"Your {schedule.get_frequency_display().lower()} report "
+            f"\"{schedule.report_title}\" for {run_at:%Y-%m-%d} is attached."
+        ),
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=schedule.get_recipients_list()
+    )
+    message.attach(*attachment)
+    return message
+
+
+def send_schedule_emails(deliveries):
+    """
+    Send (schedule, run_at, message) deliveries over one connection, each
+    message on its own so a failure does not lose the others.
+    Returns the sent count and the (schedule, run_at) pairs left unsent.
+    """
+    connection = get_connection()
+    try:
+        connection.open()
+    except Exception:
+        logger.exception("Email backend unavailable, %d scheduled reports not sent", len(deliveries))
+        return 0, [(schedule, run_at) for schedule, run_at, _ in deliveries]
+
+    sent, unsent = 0, []
+    try:
+        for schedule, run_at, message in deliveries:
+            try:
+                sent += connection.send_messages([message]) or 0
+            except Exception:
+                logger.exception("Emailing scheduled report %s (%s) failed", schedule.pk, schedule.report_title)
+                unsent.append((schedule, run_at))
+    finally:
+        connection.close()
+    return sent, unsent
+
+
+def run_due_schedules(now=None, limit=SCHEDULE_BATCH_SIZE, workers=None):
+    """
+    Claim, render and email every due schedule
+
+    Rendering runs in a pool of REPORT_WORKERS threads (0 renders in the
+    calling thread). A schedule whose report fails is marked failed and is
+    not retried until it is re-activated; one whose email fails is released
+    and retried on the next run.
+
+    Returns:
+        dict with due, claimed, sent, unsent and failed counts
+    """
+    now = now or timezone.now()
+    workers = _schedule_setting('REPORT_WORKERS', 2) if workers is None else workers
+
+    claimed = []
+    schedules = due_schedules(now, limit)
+    for schedule in schedules:
+        run_at = claim_schedule(schedule, now)
+        if run_at is not None:
+            claimed.append((schedule, run_at))
+
+    deliveries, failed = [], []
+    if workers > 0:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='texproai-schedule') as pool:
+            futures = [(schedule, run_at, pool.submit(_render_in_worker, schedule, run_at))
+                       for schedule, run_at in claimed]
+            results = [(schedule, run_at, future.exception() or future.result())
+                       for schedule, run_at, future in futures]
+    else:
+        results = []
+        for schedule, run_at in claimed:
+            try:
+                results.append((schedule, run_at, render_schedule(schedule, run_at)))
+            except Exception as e:
+                results.append((schedule, run_at, e))
+
+    for schedule, run_at, result in results:
+        if isinstance(result, Exception):
+            logger.error("Scheduled report %s (%s) failed: %s", schedule.pk, schedule.report_title, result)
+            failed.append(schedule.pk)
+        elif schedule.get_recipients_list():
+            deliveries.append((schedule, run_at, build_schedule_email(schedule, run_at, result)))
+
+    if failed:
+        ReportSchedule.objects.filter(pk__in=failed).update(status='failed', updated_at=now)
+
+    sent, unsent = send_schedule_emails(deliveries) if deliveries else (0, [])
+    for schedule, run_at in unsent:
+        release_schedule(schedule, run_at, now)
+
+    return {
+        'due': len(schedules), 'claimed': len(claimed), 'sent': sent,
+        'unsent': len(unsent), 'failed': len(failed)
+    }
@@ -0,0 +1,25 @@
+from django.urls import reverse
+from rest_framework import serializers
+from reports.models.report_job import ReportJob
+
+
+class ReportJobRequestSerializer(serializers.Serializer):
+    report = serializers.ChoiceField(choices=ReportJob.Report.choices)
+    format = serializers.ChoiceField(choices=ReportJob.Format.choices, default=ReportJob.Format.PDF)
+    filters = serializers.DictField(child=serializers.CharField(allow_blank=True), required=False, default=dict)
+
+
+class ReportJobSerializer(serializers.ModelSerializer):
+    download_url = serializers.SerializerMethodField(read_only=True)
+
+    class Meta:
+        model = ReportJob
+        fields = ['id', 'report', 'format', 'filters', 'status', 'error', 'download_url', 'created_at', 'started_at', 'completed_at']
+        read_only_fields = fields
+
+    def get_download_url(self, obj):
+        if obj.status != ReportJob.Status.COMPLETED or not obj.file:
+            return None
+        url = reverse('v1:report-job-download', kwargs={'job_id': obj.pk})
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
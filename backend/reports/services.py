@@ -1,13 +1,19 @@
 """
 Reports services for TexPro AI
-PDF and Excel generation with comprehensive filtering
+PDF, Excel, CSV and NDJSON generation with comprehensive filtering
 """
 
+import csv
 import io
+import json
+import tempfile
 from datetime import datetime, timedelta
 from django.utils import timezone
 from django.db.models import Q, Count, Sum, Avg
-from django.http import HttpResponse
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+
+from core.models import scope_to_user, user_site_code
 
 # PDF generation
 from reportlab.lib import colors
@@ -18,6 +24,7 @@ from reportlab.lib.units import inch
 
 # Excel generation
 from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import Font, Alignment, PatternFill
 from openpyxl.utils.dataframe import dataframe_to_rows
 
@@ -89,6 +96,9 @@ def apply_workflow_filters(queryset, request):
 
 def apply_machine_filters(queryset, request):
     """Apply filters to machine queryset"""
+    # Restrict to the requesting user's site
+    queryset = scope_to_user(queryset, request.user)
+
     # Status filter
     status = request.GET.get('status')
     if status:
@@ -110,6 +120,9 @@ def apply_machine_filters(queryset, request):
 def apply_maintenance_filters(queryset, request):
     """Apply filters to maintenance queryset"""
     filters = parse_date_filters(request)
+
+    # Restrict to the machines of the requesting user's site
+    queryset = scope_to_user(queryset, request.user, 'machine__site_code')
     
     # Date filters
     # Map generic start/end filters to model fields: MaintenanceLog uses
@@ -207,10 +220,16 @@ def apply_allocation_filters(queryset, request, model_type='workforce'):
     return queryset
 
 
-def create_pdf_base(title, subtitle=""):
-    """Create base PDF document with TexPro AI branding"""
-    buffer = io.BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4)
+def create_pdf_base(title, subtitle="", output=None, doc_class=SimpleDocTemplate):
+    """
+    Create base PDF document with TexPro AI branding
+    
+    Args:
+        output: file-like object to write to (a new BytesIO by default)
+        doc_class: document template class to instantiate
+    """
+    buffer = output if output is not None else io.BytesIO()
+    doc = doc_class(buffer, pagesize=A4)
     styles = getSampleStyleSheet()
     story = []
     
@@ -268,3 +287,303 @@ def create_excel_base(title):
     ws['A2'].font = Font(italic=True)
     
     return wb, ws, header_font, header_fill
+
+
+EXCEL_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+# Rows fetched per database round trip by streaming exports
+EXPORT_CHUNK_SIZE = 2000
+
+# Exports up to this size stay in memory, larger ones go to a temp file
+EXPORT_SPOOL_MAX_SIZE = 5 * 1024 * 1024
+
+
+def create_streaming_excel():
+    """
+    Create a write-only Excel workbook for exports of any size.
+    Rows are written with worksheet.append() and flushed as they go, so
+    memory use does not grow with the row count.
+    """
+    return Workbook(write_only=True)
+
+
+def add_streaming_sheet(wb, title, headers, sheet_title=None):
+    """
+    Add a write-only sheet with the TexPro AI title, timestamp and header rows
+    (the same layout as create_excel_base), ready for data rows.
+    """
+    ws = wb.create_sheet(sheet_title or title)
+
+    title_cell = WriteOnlyCell(ws, value=f"TexPro AI - {title}")
+    title_cell.font = Font(bold=True, size=16)
+    timestamp_cell = WriteOnlyCell(ws, value=f"Generated: {timezone.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    timestamp_cell.font = Font(italic=True)
+
+    header_font = Font(bold=True, color="FFFFFF")
+    header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
+    header_cells = []
+    for header in headers:
+        cell = WriteOnlyCell(ws, value=header)
+        cell.font = header_font
+        cell.fill = header_fill
+        header_cells.append(cell)
+
+    ws.append([title_cell])
+    ws.append([timestamp_cell])
+    ws.append([])
+    ws.append(header_cells)
+    return ws
+
+
+def iterate_export(queryset, *related):
+    """
+    Iterate over an export queryset in chunks without caching the results,
+    joining the given foreign keys so rows need no extra queries
+    """
+    if related:
+        queryset = queryset.select_related(*related)
+    return queryset.iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+
+def excel_file_response(wb, filename):
+    """
+    Save a workbook to a spooled temp file and return it as a download.
+    The file is closed (and removed) when the response is closed.
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_MAX_SIZE)
+    wb.save(spool)
+    spool.seek(0)
+    return FileResponse(spool, as_attachment=True, filename=filename, content_type=EXCEL_CONTENT_TYPE)
+
+
+# Data rows per table flowable; a table of this size fills about one A4 page
+PDF_ROWS_PER_TABLE = 35
+
+# Width available to tables between the default 1 inch margins
+PDF_FRAME_WIDTH = A4[0] - 2 * inch
+
+
+class ChunkedTableDocTemplate(SimpleDocTemplate):
+    """
+    Document template pulling its flowables from an iterator while the
+    document is built. Only the page being laid out is held in memory;
+    finished pages are kept compressed by reportlab until the file is saved.
+    """
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pending = None
+        self.story = None
+    
+    def build(self, flowables, pending=None, **kwargs):
+        """Build from the given flowables followed by the pending iterator"""
+        self.pending = iter(pending) if pending is not None else None
+        self.story = list(flowables)
+        super().build(self.story, **kwargs)
+    
+    def filterFlowables(self, flowables):
+        """Top up the story before its last flowable is taken"""
+        if flowables is self.story and len(flowables) <= 1 and self.pending is not None:
+            flowable = next(self.pending, None)
+            if flowable is None:
+                self.pending = None
+            else:
+                flowables.append(flowable)
+        super().filterFlowables(flowables)
+
+
+def report_table_style(header_color, body_color):
+    """Style of the report tables: a bold coloured header over a gridded body"""
+    return TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), header_color),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 12),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), body_color),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black)
+    ])
+
+
+def pdf_table_flowables(headers, rows, header_color, body_color, rows_per_table=PDF_ROWS_PER_TABLE):
+    """
+    Yield page-sized tables of rows, each with the header row (repeated
+    should a table still break across pages) and the same column widths
+    """
+    style = report_table_style(header_color, body_color)
+    col_widths = [PDF_FRAME_WIDTH / len(headers)] * len(headers)
+    
+    chunk = []
+    emitted = False
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == rows_per_table:
+            yield Table([headers] + chunk, colWidths=col_widths, repeatRows=1, style=style)
+            chunk = []
+            emitted = True
+    if chunk or not emitted:
+        yield Table([headers] + chunk, colWidths=col_widths, repeatRows=1, style=style)
+
+
+def pdf_report_response(title, subtitle, flowables, filename):
+    """
+    Render a report PDF to a spooled temp file and return it as a download.
+    flowables may be any iterable (e.g. pdf_table_flowables over a queryset
+    iterator); it is consumed while the document is laid out.
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_MAX_SIZE)
+    _, doc, story, _ = create_pdf_base(title, subtitle, output=spool, doc_class=ChunkedTableDocTemplate)
+    doc.build(story, pending=flowables)
+    spool.seek(0)
+    return FileResponse(spool, as_attachment=True, filename=filename, content_type='application/pdf')
+
+
+# Row exports streamed as CSV or NDJSON
+STREAM_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+# Columns of each row export: (column name, field path read with values_list)
+EXPORT_COLUMNS = {
+    'workflow': [
+        ('batch_code', 'batch_code'),
+        ('status', 'status'),
+        ('start_date', 'start_date'),
+        ('end_date', 'end_date'),
+        ('supervisor', 'supervisor__username'),
+        ('created_at', 'created_at'),
+    ],
+    'machines': [
+        ('machine_id', 'machine_id'),
+        ('name', 'name'),
+        ('machine_type', 'machine_type__name'),
+        ('operational_status', 'operational_status'),
+        ('site_code', 'site_code'),
+        ('building', 'building'),
+        ('installation_date', 'installation_date'),
+        ('total_operating_hours', 'total_operating_hours'),
+        ('hours_since_maintenance', 'hours_since_maintenance'),
+    ],
+    'maintenance': [
+        ('machine_id', 'machine__machine_id'),
+        ('machine_name', 'machine__name'),
+        ('technician', 'technician__username'),
+        ('priority', 'priority'),
+        ('status', 'status'),
+        ('reported_at', 'reported_at'),
+        ('resolved_at', 'resolved_at'),
+        ('downtime_hours', 'downtime_hours'),
+        ('cost', 'cost'),
+    ],
+    'quality': [
+        ('batch_code', 'batch__batch_code'),
+        ('inspector', 'inspector__username'),
+        ('status', 'status'),
+        ('defect_detected', 'defect_detected'),
+        ('defect_type', 'defect_type'),
+        ('severity', 'severity'),
+        ('ai_confidence_score', 'ai_confidence_score'),
+        ('created_at', 'created_at'),
+    ],
+    'workforce': [
+        ('batch_code', 'batch__batch_code'),
+        ('worker', 'user__username'),
+        ('role_assigned', 'role_assigned'),
+        ('start_date', 'start_date'),
+        ('end_date', 'end_date'),
+    ],
+    'material': [
+        ('batch_code', 'batch__batch_code'),
+        ('material_name', 'material_name'),
+        ('quantity', 'quantity'),
+        ('unit', 'unit'),
+        ('cost_per_unit', 'cost_per_unit'),
+        ('supplier', 'supplier'),
+    ],
+}
+
+
+def get_stream_format(request):
+    """The requested streaming format (csv or ndjson), or None"""
+    export_format = request.GET.get('format', '').lower()
+    return export_format if export_format in STREAM_FORMATS else None
+
+
+def get_export_queryset(report, request):
+    """
+    Filtered queryset of a row export, with the EXPORT_COLUMNS key to read.
+    Allocation exports read workforce allocations unless
+    allocation_type=material is given.
+    """
+    if report == 'workflow':
+        from workflow.models import BatchWorkflow
+        return apply_workflow_filters(BatchWorkflow.objects.all(), request), 'workflow'
+    if report == 'machines':
+        from machines.models import Machine
+        return apply_machine_filters(Machine.objects.all(), request), 'machines'
+    if report == 'maintenance':
+        from maintenance.models import MaintenanceLog
+        return apply_maintenance_filters(MaintenanceLog.objects.all(), request), 'maintenance'
+    if report == 'quality':
+        from quality.models import QualityCheck
+        return apply_quality_filters(QualityCheck.objects.all(), request), 'quality'
+    if report == 'allocation':
+        from allocation.models import WorkforceAllocation, MaterialAllocation
+        if request.GET.get('allocation_type') == 'material':
+            return apply_allocation_filters(MaterialAllocation.objects.all(), request, 'material'), 'material'
+        return apply_allocation_filters(WorkforceAllocation.objects.all(), request, 'workforce'), 'workforce'
+    raise ValueError(f"Unknown report: {report}")
+
+
+def export_rows(report, request):
+    """
+    Column names and row tuples of a report export. Rows are read as
+    plain values in chunks, so no model instances are built.
+    The analytics report exports the dashboard summary as metric/value rows.
+    """
+    if report == 'analytics':
+        from analytics.services import get_dashboard_summary
+        summary = get_dashboard_summary(user_site_code(request.user)).get('summary', {})
+        return ['metric', 'value'], iter(summary.items())
+
+    queryset, key = get_export_queryset(report, request)
+    columns = EXPORT_COLUMNS[key]
+    rows = queryset.values_list(*[field for _, field in columns])
+    return [name for name, _ in columns], rows.iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+
+class _Echo:
+    """File-like object returning what is written, for streaming csv.writer output"""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(columns, rows):
+    """Yield CSV lines: a header line, then one line per row"""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def iter_ndjson(columns, rows):
+    """Yield one JSON object per row, keyed by column name"""
+    for row in rows:
+        yield json.dumps(dict(zip(columns, row)), cls=DjangoJSONEncoder) + '\n'
+
+
+def stream_report_response(report, request, export_format):
+    """
+    Stream the rows of a report as CSV or NDJSON.
+    Rows are written while they are read, so the response starts at once
+    and memory use does not grow with the row count.
+    """
+    columns, rows = export_rows(report, request)
+    content = iter_csv(columns, rows) if export_format == 'csv' else iter_ndjson(columns, rows)
+
+    response = StreamingHttpResponse(content, content_type=STREAM_FORMATS[export_format])
+    response['Content-Disposition'] = f'attachment; filename="{report}_report.{export_format}"'
+    return response
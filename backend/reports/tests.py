@@ -1,3 +1,469 @@
-from django.test import TestCase
+"""
+Test suite for reports app
+Tests the report export endpoints
+"""
+import io
+import json
+import re
+import shutil
+import tempfile
+from datetime import datetime, timedelta, timezone as dt_timezone
+from io import StringIO
+from smtplib import SMTPException
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.mail.backends import locmem
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from openpyxl import load_workbook
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from analytics.cache import bump_generation
+from machines.models import Machine, MachineType
+from maintenance.models import MaintenanceLog
+from reports.jobs import LeaseLost, _heartbeat, prune_report_jobs
+from reports.models.report_job import ReportJob
+from reports.models.report_schedule import ReportSchedule
+from reports.schedules import advance_next_run
+from reports.services import PDF_ROWS_PER_TABLE
+
+User = get_user_model()
+
+
+# LARGE EXPORT TESTS
+class LargeReportExportTest(APITestCase):
+    """Test cases for the Excel and PDF exports beyond the former row caps"""
+
+    LOG_COUNT = 1200
+
+    def setUp(self):
+        """Set up more maintenance logs than the former 1,000-row cap"""
+        self.admin = User.objects.create_user(
+            username="admin_user",
+            email="admin@texpro.com",
+            password="testpass123",
+            role="admin",
+            status="active",
+            employee_id="AD0001"
+        )
+        technician = User.objects.create_user(
+            username="technician_user",
+            email="technician@texpro.com",
+            password="testpass123",
+            role="technician",
+            status="active",
+            employee_id="TE0001"
+        )
+        machine_type = MachineType.objects.create(name="Weaving Loom")
+        machines = Machine.objects.bulk_create([
+            Machine(machine_id=f"WVG-LOM-{index:03d}", name=f"Loom {index}",
+                    machine_type=machine_type, site_code="BAM001")
+            for index in range(3)
+        ])
+        # bulk_create keeps the notification signals out of the fixtures
+        MaintenanceLog.objects.bulk_create([
+            MaintenanceLog(
+                machine=machines[index % len(machines)],
+                technician=technician,
+                issue_reported=f"Issue {index}",
+                status="completed",
+                cost=1000
+            )
+            for index in range(self.LOG_COUNT)
+        ])
+        self.client.force_authenticate(user=self.admin)
+
+    def test_maintenance_excel_exports_every_row(self):
+        """Test every log is exported, with machines joined in the same query"""
+        # Logs and their machines are read in a single chunked query
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('v1:maintenance-report-excel'))
+            content = b''.join(response.streaming_content)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('maintenance_report.xlsx', response['Content-Disposition'])
+
+        ws = load_workbook(io.BytesIO(content), read_only=True).active
+        rows = list(ws.iter_rows(values_only=True))
+        self.assertEqual(rows[0][0], "TexPro AI - Maintenance Logs")
+        self.assertEqual(rows[3][0], "Machine")
+        self.assertEqual(len(rows), 4 + self.LOG_COUNT)
+        self.assertEqual(rows[-1][6], 1000)
+
+    def test_maintenance_pdf_paginates_every_row(self):
+        """Test every log is rendered over page-sized tables"""
+        # Count for the subtitle, then one joined query for the rows
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('v1:maintenance-report-pdf'))
+            content = b''.join(response.streaming_content)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertTrue(content.startswith(b'%PDF'))
+        pages = len(re.findall(rb'/Type /Page\b(?!s)', content))
+        self.assertGreaterEqual(pages, self.LOG_COUNT // PDF_ROWS_PER_TABLE)
+
+    def test_pdf_benchmark_command_rolls_back(self):
+        """Test the PDF benchmark command leaves no synthetic rows behind"""
+        out = StringIO()
+        call_command('benchmark_pdf_reports', '--sizes', '50,100', '--legacy', stdout=out)
+
+        self.assertIn('Benchmark complete', out.getvalue())
+        self.assertEqual(MaintenanceLog.objects.count(), self.LOG_COUNT)
+
+
+# STREAMING ROW EXPORT TESTS
+class StreamingRowExportTest(APITestCase):
+    """Test cases for the CSV and NDJSON row exports"""
+
+    def setUp(self):
+        """Set up machines at two sites"""
+        self.admin = User.objects.create_user(
+            username="admin_user",
+            email="admin@texpro.com",
+            password="testpass123",
+            role="admin",
+            status="active",
+            employee_id="AD0001"
+        )
+        machine_type = MachineType.objects.create(name="Weaving Loom")
+        Machine.objects.bulk_create([
+            Machine(machine_id=f"WVG-LOM-{index:03d}", name=f"Loom {index}", machine_type=machine_type,
+                    site_code=site_code, operational_status="running", total_operating_hours=index * 10)
+            for index, site_code in enumerate(["BAM001", "BAM001", "SEG001"])
+        ])
+        self.client.force_authenticate(user=self.admin)
+
+    def test_csv_streams_filtered_rows(self):
+        """Test format=csv streams one line per machine from a single query"""
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('v1:machine-report-pdf'), {'format': 'csv'})
+            lines = b''.join(response.streaming_content).decode().splitlines()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertIn('machines_report.csv', response['Content-Disposition'])
+        self.assertEqual(lines[0].split(',')[:3], ['machine_id', 'name', 'machine_type'])
+        self.assertEqual(len(lines), 4)
+        self.assertIn('WVG-LOM-002,Loom 2,Weaving Loom,running,SEG001,,,20.0,0.0', lines[1:])
+
+    def test_ndjson_streams_one_object_per_row(self):
+        """Test format=ndjson streams a JSON object per row, keyed by column"""
+        response = self.client.get(reverse('v1:machine-report-excel'), {'format': 'ndjson'})
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertEqual(
+            sorted(row['machine_id'] for row in rows),
+            ["WVG-LOM-000", "WVG-LOM-001", "WVG-LOM-002"]
+        )
+        by_id = {row['machine_id']: row for row in rows}
+        self.assertEqual(by_id["WVG-LOM-002"]['site_code'], "SEG001")
+        self.assertEqual(by_id["WVG-LOM-002"]['total_operating_hours'], 20)
+
+    def test_analytics_export_is_scoped_to_site(self):
+        """Test the analytics export of a site analyst only counts that site's machines"""
+        analyst = User.objects.create_user(
+            username="analyst_user",
+            email="analyst@texpro.com",
+            password="testpass123",
+            role="analyst",
+            status="active",
+            employee_id="AN0001"
+        )
+        analyst.site_code = "SEG001"
+        self.client.force_authenticate(user=analyst)
+
+        response = self.client.get(reverse('v1:analytics-report-pdf'), {'format': 'csv'})
+        lines = b''.join(response.streaming_content).decode().splitlines()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('operational_machines,1', lines)
+
+
+# REPORT JOB TESTS
+class ReportJobTest(APITestCase):
+    """Test cases for background report jobs"""
+
+    @classmethod
+    def setUpClass(cls):
+        """Store rendered reports in a temporary media root"""
+        super().setUpClass()
+        cls.media_root = tempfile.mkdtemp()
+        cls.settings_override = override_settings(
+            MEDIA_ROOT=cls.media_root,
+            TEXPROAI_SETTINGS={'REPORT_WORKERS': 0, 'REPORT_JOB_CACHE_MINUTES': 60}
+        )
+        cls.settings_override.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings_override.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        """Set up machines at two sites and a supervisor at each"""
+        self.supervisor = User.objects.create_user(
+            username="supervisor_user",
+            email="supervisor@texpro.com",
+            password="testpass123",
+            role="supervisor",
+            status="active",
+            employee_id="SU0001"
+        )
+        self.supervisor.site_code = "BAM001"
+        self.other_supervisor = User.objects.create_user(
+            username="other_supervisor",
+            email="other.supervisor@texpro.com",
+            password="testpass123",
+            role="supervisor",
+            status="active",
+            employee_id="SU0002"
+        )
+        self.other_supervisor.site_code = "SEG001"
+        machine_type = MachineType.objects.create(name="Weaving Loom")
+        Machine.objects.bulk_create([
+            Machine(machine_id=f"WVG-LOM-{index:03d}", name=f"Loom {index}",
+                    machine_type=machine_type, site_code=site_code)
+            for index, site_code in enumerate(["BAM001", "BAM001", "SEG001"])
+        ])
+        self.client.force_authenticate(user=self.supervisor)
+
+    def request_job(self, **payload):
+        payload.setdefault('report', 'machines')
+        payload.setdefault('format', 'csv')
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(reverse('v1:report-jobs'), payload, format='json')
+
+    def test_job_renders_and_downloads(self):
+        """Test a queued job is rendered, stored and downloadable by id"""
+        response = self.request_job()
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertFalse(response.data['deduplicated'])
+        job_id = response.data['data']['id']
+
+        detail = self.client.get(reverse('v1:report-job-detail', kwargs={'job_id': job_id}))
+        self.assertEqual(detail.data['data']['status'], 'completed')
+        self.assertIsNotNone(detail.data['data']['download_url'])
+
+        download = self.client.get(reverse('v1:report-job-download', kwargs={'job_id': job_id}))
+        self.assertEqual(download.status_code, status.HTTP_200_OK)
+        self.assertIn('machines_report.csv', download['Content-Disposition'])
+        lines = b''.join(download.streaming_content).decode().splitlines()
+        # Header and the two machines of the supervisor's site
+        self.assertEqual(len(lines), 3)
+        self.assertTrue(ReportJob.objects.get(pk=job_id).file.name.startswith('reports/jobs/'))
+
+    def test_identical_requests_share_artifact(self):
+        """Test identical filters reuse the job until the data changes"""
+        first = self.request_job(filters={'status': 'idle'})
+        second = self.request_job(filters={'status': 'idle'})
+
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertTrue(second.data['deduplicated'])
+        self.assertEqual(second.data['data']['id'], first.data['data']['id'])
+
+        other_filters = self.request_job(filters={'status': 'running'})
+        self.assertNotEqual(other_filters.data['data']['id'], first.data['data']['id'])
+
+        bump_generation('machines')
+        after_change = self.request_job(filters={'status': 'idle'})
+        self.assertFalse(after_change.data['deduplicated'])
+        self.assertEqual(ReportJob.objects.count(), 3)
+
+    def stall_job(self, attempts=1):
+        """A job left running by a worker that crashed 20 minutes ago"""
+        job_id = self.request_job().data['data']['id']
+        stalled_at = timezone.now() - timedelta(minutes=20)
+        ReportJob.objects.filter(pk=job_id).update(
+            status=ReportJob.Status.RUNNING, file='', completed_at=None,
+            started_at=stalled_at, heartbeat_at=stalled_at, attempts=attempts
+        )
+        return job_id
+
+    def test_stalled_job_is_requeued_on_request(self):
+        """Test an identical request requeues a running job that stopped heartbeating"""
+        job_id = self.stall_job()
+
+        response = self.request_job()
+
+        self.assertEqual(response.data['data']['id'], job_id)
+        job = ReportJob.objects.get(pk=job_id)
+        self.assertEqual(job.status, ReportJob.Status.COMPLETED)
+        self.assertEqual(job.attempts, 2)
+        self.assertTrue(job.file)
+
+    def test_stalled_job_out_of_attempts_is_replaced(self):
+        """Test a stalled job that ran out of attempts fails and a new job serves the request"""
+        job_id = self.stall_job(attempts=3)
+
+        response = self.request_job()
+
+        self.assertNotEqual(response.data['data']['id'], job_id)
+        self.assertFalse(response.data['deduplicated'])
+        stalled = ReportJob.objects.get(pk=job_id)
+        self.assertEqual(stalled.status, ReportJob.Status.FAILED)
+        self.assertIn('stopped responding', stalled.error)
+
+    def test_prune_requeues_stalled_jobs(self):
+        """Test the prune job requeues stalled jobs and leaves live ones running"""
+        job_id = self.stall_job()
+        live_at = timezone.now()
+        live = ReportJob.objects.create(
+            report='machines', format='pdf', cache_key='live', status=ReportJob.Status.RUNNING,
+            started_at=live_at, heartbeat_at=live_at, attempts=1, requested_by=self.supervisor
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            prune_report_jobs()
+
+        self.assertEqual(ReportJob.objects.get(pk=job_id).status, ReportJob.Status.COMPLETED)
+        self.assertEqual(ReportJob.objects.get(pk=live.pk).status, ReportJob.Status.RUNNING)
+
+    def test_requeued_run_does_not_overwrite_new_run(self):
+        """Test a worker whose job was requeued meanwhile drops its result"""
+        job_id = self.stall_job()
+        stale_run = ReportJob.objects.get(pk=job_id)
+        ReportJob.objects.filter(pk=job_id).update(attempts=2)
+
+        with self.assertRaises(LeaseLost):
+            _heartbeat(stale_run)
+
+    def test_jobs_are_site_scoped(self):
+        """Test jobs are neither shared with nor visible to another site"""
+        job_id = self.request_job().data['data']['id']
+
+        self.client.force_authenticate(user=self.other_supervisor)
+        detail = self.client.get(reverse('v1:report-job-detail', kwargs={'job_id': job_id}))
+        self.assertEqual(detail.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertNotEqual(self.request_job().data['data']['id'], job_id)
+
+    def test_job_requires_report_permission(self):
+        """Test a supervisor cannot queue an admin-only report"""
+        response = self.request_job(report='quality')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertFalse(ReportJob.objects.exists())
+
+
+# REPORT SCHEDULE TESTS
+class WeeklyFailingEmailBackend(locmem.EmailBackend):
+    """Email backend rejecting the weekly production report"""
+
+    def send_messages(self, messages):
+        if any('Weekly' in message.subject for message in messages):
+            raise SMTPException("Recipient refused")
+        return super().send_messages(messages)
+
+
+class ReportScheduleRunTest(APITestCase):
+    """Test cases for running due report schedules"""
+
+    def setUp(self):
+        """Set up machines and schedules that are due, paused and in the future"""
+        self.admin = User.objects.create_user(
+            username="admin_user",
+            email="admin@texpro.com",
+            password="testpass123",
+            role="admin",
+            status="active",
+            employee_id="AD0001"
+        )
+        machine_type = MachineType.objects.create(name="Weaving Loom")
+        Machine.objects.bulk_create([
+            Machine(machine_id=f"WVG-LOM-{index:03d}", name=f"Loom {index}",
+                    machine_type=machine_type, site_code="BAM001")
+            for index in range(2)
+        ])
+        now = timezone.now()
+        self.daily = ReportSchedule.objects.create(
+            report_title="Daily machine status", report_type="performance", frequency="daily",
+            next_run=now - timedelta(hours=1), recipients="ops@texpro.com, plant@texpro.com",
+            format="csv", created_by=self.admin
+        )
+        self.weekly = ReportSchedule.objects.create(
+            report_title="Weekly production", report_type="production", frequency="weekly",
+            next_run=now - timedelta(minutes=5), recipients="ops@texpro.com",
+            format="excel", created_by=self.admin
+        )
+        self.future = ReportSchedule.objects.create(
+            report_title="Monthly quality", report_type="quality", frequency="monthly",
+            next_run=now + timedelta(days=3), recipients="ops@texpro.com", created_by=self.admin
+        )
+        self.paused = ReportSchedule.objects.create(
+            report_title="Paused costs", report_type="cost", frequency="daily",
+            next_run=now - timedelta(days=1), recipients="ops@texpro.com",
+            status="paused", created_by=self.admin
+        )
+        # Leave only the scheduled reports in the outbox
+        mail.outbox = []
+
+    def test_due_schedules_are_emailed_once(self):
+        """Test due schedules are rendered, batched into emails and advanced"""
+        out = StringIO()
+        call_command('run_report_schedules', '--workers', '0', stdout=out)
+
+        self.assertIn('2/2 schedules run, 2 emails sent', out.getvalue())
+        self.assertEqual(len(mail.outbox), 2)
+        by_subject = {message.subject: message for message in mail.outbox}
+        daily_mail = by_subject["TexPro AI - Daily machine status"]
+        self.assertEqual(daily_mail.to, ["ops@texpro.com", "plant@texpro.com"])
+        filename, content, mimetype = daily_mail.attachments[0]
+        self.assertTrue(filename.endswith('.csv'))
+        self.assertEqual(len(content.splitlines()), 3)
+        self.assertTrue(by_subject["TexPro AI - Weekly production"].attachments[0][0].endswith('.xlsx'))
+
+        self.daily.refresh_from_db()
+        self.assertGreater(self.daily.next_run, timezone.now())
+
+        # A second run finds nothing due
+        call_command('run_report_schedules', '--workers', '0', stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 2)
+        self.paused.refresh_from_db()
+        self.assertLess(self.paused.next_run, timezone.now())
+
+    def test_schedule_without_permission_fails(self):
+        """Test a schedule whose creator lost access to the report is marked failed"""
+        self.admin.role = "technician"
+        self.admin.save()
+
+        call_command('run_report_schedules', '--workers', '0', stdout=StringIO())
+
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(
+            set(ReportSchedule.objects.filter(status="failed").values_list('pk', flat=True)),
+            {self.daily.pk, self.weekly.pk}
+        )
+
+    @override_settings(EMAIL_BACKEND='reports.tests.WeeklyFailingEmailBackend')
+    def test_unsent_email_is_retried(self):
+        """Test a schedule whose email fails keeps its run while the others are sent"""
+        weekly_run = self.weekly.next_run
+
+        out = StringIO()
+        call_command('run_report_schedules', '--workers', '0', stdout=out)
+
+        self.assertIn('1 emails sent, 1 to retry, 0 failed', out.getvalue())
+        self.assertEqual([message.subject for message in mail.outbox], ["TexPro AI - Daily machine status"])
+        self.weekly.refresh_from_db()
+        self.assertEqual(self.weekly.next_run, weekly_run)
+        self.assertEqual(self.weekly.status, "active")
+        self.daily.refresh_from_db()
+        self.assertGreater(self.daily.next_run, timezone.now())
+
+    def test_next_run_follows_cadence(self):
+        """Test missed runs are skipped and months are clamped to their last day"""
+        now = datetime(2025, 3, 10, 6, 0, tzinfo=dt_timezone.utc)
+        self.assertEqual(
+            advance_next_run(datetime(2025, 3, 1, 6, 0, tzinfo=dt_timezone.utc), 'daily', now),
+            datetime(2025, 3, 11, 6, 0, tzinfo=dt_timezone.utc)
+        )
+        self.assertEqual(
+            advance_next_run(datetime(2025, 1, 31, 6, 0, tzinfo=dt_timezone.utc), 'monthly', datetime(2025, 2, 1, tzinfo=dt_timezone.utc)),
+            datetime(2025, 2, 28, 6, 0, tzinfo=dt_timezone.utc)
+        )
@@ -32,6 +32,7 @@ from reports.dashboard_views import (
 )
 
 from reports.views import ReportScheduleCreateView
+from reports.views import ReportJobCreateView, ReportJobDetailView, ReportJobDownloadView
 
 # URL patterns for reports endpoints
 # Note: These will be prefixed with /api/v1/reports/ from core/urls.py
@@ -77,4 +78,8 @@ urlpatterns = [
     path('health/', ReportsHealthView.as_view(), name='reports-health'),
     # Schedule creation endpoint
     path('schedules/', ReportScheduleCreateView.as_view(), name='reports-schedules'),
+    # Background report jobs
+    path('jobs/', ReportJobCreateView.as_view(), name='report-jobs'),
+    path('jobs/<uuid:job_id>/', ReportJobDetailView.as_view(), name='report-job-detail'),
+    path('jobs/<uuid:job_id>/download/', ReportJobDownloadView.as_view(), name='report-job-download'),
 ]
@@ -1,19 +1,25 @@
 """
 Reports app views for TexPro AI
-PDF and Excel export endpoints with comprehensive filtering
+PDF, Excel, CSV and NDJSON export endpoints with comprehensive filtering
 """
 
 from rest_framework.views import APIView
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 from rest_framework import status
-from django.http import HttpResponse
+from django.http import FileResponse, Http404, HttpResponse
+from django.shortcuts import get_object_or_404
 import logging
 import traceback
 
+from reports.renderers import CSVStreamRenderer, NDJSONStreamRenderer
+from reports.services import get_stream_format, stream_report_response
+
 from reports.permissions import (
     WorkflowReportsPermission, MachineReportsPermission,
     MaintenanceReportsPermission, QualityReportsPermission,
-    AllocationReportsPermission, AnalyticsReportsPermission
+    AllocationReportsPermission, AnalyticsReportsPermission,
+    REPORT_PERMISSIONS
 )
 
 from reports.report_generators import (
@@ -32,9 +38,30 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.generics import CreateAPIView
 from reports.serializers.report_schedule_serializer import ReportScheduleSerializer
 from reports.models.report_schedule import ReportSchedule
+from reports.serializers.report_job_serializer import ReportJobRequestSerializer, ReportJobSerializer
+from reports.models.report_job import ReportJob
+from reports.jobs import request_report_job
+from core.models import user_site_code
 
 
-class WorkflowReportPDFView(APIView):
+class StreamingReportMixin:
+    """
+    Adds format=csv and format=ndjson to a report export view: the
+    filtered rows are streamed instead of building the PDF/Excel document
+    """
+    
+    report_name = None
+    renderer_classes = [JSONRenderer, CSVStreamRenderer, NDJSONStreamRenderer]
+    
+    def get_stream_response(self, request):
+        """Streaming response for a CSV/NDJSON request, None for other formats"""
+        export_format = get_stream_format(request)
+        if export_format is None:
+            return None
+        return stream_report_response(self.report_name, request, export_format)
+
+
+class WorkflowReportPDFView(StreamingReportMixin, APIView):
     """
     Workflow batches PDF export
     GET /api/v1/reports/workflow/pdf/
@@ -46,13 +73,18 @@ class WorkflowReportPDFView(APIView):
     - status: Filter by batch status
     - product_type: Filter by product type
     - batch_number: Filter by batch number (partial match)
+    - format: csv or ndjson to stream the filtered rows (any report endpoint)
     """
     
     permission_classes = [WorkflowReportsPermission]
+    report_name = 'workflow'
     
     def get(self, request):
         """Generate workflow PDF report"""
         try:
+            stream_response = self.get_stream_response(request)
+            if stream_response is not None:
+                return stream_response
             return generate_workflow_pdf(request)
         except Exception as e:
             logging.exception('Workflow PDF generation failed')
@@ -62,17 +94,21 @@ class WorkflowReportPDFView(APIView):
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-class WorkflowReportExcelView(APIView):
+class WorkflowReportExcelView(StreamingReportMixin, APIView):
     """
     Workflow batches Excel export
     GET /api/v1/reports/workflow/excel/
     """
     
     permission_classes = [WorkflowReportsPermission]
+    report_name = 'workflow'
     
     def get(self, request):
         """Generate workflow Excel report"""
         try:
+            stream_response = self.get_stream_response(request)
+            if stream_response is not None:
+                return stream_response
             return generate_workflow_excel(request)
         except Exception as e:
             logging.exception('Workflow Excel generation failed')
@@ -82,7 +118,7 @@ class WorkflowReportExcelView(APIView):
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-class MachineReportPDFView(APIView):
+class MachineReportPDFView(StreamingReportMixin, APIView):
     """
     Machine status PDF export
     GET /api/v1/reports/machines/pdf/
@@ -94,10 +130,14 @@ class MachineReportPDFView(APIView):
     """
     
     permission_classes = [MachineReportsPermission]
+    report_name = 'machines'
     
     def get(self, request):
         """Generate machine PDF report"""
         try:
+            stream_response = self.get_stream_response(request)
+            if stream_response is not None:
+                return stream_response
             return generate_machine_pdf(request)
         except Exception as e:
             logging.exception('Machine PDF generation failed')
@@ -107,17 +147,21 @@ class MachineReportPDFView(APIView):
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-class MachineReportExcelView(APIView):
+class MachineReportExcelView(StreamingReportMixin, APIView):
     """
     Machine status Excel export
     GET /api/v1/reports/machines/excel/
     """
     
     permission_classes = [MachineReportsPermission]
+    report_name = 'machines'
     
     def get(self, request):
         """Generate machine Excel report"""
         try:
+            stream_response = self.get_stream_response(request)
+            if stream_response is not None:
+                return stream_response
             return generate_machine_excel(request)
         except Exception as e:
             logging.exception('Machine Excel generation failed')
@@ -127,7 +171,7 @@ class MachineReportExcelView(APIView):
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-class MaintenanceReportPDFView(APIView):
+class MaintenanceReportPDFView(StreamingReportMixin, APIView):
     """
     Maintenance logs PDF export
     GET /api/v1/reports/maintenance/pdf/
@@ -142,10 +186,14 @@ class MaintenanceReportPDFView(APIView):
     """
     
     permission_classes = [MaintenanceReportsPermission]
+    report_name = 'maintenance'
     
     def get(self, request):
         """Generate maintenance PDF report"""
         try:
+            stream_response = self.get_stream_response(request)
+            if stream_response is not None:
+                return stream_response
             return generate_maintenance_pdf(request)
         except Exception as e:
             logging.exception('Maintenance PDF generation failed')
@@ -155,17 +203,21 @@ class MaintenanceReportPDFView(APIView):
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-class MaintenanceReportExcelView(APIView):
+class MaintenanceReportExcelView(StreamingReportMixin, APIView):
     """
     Maintenance logs Excel export
     GET /api/v1/reports/maintenance/excel/
     """
     
     permission_classes = [MaintenanceReportsPermission]
+    report_name = 'maintenance'
     
     def get(self, request):
         """Generate maintenance Excel report"""
         try:
+            stream_response = self.get_stream_response(request)
+            if stream_response is not None:
+                return stream_response
             return generate_maintenance_excel(request)
         except Exception as e:
             logging.exception('Maintenance Excel generation failed')
@@ -175,7 +227,7 @@ class MaintenanceReportExcelView(APIView):
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-class QualityReportPDFView(APIView):
+class QualityReportPDFView(StreamingReportMixin, APIView):
     """
     Quality checks PDF export
     GET /api/v1/reports/quality/pdf/
@@ -190,10 +242,14 @@ class QualityReportPDFView(APIView):
     """
     
     permission_classes = [QualityReportsPermission]
+    report_name = 'quality'
     
     def get(self, request):
         """Generate quality PDF report"""
         try:
+            stream_response = self.get_stream_response(request)
+            if stream_response is not None:
+                return stream_response
             return generate_quality_pdf(request)
         except Exception as e:
             logging.exception('Quality PDF generation failed')
@@ -203,17 +259,21 @@ class QualityReportPDFView(APIView):
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-class QualityReportExcelView(APIView):
+class QualityReportExcelView(StreamingReportMixin, APIView):
     """
     Quality checks Excel export
     GET /api/v1/reports/quality/excel/
     """
     
     permission_classes = [QualityReportsPermission]
+    report_name = 'quality'
     
     def get(self, request):
         """Generate quality Excel report"""
         try:
+            stream_response = self.get_stream_response(request)
+            if stream_response is not None:
+                return stream_response
             return generate_quality_excel(request)
         except Exception as e:
             logging.exception('Quality Excel generation failed')
@@ -223,7 +283,7 @@ class QualityReportExcelView(APIView):
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-class AllocationReportPDFView(APIView):
+class AllocationReportPDFView(StreamingReportMixin, APIView):
     """
     Resource allocation PDF export
     GET /api/v1/reports/allocation/pdf/
@@ -238,10 +298,14 @@ class AllocationReportPDFView(APIView):
     """
     
     permission_classes = [AllocationReportsPermission]
+    report_name = 'allocation'
     
     def get(self, request):
         """Generate allocation PDF report"""
         try:
+            stream_response = self.get_stream_response(request)
+            if stream_response is not None:
+                return stream_response
             return generate_allocation_pdf(request)
         except Exception as e:
             logging.exception('Allocation PDF generation failed')
@@ -251,17 +315,21 @@ class AllocationReportPDFView(APIView):
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-class AllocationReportExcelView(APIView):
+class AllocationReportExcelView(StreamingReportMixin, APIView):
     """
     Resource allocation Excel export
     GET /api/v1/reports/allocation/excel/
     """
     
     permission_classes = [AllocationReportsPermission]
+    report_name = 'allocation'
     
     def get(self, request):
         """Generate allocation Excel report"""
         try:
+            stream_response = self.get_stream_response(request)
+            if stream_response is not None:
+                return stream_response
             return generate_allocation_excel(request)
         except Exception as e:
             logging.exception('Allocation Excel generation failed')
@@ -271,17 +339,21 @@ class AllocationReportExcelView(APIView):
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-class AnalyticsReportPDFView(APIView):
+class AnalyticsReportPDFView(StreamingReportMixin, APIView):
     """
     Analytics KPIs PDF export
     GET /api/v1/reports/analytics/pdf/
     """
     
     permission_classes = [AnalyticsReportsPermission]
+    report_name = 'analytics'
     
     def get(self, request):
         """Generate analytics PDF report"""
         try:
+            stream_response = self.get_stream_response(request)
+            if stream_response is not None:
+                return stream_response
             return generate_analytics_pdf(request)
         except Exception as e:
             logging.exception('Analytics PDF generation failed')
@@ -291,17 +363,21 @@ class AnalyticsReportPDFView(APIView):
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-class AnalyticsReportExcelView(APIView):
+class AnalyticsReportExcelView(StreamingReportMixin, APIView):
     """
     Analytics KPIs Excel export
     GET /api/v1/reports/analytics/excel/
     """
     
     permission_classes = [AnalyticsReportsPermission]
+    report_name = 'analytics'
     
     def get(self, request):
         """Generate analytics Excel report"""
         try:
+            stream_response = self.get_stream_response(request)
+            if stream_response is not None:
+                return stream_response
             return generate_analytics_excel(request)
         except Exception as e:
             logging.exception('Analytics Excel generation failed')
@@ -393,3 +469,91 @@ class ReportScheduleCreateView(CreateAPIView):
         serializer.is_valid(raise_exception=True)
         self.perform_create(serializer)
         return Response({'success': True, 'data': serializer.data}, status=status.HTTP_201_CREATED)
+
+
+class ReportJobAccessMixin:
+    """Report permission and site checks for background report jobs"""
+
+    def has_report_permission(self, request, report):
+        return REPORT_PERMISSIONS[report]().has_permission(request, self)
+
+    def get_job(self, request, job_id):
+        """The job if the user may read its report and site, 404 otherwise"""
+        job = get_object_or_404(ReportJob, pk=job_id)
+        if not self.has_report_permission(request, job.report):
+            raise Http404
+        if job.site_code != (user_site_code(request.user) or ''):
+            raise Http404
+        return job
+
+
+class ReportJobCreateView(ReportJobAccessMixin, APIView):
+    """
+    Queue a report for background rendering
+    POST /api/v1/reports/jobs/
+
+    Body:
+    - report: workflow, machines, maintenance, quality, allocation or analytics
+    - format: pdf, excel, csv or ndjson
+    - filters: query parameters of the report's export endpoint
+
+    Returns 202 with the queued job, or 200 when an identical request
+    already has a fresh rendered report.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = ReportJobRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        report = serializer.validated_data['report']
+
+        if not self.has_report_permission(request, report):
+            return Response({
+                'success': False,
+                'error': 'You do not have permission to generate this report'
+            }, status=status.HTTP_403_FORBIDDEN)
+
+        job, created = request_report_job(
+            report,
+            serializer.validated_data['format'],
+            serializer.validated_data['filters'],
+            request.user
+        )
+        response_status = status.HTTP_200_OK if job.status == ReportJob.Status.COMPLETED else status.HTTP_202_ACCEPTED
+        return Response({
+            'success': True,
+            'deduplicated': not created,
+            'data': ReportJobSerializer(job, context={'request': request}).data
+        }, status=response_status)
+
+
+class ReportJobDetailView(ReportJobAccessMixin, APIView):
+    """
+    Status of a background report job
+    GET /api/v1/reports/jobs/<job_id>/
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, job_id):
+        job = self.get_job(request, job_id)
+        return Response({
+            'success': True,
+            'data': ReportJobSerializer(job, context={'request': request}).data
+        })
+
+
+class ReportJobDownloadView(ReportJobAccessMixin, APIView):
+    """
+    Download the rendered report of a completed job
+    GET /api/v1/reports/jobs/<job_id>/download/
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, job_id):
+        job = self.get_job(request, job_id)
+        if job.status != ReportJob.Status.COMPLETED or not job.file:
+            return Response({
+                'success': False,
+                'error': f'Report is not ready (status: {job.status})'
+            }, status=status.HTTP_409_CONFLICT)
+        return FileResponse(job.file.open('rb'), as_attachment=True, filename=job.filename)
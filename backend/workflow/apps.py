@@ -13,5 +13,10 @@ class WorkflowConfig(AppConfig):
     
     def ready(self):
         """Initialize app when ready"""
+        from core.tracking import track_changes
+        from workflow.models import BatchWorkflow
+
+        # Status changes are read by the notification signals
+        track_changes(BatchWorkflow, 'status')
         # Import signal handlers if any
         # import workflow.signals
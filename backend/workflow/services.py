@@ -3,12 +3,16 @@ Workflow services for TexPro AI
 Business logic for batch workflow management
 """
 import logging
+from collections import defaultdict
 from datetime import date
 from django.utils import timezone
 from django.db import transaction
+from django.db.models import QuerySet
 from django.core.exceptions import ValidationError
 from .models import BatchWorkflow
 from users.models import User
+from analytics.signals import invalidate_analytics
+from notifications.buffer import enqueue_notification
 
 logger = logging.getLogger('texproai.workflow')
 
@@ -82,27 +86,52 @@ class BatchWorkflowService:
     def auto_update_delayed_batches():
         """
         Automatically mark overdue batches as delayed
-        This should be run periodically (e.g., daily cron job)
+        Run periodically by the scheduler (see core.jobs): the batches are
+        read and locked with one query and marked with a single UPDATE, and
+        their delay notifications are created in bulk on commit
         """
         try:
             overdue_batches = BatchWorkflow.get_overdue_batches()
-            updated_count = 0
+            if isinstance(overdue_batches, QuerySet):
+                overdue_ids = overdue_batches.values('pk')
+            else:
+                overdue_ids = [batch.pk for batch in overdue_batches]
             
-            for batch in overdue_batches:
-                try:
-                    batch.mark_as_delayed()
-                    updated_count += 1
-                    logger.info(f"Marked batch {batch.batch_code} as delayed (overdue)")
-                except Exception as e:
-                    logger.error(f"Failed to mark batch {batch.batch_code} as delayed: {str(e)}")
+            with transaction.atomic():
+                batches = list(
+                    BatchWorkflow.objects.select_for_update().filter(
+                        pk__in=overdue_ids
+                    ).exclude(status='delayed')
+                )
+                if batches:
+                    BatchWorkflow.objects.filter(pk__in=[batch.pk for batch in batches]).update(
+                        status='delayed',
+                        updated_at=timezone.now()
+                    )
+                    BatchWorkflowService._notify_status_changes(batches, 'delayed')
+                    invalidate_analytics('workflow')
             
-            logger.info(f"Auto-updated {updated_count} overdue batches to delayed status")
-            return updated_count
+            logger.info(f"Auto-updated {len(batches)} overdue batches to delayed status")
+            return len(batches)
             
         except Exception as e:
             logger.error(f"Failed to auto-update delayed batches: {str(e)}")
             raise
     
+    @staticmethod
+    def _notify_status_changes(batches, new_status, user=None):
+        """
+        Queue the status change notifications of batches moved to new_status
+        by a queryset UPDATE, which skips post_save
+        """
+        for batch in batches:
+            changed = batch.status != new_status
+            batch.status = new_status
+            # The row now holds the new status
+            batch._snapshot_tracked_fields()
+            if changed:
+                enqueue_notification('workflow', batch, new_status.lower(), user=user)
+    
     @staticmethod
     def start_batch_workflow(batch_id, start_date=None, user=None):
         """
@@ -288,16 +317,61 @@ class BatchWorkflowService:
     def bulk_update_batch_status(batch_ids, new_status, user=None):
         """
         Bulk update status for multiple batches
+        
+        All target rows are locked with one query and the transitions are
+        validated in memory, then applied with one UPDATE per source status;
+        the status change notifications are created in bulk on commit.
+        Invalid transitions and unknown ids are reported per id without
+        blocking the valid ones.
         """
         updated_batches = []
         failed_batches = []
         
-        for batch_id in batch_ids:
-            try:
-                batch = BatchWorkflowService.update_batch_status(batch_id, new_status, user)
-                updated_batches.append(batch)
-            except Exception as e:
-                failed_batches.append({'batch_id': batch_id, 'error': str(e)})
+        # Keep the caller's order, drop duplicates
+        requested_ids = list(dict.fromkeys(str(batch_id) for batch_id in batch_ids))
+        
+        try:
+            with transaction.atomic():
+                batches = {
+                    str(batch.pk): batch
+                    for batch in BatchWorkflow.objects.select_for_update().filter(id__in=requested_ids)
+                }
+                
+                ids_by_status = defaultdict(list)
+                for batch_id in requested_ids:
+                    batch = batches.get(batch_id)
+                    if batch is None:
+                        failed_batches.append({'batch_id': batch_id, 'error': 'Batch not found'})
+                    elif not batch._is_valid_status_transition(batch.status, new_status):
+                        failed_batches.append({
+                            'batch_id': batch_id,
+                            'error': f'Invalid status transition from {batch.status} to {new_status}'
+                        })
+                    else:
+                        ids_by_status[batch.status].append(batch.pk)
+                        updated_batches.append(batch)
+                
+                updated_at = timezone.now()
+                for old_status, ids in ids_by_status.items():
+                    BatchWorkflow.objects.filter(pk__in=ids).update(
+                        status=new_status,
+                        updated_at=updated_at
+                    )
+                    logger.info(
+                        f"Bulk status update: {len(ids)} batches changed from {old_status} to {new_status}"
+                    )
+                
+                for batch in updated_batches:
+                    batch.updated_at = updated_at
+                BatchWorkflowService._notify_status_changes(updated_batches, new_status, user)
+                
+                # Queryset updates bypass the signals invalidating cached analytics
+                if updated_batches:
+                    invalidate_analytics('workflow')
+                
+        except Exception as e:
+            logger.error(f"Failed to bulk update batch status: {str(e)}")
+            raise
         
         logger.info(
             f"Bulk status update: {len(updated_batches)} successful, "
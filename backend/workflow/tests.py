@@ -1,3 +1,245 @@
+"""
+Test suite for workflow app
+Tests batch workflow services and periodic jobs
+"""
+import uuid
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.scheduler import JobScheduler
+from notifications.models import Notification
+from notifications.models.scheduled_job_run import ScheduledJobRun
+from workflow.models import BatchWorkflow
+from workflow.services import BatchWorkflowService
+
+User = get_user_model()
+
+
+class WorkflowTestMixin:
+    """Mixin providing common test data for workflow tests"""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Set up test data shared across test methods"""
+        cls.supervisor = User.objects.create_user(
+            username="supervisor_user",
+            email="supervisor@texpro.com",
+            password="testpass123",
+            role="supervisor",
+            first_name="Supervisor",
+            last_name="User",
+            employee_id="SV0001"
+        )
+
+    def create_batch(self, batch_code, **kwargs):
+        """Helper method to add a batch without firing signals"""
+        return BatchWorkflow.objects.bulk_create([
+            BatchWorkflow(batch_code=batch_code, supervisor=self.supervisor, **kwargs)
+        ])[0]
+
+
+# SERVICE TESTS
+class DelayedBatchUpdateTest(WorkflowTestMixin, TestCase):
+    """Test cases for marking overdue batches as delayed"""
+
+    def test_overdue_batches_marked_in_one_update(self):
+        """Test overdue batches are marked delayed with a single UPDATE"""
+        today = timezone.now().date()
+        overdue = self.create_batch("BATCH-001", status='in_progress', end_date=today - timedelta(days=2))
+        on_time = self.create_batch("BATCH-002", status='in_progress', end_date=today + timedelta(days=2))
+        done = self.create_batch("BATCH-003", status='completed', end_date=today - timedelta(days=2))
+
+        # SAVEPOINT, SELECT ... FOR UPDATE, UPDATE, RELEASE SAVEPOINT
+        with self.assertNumQueries(4):
+            updated_count = BatchWorkflowService.auto_update_delayed_batches()
+
+        self.assertEqual(updated_count, 1)
+        self.assertEqual(BatchWorkflow.objects.get(pk=overdue.pk).status, 'delayed')
+        self.assertEqual(BatchWorkflow.objects.get(pk=on_time.pk).status, 'in_progress')
+        self.assertEqual(BatchWorkflow.objects.get(pk=done.pk).status, 'completed')
+
+    def test_delayed_batches_are_notified(self):
+        """Test batches marked delayed get their delay notification once committed"""
+        today = timezone.now().date()
+        self.create_batch("BATCH-001", status='in_progress', end_date=today - timedelta(days=2))
+        Notification.objects.all().delete()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            BatchWorkflowService.auto_update_delayed_batches()
+
+        self.assertEqual(
+            list(Notification.objects.values_list('title', flat=True)),
+            ["Batch BATCH-001 Delayed"]
+        )
+
+
+class BulkStatusUpdateTest(WorkflowTestMixin, TestCase):
+    """Test cases for set-based bulk status transitions"""
+
+    def test_valid_transitions_applied_and_invalid_reported(self):
+        """Test valid transitions are applied while invalid ones fail per id"""
+        pending = self.create_batch("BATCH-001", status='pending')
+        delayed = self.create_batch("BATCH-002", status='delayed')
+        completed = self.create_batch("BATCH-003", status='completed')
+        missing_id = uuid.uuid4()
+
+        result = BatchWorkflowService.bulk_update_batch_status(
+            [pending.id, delayed.id, completed.id, missing_id], 'cancelled'
+        )
+
+        self.assertEqual(result['success_count'], 2)
+        self.assertEqual(result['failure_count'], 2)
+        self.assertEqual([batch.pk for batch in result['updated']], [pending.pk, delayed.pk])
+        self.assertEqual(
+            {failure['batch_id'] for failure in result['failed']},
+            {str(completed.id), str(missing_id)}
+        )
+        self.assertEqual(
+            set(BatchWorkflow.objects.filter(status='cancelled').values_list('pk', flat=True)),
+            {pending.pk, delayed.pk}
+        )
+        self.assertEqual(BatchWorkflow.objects.get(pk=completed.pk).status, 'completed')
+
+    def test_transitions_are_notified(self):
+        """Test every bulk transition sends the status change notification of a single update"""
+        batches = [self.create_batch(f"BATCH-{index:03d}", status='pending') for index in range(3)]
+        Notification.objects.all().delete()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            BatchWorkflowService.bulk_update_batch_status([batch.id for batch in batches], 'cancelled')
+
+        self.assertEqual(
+            sorted(Notification.objects.values_list('title', flat=True)),
+            [f"Batch BATCH-{index:03d} Cancelled" for index in range(3)]
+        )
+
+    def test_query_count_independent_of_batch_count(self):
+        """Test one lock query plus one UPDATE per source status"""
+        ids = [
+            self.create_batch(f"BATCH-{index:03d}", status=['pending', 'delayed'][index % 2]).id
+            for index in range(40)
+        ]
+
+        # SAVEPOINT, SELECT ... FOR UPDATE, 2 UPDATEs, RELEASE SAVEPOINT
+        with self.assertNumQueries(5):
+            result = BatchWorkflowService.bulk_update_batch_status(ids, 'cancelled')
+
+        self.assertEqual(result['success_count'], 40)
+
+    def test_bulk_update_endpoint(self):
+        """Test the bulk update endpoint serializes the updated batches"""
+        batch = self.create_batch("BATCH-001", status='pending')
+        client = APIClient()
+        client.force_authenticate(user=self.supervisor)
+
+        response = client.post(reverse('v1:workflow:batch-bulk-update-status'), {
+            'batch_ids': [str(batch.id)],
+            'status': 'in_progress'
+        }, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['data']['success_count'], 1)
+        self.assertEqual(response.data['data']['updated'][0]['status'], 'in_progress')
+
+
+# SCHEDULER TESTS
+class JobSchedulerTest(TestCase):
+    """Test cases for the periodic job scheduler"""
+
+    def setUp(self):
+        """Set up a scheduler with a counting job"""
+        self.calls = []
+        self.scheduler = JobScheduler()
+        self.scheduler.add_job('count', lambda: self.calls.append(1) or len(self.calls), timedelta(hours=1))
+
+    def test_job_runs_once_per_interval(self):
+        """Test a job does not run again within its interval"""
+        first = self.scheduler.run_job('count')
+        second = self.scheduler.run_job('count')
+
+        self.assertEqual(first['status'], 'ran')
+        self.assertEqual(first['result'], 1)
+        self.assertEqual(second['status'], 'not_due')
+        self.assertEqual(len(self.calls), 1)
+
+    def test_force_ignores_interval(self):
+        """Test forcing a job runs it again"""
+        self.scheduler.run_job('count')
+        outcome = self.scheduler.run_job('count', force=True)
+
+        self.assertEqual(outcome['status'], 'ran')
+        self.assertEqual(len(self.calls), 2)
+
+    def test_running_lock_prevents_double_run(self):
+        """Test a job held by another worker is skipped, even when forced"""
+        ScheduledJobRun.objects.create(
+            name='count', locked_until=timezone.now() + timedelta(minutes=1), lock_token='other-worker'
+        )
+
+        outcome = self.scheduler.run_job('count', force=True)
+
+        self.assertEqual(outcome['status'], 'locked')
+        self.assertEqual(self.calls, [])
+        self.assertEqual(ScheduledJobRun.objects.get(name='count').lock_token, 'other-worker')
+
+    def test_lease_is_shared_between_processes(self):
+        """Test another scheduler (another process) sees the interval lease in the database"""
+        other = JobScheduler()
+        other.add_job('count', lambda: self.calls.append(1), timedelta(hours=1))
+
+        self.assertEqual(self.scheduler.run_job('count')['status'], 'ran')
+        self.assertEqual(other.run_job('count')['status'], 'not_due')
+        self.assertEqual(len(self.calls), 1)
+
+        # An expired lock of a crashed run does not block the job forever
+        ScheduledJobRun.objects.filter(name='count').update(
+            due_at=timezone.now(), locked_until=timezone.now() - timedelta(seconds=1), lock_token='crashed'
+        )
+        self.assertEqual(other.run_job('count')['status'], 'ran')
+
+    def test_failing_job_reported_and_lock_released(self):
+        """Test a failing job is reported, releases its lock and stays due"""
+        attempts = []
+
+        def broken():
+            attempts.append(1)
+            raise RuntimeError("boom")
+
+        self.scheduler.add_job('broken', broken, timedelta(minutes=5))
+        outcome = self.scheduler.run_job('broken')
+
+        self.assertEqual(outcome['status'], 'failed')
+        self.assertEqual(outcome['error'], 'boom')
+        run = ScheduledJobRun.objects.get(name='broken')
+        self.assertIsNone(run.locked_until)
+        self.assertEqual(run.last_error, 'boom')
+
+        # Retried at the next poll instead of after the interval
+        self.assertEqual(self.scheduler.run_job('broken')['status'], 'failed')
+        self.assertEqual(len(attempts), 2)
+
+    def test_registered_jobs(self):
+        """Test the periodic jobs are registered on the shared scheduler"""
+        import core.jobs  # noqa: F401
+        from core.scheduler import scheduler
 
-# Create your tests here.
+        self.assertEqual(
+            {job.name for job in scheduler.jobs},
+            {
+                'mark_delayed_batches',
+                'maintenance_due_notifications',
+                'overdue_maintenance_notifications',
+                'batch_delay_notifications',
+                'refresh_machine_metrics',
+                'prune_report_jobs',
+                'run_report_schedules',
+                'dispatch_email_outbox',
+                'notification_digests',
+            }
+        )
@@ -9,7 +9,7 @@ from rest_framework.response import Response
 from rest_framework.pagination import PageNumberPagination
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters
-from django.db.models import Q
+from django.db.models import Q, prefetch_related_objects
 from django.utils import timezone
 from ..models import BatchWorkflow
 from ..serializers import (
@@ -100,9 +100,7 @@ class BatchWorkflowViewSet(viewsets.ModelViewSet):
         List batch workflows with filtering and pagination
         """
         try:
-            # Run auto-update for delayed batches
-            BatchWorkflowService.auto_update_delayed_batches()
-            
+            # Overdue batches are marked delayed by the scheduler (core.jobs)
             response = super().list(request, *args, **kwargs)
             
             # Add metadata to response
@@ -326,6 +324,11 @@ class BatchWorkflowViewSet(viewsets.ModelViewSet):
                 request.user
             )
             
+            prefetch_related_objects(result['updated'], 'supervisor')
+            result['updated'] = BatchWorkflowListSerializer(
+                result['updated'], many=True, context={'request': request}
+            ).data
+            
             return Response({
                 'success': True,
                 'message': f'Bulk update completed: {result["success_count"]} successful, {result["failure_count"]} failed',